@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark del transporte stdio (Content-Length + JSON-RPC) del servidor MCP.
+
+Compara el framing anterior con ``_FrameReader`` y ``_FrameWriter`` en
+mensajes por segundo, para dos tamanos de mensaje:
+
+- ``ping``: peticiones y respuestas minimas, donde pesa el coste fijo por
+  mensaje (lecturas por linea, decodificaciones, un flush por respuesta).
+- ``search 1MB``: respuestas de ``memory_search`` de aproximadamente 1 MB,
+  donde pesan las copias del cuerpo (decodificar a ``str``, concatenar
+  encabezado y cuerpo).
+
+Lectura: el anterior hace un ``readline()`` por encabezado, decodifica
+cada linea a ASCII y el cuerpo a ``str`` antes de ``json.loads``; el nuevo
+lee por bloques en un ``bytearray`` reutilizable, reconoce el encabezado
+con una expresion regular y decodifica el cuerpo desde el buffer. Los
+mensajes se leen de un fichero temporal con ``open(..., "rb")``, el mismo
+tipo de flujo que ``sys.stdin.buffer``.
+
+Escritura: el anterior concatena encabezado y cuerpo y hace flush por
+mensaje; el nuevo encola y escribe cada rafaga de ``--burst`` mensajes
+con un solo ``os.writev``. La salida va a ``os.devnull``.
+
+Uso:
+    python3 benchmarks/bench_mcp_framing.py
+    python3 benchmarks/bench_mcp_framing.py --pings 50000 --searches 50 --burst 8
+
+Los ficheros temporales se eliminan al terminar.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mcp.memory_server import _FrameReader, _FrameWriter
+
+
+def _legacy_read_message(stream: Any) -> Optional[Dict[str, Any]]:
+    """Lectura anterior: una linea por encabezado y cuerpo decodificado."""
+    content_length: Optional[int] = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line_str = line.decode("ascii").strip()
+        if line_str == "":
+            if content_length is not None:
+                break
+            continue
+        if line_str.lower().startswith("content-length:"):
+            content_length = int(line_str.split(":", 1)[1].strip())
+    body = stream.read(content_length)
+    if len(body) < content_length:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def _legacy_write_message(stream: Any, msg: Dict[str, Any]) -> None:
+    """Escritura anterior: encabezado + cuerpo concatenados y flush."""
+    body = json.dumps(msg, ensure_ascii=False).encode("utf-8")
+    header = f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+    stream.write(header + body)
+    stream.flush()
+
+
+def _ping(request_id: int) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "ping"}
+
+
+def _search_response(request_id: int, size: int) -> Dict[str, Any]:
+    """Respuesta de memory_search con ``size`` bytes de texto aproximados."""
+    hit = {
+        "type": "decision",
+        "id": 1,
+        "title": "Encolar el envio de correos con RabbitMQ",
+        "snippet": "El servicio de notificaciones envia **correos** de forma "
+                   "sincrona dentro de la peticion HTTP...",
+        "tags": ["notificaciones", "colas"],
+        "decided_at": "2026-03-01T00:00:00+00:00",
+    }
+    hit_size = len(json.dumps(hit, ensure_ascii=False))
+    results = [dict(hit, id=i) for i in range(size // hit_size)]
+    text = json.dumps({"results": results}, ensure_ascii=False,
+                      separators=(",", ":"))
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "result": {"content": [{"type": "text", "text": text}],
+                   "isError": False},
+    }
+
+
+def _encode_frames(messages: List[Dict[str, Any]]) -> bytes:
+    frames = []
+    for msg in messages:
+        body = json.dumps(msg, ensure_ascii=False).encode("utf-8")
+        frames.append(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    return b"".join(frames)
+
+
+def _compare(
+    legacy: Callable[[], int], framed: Callable[[], int], repeat: int,
+) -> Dict[str, float]:
+    """Mejor tasa (mensajes/s) de cada funcion en ``repeat`` rondas.
+
+    Las ejecuciones se alternan para que el ruido de la maquina afecte
+    por igual a las dos.
+    """
+    best = {"anterior": 0.0, "nuevo": 0.0}
+    for _ in range(repeat):
+        for name, fn in (("anterior", legacy), ("nuevo", framed)):
+            start = time.perf_counter()
+            count = fn()
+            best[name] = max(best[name], count / (time.perf_counter() - start))
+    return best
+
+
+def bench_read(path: str, repeat: int) -> Dict[str, float]:
+    """Tasas de lectura anterior y nueva sobre el fichero ``path``."""
+    def legacy() -> int:
+        count = 0
+        with open(path, "rb") as stream:
+            while _legacy_read_message(stream) is not None:
+                count += 1
+        return count
+
+    def framed() -> int:
+        count = 0
+        with open(path, "rb") as stream:
+            reader = _FrameReader(stream)
+            while reader.read_message() is not None:
+                count += 1
+        return count
+
+    return _compare(legacy, framed, repeat)
+
+
+def bench_write(
+    messages: List[Dict[str, Any]], burst: int, repeat: int,
+) -> Dict[str, float]:
+    """Tasas de escritura anterior y nueva hacia ``os.devnull``."""
+    def legacy() -> int:
+        with open(os.devnull, "wb") as stream:
+            for msg in messages:
+                _legacy_write_message(stream, msg)
+        return len(messages)
+
+    def framed() -> int:
+        with open(os.devnull, "wb") as stream:
+            writer = _FrameWriter(stream)
+            for index, msg in enumerate(messages, 1):
+                writer.enqueue(msg)
+                if index % burst == 0:
+                    writer.flush()
+            writer.flush()
+        return len(messages)
+
+    return _compare(legacy, framed, repeat)
+
+
+def run(pings: int, searches: int, size: int, burst: int, repeat: int) -> None:
+    """Ejecuta el benchmark e imprime una fila por caso."""
+    tmpdir = tempfile.mkdtemp(prefix="alfred-bench-")
+    try:
+        cases = [
+            ("ping", [_ping(i) for i in range(pings)]),
+            ("search 1MB", [_search_response(i, size) for i in range(searches)]),
+        ]
+        print(f"{'caso':<12} {'operacion':<10} {'anterior msg/s':>15} "
+              f"{'nuevo msg/s':>12} {'x':>6}")
+        for name, messages in cases:
+            path = os.path.join(tmpdir, name.replace(" ", "_"))
+            with open(path, "wb") as stream:
+                stream.write(_encode_frames(messages))
+            for operation, rates in (
+                ("lectura", bench_read(path, repeat)),
+                ("escritura", bench_write(messages, burst, repeat)),
+            ):
+                print(f"{name:<12} {operation:<10} {rates['anterior']:>15,.0f} "
+                      f"{rates['nuevo']:>12,.0f} "
+                      f"{rates['nuevo'] / rates['anterior']:>6.2f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pings", type=int, default=20000,
+                        help="mensajes ping por ejecucion")
+    parser.add_argument("--searches", type=int, default=20,
+                        help="respuestas de busqueda por ejecucion")
+    parser.add_argument("--size", type=int, default=2**20,
+                        help="bytes aproximados de cada respuesta de busqueda")
+    parser.add_argument("--burst", type=int, default=4,
+                        help="mensajes por escritura en el modo nuevo")
+    parser.add_argument("--repeat", type=int, default=15,
+                        help="repeticiones por caso (se toma la mejor)")
+    args = parser.parse_args()
+    run(args.pings, args.searches, args.size, args.burst, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tamano de las respuestas de las herramientas MCP.
+
+Genera una BD con decisiones de texto largo, commits con listas de ficheros
+y eventos con payload, invoca cada herramienta de ``_TOOLS`` con argumentos
+representativos y compara el texto que recibe el modelo en tres modos:
+
+- ``indent``: ``json.dumps(..., indent=2)`` del resultado sin tocar
+  (comportamiento anterior).
+- ``compacto``: ``_encode_result`` sin opciones (sin sangria, sin nulos y
+  con las columnas JSON decodificadas).
+- ``max_chars``: ``_encode_result`` con ``max_chars`` (por defecto 200).
+
+Para cada herramienta imprime los bytes de cada modo, la reduccion
+respecto a ``indent`` y una estimacion de tokens (bytes / 4).
+
+Uso:
+    python3 benchmarks/bench_mcp_payload.py
+    python3 benchmarks/bench_mcp_payload.py --decisions 500 --max-chars 120
+
+La BD se genera en un directorio temporal y se elimina al terminar.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.memory import MemoryDB
+from mcp.memory_server import MemoryMCPServer, _TOOLS, _encode_result
+
+_CONTEXT = (
+    "El servicio de notificaciones envia correos de forma sincrona dentro "
+    "de la peticion HTTP, de modo que un proveedor SMTP lento bloquea el "
+    "hilo del servidor y dispara los tiempos de respuesta del endpoint de "
+    "registro. Ademas, los reintentos se hacen en bucle sin espera. "
+) * 2
+_RATIONALE = (
+    "Desacopla el envio de la peticion, permite reintentos con espera "
+    "exponencial y da visibilidad de la cola en el panel de operaciones. "
+) * 2
+
+
+def populate(db: MemoryDB, decisions: int) -> Tuple[int, int]:
+    """Crea una iteracion con decisiones, commits, eventos y relaciones."""
+    iteration_id = db.start_iteration("feature", "Notificaciones asincronas")
+    ids: List[int] = []
+    with db.batch():
+        for i in range(decisions):
+            ids.append(db.log_decision(
+                title=f"Encolar el envio de correos {i}",
+                chosen="Cola de trabajos con RabbitMQ",
+                context=_CONTEXT,
+                alternatives=["Hilos en el proceso web", "Cron cada minuto",
+                              "Servicio SaaS de correo"],
+                rationale=_RATIONALE,
+                tags=["notificaciones", "colas", "rendimiento"],
+                iteration_id=iteration_id,
+            ))
+            db.log_commit(
+                sha=f"{i:040x}",
+                message=f"feat(notify): encolar correos, paso {i}",
+                author="bench",
+                files=[f"src/notify/worker_{i}_{n}.py" for n in range(10)],
+                iteration_id=iteration_id,
+            )
+            db.log_event(
+                "phase_completed", phase="desarrollo",
+                payload={"fase": "desarrollo", "resultado": "aprobado",
+                         "artefactos": [f"doc/{i}.md", f"src/{i}.py"]},
+                iteration_id=iteration_id,
+            )
+        for source, target in zip(ids[1:], ids[:-1]):
+            db.link_decisions(source, target, "depends_on")
+    return iteration_id, ids[-1]
+
+
+def tool_arguments(
+    iteration_id: int, root_id: int, workdir: str,
+) -> Dict[str, Dict[str, Any]]:
+    """Argumentos representativos de cada herramienta."""
+    return {
+        "memory_search": {"query": "correos", "limit": 20, "full": True},
+        "memory_log_decision": {
+            "title": "Idempotencia de los trabajos", "chosen": "Clave por mensaje",
+            "context": _CONTEXT, "tags": ["colas"],
+        },
+        "memory_log_commit": {
+            "sha": "f" * 40, "message": "fix(notify): reintentos",
+            "files": ["src/notify/retry.py"],
+        },
+        "memory_get_iteration": {"id": iteration_id},
+        "memory_get_timeline": {"iteration_id": iteration_id, "limit": 50},
+        "memory_stats": {},
+        "memory_manage_iteration": {"action": "start", "command": "fix"},
+        "memory_log_event": {"event_type": "gate_passed", "phase": "calidad"},
+        "memory_get_decisions": {"limit": 20},
+        "memory_purge": {"retention_days": 365},
+        "memory_update_decision": {"id": root_id, "tags": ["revisada"]},
+        "memory_link_decisions": {
+            "source_id": root_id, "target_id": 1, "link_type": "relates",
+        },
+        "memory_health": {},
+        "memory_export": {
+            "format": "jsonl", "path": os.path.join(workdir, "decisions.jsonl"),
+        },
+        "memory_import": {"source": "adr", "path": os.path.join(workdir, "adr")},
+        "memory_file_history": {"path": "src/notify/", "limit": 20},
+        "memory_traverse_decisions": {"root_id": root_id, "max_depth": 10},
+    }
+
+
+def run(decisions: int, max_chars: int) -> None:
+    """Ejecuta el benchmark e imprime una fila por herramienta."""
+    tmpdir = tempfile.mkdtemp(prefix="alfred-bench-")
+    try:
+        server = MemoryMCPServer(
+            os.path.join(tmpdir, "bench.db"), retention_days=0,
+            maintenance_interval=0,
+        )
+        db = server._ensure_db()
+        iteration_id, root_id = populate(db, decisions)
+        arguments = tool_arguments(iteration_id, root_id, tmpdir)
+
+        print(f"{'herramienta':<26} {'indent':>9} {'compacto':>9} "
+              f"{'max_chars':>9} {'red.':>6} {'red.mc':>6} {'tokens':>13}")
+        totals = [0, 0, 0]
+        for tool in _TOOLS:
+            name = tool["name"]
+            result = getattr(server, f"_call_{name}")(db, arguments[name])
+            sizes = [
+                len(text.encode("utf-8")) for text in (
+                    json.dumps(result, ensure_ascii=False, indent=2),
+                    _encode_result(result),
+                    _encode_result(result, max_chars=max_chars),
+                )
+            ]
+            totals = [t + s for t, s in zip(totals, sizes)]
+            print(f"{name:<26} {sizes[0]:>9} {sizes[1]:>9} {sizes[2]:>9} "
+                  f"{1 - sizes[1] / sizes[0]:>6.0%} {1 - sizes[2] / sizes[0]:>6.0%} "
+                  f"{sizes[0] // 4:>6}->{sizes[2] // 4:<6}")
+        print(f"{'total':<26} {totals[0]:>9} {totals[1]:>9} {totals[2]:>9} "
+              f"{1 - totals[1] / totals[0]:>6.0%} {1 - totals[2] / totals[0]:>6.0%}")
+        db.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--decisions", type=int, default=200,
+                        help="decisiones (y commits y eventos) de la BD")
+    parser.add_argument("--max-chars", type=int, default=200,
+                        help="max_chars del tercer modo")
+    args = parser.parse_args()
+    run(args.decisions, args.max_chars)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark de MemoryDB.search con filtros (FTS5).
+
+Compara la ruta de busqueda actual (una sola sentencia que une
+``decisions_fts``/``commits_fts`` con sus tablas y aplica los filtros en SQL)
+con la ruta anterior (MATCH con ``LIMIT limit*3``, una consulta por
+resultado y post-filtrado en Python), reimplementada aqui como referencia.
+
+Para cada tamano de BD se mide la latencia media de varias busquedas y
+el numero de resultados devueltos: la ruta anterior devolvia menos de
+``limit`` cuando el filtro era selectivo.
+
+Uso:
+    python3 benchmarks/bench_search.py
+    python3 benchmarks/bench_search.py --sizes 10000,100000 --repeat 20
+
+Las BDs se generan en un directorio temporal y se eliminan al terminar.
+La de 1M filas tarda varios minutos en poblarse.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.memory import MemoryDB
+
+_DEFAULT_SIZES = "10000,100000,1000000"
+
+# Una de cada TAG_EVERY decisiones lleva la etiqueta buscada, de modo que
+# el filtro es selectivo (el caso que la ruta anterior resolvia mal).
+_TAG_EVERY = 50
+_CHUNK = 20000
+
+
+def populate(db: MemoryDB, rows: int) -> None:
+    """Puebla la BD con ``rows`` registros, mitad decisiones y mitad commits.
+
+    Inserta directamente por SQL en bloques para que la generacion no
+    domine el tiempo del benchmark; los triggers mantienen el indice FTS5.
+    """
+    conn = db._conn
+    iteration_id = db.start_iteration(command="bench")
+    half = rows // 2
+    for start in range(0, half, _CHUNK):
+        end = min(start + _CHUNK, half)
+        conn.executemany(
+            "INSERT INTO decisions (iteration_id, title, context, chosen, "
+            "rationale, tags, status, decided_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    iteration_id,
+                    f"Decision de cache numero {i}",
+                    "Contexto de rendimiento",
+                    "Redis" if i % 2 else "Memcached",
+                    "Latencia",
+                    json.dumps(["objetivo"] if i % _TAG_EVERY == 0
+                               else ["ruido"]),
+                    "active" if i % 3 else "superseded",
+                    f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00+00:00",
+                )
+                for i in range(start, end)
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO commits (sha, message, author, iteration_id, "
+            "committed_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    f"{i:040x}",
+                    f"perf: ajustar cache en modulo {i}",
+                    "bench",
+                    iteration_id,
+                    f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00+00:00",
+                )
+                for i in range(start, end)
+            ],
+        )
+        conn.commit()
+
+
+def legacy_search(
+    db: MemoryDB,
+    query: str,
+    limit: int,
+    since: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    status: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Reimplementacion de la ruta anterior: MATCH, N+1 y post-filtrado."""
+    conn = db._conn
+    safe_query = '"' + query.replace('"', '""') + '"'
+    fetch_limit = limit * 3 if (since or tags or status) else limit
+    rows = conn.execute(
+        "SELECT 'decision' AS source_type, rowid AS source_id "
+        "FROM decisions_fts WHERE decisions_fts MATCH ? "
+        "UNION ALL "
+        "SELECT 'commit', rowid FROM commits_fts WHERE commits_fts MATCH ? "
+        "LIMIT ?",
+        (safe_query, safe_query, fetch_limit),
+    ).fetchall()
+
+    results: List[Dict[str, Any]] = []
+    for row in rows:
+        table = "decisions" if row["source_type"] == "decision" else "commits"
+        record = conn.execute(
+            f"SELECT * FROM {table} WHERE id = ?", (int(row["source_id"]),)
+        ).fetchone()
+        if record is None:
+            continue
+        r = {"source_type": row["source_type"], **dict(record)}
+        date = r.get("decided_at") or r.get("committed_at") or ""
+        if since and date and date < since:
+            continue
+        if r["source_type"] == "decision":
+            if tags and not any(t in json.loads(r["tags"]) for t in tags):
+                continue
+            if status and r.get("status") != status:
+                continue
+        elif tags or status:
+            continue
+        results.append(r)
+    return results[:limit]
+
+
+def _time(fn, repeat: int) -> Dict[str, Any]:
+    """Ejecuta ``fn`` ``repeat`` veces y devuelve media en ms y resultados."""
+    count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        count = len(fn())
+    elapsed = (time.perf_counter() - start) / repeat
+    return {"ms": elapsed * 1000, "results": count}
+
+
+def run(sizes: List[int], repeat: int, limit: int) -> None:
+    """Ejecuta el benchmark para cada tamano e imprime una tabla."""
+    scenarios = {
+        "sin filtro": {},
+        "since": {"since": "2026-11-01"},
+        "tags": {"tags": ["objetivo"]},
+        "tags+status": {"tags": ["objetivo"], "status": "superseded"},
+    }
+    print(f"{'filas':>9} {'escenario':<12} {'anterior ms':>12} "
+          f"{'res':>4} {'actual ms':>10} {'res':>4}")
+
+    for size in sizes:
+        tmpdir = tempfile.mkdtemp(prefix="alfred-bench-")
+        try:
+            db = MemoryDB(os.path.join(tmpdir, "bench.db"))
+            populate(db, size)
+            for name, filters in scenarios.items():
+                old = _time(
+                    lambda: legacy_search(db, "cache", limit, **filters),
+                    repeat,
+                )
+                new = _time(
+                    lambda: db.search("cache", limit=limit, **filters),
+                    repeat,
+                )
+                print(f"{size:>9} {name:<12} {old['ms']:>12.2f} "
+                      f"{old['results']:>4} {new['ms']:>10.2f} "
+                      f"{new['results']:>4}")
+            db.close()
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=_DEFAULT_SIZES,
+                        help="tamanos de BD separados por comas")
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="repeticiones por escenario")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="limite de resultados por busqueda")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    run(sizes, args.repeat, args.limit)
+
+
+if __name__ == "__main__":
+    main()
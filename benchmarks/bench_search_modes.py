@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los modos de busqueda de MemoryDB.search.
+
+Compara la busqueda por subcadena servida por los indices trigram
+(``mode='substring'``) con el recorrido completo con ``LIKE '%q%'`` que
+hacia el fallback, y mide tambien el modo prefijo sobre los indices
+principales. Los datos incluyen identificadores en camelCase y rutas de
+fichero, el caso que la busqueda por frase no resuelve.
+
+Para cada consulta imprime la latencia media, el numero de resultados y
+el plan de SQLite (``INDEX`` si la consulta usa el indice FTS5, ``SCAN``
+si recorre la tabla).
+
+Uso:
+    python3 benchmarks/bench_search_modes.py
+    python3 benchmarks/bench_search_modes.py --rows 100000 --repeat 20
+
+La BD se genera en un directorio temporal y se elimina al terminar.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.memory import MemoryDB
+
+_CHUNK = 20000
+_MODULES = ("auth", "billing", "search", "gateway", "session", "report")
+
+
+def populate(db: MemoryDB, rows: int) -> None:
+    """Puebla la BD con ``rows`` registros, mitad decisiones y mitad commits.
+
+    Inserta directamente por SQL en bloques; los triggers mantienen los
+    indices FTS5 (principales y trigram).
+    """
+    conn = db._conn
+    iteration_id = db.start_iteration(command="bench")
+    half = rows // 2
+    for start in range(0, half, _CHUNK):
+        end = min(start + _CHUNK, half)
+        conn.executemany(
+            "INSERT INTO decisions (iteration_id, title, context, chosen, "
+            "rationale, tags, status, decided_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    iteration_id,
+                    f"Extraer {_MODULES[i % 6]}Handler{i} a un servicio",
+                    "Contexto de arquitectura",
+                    f"{_MODULES[i % 6].capitalize()}Middleware{i}",
+                    "Reduce el acoplamiento",
+                    json.dumps([]),
+                    "active",
+                    "2026-03-01T00:00:00+00:00",
+                )
+                for i in range(start, end)
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO commits (sha, message, author, files, iteration_id, "
+            "committed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    f"{i:040x}",
+                    f"refactor: mover {_MODULES[i % 6]}Store{i}",
+                    "bench",
+                    json.dumps([f"src/{_MODULES[i % 6]}/store_{i}.py"]),
+                    iteration_id,
+                    "2026-03-01T00:00:00+00:00",
+                )
+                for i in range(start, end)
+            ],
+        )
+        conn.commit()
+
+
+def _plan(db: MemoryDB, sql: str, params: List[Any]) -> str:
+    """Resume el plan de una consulta: INDEX si usa FTS5, SCAN si no."""
+    details = [
+        row[3] for row in
+        db._conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    ]
+    return "INDEX" if any("VIRTUAL TABLE INDEX" in d for d in details) else "SCAN"
+
+
+def _time(fn: Callable[[], List[Dict[str, Any]]], repeat: int) -> Dict[str, Any]:
+    """Ejecuta ``fn`` ``repeat`` veces y devuelve media en ms y resultados."""
+    count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        count = len(fn())
+    elapsed = (time.perf_counter() - start) / repeat
+    return {"ms": elapsed * 1000, "results": count}
+
+
+def run(rows: int, repeat: int, limit: int) -> None:
+    """Ejecuta el benchmark e imprime una tabla por consulta."""
+    tmpdir = tempfile.mkdtemp(prefix="alfred-bench-")
+    try:
+        db_path = os.path.join(tmpdir, "bench.db")
+        db = MemoryDB(db_path)
+        if not db._trigram_enabled:
+            print("El tokenizador trigram no esta disponible en este SQLite.")
+            db.close()
+            return
+        populate(db, rows)
+        print(f"{rows} filas, {os.path.getsize(db_path) / 2**20:.1f} MB\n")
+
+        target = rows // 4 + 7
+        ident = f"Handler{target}"
+        path = f"{_MODULES[target % 6][-3:]}/store_{target}"
+        cases = [
+            ("LIKE (anterior)", ident,
+             lambda q: db._search_like(q, limit, None),
+             "SELECT id FROM decisions WHERE title LIKE ?", ["%x%"]),
+            ("substring", ident,
+             lambda q: db.search(q, limit=limit, mode="substring"),
+             "SELECT rowid FROM decisions_trigram "
+             "WHERE decisions_trigram MATCH ?", ['"abc"']),
+            ("LIKE (anterior)", path,
+             lambda q: db._search_like(q, limit, None),
+             "SELECT id FROM commits WHERE files LIKE ?", ["%x%"]),
+            ("substring", path,
+             lambda q: db.search(q, limit=limit, mode="substring"),
+             "SELECT rowid FROM commits_trigram "
+             "WHERE commits_trigram MATCH ?", ['"abc"']),
+            ("prefix", "authHandl",
+             lambda q: db.search(q, limit=limit, mode="prefix"),
+             "SELECT rowid FROM decisions_fts "
+             "WHERE decisions_fts MATCH ?", ['"abc"*']),
+        ]
+
+        print(f"{'modo':<16} {'consulta':<18} {'ms':>9} {'res':>4} {'plan':>6}")
+        for name, query, fn, plan_sql, plan_params in cases:
+            result = _time(lambda: fn(query), repeat)
+            plan = _plan(db, plan_sql, plan_params)
+            print(f"{name:<16} {query:<18} {result['ms']:>9.2f} "
+                  f"{result['results']:>4} {plan:>6}")
+        db.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="filas de la BD (mitad decisiones, mitad commits)")
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="repeticiones por consulta")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="limite de resultados por busqueda")
+    args = parser.parse_args()
+    run(args.rows, args.repeat, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark de permessage-deflate en el WebSocket del dashboard.
+
+Genera una BD con una iteracion activa de tamano realista, construye el
+mensaje ``init`` con ``GUIServer.get_full_state`` y una serie de mensajes
+``update`` como los que emite el watcher (una decision, unos eventos y un
+commit por ciclo). Para cada uno compara los bytes en el cable y el tiempo
+de CPU por mensaje en tres modos:
+
+- ``raw``: sin compresion (comportamiento anterior).
+- ``deflate``: permessage-deflate con context takeover (el que se negocia
+  con los navegadores).
+- ``no-takeover``: permessage-deflate reiniciando el compresor en cada
+  mensaje (lo que pide un cliente con ``server_no_context_takeover``).
+
+Uso:
+    python3 benchmarks/bench_ws_deflate.py
+    python3 benchmarks/bench_ws_deflate.py --decisions 200 --updates 500
+
+La BD se genera en un directorio temporal y se elimina al terminar.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.memory import MemoryDB
+from gui.server import GUIServer
+from gui.websocket import PerMessageDeflate, encode_frame
+
+
+def populate(db: MemoryDB, decisions: int) -> int:
+    """Crea una iteracion activa con decisiones, eventos y commits."""
+    iteration_id = db.start_iteration("feature", "Autenticacion OAuth2")
+    with db.batch():
+        for i in range(decisions):
+            db.log_decision(
+                title=f"Usar PKCE en el flujo {i}",
+                chosen="Authorization code + PKCE",
+                context="La aplicacion movil no puede guardar secretos.",
+                alternatives=["Implicit flow", "ROPC"],
+                rationale="Es la recomendacion actual del OAuth 2.1 draft.",
+                phase="arquitectura",
+                tags=["auth", "seguridad"],
+                iteration_id=iteration_id,
+            )
+            db.log_event(
+                "phase_completed", phase="arquitectura",
+                payload={"fase": "arquitectura", "resultado": "aprobado"},
+                iteration_id=iteration_id,
+            )
+            db.log_commit(
+                sha=f"{i:040x}", message=f"feat(auth): paso {i} del flujo PKCE",
+                author="bench", files=["src/auth/pkce.py"],
+                iteration_id=iteration_id,
+            )
+    return iteration_id
+
+
+def build_updates(count: int, iteration_id: int) -> List[str]:
+    """Genera ``count`` mensajes ``update`` tipicos del watcher."""
+    messages = []
+    for i in range(count):
+        payload = {
+            "events": [{
+                "id": 10000 + i, "iteration_id": iteration_id,
+                "event_type": "phase_completed", "phase": "desarrollo",
+                "payload": json.dumps({"fase": "desarrollo", "resultado": "ok"}),
+                "created_at": f"2026-03-01T10:{i % 60:02d}:00+00:00",
+            }],
+            "decisions": [{
+                "id": 5000 + i, "iteration_id": iteration_id,
+                "title": f"Cachear tokens de acceso {i}",
+                "chosen": "Redis con TTL", "status": "active",
+                "rationale": "Reduce la latencia del introspection endpoint.",
+                "decided_at": f"2026-03-01T10:{i % 60:02d}:00+00:00",
+            }],
+            "commits": [],
+            "pinned": [],
+        }
+        messages.append(json.dumps(
+            {"type": "update", "seq": i + 1, "payload": payload},
+            ensure_ascii=False,
+        ))
+    return messages
+
+
+def measure(
+    messages: List[str], make_deflate: Callable[[], Optional[PerMessageDeflate]],
+) -> Dict[str, Any]:
+    """Codifica los mensajes con un compresor por conexion y mide."""
+    deflate = make_deflate()
+    total = 0
+    start = time.process_time()
+    for msg in messages:
+        total += len(encode_frame(msg, deflate=deflate))
+    cpu = time.process_time() - start
+    return {"bytes": total, "cpu_us": cpu / len(messages) * 1e6}
+
+
+def run(decisions: int, updates: int) -> None:
+    """Ejecuta el benchmark e imprime una tabla por tipo de mensaje."""
+    tmpdir = tempfile.mkdtemp(prefix="alfred-bench-")
+    try:
+        db_path = os.path.join(tmpdir, "bench.db")
+        db = MemoryDB(db_path)
+        iteration_id = populate(db, decisions)
+        server = GUIServer(db_path, http_port=0, ws_port=0)
+        init_msg = json.dumps(
+            {"type": "init", "seq": 0, "payload": server.get_full_state()},
+            ensure_ascii=False, default=str,
+        )
+        server.close()
+        db.close()
+
+        modes = {
+            "raw": lambda: None,
+            "deflate": PerMessageDeflate,
+            "no-takeover": lambda: PerMessageDeflate(
+                server_no_context_takeover=True),
+        }
+        scenarios = {
+            "init": [init_msg],
+            f"update x{updates}": build_updates(updates, iteration_id),
+        }
+
+        print(f"{'mensaje':<14} {'modo':<12} {'bytes':>10} "
+              f"{'ratio':>6} {'CPU us/msg':>11}")
+        for name, messages in scenarios.items():
+            raw_bytes = None
+            for mode, factory in modes.items():
+                result = measure(messages, factory)
+                raw_bytes = raw_bytes or result["bytes"]
+                print(f"{name:<14} {mode:<12} {result['bytes']:>10} "
+                      f"{result['bytes'] / raw_bytes:>6.2f} "
+                      f"{result['cpu_us']:>11.1f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--decisions", type=int, default=50,
+                        help="decisiones (y eventos y commits) en la iteracion")
+    parser.add_argument("--updates", type=int, default=200,
+                        help="mensajes update a codificar")
+    args = parser.parse_args()
+    run(args.decisions, args.updates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Daemon opcional que ejecuta los hooks de Alfred Dev en un proceso persistente.
+
+Cada PostToolUse lanza varios procesos ``python3`` nuevos (captura de memoria,
+captura de commits, vigilancia de dependencias, ortografia, quality gate).
+Cada uno vuelve a importar modulos, compilar sus tablas de regex y, en los
+hooks de memoria, abrir ``MemoryDB``. El daemon mantiene todo eso caliente:
+los modulos de hook se cargan una vez y las conexiones a la memoria se
+reutilizan entre invocaciones.
+
+Es opt-in: ``session-start.sh`` solo lo arranca si la variable de entorno
+``ALFRED_HOOK_DAEMON`` vale ``1``. Escucha en un socket Unix dentro de
+``.claude/`` del proyecto (permisos 0600) y termina solo tras un periodo
+de inactividad.
+
+Protocolo (una linea JSON por peticion y por respuesta)::
+
+    -> {"hook": "memory-capture", "stdin": "...", "cwd": "/ruta"}
+    <- {"exit_code": 0, "stdout": "...", "stderr": "..."}
+
+Lado cliente:
+    Los hooks llaman a ``dispatch(nombre, main)`` en su bloque
+    ``__main__``. Si el socket no existe o no acepta conexiones, el hook
+    se ejecuta en el propio proceso como hasta ahora, con el mismo stdin.
+
+Uso:
+    python3 core/hook_daemon.py --project /ruta/al/proyecto
+"""
+
+import io
+import json
+import os
+import socket
+import sys
+from typing import Any, Callable, Dict, Optional
+
+# Nombres de los ficheros del daemon dentro de <proyecto>/.claude/
+_SOCKET_NAME = "alfred-hooks.sock"
+_PID_NAME = "alfred-hooks.pid"
+
+# Hooks que el daemon acepta ejecutar. Se limita a una lista cerrada para
+# que el socket no pueda usarse para cargar ficheros arbitrarios.
+HOOK_NAMES = (
+    "memory-capture",
+    "commit-capture",
+    "dependency-watch",
+    "spelling-guard",
+    "quality-gate",
+)
+
+# Tiempo maximo que el cliente espera la respuesta (los hooks de
+# PostToolUse tienen un timeout de 10 s en hooks.json).
+_CLIENT_TIMEOUT = 8.0
+
+# Segundos sin peticiones tras los que el daemon se detiene solo.
+_IDLE_TIMEOUT = 1800
+
+# Tamano maximo de una peticion (el stdin de un Write puede ser grande).
+_MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+def socket_path_for(project_dir: str) -> str:
+    """Devuelve la ruta del socket del daemon para un proyecto.
+
+    Args:
+        project_dir: directorio raiz del proyecto.
+
+    Returns:
+        Ruta absoluta del socket Unix en ``.claude/``.
+    """
+    return os.path.join(os.path.abspath(project_dir), ".claude", _SOCKET_NAME)
+
+
+# ---------------------------------------------------------------------------
+# Cliente
+# ---------------------------------------------------------------------------
+
+
+def _recv_line(sock: socket.socket) -> bytes:
+    """Lee del socket hasta el primer salto de linea o el cierre."""
+    chunks = []
+    total = 0
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        total += len(chunk)
+        if b"\n" in chunk or total > _MAX_REQUEST_BYTES:
+            break
+    return b"".join(chunks).split(b"\n", 1)[0]
+
+
+def request(
+    socket_path: str,
+    hook_name: str,
+    stdin_data: str,
+    cwd: Optional[str] = None,
+    timeout: float = _CLIENT_TIMEOUT,
+) -> Optional[Dict[str, Any]]:
+    """Envia una peticion al daemon y devuelve su respuesta.
+
+    Args:
+        socket_path: ruta del socket Unix del daemon.
+        hook_name: nombre del hook a ejecutar (ver ``HOOK_NAMES``).
+        stdin_data: entrada JSON que Claude Code paso al hook.
+        cwd: directorio de trabajo del hook (por defecto, el actual).
+        timeout: segundos maximos de espera.
+
+    Returns:
+        Diccionario con ``exit_code``, ``stdout`` y ``stderr``, o None si
+        no se pudo conectar (daemon ausente o socket huerfano).
+
+    Raises:
+        OSError: si la conexion se establece pero falla despues (p.ej.
+            timeout esperando la respuesta). En ese caso el hook puede
+            haberse ejecutado ya y el llamador no debe repetirlo.
+    """
+    if not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return None
+        payload = {
+            "hook": hook_name,
+            "stdin": stdin_data,
+            "cwd": cwd or os.getcwd(),
+        }
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        line = _recv_line(sock)
+    finally:
+        sock.close()
+    if not line:
+        raise OSError("El daemon de hooks cerro la conexion sin responder")
+    return json.loads(line.decode("utf-8"))
+
+
+def dispatch(hook_name: str, main: Callable[[], None]) -> None:
+    """Ejecuta un hook a traves del daemon o, si no esta, en este proceso.
+
+    Se llama desde el bloque ``__main__`` de cada hook. Lee todo stdin,
+    lo envia al daemon y reproduce su stdout, stderr y codigo de salida.
+    Si el daemon no esta disponible, restaura stdin con el mismo
+    contenido y llama a ``main()`` como antes. Si el daemon acepta la
+    peticion pero falla despues, se sale con 0 (politica fail-open) en
+    lugar de repetir el hook, que podria haberse ejecutado ya.
+
+    Args:
+        hook_name: nombre del hook (ver ``HOOK_NAMES``).
+        main: funcion ``main`` del hook para el camino sin daemon.
+    """
+    socket_path = socket_path_for(os.getcwd())
+    if not os.path.exists(socket_path):
+        main()
+        return
+
+    stdin_data = sys.stdin.read()
+    try:
+        response = request(socket_path, hook_name, stdin_data)
+    except (OSError, ValueError) as e:
+        print(
+            f"[{hook_name}] Aviso: el daemon de hooks no respondio: {e}",
+            file=sys.stderr,
+        )
+        sys.exit(0)
+
+    if response is None:
+        sys.stdin = io.StringIO(stdin_data)
+        main()
+        return
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sys.exit(int(response.get("exit_code", 0)))
+
+
+# ---------------------------------------------------------------------------
+# Servidor
+# ---------------------------------------------------------------------------
+
+
+class _PooledMemoryDB:
+    """Envoltorio de una MemoryDB compartida cuyo ``close()`` no cierra.
+
+    Los hooks abren y cierran la memoria en cada invocacion. Dentro del
+    daemon reciben este envoltorio: el resto de atributos se delegan en
+    la conexion caliente y ``close()`` solo deshace una transaccion
+    pendiente para que la siguiente invocacion parta de un estado limpio.
+    """
+
+    def __init__(self, db: Any) -> None:
+        self._pooled_db = db
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pooled_db, name)
+
+    def close(self) -> None:
+        conn = self._pooled_db._conn
+        if conn.in_transaction:
+            conn.rollback()
+            self._pooled_db._invalidate_cache()
+
+
+class _WarmDBPool:
+    """Mantiene una MemoryDB abierta por ruta de base de datos.
+
+    Sustituye a ``core.memory.MemoryDB`` dentro del proceso del daemon
+    (ver ``HookDaemon.install``), de modo que el ``MemoryDB(db_path)`` de
+    los hooks reutiliza la conexion en lugar de abrir una nueva. Si el
+    fichero desaparece (p.ej. el usuario borra la memoria), la conexion
+    se descarta y se abre de nuevo.
+
+    Args:
+        factory: clase MemoryDB original.
+    """
+
+    def __init__(self, factory: Callable[[str], Any]) -> None:
+        self._factory = factory
+        self._dbs: Dict[str, Any] = {}
+
+    def __call__(self, db_path: str) -> _PooledMemoryDB:
+        key = os.path.realpath(db_path)
+        db = self._dbs.get(key)
+        if db is not None and not os.path.exists(key):
+            db.close()
+            db = None
+        if db is None:
+            db = self._factory(db_path)
+            self._dbs[key] = db
+        return _PooledMemoryDB(db)
+
+    def close_all(self) -> None:
+        """Cierra todas las conexiones abiertas."""
+        for db in self._dbs.values():
+            db.close()
+        self._dbs.clear()
+
+
+class HookDaemon:
+    """Servidor de hooks sobre un socket Unix.
+
+    Atiende las peticiones de una en una: los hooks redirigen
+    ``sys.stdin``/``sys.stdout``, que son globales del proceso, y son lo
+    bastante rapidos como para que la serializacion no importe.
+
+    Args:
+        project_dir: directorio raiz del proyecto (donde vive ``.claude/``).
+        plugin_root: raiz del plugin (por defecto, la de este fichero).
+        idle_timeout: segundos sin peticiones tras los que se detiene.
+    """
+
+    def __init__(
+        self,
+        project_dir: str,
+        plugin_root: Optional[str] = None,
+        idle_timeout: float = _IDLE_TIMEOUT,
+    ) -> None:
+        self.project_dir = os.path.abspath(project_dir)
+        self.plugin_root = plugin_root or os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__))
+        )
+        self.socket_path = socket_path_for(self.project_dir)
+        self.idle_timeout = idle_timeout
+        self._modules: Dict[str, Any] = {}
+        self._pool: Optional[_WarmDBPool] = None
+        self._sock: Optional[socket.socket] = None
+        self._running = False
+
+    def install(self) -> None:
+        """Prepara el proceso: path del plugin y MemoryDB caliente.
+
+        Sustituye ``core.memory.MemoryDB`` por el pool de conexiones. Solo
+        debe llamarse en el proceso del daemon.
+        """
+        if self.plugin_root not in sys.path:
+            sys.path.insert(0, self.plugin_root)
+        import core.memory
+
+        if not isinstance(core.memory.MemoryDB, _WarmDBPool):
+            self._pool = _WarmDBPool(core.memory.MemoryDB)
+            core.memory.MemoryDB = self._pool
+
+    def load_hook(self, name: str) -> Any:
+        """Carga (una sola vez) el modulo de un hook.
+
+        Args:
+            name: nombre del hook sin extension.
+
+        Returns:
+            Modulo del hook, con su ``main``.
+
+        Raises:
+            ValueError: si el hook no esta en ``HOOK_NAMES``.
+        """
+        if name not in HOOK_NAMES:
+            raise ValueError(f"Hook no soportado: '{name}'")
+        module = self._modules.get(name)
+        if module is None:
+            import importlib.util
+
+            path = os.path.join(self.plugin_root, "hooks", f"{name}.py")
+            spec = importlib.util.spec_from_file_location(
+                "alfred_hook_" + name.replace("-", "_"), path,
+            )
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._modules[name] = module
+        return module
+
+    def handle_request(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecuta un hook con el stdin y cwd de la peticion.
+
+        Args:
+            req: peticion con ``hook``, ``stdin`` y ``cwd``.
+
+        Returns:
+            Diccionario con ``exit_code``, ``stdout`` y ``stderr``.
+        """
+        try:
+            module = self.load_hook(str(req.get("hook", "")))
+        except Exception as e:
+            return {"exit_code": 0, "stdout": "", "stderr": f"[hook-daemon] {e}\n"}
+
+        out, err = io.StringIO(), io.StringIO()
+        saved_streams = (sys.stdin, sys.stdout, sys.stderr)
+        saved_path = list(sys.path)
+        saved_cwd = os.getcwd()
+        exit_code = 0
+
+        cwd = req.get("cwd") or self.project_dir
+        try:
+            os.chdir(cwd if os.path.isdir(cwd) else self.project_dir)
+            sys.stdin = io.StringIO(req.get("stdin", ""))
+            sys.stdout, sys.stderr = out, err
+            module.main()
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                exit_code = e.code
+            elif e.code is not None:
+                err.write(f"{e.code}\n")
+                exit_code = 1
+        except Exception as e:
+            # Politica fail-open de los hooks: un fallo no bloquea
+            err.write(f"[hook-daemon] Error en {req.get('hook')}: {e}\n")
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            sys.path[:] = saved_path
+            os.chdir(saved_cwd)
+
+        return {
+            "exit_code": exit_code,
+            "stdout": out.getvalue(),
+            "stderr": err.getvalue(),
+        }
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        """Lee una peticion de la conexion y escribe la respuesta."""
+        conn.settimeout(_CLIENT_TIMEOUT)
+        try:
+            line = _recv_line(conn)
+            if not line:
+                return
+            try:
+                req = json.loads(line.decode("utf-8"))
+            except (ValueError, UnicodeDecodeError) as e:
+                resp = {"exit_code": 0, "stdout": "",
+                        "stderr": f"[hook-daemon] Peticion invalida: {e}\n"}
+            else:
+                resp = self.handle_request(req)
+            conn.sendall(json.dumps(resp).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def bind(self) -> None:
+        """Crea el socket Unix (0600) y el fichero PID."""
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        sock.listen(16)
+        sock.settimeout(1.0)
+        self._sock = sock
+        pid_path = os.path.join(os.path.dirname(self.socket_path), _PID_NAME)
+        with open(pid_path, "w") as f:
+            f.write(str(os.getpid()))
+
+    def serve_forever(self) -> None:
+        """Atiende peticiones hasta ``shutdown()`` o el timeout de inactividad."""
+        import time
+
+        if self._sock is None:
+            self.bind()
+        self._running = True
+        last_activity = time.monotonic()
+        try:
+            while self._running:
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    if time.monotonic() - last_activity > self.idle_timeout:
+                        break
+                    continue
+                except OSError:
+                    break
+                if not self._running:
+                    conn.close()
+                    break
+                self._serve_connection(conn)
+                last_activity = time.monotonic()
+        finally:
+            self.close()
+
+    def shutdown(self) -> None:
+        """Pide al bucle de ``serve_forever`` que termine.
+
+        Abre una conexion vacia para despertar el ``accept()`` en curso.
+        """
+        self._running = False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.5)
+                sock.connect(self.socket_path)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Cierra el socket, elimina sus ficheros y las conexiones a la BD."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        pid_path = os.path.join(os.path.dirname(self.socket_path), _PID_NAME)
+        for path in (self.socket_path, pid_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        if self._pool is not None:
+            import core.memory
+
+            self._pool.close_all()
+            if core.memory.MemoryDB is self._pool:
+                core.memory.MemoryDB = self._pool._factory
+            self._pool = None
+
+
+def main() -> None:
+    """Punto de entrada: arranca el daemon para el proyecto indicado."""
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(
+        description="Daemon de hooks de Alfred Dev",
+    )
+    parser.add_argument(
+        "--project", default=os.getcwd(),
+        help="Directorio raiz del proyecto (por defecto, el actual)",
+    )
+    parser.add_argument(
+        "--idle-timeout", type=float, default=_IDLE_TIMEOUT,
+        help="Segundos sin peticiones antes de detenerse",
+    )
+    args = parser.parse_args()
+
+    daemon = HookDaemon(args.project, idle_timeout=args.idle_timeout)
+    daemon.install()
+    signal.signal(signal.SIGTERM, lambda *_: daemon.shutdown())
+    daemon.bind()
+    daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ de datos en ``.claude/alfred-memory.db``.
 
 Componentes principales:
     - sanitize_content(): limpia texto de posibles secretos antes de persistir.
+    - OperationCancelled: excepcion de las operaciones largas interrumpidas.
     - MemoryDB: clase que encapsula la conexion SQLite, el esquema y todas las
       operaciones de lectura y escritura sobre la memoria.
 
@@ -23,6 +24,8 @@ Seguridad:
     se reemplazan por marcadores [REDACTED:<tipo>] para evitar fugas accidentales.
 """
 
+import base64
+import functools
 import json
 import os
 import re
@@ -30,9 +33,19 @@ import shutil
 import sqlite3
 import stat
 import subprocess
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple,
+    TypeVar, Union,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -97,13 +110,65 @@ _SECRET_PATTERNS: List[Tuple[re.Pattern, str]] = [
 
 # Version actual del esquema. Se almacena en la tabla meta y se usa
 # para detectar si es necesario aplicar migraciones en el futuro.
-_SCHEMA_VERSION = 3
+_SCHEMA_VERSION = 10
+
+
+def _backfill_packed_commit_files(conn: sqlite3.Connection) -> None:
+    """Puebla ``commit_files`` con las listas de ficheros comprimidas.
+
+    Paso de la migracion v6 -> v7: ``json_each()`` no puede leer un BLOB
+    de zlib (ver ``pack_text``), asi que esas filas se descomprimen aqui.
+    """
+    rows = conn.execute(
+        "SELECT id, files FROM commits WHERE typeof(files) = 'blob'"
+    ).fetchall()
+    conn.executemany(
+        "INSERT OR IGNORE INTO commit_files (commit_id, path) VALUES (?, ?)",
+        [
+            (commit_id, path)
+            for commit_id, files in rows
+            for path in json.loads(unpack_text(files))
+            if isinstance(path, str)
+        ],
+    )
+
+
+def _unpack_commit_files(conn: sqlite3.Connection) -> None:
+    """Descomprime las listas de ficheros guardadas como BLOB.
+
+    Paso de la migracion v9 -> v10: ``commits.files`` vuelve a guardarse
+    siempre como texto para que ``commits_trigram`` indexe las rutas de
+    los commits grandes.
+    """
+    rows = conn.execute(
+        "SELECT id, files FROM commits WHERE typeof(files) = 'blob'"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE commits SET files = ? WHERE id = ?",
+        [(unpack_text(files), commit_id) for commit_id, files in rows],
+    )
+
+
+def _add_decisions_updated_at(conn: sqlite3.Connection) -> None:
+    """Anade ``decisions.updated_at`` y la rellena con ``decided_at``.
+
+    Paso de la migracion v8 -> v9. SQLite no tiene ``ADD COLUMN IF NOT
+    EXISTS``, asi que se consulta antes el esquema de la tabla.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(decisions)")}
+    if "updated_at" not in columns:
+        conn.execute("ALTER TABLE decisions ADD COLUMN updated_at TEXT")
+    conn.execute(
+        "UPDATE decisions SET updated_at = decided_at WHERE updated_at IS NULL"
+    )
+
 
 # Migraciones de esquema. Cada entrada es una lista de sentencias SQL
-# que transforman la base de datos de la version N a la N+1. Se ejecutan
-# secuencialmente dentro de una transaccion. Antes de aplicar cualquier
-# migracion, se crea una copia de seguridad (.bak) del fichero.
-_MIGRATIONS: Dict[int, List[str]] = {
+# (o funciones que reciben la conexion, para los pasos que SQLite no puede
+# expresar) que transforman la base de datos de la version N a la N+1. Se
+# ejecutan secuencialmente dentro de una transaccion. Antes de aplicar
+# cualquier migracion, se crea una copia de seguridad (.bak) del fichero.
+_MIGRATIONS: Dict[int, List[Union[str, Callable[[sqlite3.Connection], None]]]] = {
     1: [
         # v1 -> v2: etiquetas y estado en decisiones, ficheros en commits,
         # tabla de relaciones entre decisiones.
@@ -144,12 +209,417 @@ _MIGRATIONS: Dict[int, List[str]] = {
         )""",
         "CREATE INDEX IF NOT EXISTS idx_pinned_items_type ON pinned_items(item_type)",
     ],
+    3: [
+        # v3 -> v4: tabla normalizada de etiquetas, poblada a partir del
+        # JSON de decisions.tags para que los filtros usen un indice.
+        """CREATE TABLE IF NOT EXISTS decision_tags (
+            decision_id INTEGER NOT NULL REFERENCES decisions(id),
+            tag         TEXT    NOT NULL,
+            PRIMARY KEY (decision_id, tag)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_decision_tags_tag ON decision_tags(tag)",
+        """INSERT OR IGNORE INTO decision_tags (decision_id, tag)
+            SELECT d.id, j.value
+            FROM decisions d, json_each(d.tags) j
+            WHERE json_valid(d.tags) AND j.type = 'text'""",
+    ],
+    4: [
+        # v4 -> v5: contadores de filas mantenidos por triggers. La tabla
+        # y los triggers los crea _COUNTERS_SQL; aqui se parte del recuento
+        # real de las filas existentes.
+        """INSERT OR REPLACE INTO counters (name, value)
+            SELECT 'iterations', COUNT(*) FROM iterations
+            UNION ALL SELECT 'decisions', COUNT(*) FROM decisions
+            UNION ALL SELECT 'commits', COUNT(*) FROM commits
+            UNION ALL SELECT 'events', COUNT(*) FROM events""",
+    ],
+    5: [
+        # v5 -> v6: resumenes diarios de eventos para la retencion,
+        # indice por fecha para localizar los eventos caducados y
+        # auto_vacuum incremental. Cambiar auto_vacuum en una BD existente
+        # exige un VACUUM completo, que solo se paga una vez.
+        """CREATE TABLE IF NOT EXISTS event_summaries (
+            iteration_id  INTEGER REFERENCES iterations(id),
+            day           TEXT    NOT NULL,
+            event_type    TEXT    NOT NULL,
+            count         INTEGER NOT NULL,
+            first_at      TEXT    NOT NULL,
+            last_at       TEXT    NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_event_summaries_iteration "
+        "ON event_summaries(iteration_id, day)",
+        "CREATE INDEX IF NOT EXISTS idx_events_created ON events(created_at)",
+        "PRAGMA auto_vacuum = INCREMENTAL",
+        "VACUUM",
+    ],
+    6: [
+        # v6 -> v7: indice de ficheros por commit, poblado a partir del
+        # JSON de commits.files para que el historial de una ruta sea un
+        # recorrido por indice.
+        """CREATE TABLE IF NOT EXISTS commit_files (
+            commit_id INTEGER NOT NULL REFERENCES commits(id),
+            path      TEXT    NOT NULL,
+            PRIMARY KEY (commit_id, path)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_commit_files_path ON commit_files(path)",
+        """INSERT OR IGNORE INTO commit_files (commit_id, path)
+            SELECT c.id, j.value
+            FROM commits c, json_each(c.files) j
+            WHERE typeof(c.files) = 'text' AND json_valid(c.files)
+                AND j.type = 'text'""",
+        _backfill_packed_commit_files,
+    ],
+    7: [
+        # v7 -> v8: indices en el orden de los listados paginados, para
+        # que cada pagina sea un recorrido por indice desde el cursor.
+        "DROP INDEX IF EXISTS idx_decisions_iteration",
+        "CREATE INDEX idx_decisions_iteration "
+        "ON decisions(iteration_id, decided_at)",
+        "CREATE INDEX IF NOT EXISTS idx_decisions_decided "
+        "ON decisions(decided_at)",
+        "DROP INDEX IF EXISTS idx_events_iteration",
+        "CREATE INDEX idx_events_iteration ON events(iteration_id, created_at)",
+    ],
+    8: [
+        # v8 -> v9: fecha de la ultima modificacion de cada decision, para
+        # la exportacion incremental. Las existentes parten de decided_at.
+        _add_decisions_updated_at,
+        "CREATE INDEX IF NOT EXISTS idx_decisions_updated "
+        "ON decisions(updated_at)",
+    ],
+    9: [
+        # v9 -> v10: las listas de ficheros ya no se comprimen; las que se
+        # guardaron comprimidas pasan a texto.
+        _unpack_commit_files,
+    ],
 }
 
 # Estados validos para decisiones. Se usa en update_decision_status
 # para validar la entrada antes de modificar la base de datos.
 _VALID_DECISION_STATUSES = {"active", "superseded", "deprecated"}
 
+# Recorrido del grafo de decisiones (traverse_decisions): para cada
+# direccion, la condicion de union con decision_links y la decision
+# vecina. 'outgoing' usa la clave primaria (source_id, target_id),
+# 'incoming' el indice idx_decision_links_target y 'both' ambos.
+_TRAVERSE_STEPS: Dict[str, Tuple[str, str]] = {
+    "outgoing": ("l.source_id = w.id", "l.target_id"),
+    "incoming": ("l.target_id = w.id", "l.source_id"),
+    "both": (
+        "(l.source_id = w.id OR l.target_id = w.id)",
+        "CASE WHEN l.source_id = w.id THEN l.target_id ELSE l.source_id END",
+    ),
+}
+_TRAVERSE_MAX_DEPTH = 50
+
+# Columnas de decisiones y commits en el orden del esquema. La busqueda
+# FTS las selecciona explicitamente con prefijo para unir ambas tablas en
+# una sola consulta sin colisiones de nombres (id, iteration_id...).
+_DECISION_COLUMNS: Tuple[str, ...] = (
+    "id", "iteration_id", "title", "context", "chosen", "alternatives",
+    "rationale", "impact", "phase", "tags", "status", "decided_at",
+    "updated_at",
+)
+_COMMIT_COLUMNS: Tuple[str, ...] = (
+    "id", "sha", "message", "author", "files_changed", "insertions",
+    "deletions", "files", "committed_at", "iteration_id",
+)
+
+# Sentencias de insercion compartidas por los metodos individuales y los
+# de carga masiva (log_*_bulk).
+_INSERT_COMMIT_SQL = (
+    "INSERT INTO commits "
+    "(sha, message, author, files_changed, insertions, "
+    " deletions, files, committed_at, iteration_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_EVENT_SQL = (
+    "INSERT INTO events "
+    "(iteration_id, event_type, phase, payload, created_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+# Importacion del historial de git: commits por transaccion y tiempo
+# maximo (segundos) para los comandos git auxiliares (rev-parse, merge-base).
+_GIT_IMPORT_CHUNK = 1000
+_GIT_TIMEOUT = 30
+
+# Retencion de eventos (compact_events): eventos por transaccion y pausa
+# (segundos) entre lotes para ceder el bloqueo de escritura a otros
+# procesos (hooks, GUI).
+_RETENTION_BATCH = 2000
+_RETENTION_PAUSE = 0.005
+
+# Version de la disposicion de los indices FTS5. Se guarda en meta (clave
+# fts_version); si la BD tiene una anterior, los indices se reconstruyen.
+# La version 3 sustituye memory_fts (copia propia del texto) por indices
+# de contenido externo; la 4 anade los indices trigram; la 5 los alimenta
+# desde una vista cuando indexan columnas comprimidas; la 6 vuelve a leer
+# commits_trigram de commits, ya sin listas de ficheros comprimidas.
+_FTS_VERSION = 6
+
+# Indices FTS5 de contenido externo: (indice, tabla origen, columnas, pesos
+# de bm25() por columna). Los nombres de columna coinciden con los de la
+# tabla origen, que FTS5 lee al reconstruir el indice y al generar
+# fragmentos. Un termino en el titulo pesa mas que en la justificacion, y
+# esta mas que en un mensaje de commit.
+_FTS_INDEXES: Tuple[Tuple[str, str, Tuple[str, ...], Tuple[float, ...]], ...] = (
+    ("decisions_fts", "decisions",
+     ("title", "chosen", "rationale", "context", "alternatives"),
+     (10.0, 6.0, 4.0, 2.0, 1.5)),
+    ("commits_fts", "commits", ("message",), (1.0,)),
+)
+
+# Indices con el tokenizador trigram para la busqueda por subcadena
+# (mode='substring'): identificadores parciales o fragmentos de ruta. El de
+# commits incluye la lista de ficheros. El tokenizador existe desde
+# SQLite 3.34; con versiones anteriores no se crean.
+_TRIGRAM_INDEXES: Tuple[Tuple[str, str, Tuple[str, ...], Tuple[float, ...]], ...] = (
+    ("decisions_trigram", "decisions",
+     ("title", "chosen", "rationale", "context"), (10.0, 6.0, 4.0, 2.0)),
+    ("commits_trigram", "commits", ("message", "files"), (1.0, 0.5)),
+)
+_TRIGRAM_AVAILABLE = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+# Modos de search(). Con trigram, una subcadena de menos de 3 caracteres
+# no tiene trigramas que buscar y se resuelve con LIKE.
+_SEARCH_MODES = ("phrase", "prefix", "substring", "boolean")
+_TRIGRAM_MIN_CHARS = 3
+
+# Paginas que fusiona cada llamada a optimize_fts(incremental=True). Acota
+# el trabajo de una pasada de mantenimiento; 'optimize' fusiona todo.
+_FTS_MERGE_PAGES = 500
+
+# Filas que ANALYZE examina por indice en optimize() (PRAGMA
+# analysis_limit): estadisticas aproximadas a cambio de un coste acotado.
+_ANALYSIS_LIMIT = 400
+
+# Clave de meta con el informe de la ultima pasada de run_maintenance().
+_MAINTENANCE_META_KEY = "maintenance_last_run"
+
+# Marcadores y tamano (en tokens) de los fragmentos devueltos por search().
+_SNIPPET_OPEN = "**"
+_SNIPPET_CLOSE = "**"
+_SNIPPET_ELLIPSIS = "..."
+_SNIPPET_TOKENS = 16
+_SNIPPET_TRIGRAM_TOKENS = 64
+
+# Entradas de la cache de lecturas de MemoryDB (LRU). 0 la desactiva.
+_CACHE_SIZE = 128
+
+# Compresion de events.payload: a partir de _PACK_MIN_BYTES el texto se
+# guarda como BLOB con zlib, precedido de un byte que identifica el codec.
+# Por debajo, la cabecera de zlib apenas compensa y el valor se queda como
+# texto. commits.files no se comprime: FTS5 no puede leer un BLOB de zlib
+# y commits_trigram indexa las rutas.
+_PACK_MIN_BYTES = 1024
+_PACK_LEVEL = 6
+_CODEC_ZLIB = b"z"
+
+# Tamano de pagina con el que iter_decisions() recorre la tabla.
+_ITER_BATCH = 500
+
+# Formatos de export_decisions(): documento unico, un fichero por
+# decision y JSON por lineas.
+_EXPORT_FORMATS = ("markdown", "adr", "jsonl")
+_SLUG_MAX_CHARS = 60
+
+
+def pack_text(text: Optional[str]) -> Union[str, bytes, None]:
+    """
+    Prepara un texto largo para guardarlo comprimido.
+
+    Los textos de al menos ``_PACK_MIN_BYTES`` bytes se comprimen con zlib
+    y se devuelven como ``bytes`` con el marcador de codec delante; el
+    resto (o si la compresion no reduce el tamano) se devuelve sin
+    cambios. ``unpack_text`` hace la operacion inversa.
+
+    Args:
+        text: texto a guardar (normalmente JSON).
+
+    Returns:
+        El texto original o su version comprimida.
+    """
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    if len(raw) < _PACK_MIN_BYTES:
+        return text
+    packed = _CODEC_ZLIB + zlib.compress(raw, _PACK_LEVEL)
+    return packed if len(packed) < len(raw) else text
+
+
+def unpack_text(value: Any) -> Any:
+    """
+    Devuelve el texto de un valor guardado con ``pack_text``.
+
+    Los valores que no son ``bytes`` (texto sin comprimir, NULL, numeros)
+    se devuelven tal cual, por lo que se puede aplicar a cualquier columna.
+
+    Args:
+        value: valor leido de la BD.
+
+    Returns:
+        El texto descomprimido o el valor original.
+
+    Raises:
+        ValueError: si el BLOB lleva un marcador de codec desconocido.
+    """
+    if not isinstance(value, bytes):
+        return value
+    if value[:1] == _CODEC_ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    raise ValueError(f"Codec de compresion desconocido: {value[:1]!r}")
+
+
+def unpack_row(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convierte una fila en diccionario descomprimiendo sus columnas.
+
+    Solo se descomprimen las columnas que llegan como BLOB; el resto se
+    copia sin tocar. Los diccionarios tienen la misma forma que antes de
+    la compresion (``payload`` como texto JSON).
+    """
+    return {
+        key: unpack_text(value) if isinstance(value, bytes) else value
+        for key, value in zip(row.keys(), row)
+    }
+
+
+class Page(list):
+    """Pagina de resultados de un listado con paginacion por clave.
+
+    Es una lista normal de registros con un atributo ``next_cursor``: el
+    cursor opaco que, pasado como ``cursor`` al mismo metodo con los mismos
+    filtros, devuelve la pagina siguiente. Es None en la ultima pagina.
+    """
+
+    def __init__(
+        self, items: Iterable[Any] = (), next_cursor: Optional[str] = None,
+    ) -> None:
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def _encode_cursor(kind: str, key: Iterable[Any]) -> str:
+    """Codifica la clave de la ultima fila de una pagina como cursor opaco.
+
+    El cursor es JSON en base64 (apto para URL) con el tipo de listado
+    delante, de modo que no se puede reutilizar en otro listado.
+    """
+    raw = json.dumps([kind, *key], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, kind: str, size: int) -> List[Any]:
+    """Devuelve la clave guardada en un cursor de ``_encode_cursor``.
+
+    Args:
+        cursor: cursor recibido del llamante.
+        kind: tipo de listado que lo debe haber generado.
+        size: numero de columnas de la clave.
+
+    Raises:
+        ValueError: si el cursor esta mal formado o es de otro listado.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Cursor no valido: {cursor!r}") from exc
+    if not isinstance(data, list) or len(data) != size + 1 or data[0] != kind:
+        raise ValueError(f"Cursor no valido para {kind}: {cursor!r}")
+    return data[1:]
+
+
+def _page(
+    rows: List[Any], limit: int, kind: str,
+    key: Callable[[Any], Iterable[Any]],
+) -> Page:
+    """Recorta a ``limit`` filas una consulta hecha con ``LIMIT limit + 1``.
+
+    Si sobraba una fila hay pagina siguiente, y su cursor es la clave
+    (``key``) de la ultima fila devuelta.
+    """
+    items = rows[:max(limit, 0)]
+    next_cursor = None
+    if items and len(rows) > len(items):
+        next_cursor = _encode_cursor(kind, key(items[-1]))
+    return Page(items, next_cursor)
+
+
+class OperationCancelled(Exception):
+    """Una operacion larga se ha interrumpido a peticion del llamante.
+
+    La lanzan las importaciones y exportaciones cuando el ``threading.Event``
+    recibido en ``cancel`` se activa. Lo ya confirmado se conserva, pero el
+    punto de control no avanza, asi que la siguiente ejecucion lo repite.
+    """
+
+
+def _check_cancel(cancel: Optional[threading.Event]) -> None:
+    """Lanza ``OperationCancelled`` si se ha pedido cancelar la operacion."""
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelled()
+
+
+def _json_list(value: Optional[str]) -> List[Any]:
+    """Decodifica una columna con una lista JSON; vacia si no es valida."""
+    try:
+        decoded = json.loads(value) if value else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return decoded if isinstance(decoded, list) else []
+
+
+def _slugify(text: str) -> str:
+    """Convierte un titulo en un nombre de fichero ASCII en minusculas."""
+    ascii_text = (
+        unicodedata.normalize("NFKD", text)
+        .encode("ascii", "ignore")
+        .decode("ascii")
+    )
+    slug = re.sub(r"[^a-z0-9]+", "-", ascii_text.lower()).strip("-")
+    return slug[:_SLUG_MAX_CHARS].rstrip("-") or "decision"
+
+
+def _adr_markdown(dec: Dict[str, Any], level: int) -> str:
+    """Genera el bloque Markdown ADR-like de una decision.
+
+    Args:
+        dec: fila de ``decisions`` como diccionario.
+        level: nivel del encabezado del titulo. Las secciones van un
+            nivel por debajo: con ``1`` el bloque es un ADR independiente
+            con los encabezados que lee ``import_adrs``; con ``2`` es una
+            seccion del documento unico.
+
+    Returns:
+        Texto Markdown terminado en linea en blanco.
+    """
+    title = "#" * level
+    section = "#" * (level + 1)
+    lines = [
+        f"{title} {dec['title']}",
+        "",
+        f"- **Fecha:** {dec.get('decided_at', 'N/A')}",
+        f"- **Estado:** {dec.get('status', 'active')}",
+    ]
+    tags = _json_list(dec.get("tags"))
+    if tags:
+        lines.append(f"- **Etiquetas:** {', '.join(tags)}")
+    lines.append("")
+
+    if dec.get("context"):
+        lines += [f"{section} Contexto", "", dec["context"], ""]
+    lines += [f"{section} Decision", "", dec["chosen"], ""]
+    alts = _json_list(dec.get("alternatives"))
+    if alts:
+        lines += [f"{section} Alternativas descartadas", ""]
+        lines += [f"- {alt}" for alt in alts]
+        lines.append("")
+    if dec.get("rationale"):
+        lines += [f"{section} Justificacion", "", dec["rationale"], ""]
+    return "\n".join(lines) + "\n"
+
 
 def sanitize_content(text: Optional[str]) -> Optional[str]:
     """
@@ -215,7 +685,8 @@ CREATE TABLE IF NOT EXISTS decisions (
     phase         TEXT,
     tags          TEXT    DEFAULT '[]',
     status        TEXT    DEFAULT 'active',
-    decided_at    TEXT    NOT NULL
+    decided_at    TEXT    NOT NULL,
+    updated_at    TEXT
 );
 
 CREATE TABLE IF NOT EXISTS commits (
@@ -250,13 +721,28 @@ CREATE TABLE IF NOT EXISTS events (
 CREATE INDEX IF NOT EXISTS idx_iterations_status
     ON iterations(status);
 CREATE INDEX IF NOT EXISTS idx_decisions_iteration
-    ON decisions(iteration_id);
+    ON decisions(iteration_id, decided_at);
+CREATE INDEX IF NOT EXISTS idx_decisions_decided
+    ON decisions(decided_at);
 CREATE INDEX IF NOT EXISTS idx_commits_iteration
     ON commits(iteration_id);
 CREATE INDEX IF NOT EXISTS idx_events_iteration
-    ON events(iteration_id);
+    ON events(iteration_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_events_type
     ON events(event_type);
+CREATE INDEX IF NOT EXISTS idx_events_created
+    ON events(created_at);
+
+CREATE TABLE IF NOT EXISTS event_summaries (
+    iteration_id  INTEGER REFERENCES iterations(id),
+    day           TEXT    NOT NULL,
+    event_type    TEXT    NOT NULL,
+    count         INTEGER NOT NULL,
+    first_at      TEXT    NOT NULL,
+    last_at       TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_event_summaries_iteration
+    ON event_summaries(iteration_id, day);
 
 CREATE TABLE IF NOT EXISTS decision_links (
     source_id   INTEGER NOT NULL REFERENCES decisions(id),
@@ -267,6 +753,20 @@ CREATE TABLE IF NOT EXISTS decision_links (
 );
 CREATE INDEX IF NOT EXISTS idx_decision_links_target ON decision_links(target_id);
 
+CREATE TABLE IF NOT EXISTS decision_tags (
+    decision_id INTEGER NOT NULL REFERENCES decisions(id),
+    tag         TEXT    NOT NULL,
+    PRIMARY KEY (decision_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_decision_tags_tag ON decision_tags(tag);
+
+CREATE TABLE IF NOT EXISTS commit_files (
+    commit_id INTEGER NOT NULL REFERENCES commits(id),
+    path      TEXT    NOT NULL,
+    PRIMARY KEY (commit_id, path)
+);
+CREATE INDEX IF NOT EXISTS idx_commit_files_path ON commit_files(path);
+
 CREATE TABLE IF NOT EXISTS gui_actions (
     id            INTEGER PRIMARY KEY AUTOINCREMENT,
     action_type   TEXT    NOT NULL,
@@ -292,6 +792,101 @@ CREATE TABLE IF NOT EXISTS pinned_items (
 CREATE INDEX IF NOT EXISTS idx_pinned_items_type ON pinned_items(item_type);
 """
 
+# Indices sobre columnas que anade una migracion. _SCHEMA_SQL se ejecuta
+# antes de migrar, cuando la columna aun no existe en una BD antigua, asi
+# que estos se crean despues.
+_MIGRATED_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_decisions_updated
+    ON decisions(updated_at);
+"""
+
+# Contadores de filas de las tablas principales. get_stats() los lee en
+# una sola consulta en lugar de hacer un COUNT(*) (recorrido completo) por
+# tabla. Los triggers los mantienen en la misma transaccion que la
+# escritura; INSERT OR IGNORE no dispara el trigger si la fila se omite.
+_COUNTED_TABLES: Tuple[str, ...] = ("iterations", "decisions", "commits", "events")
+
+_COUNTERS_SQL = """
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+""" + "".join(
+    f"""
+INSERT OR IGNORE INTO counters (name, value) VALUES ('{table}', 0);
+CREATE TRIGGER IF NOT EXISTS counters_insert_{table}
+AFTER INSERT ON {table}
+BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = '{table}';
+END;
+CREATE TRIGGER IF NOT EXISTS counters_delete_{table}
+AFTER DELETE ON {table}
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = '{table}';
+END;
+"""
+    for table in _COUNTED_TABLES
+)
+
+
+def connect_read_only(db_path: str) -> sqlite3.Connection:
+    """Abre una conexion de solo lectura mediante una URI ``mode=ro``.
+
+    Args:
+        db_path: ruta al fichero SQLite (debe existir).
+
+    Returns:
+        Conexion con ``row_factory`` a ``sqlite3.Row``. Se permite su uso
+        desde otros hilos para lectores como el watcher del dashboard.
+    """
+    uri = Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convierte listas, tuplas y diccionarios anidados en claves hashables."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _copy_result(value: Any) -> Any:
+    """Copia un resultado cacheado para que el llamante pueda modificarlo.
+
+    Se copian recursivamente los diccionarios y las listas (conservando
+    las ``Page`` con su ``next_cursor``): resultados como los de
+    ``get_file_history()`` o ``traverse_decisions()`` anidan listas de
+    registros, y modificarlas no debe alterar la copia de la cache. Los
+    valores escalares se comparten, porque son inmutables.
+    """
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, Page):
+        return Page((_copy_result(v) for v in value), value.next_cursor)
+    if isinstance(value, list):
+        return [_copy_result(v) for v in value]
+    return value
+
+
+def _cached_read(method: _F) -> _F:
+    """Decorador de metodos de lectura de MemoryDB que cachea su resultado.
+
+    La clave es el nombre del metodo y sus argumentos; la validez de la
+    cache la decide ``MemoryDB._cached``.
+    """
+    @functools.wraps(method)
+    def wrapper(self: "MemoryDB", *args: Any, **kwargs: Any) -> Any:
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return self._cached(key, lambda: method(self, *args, **kwargs))
+    return wrapper  # type: ignore[return-value]
+
 
 class MemoryDB:
     """
@@ -305,13 +900,69 @@ class MemoryDB:
     El fichero de base de datos se crea con permisos 0600 (solo el propietario
     puede leer y escribir) para proteger la informacion almacenada.
 
+    Apertura rapida: si ``PRAGMA user_version`` y la ``schema_version`` de
+    meta coinciden con la version actual, se omiten el DDL del esquema, la
+    deteccion de FTS5 (cuyo resultado se lee de meta) y el ``chmod``, de
+    modo que abrir una BD ya inicializada es una sola lectura.
+
+    Con ``read_only=True`` la conexion se abre con una URI ``mode=ro``:
+    cualquier escritura falla con ``sqlite3.OperationalError``. Si el
+    esquema no esta al dia, se actualiza una vez con una conexion de
+    escritura antes de reabrir en solo lectura.
+
+    Cache de lecturas: los metodos de lectura frecuentes (iteraciones,
+    decisiones, timeline, estadisticas, marcados) guardan su resultado en
+    una cache LRU por argumentos. La cache se vacia cuando cambia
+    ``total_changes`` de la conexion (escrituras propias, tambien con SQL
+    directo sobre ``_conn``) o ``PRAGMA data_version`` (escrituras de otros
+    procesos), de modo que un proceso de larga duracion como el servidor
+    MCP resuelve las lecturas repetidas sin consultar las tablas.
+
     Args:
         db_path: ruta absoluta o relativa al fichero SQLite.
+        read_only: abrir en modo solo lectura (para lectores como
+            ``session-start.sh``, ``memory-compact.py`` o el dashboard).
+        cache_size: entradas maximas de la cache de lecturas; 0 la
+            desactiva.
+
+    Raises:
+        sqlite3.OperationalError: si ``read_only`` es True y el fichero
+            no existe.
     """
 
-    def __init__(self, db_path: str) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        read_only: bool = False,
+        cache_size: int = _CACHE_SIZE,
+    ) -> None:
         self._db_path = db_path
+        self._read_only = read_only
         self._fts_enabled = False
+        self._trigram_enabled = False
+        # Profundidad de batch() anidados; mientras sea > 0, las escrituras
+        # no hacen commit y se confirman al salir del bloque exterior.
+        self._batch_depth = 0
+        # Cache de lecturas (ver _cached) y el estado de la BD con el que
+        # se lleno: (generacion, total_changes, data_version).
+        self._cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_state: Optional[Tuple[int, int, int]] = None
+        self._cache_generation = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+        if read_only:
+            self._conn = connect_read_only(db_path)
+            if not self._load_schema_state():
+                # Esquema antiguo o BD sin inicializar: se actualiza con
+                # una conexion de escritura y se vuelve a solo lectura.
+                self._conn.close()
+                MemoryDB(db_path).close()
+                self._conn = connect_read_only(db_path)
+                self._load_schema_state()
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            return
 
         # Crear el directorio padre si no existe
         parent = os.path.dirname(db_path)
@@ -320,14 +971,25 @@ class MemoryDB:
 
         self._conn = sqlite3.connect(db_path)
         self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+        if self._load_schema_state():
+            return
+
+        # auto_vacuum incremental para que compact_events pueda devolver
+        # espacio. Solo surte efecto en una BD vacia (en las existentes lo
+        # activa la migracion a v6), por eso va antes de activar WAL.
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
-        # Activar WAL para mejor concurrencia y foreign keys para integridad
+        # Activar WAL para mejor concurrencia (persiste en el fichero)
         self._conn.execute("PRAGMA journal_mode=WAL")
-        self._conn.execute("PRAGMA foreign_keys=ON")
 
         self._ensure_schema()
         self._detect_fts5()
 
+        # Marcar el esquema como al dia para la apertura rapida
+        self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
         # Permisos 0600: solo el propietario puede leer y escribir.
         # Se aplica despues de la creacion para cubrir el caso de DB nueva.
         try:
@@ -339,6 +1001,43 @@ class MemoryDB:
 
     # --- Gestion del esquema ------------------------------------------------
 
+    def _load_schema_state(self) -> bool:
+        """Comprueba en una sola lectura si el esquema esta al dia.
+
+        Lee ``PRAGMA user_version`` y las claves ``schema_version``,
+        ``fts_enabled``, ``fts_version`` y ``fts_trigram`` de meta. Si todo
+        corresponde a la version actual, fija ``_fts_enabled`` y
+        ``_trigram_enabled`` desde meta.
+
+        Returns:
+            True si se puede omitir la inicializacion del esquema.
+        """
+        try:
+            row = self._conn.execute(
+                "SELECT (SELECT user_version FROM pragma_user_version), "
+                "(SELECT value FROM meta WHERE key = 'schema_version'), "
+                "(SELECT value FROM meta WHERE key = 'fts_enabled'), "
+                "(SELECT value FROM meta WHERE key = 'fts_version'), "
+                "(SELECT value FROM meta WHERE key = 'fts_trigram')"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # BD nueva (sin tabla meta) o no legible
+            return False
+
+        user_version, schema_version, fts_enabled, fts_version, trigram = row
+        if user_version != _SCHEMA_VERSION:
+            return False
+        if schema_version != str(_SCHEMA_VERSION) or fts_enabled is None:
+            return False
+        if fts_enabled == "1" and (
+            fts_version != str(_FTS_VERSION)
+            or trigram != ("1" if _TRIGRAM_AVAILABLE else "0")
+        ):
+            return False
+        self._fts_enabled = fts_enabled == "1"
+        self._trigram_enabled = self._fts_enabled and trigram == "1"
+        return True
+
     def _ensure_schema(self) -> None:
         """
         Crea las tablas e indices si no existen.
@@ -347,7 +1046,7 @@ class MemoryDB:
         fecha de creacion en la tabla meta. Si ya existe, se mantiene intacta
         (las sentencias usan ``IF NOT EXISTS``).
         """
-        self._conn.executescript(_SCHEMA_SQL)
+        self._conn.executescript(_SCHEMA_SQL + _COUNTERS_SQL)
 
         # Registrar metadatos si es la primera vez
         row = self._conn.execute(
@@ -370,6 +1069,8 @@ class MemoryDB:
             if current < _SCHEMA_VERSION:
                 self._run_migrations(current)
 
+        self._conn.executescript(_MIGRATED_INDEXES_SQL)
+
     def _run_migrations(self, current_version: int) -> None:
         """Aplica migraciones pendientes de forma secuencial.
 
@@ -398,7 +1099,10 @@ class MemoryDB:
             statements = _MIGRATIONS[version]
             try:
                 for sql in statements:
-                    self._conn.execute(sql)
+                    if callable(sql):
+                        sql(self._conn)
+                    else:
+                        self._conn.execute(sql)
                 # Actualizar la version en meta
                 new_version = version + 1
                 self._conn.execute(
@@ -412,12 +1116,19 @@ class MemoryDB:
 
     def _detect_fts5(self) -> None:
         """
-        Comprueba si el entorno SQLite soporta FTS5 y crea la tabla virtual.
+        Comprueba si el entorno SQLite soporta FTS5 y crea los indices.
 
-        Si FTS5 esta disponible, se crea la tabla ``memory_fts`` y los triggers
-        que la mantienen sincronizada con ``decisions`` y ``commits``. Si no
+        Si FTS5 esta disponible, se crean los indices de contenido externo y
+        los triggers que los mantienen sincronizados con ``decisions`` y
+        ``commits`` (ver ``_rebuild_memory_fts``). Si no
         esta disponible, se registra el resultado para que las busquedas usen
         el fallback con LIKE.
+
+        La disposicion de los indices se versiona con la clave
+        ``fts_version`` de meta (y ``fts_trigram`` indica si se crearon los
+        indices trigram). Si los existentes son de una version anterior
+        (p.ej. la tabla ``memory_fts``), se reconstruyen a partir de las
+        tablas origen.
         """
         try:
             # Intentar crear una tabla FTS5 temporal para detectar soporte
@@ -427,41 +1138,17 @@ class MemoryDB:
             )
             self._conn.execute("DROP TABLE IF EXISTS _fts5_test")
 
-            # FTS5 disponible: crear la tabla de busqueda real
-            self._conn.execute(
-                "CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts "
-                "USING fts5(source_type, source_id, content)"
-            )
-
-            # Triggers para mantener el indice actualizado.
-            # Se usa INSERT OR REPLACE porque FTS5 no soporta UPDATE directo.
-            self._conn.executescript("""
-                CREATE TRIGGER IF NOT EXISTS fts_insert_decision
-                AFTER INSERT ON decisions
-                BEGIN
-                    INSERT INTO memory_fts(source_type, source_id, content)
-                    VALUES (
-                        'decision',
-                        CAST(NEW.id AS TEXT),
-                        COALESCE(NEW.title, '') || ' ' ||
-                        COALESCE(NEW.context, '') || ' ' ||
-                        COALESCE(NEW.chosen, '') || ' ' ||
-                        COALESCE(NEW.alternatives, '') || ' ' ||
-                        COALESCE(NEW.rationale, '')
-                    );
-                END;
-
-                CREATE TRIGGER IF NOT EXISTS fts_insert_commit
-                AFTER INSERT ON commits
-                BEGIN
-                    INSERT INTO memory_fts(source_type, source_id, content)
-                    VALUES (
-                        'commit',
-                        CAST(NEW.id AS TEXT),
-                        COALESCE(NEW.message, '')
-                    );
-                END;
-            """)
+            version, trigram = self._conn.execute(
+                "SELECT (SELECT value FROM meta WHERE key = 'fts_version'), "
+                "(SELECT value FROM meta WHERE key = 'fts_trigram')"
+            ).fetchone()
+            # Tambien se reconstruye si la disponibilidad del tokenizador
+            # trigram ha cambiado (BD creada con otra version de SQLite).
+            if (version is None or int(version) < _FTS_VERSION
+                    or trigram != ("1" if _TRIGRAM_AVAILABLE else "0")):
+                self._rebuild_memory_fts()
+            else:
+                self._trigram_enabled = trigram == "1"
 
             self._fts_enabled = True
         except sqlite3.OperationalError:
@@ -475,11 +1162,375 @@ class MemoryDB:
         )
         self._conn.commit()
 
+    def _rebuild_memory_fts(self) -> None:
+        """
+        (Re)crea los indices FTS5 de contenido externo y los repuebla.
+
+        Los indices de ``_FTS_INDEXES`` (y los de ``_TRIGRAM_INDEXES`` si
+        el tokenizador esta disponible) se declaran con ``content='<tabla>'``:
+        no guardan una segunda copia del texto, sino que lo leen de la
+        tabla origen (por ``rowid``) cuando lo necesitan, p.ej. para
+        ``snippet()``. Cada campo tiene su propia columna para que
+        ``bm25()`` pueda ponderarlos por separado.
+
+        Con contenido externo el indice solo es correcto si se le notifican
+        todas las altas, bajas y modificaciones, de ahi los triggers de
+        INSERT, UPDATE y DELETE (ver ``_fts_trigger_sql``).
+
+        Elimina tambien la tabla ``memory_fts`` y los triggers de versiones
+        anteriores, que guardaban el texto duplicado, y las vistas
+        ``<indice>_content`` de la version 5.
+        """
+        self._trigram_enabled = _TRIGRAM_AVAILABLE
+        script = ["DROP TABLE IF EXISTS memory_fts;"]
+        for table in ("decisions", "commits"):
+            for action in ("insert", "update", "delete"):
+                script.append(
+                    f"DROP TRIGGER IF EXISTS fts_{action}_{table[:-1]};"
+                )
+        for index, _, _, _ in _FTS_INDEXES + _TRIGRAM_INDEXES:
+            script.append(f"DROP TABLE IF EXISTS {index};")
+            script.append(f"DROP VIEW IF EXISTS {index}_content;")
+
+        indexes = self._active_fts_indexes()
+        for index, table, columns, _ in indexes:
+            tokenize = (
+                ", tokenize='trigram'" if index.endswith("_trigram") else ""
+            )
+            script.append(
+                f"CREATE VIRTUAL TABLE {index} USING fts5("
+                f"{', '.join(columns)}, content='{table}', "
+                f"content_rowid='id'{tokenize});"
+            )
+        for table in ("decisions", "commits"):
+            script.append(self._fts_trigger_sql(
+                table, [i for i in indexes if i[1] == table],
+            ))
+        for index, _, _, _ in indexes:
+            script.append(
+                f"INSERT INTO {index}({index}) VALUES ('rebuild');"
+            )
+
+        self._conn.executescript("\n".join(script))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("fts_version", str(_FTS_VERSION)),
+                ("fts_trigram", "1" if self._trigram_enabled else "0"),
+            ],
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _fts_trigger_sql(
+        table: str,
+        indexes: List[Tuple[str, str, Tuple[str, ...], Tuple[float, ...]]],
+    ) -> str:
+        """Genera los triggers que sincronizan los indices de una tabla.
+
+        Cada trigger actualiza todos los indices de la tabla. Las bajas
+        usan el comando ``'delete'`` con los valores anteriores, que es lo
+        que FTS5 necesita para retirar los terminos del indice. El de
+        UPDATE solo se dispara si cambia una columna indexada: cambiar el
+        estado o las etiquetas de una decision no toca los indices.
+
+        Args:
+            table: tabla origen (``decisions`` o ``commits``).
+            indexes: entradas de ``_FTS_INDEXES``/``_TRIGRAM_INDEXES``
+                cuya tabla origen es ``table``.
+
+        Returns:
+            Sentencias ``CREATE TRIGGER`` separadas por punto y coma.
+        """
+        inserts, deletes = [], []
+        watched: List[str] = []
+        for index, _, columns, _ in indexes:
+            cols = ", ".join(columns)
+            new = ", ".join(f"NEW.{c}" for c in columns)
+            old = ", ".join(f"OLD.{c}" for c in columns)
+            inserts.append(
+                f"INSERT INTO {index}(rowid, {cols}) VALUES (NEW.id, {new});"
+            )
+            deletes.append(
+                f"INSERT INTO {index}({index}, rowid, {cols}) "
+                f"VALUES ('delete', OLD.id, {old});"
+            )
+            watched.extend(c for c in columns if c not in watched)
+
+        name = table[:-1]
+        return (
+            f"CREATE TRIGGER fts_insert_{name} AFTER INSERT ON {table} "
+            f"BEGIN {' '.join(inserts)} END;\n"
+            f"CREATE TRIGGER fts_update_{name} "
+            f"AFTER UPDATE OF {', '.join(watched)} ON {table} "
+            f"BEGIN {' '.join(deletes)} {' '.join(inserts)} END;\n"
+            f"CREATE TRIGGER fts_delete_{name} AFTER DELETE ON {table} "
+            f"BEGIN {' '.join(deletes)} END;"
+        )
+
     @property
     def fts_enabled(self) -> bool:
         """Indica si la busqueda de texto completo (FTS5) esta activa."""
         return self._fts_enabled
 
+    # --- Mantenimiento del indice FTS5 --------------------------------------
+
+    def _active_fts_indexes(
+        self,
+    ) -> Tuple[Tuple[str, str, Tuple[str, ...], Tuple[float, ...]], ...]:
+        """Indices FTS5 presentes en esta BD (con o sin los trigram)."""
+        if self._trigram_enabled:
+            return _FTS_INDEXES + _TRIGRAM_INDEXES
+        return _FTS_INDEXES
+
+    def _fts_missing_and_orphans(self) -> Dict[str, Tuple[int, int]]:
+        """Cuenta las filas sin indexar y las entradas huerfanas por indice.
+
+        Con contenido externo, ``SELECT rowid FROM decisions_fts`` lee la
+        tabla origen, no el indice. Las filas realmente indexadas se
+        obtienen de la tabla sombra ``<indice>_docsize``, que FTS5 mantiene
+        con una fila por documento.
+
+        Returns:
+            Diccionario ``{indice: (sin_indexar, huerfanas)}``.
+        """
+        result: Dict[str, Tuple[int, int]] = {}
+        for index, table, _, _ in self._active_fts_indexes():
+            missing, orphans = self._conn.execute(
+                f"SELECT "
+                f"(SELECT COUNT(*) FROM {table} WHERE id NOT IN "
+                f"   (SELECT id FROM {index}_docsize)), "
+                f"(SELECT COUNT(*) FROM {index}_docsize WHERE id NOT IN "
+                f"   (SELECT id FROM {table}))"
+            ).fetchone()
+            result[index] = (missing, orphans)
+        return result
+
+    def _fts_row_count(self, index: str) -> int:
+        """Numero de documentos de un indice FTS5.
+
+        Se cuenta en ``<indice>_docsize``, la tabla documentada de FTS5
+        con una fila por documento. Es un ``COUNT(*)`` sobre un arbol de
+        rowids sin columnas de texto, mucho mas barato que recorrer el
+        indice, y no depende del formato interno de ``<indice>_data``.
+
+        Args:
+            index: nombre de la tabla FTS5.
+
+        Returns:
+            Documentos indexados (0 si el indice esta vacio).
+        """
+        return self._conn.execute(
+            f"SELECT COUNT(*) FROM {index}_docsize"
+        ).fetchone()[0]
+
+    def rebuild_fts(self, incremental: bool = True) -> Dict[str, Any]:
+        """Resincroniza los indices FTS5 con ``decisions`` y ``commits``.
+
+        En modo incremental solo indexa las filas que faltan en cada
+        indice (p.ej. insertadas con los triggers desactivados o por otra
+        herramienta), sin tocar el resto. Una entrada huerfana (fila
+        borrada sin pasar por el trigger) no se puede retirar de forma
+        selectiva, porque FTS5 necesita el texto original para hacerlo; en
+        ese caso se reconstruye ese indice entero con el comando
+        ``'rebuild'``, igual que con ``incremental`` a False.
+
+        Args:
+            incremental: si es True, intenta indexar solo lo que falta.
+
+        Returns:
+            Diccionario con ``mode`` ('incremental', 'full' o 'disabled'
+            si FTS5 no esta disponible), ``indexed`` (filas indexadas por
+            indice en modo incremental) y ``rebuilt`` (indices
+            reconstruidos enteros).
+
+        Raises:
+            sqlite3.OperationalError: si la BD se abrio en solo lectura.
+        """
+        if not self._fts_enabled:
+            return {"mode": "disabled", "indexed": {}, "rebuilt": []}
+
+        state = self._fts_missing_and_orphans()
+        indexed: Dict[str, int] = {}
+        rebuilt: List[str] = []
+        for index, table, columns, _ in self._active_fts_indexes():
+            missing, orphans = state[index]
+            if not incremental or orphans:
+                self._conn.execute(
+                    f"INSERT INTO {index}({index}) VALUES ('rebuild')"
+                )
+                rebuilt.append(index)
+                continue
+            if missing:
+                cols = ", ".join(columns)
+                self._conn.execute(
+                    f"INSERT INTO {index}(rowid, {cols}) "
+                    f"SELECT id, {cols} FROM {table} "
+                    f"WHERE id NOT IN (SELECT id FROM {index}_docsize)"
+                )
+            indexed[index] = missing
+        self._commit()
+        return {
+            "mode": "full" if rebuilt else "incremental",
+            "indexed": indexed,
+            "rebuilt": rebuilt,
+        }
+
+    def optimize_fts(
+        self, incremental: bool = False, pages: int = _FTS_MERGE_PAGES,
+    ) -> None:
+        """Fusiona los segmentos de los indices FTS5.
+
+        Cada transaccion que escribe en un indice FTS5 anade un segmento
+        nuevo; FTS5 los va fusionando (automerge), pero tras muchas
+        escrituras pequenas las consultas recorren varios segmentos por
+        termino. ``'optimize'`` los fusiona todos en uno. Con
+        ``incremental`` se ejecuta ``'merge'`` con un limite de ``pages``
+        paginas, una pasada acotada pensada para ejecutarse
+        periodicamente sin bloquear la BD mucho tiempo.
+
+        Args:
+            incremental: si es True, hace una fusion parcial acotada.
+            pages: paginas a fusionar por indice en modo incremental.
+        """
+        if not self._fts_enabled:
+            return
+        for index, _, _, _ in self._active_fts_indexes():
+            if incremental:
+                self._conn.execute(
+                    f"INSERT INTO {index}({index}, rank) VALUES ('merge', ?)",
+                    (int(pages),),
+                )
+            else:
+                self._conn.execute(
+                    f"INSERT INTO {index}({index}) VALUES ('optimize')"
+                )
+        self._commit()
+
+    # --- Cache de lecturas --------------------------------------------------
+
+    def _cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Devuelve el resultado cacheado para ``key`` o lo calcula.
+
+        Antes de cada consulta se compara el estado de la BD con el de la
+        cache: ``total_changes`` cubre cualquier escritura de esta conexion
+        (aunque no pase por los metodos de MemoryDB) y ``PRAGMA
+        data_version`` las confirmadas por otras conexiones. Si alguno ha
+        cambiado, o ``_invalidate_cache`` ha subido la generacion, la cache
+        se vacia. Leer ``data_version`` no toca el disco.
+
+        Args:
+            key: clave hashable (metodo y argumentos).
+            compute: funcion que ejecuta la consulta real.
+
+        Returns:
+            Copia del resultado (ver ``_copy_result``).
+        """
+        if self._cache_size <= 0:
+            return compute()
+        state = (
+            self._cache_generation,
+            self._conn.total_changes,
+            self._conn.execute("PRAGMA data_version").fetchone()[0],
+        )
+        if state != self._cache_state:
+            self._cache.clear()
+            self._cache_state = state
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self._cache_misses += 1
+            value = compute()
+            self._cache[key] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache_hits += 1
+            self._cache.move_to_end(key)
+        return _copy_result(value)
+
+    def _invalidate_cache(self) -> None:
+        """Descarta la cache de lecturas.
+
+        Necesario tras un ROLLBACK: deshace cambios sin que
+        ``total_changes`` retroceda, asi que una lectura cacheada dentro
+        de la transaccion revertida no se detectaria como obsoleta.
+        """
+        self._cache_generation += 1
+
+    # --- Transacciones ------------------------------------------------------
+
+    def _commit(self) -> None:
+        """Confirma la transaccion salvo que haya un ``batch()`` abierto.
+
+        Todos los metodos de escritura pasan por aqui en lugar de llamar
+        directamente a ``self._conn.commit()``, de modo que dentro de un
+        batch sus cambios se acumulan en una sola transaccion.
+        """
+        if self._batch_depth == 0:
+            self._conn.commit()
+
+    @contextmanager
+    def batch(self) -> Iterator["MemoryDB"]:
+        """Agrupa varias escrituras en una unica transaccion.
+
+        Dentro del bloque, los metodos de escritura no hacen commit: todo
+        se confirma de una vez al salir (un solo fsync) o se revierte si
+        se produce una excepcion. Los bloques anidados usan un SAVEPOINT,
+        de modo que un error capturado dentro del bloque exterior solo
+        deshace las escrituras del bloque interior.
+
+        Ademas, FTS5 acumula en memoria los terminos que insertan los
+        triggers durante la transaccion y los vuelca al indice al final,
+        asi que las inserciones masivas no reescriben el indice fila a fila.
+
+        Tambien sirve para agrupar lecturas: la transaccion es ``BEGIN
+        DEFERRED``, de modo que en WAL todas las consultas del bloque ven
+        la misma instantanea de la BD (la del primer SELECT), aunque otra
+        conexion confirme cambios mientras tanto. Funciona igual con una
+        conexion ``read_only``.
+
+        Uso::
+
+            with db.batch():
+                db.log_event("phase_completed", phase="desarrollo")
+                db.pin_item("event", item_id=event_id, auto=True)
+
+        Yields:
+            La propia instancia de MemoryDB.
+        """
+        savepoint = f"batch_{self._batch_depth}"
+        if self._batch_depth == 0:
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN DEFERRED")
+        else:
+            self._conn.execute(f"SAVEPOINT {savepoint}")
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.rollback()
+            else:
+                self._conn.execute(f"ROLLBACK TO {savepoint}")
+                self._conn.execute(f"RELEASE {savepoint}")
+            self._invalidate_cache()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._conn.commit()
+        else:
+            self._conn.execute(f"RELEASE {savepoint}")
+
+    def _resolve_iteration(self, iteration_id: Optional[int]) -> Optional[int]:
+        """Devuelve ``iteration_id`` o, si es None, el de la iteracion activa."""
+        if iteration_id is None:
+            active = self.get_active_iteration()
+            if active is not None:
+                iteration_id = active["id"]
+        return iteration_id
+
     # --- Escritura: iteraciones ---------------------------------------------
 
     def start_iteration(
@@ -508,7 +1559,7 @@ class MemoryDB:
             "VALUES (?, ?, 'active', ?)",
             (command, description, now),
         )
-        self._conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def complete_iteration(
@@ -528,7 +1579,7 @@ class MemoryDB:
             "UPDATE iterations SET status = ?, completed_at = ? WHERE id = ?",
             (status, now, iteration_id),
         )
-        self._conn.commit()
+        self._commit()
 
     # --- Escritura: decisiones ----------------------------------------------
 
@@ -550,7 +1601,8 @@ class MemoryDB:
         Si no se proporciona ``iteration_id``, se vincula automaticamente a la
         iteracion activa (si existe). Todos los campos de texto se sanitizan
         antes de persistir. Las etiquetas se almacenan como JSON; si no se
-        proporcionan, se guarda una lista vacia.
+        proporcionan, se guarda una lista vacia. Ademas se escriben en la
+        tabla ``decision_tags``, que es la que usan los filtros.
 
         Args:
             title: titulo corto de la decision.
@@ -567,11 +1619,7 @@ class MemoryDB:
             ID de la decision creada.
         """
         # Auto-vincular a la iteracion activa si no se especifica
-        if iteration_id is None:
-            active = self.get_active_iteration()
-            if active is not None:
-                iteration_id = active["id"]
-
+        iteration_id = self._resolve_iteration(iteration_id)
         now = datetime.now(timezone.utc).isoformat()
 
         # Sanitizar todos los campos de texto
@@ -586,25 +1634,67 @@ class MemoryDB:
             sanitized_alts = [sanitize_content(a) or a for a in alternatives]
             alt_json = json.dumps(sanitized_alts, ensure_ascii=False)
 
-        # Las etiquetas se almacenan como JSON; lista vacia por defecto
-        tags_json = json.dumps(tags or [], ensure_ascii=False)
+        # Las etiquetas se almacenan como JSON; lista vacia por defecto.
+        # Se eliminan duplicados conservando el orden.
+        tags = list(dict.fromkeys(tags or []))
+        tags_json = json.dumps(tags, ensure_ascii=False)
 
         cursor = self._conn.execute(
             "INSERT INTO decisions "
             "(iteration_id, title, context, chosen, alternatives, "
-            " rationale, impact, phase, tags, decided_at) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            " rationale, impact, phase, tags, decided_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (
                 iteration_id, title, context, chosen, alt_json,
-                rationale, impact, phase, tags_json, now,
+                rationale, impact, phase, tags_json, now, now,
             ),
         )
-        self._conn.commit()
+        self._insert_decision_tags(cursor.lastrowid, tags)
+        self._commit()
         return cursor.lastrowid
 
-    # --- Escritura: estado y etiquetas de decisiones -------------------------
-
-    def update_decision_status(self, decision_id: int, status: str) -> None:
+    def log_decisions_bulk(
+        self,
+        decisions: Iterable[Dict[str, Any]],
+        iteration_id: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Registra muchas decisiones en una sola transaccion.
+
+        Cada decision pasa por ``log_decision`` (misma sanitizacion y
+        escritura de etiquetas), pero dentro de un ``batch()``: la
+        iteracion activa se resuelve una sola vez y hay un unico commit.
+        No se usa ``executemany`` porque cada decision necesita su ID para
+        poblar ``decision_tags``; el coste dominante (el fsync por fila)
+        desaparece igualmente.
+
+        Args:
+            decisions: diccionarios con los argumentos de ``log_decision``
+                (``title`` y ``chosen`` obligatorios).
+            iteration_id: iteracion para las decisiones que no traigan una
+                propia (por defecto, la activa).
+
+        Returns:
+            Diccionario con ``inserted`` y ``skipped`` (sin titulo u opcion).
+        """
+        iteration_id = self._resolve_iteration(iteration_id)
+        inserted = 0
+        skipped = 0
+        with self.batch():
+            for decision in decisions:
+                if not decision.get("title") or not decision.get("chosen"):
+                    skipped += 1
+                    continue
+                kwargs = dict(decision)
+                if kwargs.get("iteration_id") is None:
+                    kwargs["iteration_id"] = iteration_id
+                self.log_decision(**kwargs)
+                inserted += 1
+        return {"inserted": inserted, "skipped": skipped}
+
+    # --- Escritura: estado y etiquetas de decisiones -------------------------
+
+    def update_decision_status(self, decision_id: int, status: str) -> None:
         """
         Actualiza el estado de una decision existente.
 
@@ -625,10 +1715,10 @@ class MemoryDB:
                 f"Valores permitidos: {sorted(_VALID_DECISION_STATUSES)}"
             )
         self._conn.execute(
-            "UPDATE decisions SET status = ? WHERE id = ?",
-            (status, decision_id),
+            "UPDATE decisions SET status = ?, updated_at = ? WHERE id = ?",
+            (status, datetime.now(timezone.utc).isoformat(), decision_id),
         )
-        self._conn.commit()
+        self._commit()
 
     def add_decision_tags(
         self, decision_id: int, tags: List[str]
@@ -638,7 +1728,8 @@ class MemoryDB:
 
         Lee las etiquetas actuales, fusiona con las nuevas conservando el
         orden de insercion y elimina duplicados. El resultado se persiste
-        de vuelta en la columna ``tags`` como JSON.
+        de vuelta en la columna ``tags`` como JSON y las etiquetas nuevas
+        se anaden a ``decision_tags``.
 
         Args:
             decision_id: ID de la decision a etiquetar.
@@ -660,10 +1751,29 @@ class MemoryDB:
         merged_json = json.dumps(merged, ensure_ascii=False)
 
         self._conn.execute(
-            "UPDATE decisions SET tags = ? WHERE id = ?",
-            (merged_json, decision_id),
+            "UPDATE decisions SET tags = ?, updated_at = ? WHERE id = ?",
+            (merged_json, datetime.now(timezone.utc).isoformat(), decision_id),
+        )
+        if row is not None:
+            self._insert_decision_tags(decision_id, merged)
+        self._commit()
+
+    def _insert_decision_tags(self, decision_id: int, tags: List[str]) -> None:
+        """Escribe las etiquetas de una decision en ``decision_tags``.
+
+        No hace commit: lo llama el metodo de escritura que modifica la
+        columna JSON, dentro de la misma transaccion. ``INSERT OR IGNORE``
+        hace la operacion idempotente para etiquetas ya registradas.
+
+        Args:
+            decision_id: ID de la decision.
+            tags: etiquetas a registrar.
+        """
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO decision_tags (decision_id, tag) "
+            "VALUES (?, ?)",
+            [(decision_id, tag) for tag in tags],
         )
-        self._conn.commit()
 
     # --- Escritura: relaciones entre decisiones -----------------------------
 
@@ -694,11 +1804,12 @@ class MemoryDB:
                 "VALUES (?, ?, ?, ?)",
                 (source_id, target_id, link_type, now),
             )
-            self._conn.commit()
+            self._commit()
         except sqlite3.IntegrityError:
             # La relacion ya existe: idempotencia
             pass
 
+    @_cached_read
     def get_decision_links(
         self, decision_id: int
     ) -> List[Dict[str, Any]]:
@@ -723,6 +1834,96 @@ class MemoryDB:
         ).fetchall()
         return [dict(r) for r in rows]
 
+    @_cached_read
+    def traverse_decisions(
+        self,
+        root_id: int,
+        link_types: Optional[List[str]] = None,
+        max_depth: int = 10,
+        direction: str = "outgoing",
+    ) -> Dict[str, Any]:
+        """
+        Recorre el grafo de decisiones a partir de una decision.
+
+        Una sola consulta ``WITH RECURSIVE`` sigue las relaciones de
+        ``decision_links`` hasta ``max_depth`` saltos, en lugar de un
+        ``get_decision_links`` por salto. Cada paso busca por indice
+        (``source_id`` con la clave primaria, ``target_id`` con
+        ``idx_decision_links_target``). Los ciclos no hacen divergir la
+        consulta: ``UNION`` descarta los pares (decision, profundidad) ya
+        vistos y la profundidad esta acotada. Cada decision aparece una
+        vez, con la profundidad minima a la que se alcanza.
+
+        Args:
+            root_id: ID de la decision de partida.
+            link_types: tipos de relacion a seguir (p.ej. ``supersedes``,
+                ``depends_on``). Si es None, se siguen todos.
+            max_depth: numero maximo de saltos (0 a
+                ``_TRAVERSE_MAX_DEPTH``).
+            direction: ``outgoing`` (de origen a destino), ``incoming``
+                (de destino a origen) o ``both``.
+
+        Returns:
+            Diccionario con ``root_id``, ``nodes`` (decisiones alcanzadas
+            con su ``depth``, ordenadas por profundidad; vacio si la raiz
+            no existe) y ``edges`` (relaciones entre esas decisiones de los
+            tipos seguidos).
+
+        Raises:
+            ValueError: si ``direction`` o ``max_depth`` no son validos.
+        """
+        if direction not in _TRAVERSE_STEPS:
+            raise ValueError(
+                f"Direccion no valida: '{direction}'. "
+                f"Valores permitidos: {sorted(_TRAVERSE_STEPS)}"
+            )
+        if not 0 <= max_depth <= _TRAVERSE_MAX_DEPTH:
+            raise ValueError(
+                f"max_depth debe estar entre 0 y {_TRAVERSE_MAX_DEPTH}"
+            )
+        join, neighbour = _TRAVERSE_STEPS[direction]
+        type_filter = ""
+        params: List[Any] = [root_id, max_depth]
+        if link_types is not None:
+            type_filter = (
+                " AND l.link_type IN (SELECT value FROM json_each(?))"
+            )
+            params.append(json.dumps(link_types))
+
+        nodes = [
+            dict(row) for row in self._conn.execute(
+                "WITH RECURSIVE walk(id, depth) AS ("
+                "SELECT ?, 0 "
+                f"UNION SELECT {neighbour}, w.depth + 1 "
+                f"FROM walk w JOIN decision_links l ON {join} "
+                f"WHERE w.depth < ?{type_filter}) "
+                "SELECT d.id, d.title, d.chosen, d.status, d.phase, "
+                "d.iteration_id, d.decided_at, MIN(w.depth) AS depth "
+                "FROM walk w JOIN decisions d ON d.id = w.id "
+                "GROUP BY d.id ORDER BY depth, d.id",
+                params,
+            )
+        ]
+
+        edges: List[Dict[str, Any]] = []
+        if nodes:
+            ids = json.dumps([n["id"] for n in nodes])
+            edge_params: List[Any] = [ids, ids]
+            if link_types is not None:
+                edge_params.append(json.dumps(link_types))
+            edges = [
+                dict(row) for row in self._conn.execute(
+                    "SELECT l.source_id, l.target_id, l.link_type "
+                    "FROM decision_links l "
+                    "WHERE l.source_id IN (SELECT value FROM json_each(?)) "
+                    "AND l.target_id IN (SELECT value FROM json_each(?))"
+                    f"{type_filter} ORDER BY l.source_id, l.target_id",
+                    edge_params,
+                )
+            ]
+
+        return {"root_id": root_id, "nodes": nodes, "edges": edges}
+
     # --- Escritura: commits -------------------------------------------------
 
     def log_commit(
@@ -742,7 +1943,8 @@ class MemoryDB:
         Si el SHA ya existe, se ignora silenciosamente (idempotencia). Si no se
         proporciona ``iteration_id``, se vincula a la iteracion activa. La lista
         de ficheros modificados se serializa como JSON tras sanitizar cada ruta
-        para evitar fugas de informacion sensible en nombres de fichero.
+        para evitar fugas de informacion sensible en nombres de fichero, y cada
+        ruta se registra tambien en ``commit_files`` (ver ``get_file_history``).
 
         Args:
             sha: hash SHA del commit.
@@ -758,38 +1960,139 @@ class MemoryDB:
             ID del commit creado, o None si ya existia.
         """
         # Auto-vincular a la iteracion activa si no se especifica
-        if iteration_id is None:
-            active = self.get_active_iteration()
-            if active is not None:
-                iteration_id = active["id"]
-
+        iteration_id = self._resolve_iteration(iteration_id)
         now = datetime.now(timezone.utc).isoformat()
-        message = sanitize_content(message)
-
-        # Serializar la lista de ficheros con sanitizacion preventiva.
-        # Se usa el valor original como fallback si sanitize_content
-        # devuelve None (caso de rutas sin secretos).
-        files_json = json.dumps(
-            [sanitize_content(f) or f for f in (files or [])],
-            ensure_ascii=False,
-        )
+        paths = self._sanitize_paths(files)
 
         try:
             cursor = self._conn.execute(
-                "INSERT INTO commits "
-                "(sha, message, author, files_changed, insertions, "
-                " deletions, files, committed_at, iteration_id) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (
-                    sha, message, author, files_changed,
-                    insertions, deletions, files_json, now, iteration_id,
+                _INSERT_COMMIT_SQL,
+                self._commit_params(
+                    {
+                        "sha": sha, "message": message, "author": author,
+                        "files_changed": files_changed,
+                        "insertions": insertions, "deletions": deletions,
+                    },
+                    paths, iteration_id, now,
                 ),
             )
-            self._conn.commit()
-            return cursor.lastrowid
         except sqlite3.IntegrityError:
             # El SHA ya existe: idempotencia, no es un error
             return None
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO commit_files (commit_id, path) "
+            "VALUES (?, ?)",
+            [(cursor.lastrowid, path) for path in paths],
+        )
+        self._commit()
+        return cursor.lastrowid
+
+    @staticmethod
+    def _sanitize_paths(files: Optional[List[str]]) -> List[str]:
+        """Sanitiza una lista de rutas de fichero de un commit.
+
+        Se usa el valor original como fallback si sanitize_content devuelve
+        None (caso de rutas vacias).
+        """
+        return [sanitize_content(f) or f for f in (files or [])]
+
+    @staticmethod
+    def _commit_params(
+        commit: Dict[str, Any],
+        paths: List[str],
+        iteration_id: Optional[int],
+        now: str,
+    ) -> Tuple[Any, ...]:
+        """Prepara los parametros de ``_INSERT_COMMIT_SQL`` para un commit.
+
+        Sanitiza el mensaje y serializa la lista de ficheros, ya
+        sanitizada con ``_sanitize_paths``. La lista no se comprime: el
+        indice trigram la necesita como texto. Si el commit no trae
+        ``committed_at`` ni ``iteration_id`` propios, se usan los valores
+        por defecto recibidos.
+
+        Args:
+            commit: diccionario con las claves de ``log_commit``.
+            paths: rutas de ficheros sanitizadas.
+            iteration_id: iteracion por defecto.
+            now: fecha ISO por defecto.
+
+        Returns:
+            Tupla de parametros en el orden de la sentencia INSERT.
+        """
+        files_json = json.dumps(paths, ensure_ascii=False)
+        commit_iteration = commit.get("iteration_id")
+        return (
+            commit["sha"],
+            sanitize_content(commit.get("message")),
+            commit.get("author"),
+            commit.get("files_changed"),
+            commit.get("insertions"),
+            commit.get("deletions"),
+            files_json,
+            commit.get("committed_at") or now,
+            commit_iteration if commit_iteration is not None else iteration_id,
+        )
+
+    def log_commits_bulk(
+        self,
+        commits: Iterable[Dict[str, Any]],
+        iteration_id: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Registra muchos commits en una sola transaccion.
+
+        Equivalente a llamar a ``log_commit`` por cada elemento, pero la
+        iteracion activa se resuelve una sola vez, las filas (y sus rutas
+        en ``commit_files``) se insertan con ``executemany`` y se hace un
+        unico commit al final. Los SHA que ya existen se omiten
+        (``INSERT OR IGNORE``).
+
+        Args:
+            commits: diccionarios con las claves de ``log_commit`` (``sha``
+                obligatoria) y, opcionalmente, ``committed_at``.
+            iteration_id: iteracion para los commits que no traigan una
+                propia (por defecto, la activa).
+
+        Returns:
+            Diccionario con ``inserted`` (commits nuevos) y ``skipped``
+            (duplicados o sin SHA).
+        """
+        iteration_id = self._resolve_iteration(iteration_id)
+        now = datetime.now(timezone.utc).isoformat()
+
+        rows = []
+        file_rows = []
+        skipped = 0
+        for commit in commits:
+            if not commit.get("sha"):
+                skipped += 1
+                continue
+            paths = self._sanitize_paths(commit.get("files"))
+            rows.append(self._commit_params(commit, paths, iteration_id, now))
+            file_rows.extend((commit["sha"], path) for path in paths)
+
+        inserted = 0
+        if rows:
+            with self.batch():
+                last_id = self._conn.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM commits"
+                ).fetchone()[0]
+                cursor = self._conn.executemany(
+                    _INSERT_COMMIT_SQL.replace("INSERT", "INSERT OR IGNORE", 1),
+                    rows,
+                )
+                inserted = max(cursor.rowcount, 0)
+                # Se resuelve el id por SHA. Solo los commits recien
+                # insertados (id posterior al ultimo previo) reciben rutas:
+                # un SHA ya registrado conserva las suyas.
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO commit_files (commit_id, path) "
+                    "SELECT id, ? FROM commits WHERE sha = ? AND id > ?",
+                    [(path, sha, last_id) for sha, path in file_rows],
+                )
+
+        return {"inserted": inserted, "skipped": skipped + len(rows) - inserted}
 
     def link_commit_decision(
         self,
@@ -814,7 +2117,7 @@ class MemoryDB:
                 "VALUES (?, ?, ?)",
                 (commit_id, decision_id, link_type),
             )
-            self._conn.commit()
+            self._commit()
         except sqlite3.IntegrityError:
             # El vinculo ya existe: idempotencia
             pass
@@ -844,32 +2147,81 @@ class MemoryDB:
         Returns:
             ID del evento creado.
         """
-        if iteration_id is None:
-            active = self.get_active_iteration()
-            if active is not None:
-                iteration_id = active["id"]
-
+        iteration_id = self._resolve_iteration(iteration_id)
         now = datetime.now(timezone.utc).isoformat()
-        payload_json = None
-        if payload is not None:
-            # Sanitizar los valores del payload por si contienen secretos
-            sanitized = {
-                k: sanitize_content(str(v)) if isinstance(v, str) else v
-                for k, v in payload.items()
-            }
-            payload_json = json.dumps(sanitized, ensure_ascii=False)
 
         cursor = self._conn.execute(
-            "INSERT INTO events "
-            "(iteration_id, event_type, phase, payload, created_at) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (iteration_id, event_type, phase, payload_json, now),
+            _INSERT_EVENT_SQL,
+            (iteration_id, event_type, phase, self._payload_json(payload), now),
         )
-        self._conn.commit()
+        self._commit()
         return cursor.lastrowid
 
+    @staticmethod
+    def _payload_json(
+        payload: Optional[Dict[str, Any]],
+    ) -> Union[str, bytes, None]:
+        """Serializa el payload de un evento sanitizando sus valores de texto.
+
+        Los payloads grandes se devuelven comprimidos (ver ``pack_text``).
+        """
+        if payload is None:
+            return None
+        # Sanitizar los valores del payload por si contienen secretos
+        sanitized = {
+            k: sanitize_content(str(v)) if isinstance(v, str) else v
+            for k, v in payload.items()
+        }
+        return pack_text(json.dumps(sanitized, ensure_ascii=False))
+
+    def log_events_bulk(
+        self,
+        events: Iterable[Dict[str, Any]],
+        iteration_id: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Registra muchos eventos en una sola transaccion.
+
+        La iteracion activa se resuelve una sola vez y las filas se
+        insertan con ``executemany`` y un unico commit.
+
+        Args:
+            events: diccionarios con ``event_type`` (obligatorio) y,
+                opcionalmente, ``phase``, ``payload``, ``iteration_id`` y
+                ``created_at``.
+            iteration_id: iteracion para los eventos que no traigan una
+                propia (por defecto, la activa).
+
+        Returns:
+            Diccionario con ``inserted`` y ``skipped`` (sin ``event_type``).
+        """
+        iteration_id = self._resolve_iteration(iteration_id)
+        now = datetime.now(timezone.utc).isoformat()
+
+        rows = []
+        skipped = 0
+        for event in events:
+            if not event.get("event_type"):
+                skipped += 1
+                continue
+            event_iteration = event.get("iteration_id")
+            rows.append((
+                event_iteration if event_iteration is not None else iteration_id,
+                event["event_type"],
+                event.get("phase"),
+                self._payload_json(event.get("payload")),
+                event.get("created_at") or now,
+            ))
+
+        if rows:
+            with self.batch():
+                self._conn.executemany(_INSERT_EVENT_SQL, rows)
+
+        return {"inserted": len(rows), "skipped": skipped}
+
     # --- Lectura: iteraciones -----------------------------------------------
 
+    @_cached_read
     def get_iteration(self, iteration_id: int) -> Optional[Dict[str, Any]]:
         """
         Obtiene los datos completos de una iteracion por su ID.
@@ -885,6 +2237,7 @@ class MemoryDB:
         ).fetchone()
         return dict(row) if row else None
 
+    @_cached_read
     def get_active_iteration(self) -> Optional[Dict[str, Any]]:
         """
         Obtiene la iteracion activa mas reciente.
@@ -902,6 +2255,7 @@ class MemoryDB:
         ).fetchone()
         return dict(row) if row else None
 
+    @_cached_read
     def get_latest_iteration(self) -> Optional[Dict[str, Any]]:
         """
         Obtiene la iteracion mas reciente independientemente de su estado.
@@ -920,31 +2274,64 @@ class MemoryDB:
 
     # --- Lectura: decisiones ------------------------------------------------
 
+    @_cached_read
     def get_decisions(
         self,
         iteration_id: Optional[int] = None,
         limit: int = 50,
         tags: Optional[List[str]] = None,
         status: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
+        tags_mode: str = "any",
+        cursor: Optional[str] = None,
+    ) -> Page:
         """
         Obtiene decisiones con filtros opcionales por iteracion, etiquetas y estado.
 
         La query SQL se construye dinamicamente en funcion de los filtros
-        proporcionados. El filtro de etiquetas compara contra el campo JSON
-        ``tags`` usando ``LIKE`` para cada etiqueta; basta con que una
-        coincida para incluir el registro (logica OR). El filtro de estado
-        aplica una comparacion exacta.
+        proporcionados. El filtro de etiquetas se resuelve contra la tabla
+        indexada ``decision_tags``: con ``tags_mode='any'`` basta con que
+        una etiqueta coincida (logica OR); con ``tags_mode='all'`` deben
+        estar todas (logica AND). El filtro de estado aplica una
+        comparacion exacta.
+
+        Las decisiones se ordenan por ``(decided_at, id)`` descendente y se
+        paginan por clave: el cursor guarda la clave de la ultima fila y la
+        pagina siguiente empieza en ella recorriendo el indice, de modo que
+        una pagina profunda cuesta lo mismo que la primera.
 
         Args:
             iteration_id: si se proporciona, solo decisiones de esa iteracion.
             limit: numero maximo de resultados.
-            tags: lista de etiquetas; al menos una debe coincidir con las
-                del registro para que se incluya en los resultados.
+            tags: lista de etiquetas a comparar con las del registro.
             status: si se proporciona, solo decisiones con este estado.
+            tags_mode: ``'any'`` (al menos una) o ``'all'`` (todas).
+            cursor: ``next_cursor`` de la pagina anterior.
 
         Returns:
-            Lista de diccionarios con los datos de cada decision.
+            ``Page`` (lista) con los datos de cada decision y el
+            ``next_cursor`` de la pagina siguiente.
+
+        Raises:
+            ValueError: si ``tags_mode`` no es ``'any'`` ni ``'all'`` o el
+                cursor no es valido.
+        """
+        return self._select_decisions(
+            iteration_id, limit, tags, status, tags_mode, cursor,
+        )
+
+    def _select_decisions(
+        self,
+        iteration_id: Optional[int],
+        limit: int,
+        tags: Optional[List[str]],
+        status: Optional[str],
+        tags_mode: str,
+        cursor: Optional[str],
+    ) -> Page:
+        """Consulta de ``get_decisions`` sin pasar por la cache.
+
+        ``iter_decisions`` la usa directamente para que un recorrido
+        completo no llene la cache con todas sus paginas.
         """
         # Construccion dinamica de la query SQL
         conditions: List[str] = []
@@ -958,26 +2345,105 @@ class MemoryDB:
             conditions.append("status = ?")
             params.append(status)
 
-        # Para etiquetas se usa LIKE sobre el campo JSON. Se busca la
-        # presencia de al menos una etiqueta con logica OR. El patron
-        # '"%tag%"' se apoya en que las etiquetas se serializan como
-        # array JSON con comillas (p.ej. '["security", "api"]').
         if tags:
-            tag_clauses = []
-            for tag in tags:
-                tag_clauses.append("tags LIKE ?")
-                params.append(f'%"{tag}"%')
-            conditions.append(f"({' OR '.join(tag_clauses)})")
+            tag_sql, tag_params = self._tags_condition("id", tags, tags_mode)
+            conditions.append(tag_sql)
+            params.extend(tag_params)
+
+        if cursor is not None:
+            conditions.append("(decided_at, id) < (?, ?)")
+            params.extend(_decode_cursor(cursor, "decisions", 2))
 
         where = ""
         if conditions:
             where = "WHERE " + " AND ".join(conditions)
 
-        sql = f"SELECT * FROM decisions {where} ORDER BY decided_at DESC LIMIT ?"
-        params.append(limit)
+        sql = (
+            f"SELECT * FROM decisions {where} "
+            "ORDER BY decided_at DESC, id DESC LIMIT ?"
+        )
+        params.append(limit + 1)
 
         rows = self._conn.execute(sql, params).fetchall()
-        return [dict(r) for r in rows]
+        return _page(
+            [dict(r) for r in rows], limit, "decisions",
+            lambda r: (r["decided_at"], r["id"]),
+        )
+
+    def iter_decisions(
+        self,
+        iteration_id: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        status: Optional[str] = None,
+        tags_mode: str = "any",
+        batch_size: int = _ITER_BATCH,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todas las decisiones que cumplen los filtros, sin limite.
+
+        Pide paginas de ``batch_size`` con la consulta de ``get_decisions``
+        siguiendo su cursor, sin pasar por la cache, de modo que en memoria
+        solo hay una pagina cada vez. El orden es el de ``get_decisions``
+        (de la mas reciente a la mas antigua).
+
+        Args:
+            iteration_id: si se proporciona, solo decisiones de esa iteracion.
+            tags: lista de etiquetas a comparar con las del registro.
+            status: si se proporciona, solo decisiones con este estado.
+            tags_mode: ``'any'`` (al menos una) o ``'all'`` (todas).
+            batch_size: decisiones por consulta.
+
+        Yields:
+            Diccionario con los datos de cada decision.
+        """
+        cursor: Optional[str] = None
+        while True:
+            page = self._select_decisions(
+                iteration_id, batch_size, tags, status, tags_mode, cursor,
+            )
+            yield from page
+            cursor = page.next_cursor
+            if cursor is None:
+                return
+
+    @staticmethod
+    def _tags_condition(
+        id_expr: str, tags: List[str], tags_mode: str = "any"
+    ) -> Tuple[str, List[Any]]:
+        """Genera la condicion SQL de filtrado por etiquetas.
+
+        La subconsulta recorre ``idx_decision_tags_tag`` para obtener los
+        IDs de las decisiones con las etiquetas pedidas. En modo ``all``
+        se agrupa por decision y se exige que aparezcan todas.
+
+        Args:
+            id_expr: expresion SQL del ID de la decision en la consulta
+                exterior (p.ej. ``id`` o ``d.id``).
+            tags: etiquetas a comparar.
+            tags_mode: ``'any'`` o ``'all'``.
+
+        Returns:
+            Tupla (condicion, parametros).
+
+        Raises:
+            ValueError: si ``tags_mode`` no es valido.
+        """
+        if tags_mode not in ("any", "all"):
+            raise ValueError(
+                f"Modo de etiquetas no valido: '{tags_mode}'. "
+                "Valores permitidos: ['all', 'any']"
+            )
+        unique = list(dict.fromkeys(tags))
+        placeholders = ", ".join("?" for _ in unique)
+        sql = (
+            f"{id_expr} IN (SELECT decision_id FROM decision_tags "
+            f"WHERE tag IN ({placeholders})"
+        )
+        params: List[Any] = list(unique)
+        if tags_mode == "all":
+            sql += " GROUP BY decision_id HAVING COUNT(*) = ?"
+            params.append(len(unique))
+        return sql + ")", params
 
     # --- Lectura: busqueda --------------------------------------------------
 
@@ -990,16 +2456,40 @@ class MemoryDB:
         until: Optional[str] = None,
         tags: Optional[List[str]] = None,
         status: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
+        mode: str = "phrase",
+        cursor: Optional[str] = None,
+    ) -> Page:
         """
         Busca en decisiones y commits por texto con filtros opcionales.
 
         Si FTS5 esta disponible, usa MATCH para busqueda de texto completo.
         En caso contrario, usa LIKE como fallback (mas lento pero funcional).
 
+        El modo determina como se interpreta ``query``:
+
+        - ``phrase``: frase literal (por defecto).
+        - ``prefix``: cada palabra es un prefijo (``authMidd`` encuentra
+          ``authMiddleware``); deben coincidir todas.
+        - ``substring``: subcadena en cualquier posicion, tambien dentro de
+          una palabra o una ruta de fichero de un commit. Se resuelve con
+          los indices trigram; con menos de 3 caracteres, o si el
+          tokenizador no esta disponible, con LIKE.
+        - ``boolean``: sintaxis de consulta de FTS5 sin escapar (``AND``,
+          ``OR``, ``NOT``, parentesis, ``NEAR``, prefijos con ``*``).
+
+        Sin FTS5, todos los modos se resuelven como subcadena con LIKE.
+
         Los resultados se enriquecen con el tipo de fuente y los datos
-        completos del registro original. Tras la busqueda inicial, se aplican
-        filtros de post-procesado sobre fechas, etiquetas y estado.
+        completos del registro original. Los filtros de iteracion, fechas,
+        etiquetas y estado se aplican en la propia consulta SQL, de modo
+        que un filtro selectivo no reduce el numero de resultados por
+        debajo de ``limit`` si hay coincidencias suficientes.
+
+        Los resultados se paginan por clave: con FTS5, ``(rango, tipo, id)``;
+        con LIKE, las decisiones y despues los commits por fecha
+        descendente. Con FTS5 cada pagina sigue puntuando todas las
+        coincidencias (lo exige ordenar por relevancia), pero no construye
+        las filas de las paginas anteriores.
 
         Args:
             query: termino de busqueda.
@@ -1012,94 +2502,121 @@ class MemoryDB:
             tags: lista de etiquetas; para decisiones, al menos una debe
                 coincidir con las etiquetas del registro.
             status: estado requerido; solo aplica a decisiones.
+            mode: 'phrase', 'prefix', 'substring' o 'boolean'.
+            cursor: ``next_cursor`` de la pagina anterior.
 
         Returns:
-            Lista de diccionarios con los resultados, cada uno con la clave
-            ``source_type`` ('decision' o 'commit') y los datos del registro.
+            ``Page`` (lista) con los resultados, cada uno con la clave
+            ``source_type`` ('decision' o 'commit'), los datos del registro,
+            ``score`` (relevancia BM25, mayor es mejor; None con LIKE) y
+            ``snippet`` (fragmento con el termino resaltado), y el
+            ``next_cursor`` de la pagina siguiente. Con FTS5 se ordenan de
+            mas a menos relevante.
+
+        Raises:
+            ValueError: si el modo o el cursor no son validos o, en modo
+                ``boolean``, si la consulta no tiene una sintaxis FTS5
+                valida.
         """
-        results: List[Dict[str, Any]] = []
+        if mode not in _SEARCH_MODES:
+            raise ValueError(
+                f"Modo de busqueda no valido: '{mode}'. "
+                f"Valores permitidos: {', '.join(_SEARCH_MODES)}"
+            )
+        filters = {
+            "since": since, "until": until, "tags": tags, "status": status,
+            "cursor": cursor,
+        }
 
-        if self._fts_enabled:
-            results = self._search_fts(
-                query, limit, iteration_id,
-                since=since, until=until, tags=tags, status=status,
+        use_like = not self._fts_enabled or (
+            mode == "substring" and (
+                not self._trigram_enabled
+                or len(query) < _TRIGRAM_MIN_CHARS
             )
-        else:
-            results = self._search_like(
+        )
+        if use_like:
+            return self._search_like(
                 query, limit, iteration_id,
-                since=since, until=until, tags=tags, status=status,
+                match_files=mode == "substring", **filters,
             )
 
-        return results
+        if mode == "boolean":
+            try:
+                return self._search_fts(
+                    query, limit, iteration_id, mode=mode, **filters,
+                )
+            except sqlite3.OperationalError as exc:
+                raise ValueError(f"Consulta booleana no valida: {exc}") from exc
+        return self._search_fts(
+            query, limit, iteration_id, mode=mode, **filters,
+        )
 
-    def _apply_post_filters(
-        self,
-        results: List[Dict[str, Any]],
+    @staticmethod
+    def _search_conditions(
+        date_expr: str,
+        iteration_expr: str,
+        decision_id_expr: Optional[str],
+        status_expr: Optional[str],
+        iteration_id: Optional[int] = None,
         since: Optional[str] = None,
         until: Optional[str] = None,
         tags: Optional[List[str]] = None,
         status: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
+    ) -> Tuple[List[str], List[Any]]:
         """
-        Aplica filtros de post-procesado sobre los resultados de busqueda.
+        Traduce los filtros de busqueda a condiciones SQL parametrizadas.
 
-        Este metodo centraliza la logica de filtrado que comparten tanto
-        la busqueda FTS5 como el fallback LIKE. Los filtros de fecha se
-        aplican a todos los tipos de resultado (decisiones y commits),
-        mientras que los filtros de etiquetas y estado solo afectan a
-        resultados de tipo ``decision``.
+        Centraliza la logica de filtrado que comparten la busqueda FTS5 y
+        el fallback LIKE. Las expresiones de columna se reciben como
+        argumento porque cada consulta las nombra de forma distinta. Si
+        se pide filtrar por etiquetas o estado y la fuente no tiene esas
+        columnas (``decision_id_expr``/``status_expr`` a None), se genera
+        una condicion siempre falsa: los commits no tienen tags ni status,
+        asi que quedan excluidos.
 
         Args:
-            results: lista de resultados sin filtrar.
+            date_expr: expresion SQL de la fecha del registro.
+            iteration_expr: expresion SQL del ID de iteracion.
+            decision_id_expr: expresion SQL del ID de la decision, que se
+                cruza con ``decision_tags``.
+            status_expr: expresion SQL de la columna de estado.
+            iteration_id: filtra por iteracion.
             since: fecha ISO minima (inclusive).
             until: fecha ISO maxima (inclusive).
             tags: etiquetas requeridas (al menos una debe coincidir).
             status: estado requerido para decisiones.
 
         Returns:
-            Lista filtrada de resultados.
+            Tupla (condiciones, parametros) lista para unir con ``AND``.
         """
-        filtered: List[Dict[str, Any]] = []
-
-        for r in results:
-            source_type = r.get("source_type", "")
-
-            # --- Filtro por fecha ---
-            # Se usa decided_at para decisiones y committed_at para commits
-            date_field = (
-                "decided_at" if source_type == "decision" else "committed_at"
-            )
-            record_date = r.get(date_field, "")
-
-            if since and record_date and record_date < since:
-                continue
-            if until and record_date and record_date > until:
-                continue
-
-            # --- Filtros exclusivos de decisiones ---
-            if source_type == "decision":
-                # Filtro por etiquetas: al menos una debe coincidir
-                if tags:
-                    record_tags_raw = r.get("tags", "[]")
-                    try:
-                        record_tags = json.loads(record_tags_raw)
-                    except (json.JSONDecodeError, TypeError):
-                        record_tags = []
-                    if not any(t in record_tags for t in tags):
-                        continue
-
-                # Filtro por estado
-                if status and r.get("status") != status:
-                    continue
-
-            # Los commits no tienen tags ni status, asi que si se
-            # especifican esos filtros, los commits se excluyen
-            elif source_type == "commit" and (tags or status):
-                continue
+        conditions: List[str] = []
+        params: List[Any] = []
 
-            filtered.append(r)
+        if iteration_id is not None:
+            conditions.append(f"{iteration_expr} = ?")
+            params.append(iteration_id)
+        if since:
+            conditions.append(f"{date_expr} >= ?")
+            params.append(since)
+        if until:
+            conditions.append(f"{date_expr} <= ?")
+            params.append(until)
+
+        if (tags or status) and (decision_id_expr is None or status_expr is None):
+            conditions.append("0")
+            return conditions, params
+
+        # Mismo criterio que get_decisions: logica OR entre etiquetas
+        # resuelta contra el indice de decision_tags.
+        if tags:
+            tag_sql, tag_params = MemoryDB._tags_condition(decision_id_expr, tags)
+            conditions.append(tag_sql)
+            params.extend(tag_params)
+        if status:
+            conditions.append(f"{status_expr} = ?")
+            params.append(status)
 
-        return filtered
+        return conditions, params
 
     def _search_fts(
         self,
@@ -1110,57 +2627,155 @@ class MemoryDB:
         until: Optional[str] = None,
         tags: Optional[List[str]] = None,
         status: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
-        """Busqueda con FTS5 MATCH y post-filtrado opcional.
-
-        Se solicita un margen extra de resultados al indice FTS5 para
-        compensar los registros que el post-filtrado pueda descartar.
+        mode: str = "phrase",
+        cursor: Optional[str] = None,
+    ) -> Page:
+        """Busqueda con FTS5 MATCH y filtros resueltos en SQL.
+
+        Consulta ``decisions_fts`` y ``commits_fts`` (o sus equivalentes
+        trigram) en una unica sentencia (``UNION ALL``), cada rama unida por
+        ``rowid`` con su tabla origen,
+        de modo que el registro completo llega en la misma fila que la
+        coincidencia (sin una consulta adicional por resultado) y los
+        filtros se evaluan antes del ``LIMIT``. Los resultados se ordenan
+        por ``bm25()`` con pesos por columna y llevan un fragmento de
+        ``snippet()`` con el termino resaltado.
 
         Args:
             query: termino de busqueda.
             limit: numero maximo de resultados finales.
-            iteration_id: filtra por iteracion (pre-filtro).
-            since: fecha ISO minima (post-filtro).
-            until: fecha ISO maxima (post-filtro).
-            tags: etiquetas requeridas (post-filtro, solo decisiones).
-            status: estado requerido (post-filtro, solo decisiones).
+            iteration_id: filtra por iteracion.
+            since: fecha ISO minima.
+            until: fecha ISO maxima.
+            tags: etiquetas requeridas (solo decisiones).
+            status: estado requerido (solo decisiones).
+            mode: modo de ``search()``; ``substring`` consulta los indices
+                trigram en lugar de los principales.
+            cursor: cursor de la pagina anterior, con la clave
+                ``(rango, source_type, id)`` de su ultimo resultado.
         """
-        results: List[Dict[str, Any]] = []
-
-        # FTS5 requiere escapar caracteres especiales en la query.
-        # Se envuelve entre comillas dobles para tratarla como frase literal.
-        safe_query = '"' + query.replace('"', '""') + '"'
+        keyset = ""
+        keyset_params: List[Any] = []
+        if cursor is not None:
+            keyset = " WHERE (_rank, source_type, _id) > (?, ?, ?)"
+            keyset_params = _decode_cursor(cursor, "search", 3)
+        fts_query = self._fts_query(query, mode)
+        if not fts_query:
+            return Page()
+        # Con trigram cada token es un caracter, asi que el fragmento se
+        # mide con un limite mayor para cubrir una extension parecida.
+        snippet_params = [
+            _SNIPPET_OPEN, _SNIPPET_CLOSE, _SNIPPET_ELLIPSIS,
+            _SNIPPET_TRIGRAM_TOKENS if mode == "substring" else _SNIPPET_TOKENS,
+        ]
+
+        # Cada rama devuelve las columnas de ambas tablas (las de la otra
+        # a NULL) para que _split_search_row trate igual todas las filas.
+        null_dec = ", ".join(f"NULL AS d_{c}" for c in _DECISION_COLUMNS)
+        null_com = ", ".join(f"NULL AS c_{c}" for c in _COMMIT_COLUMNS)
+        dec_cols = ", ".join(f"d.{c} AS d_{c}" for c in _DECISION_COLUMNS)
+        com_cols = ", ".join(f"c.{c} AS c_{c}" for c in _COMMIT_COLUMNS)
+
+        indexes = _TRIGRAM_INDEXES if mode == "substring" else _FTS_INDEXES
+        branch_args = {
+            "decisions": (
+                "decision", "d", f"{dec_cols}, {null_com}",
+                {"date_expr": "d.decided_at",
+                 "iteration_expr": "d.iteration_id",
+                 "decision_id_expr": "d.id", "status_expr": "d.status"},
+            ),
+            "commits": (
+                "commit", "c", f"{null_dec}, {com_cols}",
+                {"date_expr": "c.committed_at",
+                 "iteration_expr": "c.iteration_id",
+                 "decision_id_expr": None, "status_expr": None},
+            ),
+        }
 
-        # Solicitar un margen extra para compensar el post-filtrado
-        fetch_limit = limit * 3 if (since or until or tags or status) else limit
+        branches: List[str] = []
+        params: List[Any] = []
+        for index, table, _, weights in indexes:
+            source, alias, cols, filter_args = branch_args[table]
+            if source == "commit" and (tags or status):
+                # Los commits no tienen etiquetas ni estado: no coinciden
+                continue
+            conditions, cond_params = self._search_conditions(
+                **filter_args, iteration_id=iteration_id,
+                since=since, until=until, tags=tags, status=status,
+            )
+            extra = "".join(f" AND {c}" for c in conditions)
+            weight_list = ", ".join(str(w) for w in weights)
+            branches.append(
+                f"SELECT '{source}' AS source_type, {cols}, "
+                f"{alias}.id AS _id, "
+                f"bm25({index}, {weight_list}) AS _rank, "
+                f"snippet({index}, -1, ?, ?, ?, ?) AS _snippet "
+                f"FROM {index} JOIN {table} {alias} "
+                f"  ON {alias}.id = {index}.rowid "
+                f"WHERE {index} MATCH ?{extra}"
+            )
+            params.extend([*snippet_params, fts_query, *cond_params])
 
+        # El empate de rango se rompe por tipo e ID para que la clave de
+        # paginacion identifique cada fila.
         rows = self._conn.execute(
-            "SELECT source_type, source_id FROM memory_fts "
-            "WHERE memory_fts MATCH ? LIMIT ?",
-            (safe_query, fetch_limit),
+            "SELECT * FROM (" + " UNION ALL ".join(branches) + ")"
+            f"{keyset} ORDER BY _rank, source_type, _id LIMIT ?",
+            [*params, *keyset_params, limit + 1],
         ).fetchall()
 
-        for row in rows:
-            source_type = row["source_type"]
-            source_id = int(row["source_id"])
-            record = self._fetch_source_record(source_type, source_id)
-            if record is None:
-                continue
-            # Filtrar por iteracion si se especifico
-            if iteration_id is not None:
-                if record.get("iteration_id") != iteration_id:
-                    continue
-            results.append({
-                "source_type": source_type,
-                **record,
-            })
-
-        # Aplicar post-filtros de fecha, etiquetas y estado
-        results = self._apply_post_filters(
-            results, since=since, until=until, tags=tags, status=status,
+        page = _page(
+            rows, limit, "search",
+            lambda r: (r["_rank"], r["source_type"], r["_id"]),
+        )
+        return Page(
+            (self._split_search_row(row) for row in page), page.next_cursor,
         )
 
-        return results[:limit]
+    @staticmethod
+    def _fts_query(query: str, mode: str) -> str:
+        """Traduce la consulta del usuario a una expresion MATCH de FTS5.
+
+        FTS5 interpreta comillas, operadores y ``*``; salvo en modo
+        ``boolean`` cada termino se envuelve entre comillas dobles
+        (duplicando las internas) para tratarlo como literal.
+
+        Args:
+            query: consulta tal como la escribio el usuario.
+            mode: modo de ``search()``.
+
+        Returns:
+            Expresion para ``MATCH``, o cadena vacia si no hay terminos.
+        """
+        if mode == "boolean":
+            return query.strip()
+        if mode == "prefix":
+            return " ".join(
+                '"' + term.replace('"', '""') + '"*' for term in query.split()
+            )
+        return '"' + query.replace('"', '""') + '"'
+
+    @staticmethod
+    def _split_search_row(row: sqlite3.Row) -> Dict[str, Any]:
+        """Reconstruye el registro original a partir de una fila de busqueda.
+
+        La consulta FTS devuelve las columnas de ambas tablas con prefijo
+        (``d_`` para decisiones, ``c_`` para commits). Se conserva solo el
+        lado correspondiente al ``source_type`` de la fila.
+        """
+        source_type = row["source_type"]
+        if source_type == "decision":
+            prefix, columns = "d_", _DECISION_COLUMNS
+        else:
+            prefix, columns = "c_", _COMMIT_COLUMNS
+        record: Dict[str, Any] = {"source_type": source_type}
+        for col in columns:
+            record[col] = row[prefix + col]
+        # bm25() devuelve valores negativos (mas negativo = mas relevante);
+        # se invierte el signo para que el score crezca con la relevancia.
+        record["score"] = round(-row["_rank"], 4)
+        record["snippet"] = row["_snippet"]
+        return record
 
     def _search_like(
         self,
@@ -1171,142 +2786,357 @@ class MemoryDB:
         until: Optional[str] = None,
         tags: Optional[List[str]] = None,
         status: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
-        """Busqueda con LIKE como fallback y post-filtrado opcional.
+        cursor: Optional[str] = None,
+        match_files: bool = False,
+    ) -> Page:
+        """Busqueda con LIKE como fallback y filtros resueltos en SQL.
 
-        Se solicita un margen extra de resultados SQL para compensar los
-        registros que el post-filtrado pueda descartar.
+        Devuelve primero las decisiones y despues los commits, cada grupo
+        por fecha descendente; el cursor guarda el tipo, la fecha y el ID
+        del ultimo resultado.
 
         Args:
             query: termino de busqueda.
             limit: numero maximo de resultados finales.
-            iteration_id: filtra por iteracion (pre-filtro SQL).
-            since: fecha ISO minima (post-filtro).
-            until: fecha ISO maxima (post-filtro).
-            tags: etiquetas requeridas (post-filtro, solo decisiones).
-            status: estado requerido (post-filtro, solo decisiones).
+            iteration_id: filtra por iteracion.
+            since: fecha ISO minima.
+            until: fecha ISO maxima.
+            tags: etiquetas requeridas (solo decisiones).
+            status: estado requerido (solo decisiones).
+            cursor: cursor de la pagina anterior.
+            match_files: busca tambien en la lista de ficheros de los
+                commits, como ``commits_trigram`` en ``mode='substring'``.
         """
         results: List[Dict[str, Any]] = []
         like_pattern = f"%{query}%"
-
-        # Margen extra para compensar el post-filtrado
-        fetch_limit = limit * 3 if (since or until or tags or status) else limit
-
-        # Buscar en decisiones
-        if iteration_id is not None:
-            decision_rows = self._conn.execute(
-                "SELECT * FROM decisions "
-                "WHERE (title LIKE ? OR context LIKE ? OR chosen LIKE ? "
-                "       OR rationale LIKE ?) "
-                "  AND iteration_id = ? "
-                "ORDER BY decided_at DESC LIMIT ?",
-                (like_pattern, like_pattern, like_pattern, like_pattern,
-                 iteration_id, fetch_limit),
-            ).fetchall()
-        else:
-            decision_rows = self._conn.execute(
-                "SELECT * FROM decisions "
-                "WHERE title LIKE ? OR context LIKE ? OR chosen LIKE ? "
-                "      OR rationale LIKE ? "
-                "ORDER BY decided_at DESC LIMIT ?",
-                (like_pattern, like_pattern, like_pattern, like_pattern,
-                 fetch_limit),
-            ).fetchall()
+        after: Optional[List[Any]] = None
+        if cursor is not None:
+            after = _decode_cursor(cursor, "search_like", 3)
+
+        # Buscar en decisiones, salvo que el cursor este ya en los commits
+        conditions, params = self._search_conditions(
+            date_expr="decided_at",
+            iteration_expr="iteration_id",
+            decision_id_expr="id",
+            status_expr="status",
+            iteration_id=iteration_id,
+            since=since, until=until, tags=tags, status=status,
+        )
+        if after is not None:
+            if after[0] == "decision":
+                conditions.append("(decided_at, id) < (?, ?)")
+                params.extend(after[1:])
+            else:
+                conditions.append("0")
+        extra = "".join(f" AND {c}" for c in conditions)
+        decision_rows = self._conn.execute(
+            "SELECT * FROM decisions "
+            "WHERE (title LIKE ? OR context LIKE ? OR chosen LIKE ? "
+            "       OR rationale LIKE ?)"
+            f"{extra} "
+            "ORDER BY decided_at DESC, id DESC LIMIT ?",
+            [like_pattern, like_pattern, like_pattern, like_pattern,
+             *params, limit + 1],
+        ).fetchall()
 
         for row in decision_rows:
-            results.append({"source_type": "decision", **dict(row)})
+            record = dict(row)
+            results.append({
+                "source_type": "decision",
+                **record,
+                "score": None,
+                "snippet": self._like_snippet(
+                    query,
+                    record.get("title"), record.get("chosen"),
+                    record.get("rationale"), record.get("context"),
+                ),
+            })
 
-        # Buscar en commits
-        remaining = fetch_limit - len(results)
+        # Buscar en commits (sin tags ni status: si se filtra por ellos,
+        # la condicion generada excluye todos los commits)
+        remaining = limit + 1 - len(results)
         if remaining > 0:
-            if iteration_id is not None:
-                commit_rows = self._conn.execute(
-                    "SELECT * FROM commits "
-                    "WHERE message LIKE ? AND iteration_id = ? "
-                    "ORDER BY committed_at DESC LIMIT ?",
-                    (like_pattern, iteration_id, remaining),
-                ).fetchall()
-            else:
-                commit_rows = self._conn.execute(
-                    "SELECT * FROM commits WHERE message LIKE ? "
-                    "ORDER BY committed_at DESC LIMIT ?",
-                    (like_pattern, remaining),
-                ).fetchall()
+            conditions, params = self._search_conditions(
+                date_expr="committed_at",
+                iteration_expr="iteration_id",
+                decision_id_expr=None,
+                status_expr=None,
+                iteration_id=iteration_id,
+                since=since, until=until, tags=tags, status=status,
+            )
+            if after is not None and after[0] == "commit":
+                conditions.append("(committed_at, id) < (?, ?)")
+                params.extend(after[1:])
+            match = "message LIKE ?"
+            match_params = [like_pattern]
+            if match_files:
+                match = "(message LIKE ? OR files LIKE ?)"
+                match_params.append(like_pattern)
+            extra = "".join(f" AND {c}" for c in conditions)
+            commit_rows = self._conn.execute(
+                f"SELECT * FROM commits WHERE {match}"
+                f"{extra} "
+                "ORDER BY committed_at DESC, id DESC LIMIT ?",
+                [*match_params, *params, remaining],
+            ).fetchall()
 
             for row in commit_rows:
-                results.append({"source_type": "commit", **dict(row)})
-
-        # Aplicar post-filtros de fecha, etiquetas y estado
-        results = self._apply_post_filters(
-            results, since=since, until=until, tags=tags, status=status,
+                record = dict(row)
+                results.append({
+                    "source_type": "commit",
+                    **record,
+                    "score": None,
+                    "snippet": self._like_snippet(
+                        query, record.get("message"),
+                        record.get("files") if match_files else None,
+                    ),
+                })
+
+        return _page(
+            results, limit, "search_like",
+            lambda r: (
+                r["source_type"],
+                r["decided_at" if r["source_type"] == "decision"
+                  else "committed_at"],
+                r["id"],
+            ),
         )
 
-        return results[:limit]
+    @staticmethod
+    def _like_snippet(query: str, *fields: Optional[str]) -> Optional[str]:
+        """Construye un fragmento resaltado para la busqueda LIKE.
 
-    def _fetch_source_record(
-        self, source_type: str, source_id: int
-    ) -> Optional[Dict[str, Any]]:
-        """Obtiene el registro completo de una fuente (decision o commit)."""
-        table = "decisions" if source_type == "decision" else "commits"
-        row = self._conn.execute(
-            f"SELECT * FROM {table} WHERE id = ?", (source_id,)
-        ).fetchone()
-        return dict(row) if row else None
+        Equivalente aproximado de ``snippet()`` de FTS5: toma el primer
+        campo que contiene el termino (sin distinguir mayusculas), recorta
+        unos caracteres a cada lado y envuelve la coincidencia con los
+        mismos marcadores.
 
-    # --- Lectura: cronologia ------------------------------------------------
+        Args:
+            query: termino buscado.
+            *fields: campos candidatos, en orden de preferencia.
 
-    def get_timeline(
-        self,
+        Returns:
+            Fragmento con la coincidencia resaltada, o None si ningun
+            campo la contiene.
+        """
+        needle = query.lower()
+        radius = _SNIPPET_TOKENS * 4
+        for text in fields:
+            if not text:
+                continue
+            pos = text.lower().find(needle)
+            if pos < 0:
+                continue
+            start = max(0, pos - radius)
+            end = min(len(text), pos + len(query) + radius)
+            return (
+                (_SNIPPET_ELLIPSIS if start > 0 else "")
+                + text[start:pos]
+                + _SNIPPET_OPEN + text[pos:pos + len(query)] + _SNIPPET_CLOSE
+                + text[pos + len(query):end]
+                + (_SNIPPET_ELLIPSIS if end < len(text) else "")
+            )
+        return None
+
+    # --- Lectura: cronologia ------------------------------------------------
+
+    @_cached_read
+    def get_timeline(
+        self,
         iteration_id: int,
         limit: int = 100,
-    ) -> List[Dict[str, Any]]:
+        cursor: Optional[str] = None,
+    ) -> Page:
         """
         Obtiene la cronologia de eventos de una iteracion.
 
+        Los eventos se ordenan por ``(created_at, id)`` y se paginan por
+        clave sobre ``idx_events_iteration`` (ver ``get_decisions``).
+
         Args:
             iteration_id: ID de la iteracion.
             limit: numero maximo de eventos.
+            cursor: ``next_cursor`` de la pagina anterior.
 
         Returns:
-            Lista de diccionarios con los datos de cada evento, ordenados
-            cronologicamente.
+            ``Page`` (lista) con los datos de cada evento, ordenados
+            cronologicamente, y el ``next_cursor`` de la pagina siguiente.
+
+        Raises:
+            ValueError: si el cursor no es valido.
         """
+        keyset = ""
+        params: List[Any] = [iteration_id]
+        if cursor is not None:
+            keyset = " AND (created_at, id) > (?, ?)"
+            params.extend(_decode_cursor(cursor, "timeline", 2))
         rows = self._conn.execute(
-            "SELECT * FROM events WHERE iteration_id = ? "
-            "ORDER BY created_at ASC LIMIT ?",
-            (iteration_id, limit),
+            f"SELECT * FROM events WHERE iteration_id = ?{keyset} "
+            "ORDER BY created_at ASC, id ASC LIMIT ?",
+            [*params, limit + 1],
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _page(
+            [unpack_row(r) for r in rows], limit, "timeline",
+            lambda r: (r["created_at"], r["id"]),
+        )
+
+    # --- Lectura: historial de ficheros -------------------------------------
+
+    @_cached_read
+    def get_file_history(
+        self,
+        path: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Devuelve los commits que tocaron una ruta y sus decisiones.
+
+        ``path`` se trata como prefijo: ``src/auth/`` cubre todo el
+        directorio y ``src/app.py`` el fichero (y cualquier ruta que empiece
+        igual). La busqueda es un recorrido por rango sobre el indice
+        ``idx_commit_files_path`` de ``commit_files``; las decisiones se
+        obtienen a traves de ``commit_links``.
+
+        Args:
+            path: ruta o prefijo de ruta, relativo a la raiz del repositorio.
+            limit: numero maximo de commits, del mas reciente al mas antiguo.
+            cursor: ``next_cursor`` de la pagina anterior.
+
+        Returns:
+            Diccionario con ``path``, ``commits`` (cada uno con ``paths``,
+            las rutas que coinciden, y ``decision_ids``), ``decisions``
+            (las decisiones vinculadas a esos commits, con ``commit_ids``)
+            y ``next_cursor`` (None en la ultima pagina).
+
+        Raises:
+            ValueError: si ``path`` esta vacio o el cursor no es valido.
+        """
+        prefix = path.strip()
+        while prefix.startswith("./"):
+            prefix = prefix[2:]
+        if not prefix:
+            raise ValueError("La ruta no puede estar vacia")
+        # Limite superior del rango: el prefijo con su ultimo caracter
+        # incrementado. Con la colacion BINARY, path >= ? AND path < ?
+        # equivale a "empieza por el prefijo" y usa el indice.
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        keyset = ""
+        params: List[Any] = [prefix, upper]
+        if cursor is not None:
+            keyset = " AND (c.committed_at, c.id) < (?, ?)"
+            params.extend(_decode_cursor(cursor, "file_history", 2))
+
+        rows = self._conn.execute(
+            "SELECT c.id, c.sha, c.message, c.author, c.committed_at, "
+            "c.iteration_id, json_group_array(f.path) AS paths "
+            "FROM commit_files f JOIN commits c ON c.id = f.commit_id "
+            f"WHERE f.path >= ? AND f.path < ?{keyset} "
+            "GROUP BY c.id ORDER BY c.committed_at DESC, c.id DESC LIMIT ?",
+            [*params, limit + 1],
+        ).fetchall()
+        commits = _page(
+            [dict(row) for row in rows], limit, "file_history",
+            lambda c: (c["committed_at"], c["id"]),
+        )
+        for commit in commits:
+            commit["paths"] = sorted(json.loads(commit["paths"]))
+            commit["decision_ids"] = []
+
+        decisions: Dict[int, Dict[str, Any]] = {}
+        if commits:
+            by_id = {c["id"]: c for c in commits}
+            links = self._conn.execute(
+                "SELECT l.commit_id, d.id, d.title, d.chosen, "
+                "d.status, d.decided_at "
+                "FROM commit_links l JOIN decisions d ON d.id = l.decision_id "
+                "WHERE l.commit_id IN (SELECT value FROM json_each(?)) "
+                "ORDER BY d.decided_at DESC, d.id DESC",
+                (json.dumps(list(by_id)),),
+            ).fetchall()
+            for link in links:
+                decision = decisions.setdefault(link["id"], {
+                    "id": link["id"],
+                    "title": link["title"],
+                    "chosen": link["chosen"],
+                    "status": link["status"],
+                    "decided_at": link["decided_at"],
+                    "commit_ids": [],
+                })
+                decision["commit_ids"].append(link["commit_id"])
+                by_id[link["commit_id"]]["decision_ids"].append(link["id"])
+
+        return {
+            "path": prefix,
+            "commits": list(commits),
+            "decisions": list(decisions.values()),
+            "next_cursor": commits.next_cursor,
+        }
 
     # --- Lectura: estadisticas ----------------------------------------------
 
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, exact: bool = False) -> Dict[str, Any]:
         """
         Devuelve estadisticas generales de la memoria del proyecto.
 
+        Por defecto los totales se leen de la tabla ``counters``, que los
+        triggers mantienen al dia, junto con meta en una sola consulta.
+        Con ``exact`` se cuentan las filas de cada tabla con ``COUNT(*)``
+        (un recorrido completo por tabla), util para auditar los
+        contadores.
+
+        Args:
+            exact: si es True, cuenta las filas en lugar de leer los
+                contadores.
+
         Returns:
             Diccionario con contadores (iteraciones, decisiones, commits,
-            eventos), estado de FTS5, version del esquema y fecha de creacion.
+            eventos), estado de FTS5, version del esquema, fecha de creacion
+            y aciertos/fallos de la cache de lecturas (``cache_hits``,
+            ``cache_misses``).
         """
-        stats: Dict[str, Any] = {}
-
-        # Contadores
-        for table in ("iterations", "decisions", "commits", "events"):
-            row = self._conn.execute(
-                f"SELECT COUNT(*) as cnt FROM {table}"
-            ).fetchone()
-            stats[f"total_{table}"] = row["cnt"]
+        stats = self._table_stats(exact)
+        stats["cache_hits"] = self._cache_hits
+        stats["cache_misses"] = self._cache_misses
+        return stats
 
-        # Metadatos
-        meta_rows = self._conn.execute("SELECT key, value FROM meta").fetchall()
-        for row in meta_rows:
+    @_cached_read
+    def _table_stats(self, exact: bool = False) -> Dict[str, Any]:
+        """Totales por tabla y contenido de meta (cacheado)."""
+        stats: Dict[str, Any] = {}
+        if exact:
+            stats.update(
+                (f"total_{table}", count)
+                for table, count in self._exact_counts().items()
+            )
+            rows = self._conn.execute("SELECT key, value FROM meta").fetchall()
+        else:
+            rows = self._conn.execute(
+                "SELECT 'total_' || name AS key, value FROM counters "
+                "UNION ALL SELECT key, value FROM meta"
+            ).fetchall()
+        for row in rows:
             stats[row["key"]] = row["value"]
-
         return stats
 
+    def _exact_counts(self) -> Dict[str, int]:
+        """Cuenta las filas de cada tabla de ``_COUNTED_TABLES``."""
+        row = self._conn.execute(
+            "SELECT "
+            + ", ".join(f"(SELECT COUNT(*) FROM {t})" for t in _COUNTED_TABLES)
+        ).fetchone()
+        return dict(zip(_COUNTED_TABLES, row))
+
+    def _counter_values(self) -> Dict[str, int]:
+        """Lee los contadores mantenidos por triggers."""
+        return {
+            row[0]: row[1] for row in
+            self._conn.execute("SELECT name, value FROM counters").fetchall()
+        }
+
     # --- Mantenimiento ------------------------------------------------------
 
-    def check_health(self) -> Dict[str, Any]:
+    def check_health(self, repair: bool = False) -> Dict[str, Any]:
         """Valida la integridad de la base de datos de memoria.
 
         Ejecuta un conjunto de comprobaciones diagnosticas para detectar
@@ -1315,15 +3145,27 @@ class MemoryDB:
 
         Comprobaciones:
             - Version del esquema correcta.
-            - FTS5 sincronizado (conteo en FTS vs tablas fuente).
+            - FTS5 sincronizado: el total de documentos de cada indice
+              coincide con el contador de su tabla. Si no, se buscan las
+              filas sin indexar y las entradas huerfanas.
             - Permisos del fichero (0600).
             - Tamano de la BD (aviso si > 50 MB).
 
+        Args:
+            repair: si es True, se recalculan los contadores de filas con
+                ``COUNT(*)`` y, si los indices FTS5 estan desincronizados,
+                se resincronizan con ``rebuild_fts()`` y se vuelve a
+                comprobar.
+
         Returns:
             Diccionario con status (healthy, warnings, errors),
-            lista de issues y metadatos de la DB.
+            lista de issues y metadatos de la DB. Si se ha reparado el
+            indice, incluye ``fts_repair`` con el resultado de
+            ``rebuild_fts()``; si se han corregido los contadores,
+            ``counters_repaired``.
         """
         issues: List[str] = []
+        report: Dict[str, Any] = {}
 
         # Version del esquema
         row = self._conn.execute(
@@ -1336,23 +3178,37 @@ class MemoryDB:
                 f"(esperada: {_SCHEMA_VERSION})"
             )
 
-        # FTS5 sincronizado
-        if self._fts_enabled:
-            fts_count = self._conn.execute(
-                "SELECT COUNT(*) FROM memory_fts"
-            ).fetchone()[0]
-            dec_count = self._conn.execute(
-                "SELECT COUNT(*) FROM decisions"
-            ).fetchone()[0]
-            commit_count = self._conn.execute(
-                "SELECT COUNT(*) FROM commits"
-            ).fetchone()[0]
-            expected = dec_count + commit_count
-            if fts_count != expected:
-                issues.append(
-                    f"FTS5 desincronizado: {fts_count} entradas "
-                    f"vs {expected} esperadas"
+        # Contadores: solo se auditan (recorriendo las tablas) al reparar
+        if repair:
+            exact = self._exact_counts()
+            if exact != self._counter_values():
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO counters (name, value) "
+                    "VALUES (?, ?)",
+                    list(exact.items()),
                 )
+                self._commit()
+                report["counters_repaired"] = True
+
+        # FTS5 sincronizado: se compara el total de documentos de cada
+        # indice con el contador de su tabla, sin recorrer ninguna. Solo si
+        # no coinciden (o al reparar) se buscan las filas concretas.
+        if self._fts_enabled:
+            counts = self._counter_values()
+            drift = repair or any(
+                self._fts_row_count(index) != counts[table]
+                for index, table, _, _ in self._active_fts_indexes()
+            )
+            state = self._fts_missing_and_orphans() if drift else {}
+            if repair and any(m or o for m, o in state.values()):
+                report["fts_repair"] = self.rebuild_fts(incremental=True)
+                state = self._fts_missing_and_orphans()
+            for index, (missing, orphans) in state.items():
+                if missing or orphans:
+                    issues.append(
+                        f"FTS5 desincronizado en {index}: {missing} filas "
+                        f"sin indexar, {orphans} entradas huerfanas"
+                    )
 
         # Permisos del fichero
         permissions_ok = True
@@ -1387,21 +3243,24 @@ class MemoryDB:
         else:
             status = "healthy"
 
-        return {
+        report.update({
             "status": status,
             "issues": issues,
             "schema_version": schema_version,
             "fts_enabled": self._fts_enabled,
             "permissions_ok": permissions_ok,
             "size_bytes": size_bytes,
-        }
+        })
+        return report
 
     def purge_old_events(self, retention_days: int) -> int:
         """
         Elimina eventos anteriores a la ventana de retencion.
 
         Solo se purgan eventos: las decisiones e iteraciones se conservan
-        siempre por su alto valor para la trazabilidad.
+        siempre por su alto valor para la trazabilidad. Los eventos
+        eliminados quedan resumidos en ``event_summaries`` (ver
+        ``compact_events``).
 
         Args:
             retention_days: numero de dias de retencion.
@@ -1409,17 +3268,410 @@ class MemoryDB:
         Returns:
             Numero de eventos eliminados.
         """
+        return self.compact_events(retention_days)["deleted"]
+
+    def compact_events(
+        self,
+        retention_days: int,
+        batch_size: int = _RETENTION_BATCH,
+        pause: float = _RETENTION_PAUSE,
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Resume y elimina los eventos anteriores a la ventana de retencion.
+
+        Trabaja en lotes de ``batch_size`` eventos, cada uno en su propia
+        transaccion: agrega el lote en ``event_summaries`` (una fila por
+        iteracion, dia y tipo de evento, con el numero de eventos y el
+        primer y ultimo instante), borra los eventos y confirma. Entre
+        lotes espera ``pause`` segundos para que otros procesos puedan
+        escribir. Al terminar libera las paginas vacias con
+        ``incremental_vacuum()``.
+
+        Dentro de ``batch()`` los lotes no se confirman por separado y el
+        bloqueo se mantiene hasta el final del bloque.
+
+        Args:
+            retention_days: numero de dias de retencion.
+            batch_size: eventos por lote.
+            pause: segundos de espera entre lotes.
+            cancel: evento que se comprueba entre lotes.
+
+        Returns:
+            Diccionario con ``deleted`` (eventos eliminados),
+            ``summarized`` (filas de resumen creadas o actualizadas),
+            ``batches`` y ``bytes_reclaimed``.
+
+        Raises:
+            OperationCancelled: si ``cancel`` se activa; los lotes ya
+                confirmados se conservan.
+        """
         cutoff = (
             datetime.now(timezone.utc) - timedelta(days=retention_days)
         ).isoformat()
-        cursor = self._conn.execute(
-            "DELETE FROM events WHERE created_at < ?", (cutoff,)
+        deleted = summarized = batches = 0
+        while True:
+            ids = [
+                row[0] for row in self._conn.execute(
+                    "SELECT id FROM events WHERE created_at < ? "
+                    "ORDER BY created_at LIMIT ?",
+                    (cutoff, batch_size),
+                )
+            ]
+            if not ids:
+                break
+            if batches and pause > 0:
+                time.sleep(pause)
+            _check_cancel(cancel)
+            summarized += self._summarize_events(ids)
+            self._conn.executemany(
+                "DELETE FROM events WHERE id = ?", [(i,) for i in ids],
+            )
+            self._commit()
+            deleted += len(ids)
+            batches += 1
+
+        return {
+            "deleted": deleted,
+            "summarized": summarized,
+            "batches": batches,
+            "bytes_reclaimed": self.incremental_vacuum() if deleted else 0,
+        }
+
+    def _summarize_events(self, ids: List[int]) -> int:
+        """Acumula un lote de eventos en ``event_summaries``.
+
+        Suma los eventos del lote a la fila de su iteracion, dia y tipo,
+        o la crea si no existe. Las iteraciones ausentes (``NULL``) se
+        agrupan entre si.
+
+        Args:
+            ids: identificadores de los eventos a resumir.
+
+        Returns:
+            Numero de filas de resumen creadas o actualizadas.
+        """
+        groups = self._conn.execute(
+            "SELECT iteration_id, substr(created_at, 1, 10) AS day, "
+            "event_type, COUNT(*), MIN(created_at), MAX(created_at) "
+            "FROM events WHERE id IN (SELECT value FROM json_each(?)) "
+            "GROUP BY iteration_id, day, event_type",
+            (json.dumps(ids),),
+        ).fetchall()
+        for iteration_id, day, event_type, count, first_at, last_at in groups:
+            cursor = self._conn.execute(
+                "UPDATE event_summaries SET count = count + ?, "
+                "first_at = min(first_at, ?), last_at = max(last_at, ?) "
+                "WHERE iteration_id IS ? AND day = ? AND event_type = ?",
+                (count, first_at, last_at, iteration_id, day, event_type),
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "INSERT INTO event_summaries (iteration_id, day, "
+                    "event_type, count, first_at, last_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (iteration_id, day, event_type, count, first_at, last_at),
+                )
+        return len(groups)
+
+    def incremental_vacuum(self, max_pages: int = 0) -> int:
+        """
+        Devuelve al sistema de ficheros las paginas libres de la BD.
+
+        Requiere ``auto_vacuum=INCREMENTAL`` (lo activa la migracion a la
+        version 6 y el esquema de las BD nuevas); con otro modo no hace
+        nada. Tampoco hace nada con una transaccion abierta (dentro de
+        ``batch()``). En modo WAL el fichero principal se trunca en el
+        siguiente checkpoint.
+
+        Args:
+            max_pages: paginas a liberar como maximo; 0 libera todas.
+
+        Returns:
+            Bytes liberados.
+        """
+        if self._conn.in_transaction:
+            return 0
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        before = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        # execute() solo avanza un paso del pragma (una pagina); el script
+        # lo ejecuta hasta el final.
+        self._conn.executescript(
+            f"PRAGMA incremental_vacuum({int(max_pages)});"
         )
-        self._conn.commit()
-        return cursor.rowcount
+        after = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        return (before - after) * page_size
+
+    def optimize(self, analysis_limit: int = _ANALYSIS_LIMIT) -> str:
+        """
+        Actualiza las estadisticas que usa el planificador de consultas.
+
+        La primera vez (sin ``sqlite_stat1``) ejecuta ``ANALYZE``; despues,
+        ``PRAGMA optimize``, que solo reanaliza las tablas cuyo tamano ha
+        cambiado mucho desde el ultimo analisis (desde SQLite 3.46 revisa
+        todas; antes, solo las consultadas por esta conexion). En ambos
+        casos ``analysis_limit`` acota las filas examinadas por indice.
+
+        Args:
+            analysis_limit: filas por indice (0 analiza todas).
+
+        Returns:
+            ``"analyze"`` u ``"optimize"``, segun lo que se haya ejecutado.
+        """
+        self._conn.execute(f"PRAGMA analysis_limit={int(analysis_limit)}")
+        analyzed = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()
+        if analyzed:
+            self._conn.execute("PRAGMA optimize=0x10002")
+        else:
+            self._conn.execute("ANALYZE")
+        self._commit()
+        return "optimize" if analyzed else "analyze"
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Vuelca el WAL al fichero principal y lo trunca.
+
+        Ejecuta ``PRAGMA wal_checkpoint(TRUNCATE)``. Si hay lectores con
+        una instantanea abierta el checkpoint no se completa (``busy``) y
+        el WAL se queda como estaba hasta el siguiente.
+
+        Returns:
+            Diccionario con ``busy``, ``wal_pages`` (paginas que habia en
+            el WAL) y ``checkpointed`` (paginas volcadas).
+        """
+        busy, wal_pages, checkpointed = self._conn.execute(
+            "PRAGMA wal_checkpoint(TRUNCATE)"
+        ).fetchone()
+        return {
+            "busy": bool(busy),
+            "wal_pages": wal_pages,
+            "checkpointed": checkpointed,
+        }
+
+    def run_maintenance(
+        self,
+        retention_days: int = 0,
+        analysis_limit: int = _ANALYSIS_LIMIT,
+        fts_merge_pages: int = _FTS_MERGE_PAGES,
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta una pasada completa de mantenimiento.
+
+        Pasos, en este orden: retencion de eventos (``compact_events``,
+        solo si ``retention_days`` es positivo), estadisticas del
+        planificador (``optimize``), fusion acotada de los indices FTS5
+        (``optimize_fts(incremental=True)``) y checkpoint del WAL
+        (``checkpoint``). ``cancel`` se comprueba antes de cada paso (y
+        entre los lotes de la retencion): al activarse se abandona el
+        resto y el informe queda como ``interrupted``. El error de un
+        paso se anota en su entrada y no impide los siguientes.
+
+        El informe se guarda en ``meta`` (ver
+        ``get_maintenance_report``).
+
+        Args:
+            retention_days: dias de retencion de eventos; 0 omite el paso.
+            analysis_limit: ``analysis_limit`` de ``optimize``.
+            fts_merge_pages: paginas por indice de la fusion FTS5.
+            cancel: evento que interrumpe la pasada.
+
+        Returns:
+            Informe con ``started_at``, ``finished_at``, ``duration_ms``,
+            ``interrupted`` y ``steps`` (por paso, su resultado y ``ms``).
+        """
+        steps: List[Tuple[str, Callable[[], Any]]] = []
+        if retention_days > 0:
+            steps.append((
+                "purge",
+                lambda: self.compact_events(retention_days, cancel=cancel),
+            ))
+        steps += [
+            ("optimize", lambda: {"action": self.optimize(analysis_limit)}),
+            ("fts_merge", lambda: self.optimize_fts(
+                incremental=True, pages=fts_merge_pages,
+            )),
+            ("checkpoint", self.checkpoint),
+        ]
+
+        report: Dict[str, Any] = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "interrupted": False,
+            "steps": {},
+        }
+        started = time.perf_counter()
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                _check_cancel(cancel)
+                result = step() or {}
+            except OperationCancelled:
+                report["interrupted"] = True
+                break
+            except sqlite3.Error as exc:
+                result = {"error": str(exc)}
+            result["ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+            report["steps"][name] = result
+        report["finished_at"] = datetime.now(timezone.utc).isoformat()
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (_MAINTENANCE_META_KEY, json.dumps(report)),
+        )
+        self._commit()
+        return report
+
+    def get_maintenance_report(self) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el informe de la ultima pasada de ``run_maintenance``.
+
+        Returns:
+            El informe guardado, o None si nunca se ha ejecutado.
+        """
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (_MAINTENANCE_META_KEY,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    @_cached_read
+    def get_event_summaries(
+        self, iteration_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve los resumenes diarios de los eventos ya compactados.
+
+        Args:
+            iteration_id: filtra por iteracion. Si es None, devuelve todos.
+
+        Returns:
+            Lista de resumenes ordenados por dia y tipo de evento.
+        """
+        sql = (
+            "SELECT iteration_id, day, event_type, count, first_at, last_at "
+            "FROM event_summaries"
+        )
+        params: List[Any] = []
+        if iteration_id is not None:
+            sql += " WHERE iteration_id = ?"
+            params.append(iteration_id)
+        sql += " ORDER BY day, event_type"
+        return [dict(row) for row in self._conn.execute(sql, params)]
 
     # --- Export e import ----------------------------------------------------
 
+    def export_decisions(
+        self,
+        path: str,
+        fmt: str = "markdown",
+        iteration_id: Optional[int] = None,
+        incremental: bool = False,
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """Exporta las decisiones escribiendo cada una segun se lee.
+
+        Recorre las decisiones con ``iter_decisions`` (paginas por clave)
+        y vuelca cada una al fichero de destino antes de leer la
+        siguiente, asi que la memoria no crece con el numero de
+        decisiones y no hay limite. Formatos:
+
+        - ``markdown``: un unico documento ADR-like. Se escribe en un
+          temporal y se renombra al terminar, para no dejar un fichero
+          a medias si la exportacion falla.
+        - ``adr``: un fichero por decision en el directorio ``path``,
+          llamado ``NNNN-titulo.md`` por su ID, con los encabezados que
+          lee ``import_adrs``.
+        - ``jsonl``: una decision por linea, con ``alternatives`` y
+          ``tags`` ya decodificados.
+
+        Al terminar se guarda en meta la clave ``(updated_at, id)`` mas
+        alta exportada. Con ``incremental`` solo se escriben las
+        decisiones creadas o modificadas despues de ese punto de control:
+        en ``adr`` se reescriben sus ficheros y en ``jsonl`` se anaden al
+        final (la ultima linea de cada ID es la vigente).
+
+        Args:
+            path: fichero de destino (``markdown``, ``jsonl``) o
+                directorio (``adr``). Se crean los directorios que falten.
+            fmt: ``markdown``, ``adr`` o ``jsonl``.
+            iteration_id: si se proporciona, solo exporta decisiones
+                de esa iteracion.
+            incremental: si es True, parte del punto de control guardado
+                para ``path``. No se admite con ``markdown``, que siempre
+                reescribe el documento completo.
+            cancel: evento que interrumpe la exportacion entre dos
+                decisiones. El documento ``markdown`` anterior queda
+                intacto y el punto de control no avanza.
+
+        Returns:
+            Diccionario con ``exported`` (decisiones escritas), ``path``,
+            ``format`` e ``incremental``.
+
+        Raises:
+            ValueError: si el formato no es valido o se pide una
+                exportacion incremental en ``markdown``.
+            OperationCancelled: si se activa ``cancel``.
+        """
+        if fmt not in _EXPORT_FORMATS:
+            raise ValueError(
+                f"Formato no soportado: '{fmt}'. "
+                f"Valores permitidos: {list(_EXPORT_FORMATS)}"
+            )
+        if incremental and fmt == "markdown":
+            raise ValueError(
+                "La exportacion incremental no se admite en 'markdown': "
+                "usa 'adr' o 'jsonl'."
+            )
+
+        checkpoint_key = "decision_export_checkpoint:" + os.path.realpath(path)
+        since: Optional[List[Any]] = None
+        if incremental:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (checkpoint_key,)
+            ).fetchone()
+            since = json.loads(row[0]) if row else None
+
+        if since is not None:
+            decisions = self._iter_changed_decisions(since, iteration_id)
+        else:
+            decisions = self.iter_decisions(iteration_id=iteration_id)
+
+        count = 0
+        last = since
+        written = self._write_export(path, fmt, decisions, since is not None)
+        try:
+            for dec in written:
+                count += 1
+                key = [dec.get("updated_at"), dec["id"]]
+                if key[0] is not None and (last is None or key > last):
+                    last = key
+                _check_cancel(cancel)
+        finally:
+            # Cerrar el generador descarta el temporal de markdown si la
+            # exportacion no ha llegado al final.
+            written.close()
+
+        if last is not None and last != since:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (checkpoint_key, json.dumps(last)),
+            )
+            self._commit()
+
+        return {
+            "exported": count,
+            "path": path,
+            "format": fmt,
+            "incremental": since is not None,
+        }
+
     def export_decisions_markdown(
         self,
         path: str,
@@ -1427,10 +3679,7 @@ class MemoryDB:
     ) -> int:
         """Exporta las decisiones a un fichero Markdown con formato ADR-like.
 
-        Genera un documento estructurado donde cada decision se presenta
-        como un registro de arquitectura (Architecture Decision Record),
-        incluyendo titulo, fecha, estado, etiquetas, contexto, decision
-        elegida, alternativas descartadas y justificacion.
+        Atajo de ``export_decisions`` con el formato ``markdown``.
 
         Args:
             path: ruta del fichero Markdown de destino. Se crea el
@@ -1441,156 +3690,339 @@ class MemoryDB:
         Returns:
             Numero de decisiones exportadas.
         """
-        decisions = self.get_decisions(
-            limit=1000, iteration_id=iteration_id,
-        )
+        return self.export_decisions(path, "markdown", iteration_id)["exported"]
 
-        lines: List[str] = []
-        lines.append("# Registro de decisiones de arquitectura\n")
-        lines.append("")
+    def _iter_changed_decisions(
+        self,
+        since: List[Any],
+        iteration_id: Optional[int] = None,
+        batch_size: int = _ITER_BATCH,
+    ) -> Iterator[Dict[str, Any]]:
+        """Recorre las decisiones modificadas despues de un punto de control.
 
-        for dec in decisions:
-            lines.append(f"## {dec['title']}")
-            lines.append("")
-            lines.append(f"- **Fecha:** {dec.get('decided_at', 'N/A')}")
-            lines.append(f"- **Estado:** {dec.get('status', 'active')}")
+        Pagina por la clave ``(updated_at, id)`` en orden ascendente sobre
+        ``idx_decisions_updated``, sin pasar por la cache.
+
+        Args:
+            since: clave ``[updated_at, id]`` de la ultima decision ya
+                exportada.
+            iteration_id: si se proporciona, solo decisiones de esa iteracion.
+            batch_size: decisiones por consulta.
+
+        Yields:
+            Diccionario con los datos de cada decision.
+        """
+        key = list(since)
+        while True:
+            sql = "SELECT * FROM decisions WHERE (updated_at, id) > (?, ?)"
+            params: List[Any] = list(key)
+            if iteration_id is not None:
+                sql += " AND iteration_id = ?"
+                params.append(iteration_id)
+            sql += " ORDER BY updated_at, id LIMIT ?"
+            params.append(batch_size)
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            key = [rows[-1]["updated_at"], rows[-1]["id"]]
+
+    def _write_export(
+        self,
+        path: str,
+        fmt: str,
+        decisions: Iterable[Dict[str, Any]],
+        append: bool,
+    ) -> Iterator[Dict[str, Any]]:
+        """Escribe las decisiones en el formato pedido segun se consumen.
+
+        Es un generador: devuelve cada decision despues de escribirla,
+        para que ``export_decisions`` lleve la cuenta y el punto de
+        control sin acumularlas.
+
+        Args:
+            path: fichero o directorio de destino.
+            fmt: ``markdown``, ``adr`` o ``jsonl``.
+            decisions: decisiones a escribir.
+            append: en ``jsonl``, anadir al fichero existente en lugar
+                de reemplazarlo.
+
+        Yields:
+            Cada decision una vez escrita.
+        """
+        if fmt == "adr":
+            os.makedirs(path, exist_ok=True)
+            for dec in decisions:
+                name = f"{dec['id']:04d}-{_slugify(dec['title'])}.md"
+                with open(
+                    os.path.join(path, name), "w", encoding="utf-8"
+                ) as f:
+                    f.write(_adr_markdown(dec, level=1))
+                yield dec
+            return
 
-            # Etiquetas
-            tags_raw = dec.get("tags", "[]")
-            try:
-                tags = json.loads(tags_raw) if tags_raw else []
-            except (json.JSONDecodeError, TypeError):
-                tags = []
-            if tags:
-                lines.append(f"- **Etiquetas:** {', '.join(tags)}")
-
-            lines.append("")
-
-            # Contexto
-            if dec.get("context"):
-                lines.append("### Contexto")
-                lines.append("")
-                lines.append(dec["context"])
-                lines.append("")
-
-            # Decision elegida
-            lines.append("### Decision")
-            lines.append("")
-            lines.append(dec["chosen"])
-            lines.append("")
-
-            # Alternativas descartadas
-            if dec.get("alternatives"):
-                try:
-                    alts = json.loads(dec["alternatives"])
-                except (json.JSONDecodeError, TypeError):
-                    alts = []
-                if alts:
-                    lines.append("### Alternativas descartadas")
-                    lines.append("")
-                    for alt in alts:
-                        lines.append(f"- {alt}")
-                    lines.append("")
-
-            # Justificacion
-            if dec.get("rationale"):
-                lines.append("### Justificacion")
-                lines.append("")
-                lines.append(dec["rationale"])
-                lines.append("")
-
-            lines.append("---")
-            lines.append("")
-
-        # Crear directorio padre si no existe
         parent = os.path.dirname(path)
         if parent:
             os.makedirs(parent, exist_ok=True)
 
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+        if fmt == "jsonl":
+            with open(path, "a" if append else "w", encoding="utf-8") as f:
+                for dec in decisions:
+                    record = dict(dec)
+                    for column in ("alternatives", "tags"):
+                        record[column] = _json_list(record.get(column))
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    yield dec
+            return
 
-        return len(decisions)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("# Registro de decisiones de arquitectura\n\n")
+                for dec in decisions:
+                    f.write(_adr_markdown(dec, level=2))
+                    f.write("---\n\n")
+                    yield dec
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     def import_git_history(
         self,
         repo_path: str,
-        limit: int = 100,
+        limit: Optional[int] = 100,
+        incremental: bool = True,
+        cancel: Optional[threading.Event] = None,
     ) -> int:
         """Importa el historial de commits de un repositorio Git.
 
-        Ejecuta ``git log`` sobre el repositorio indicado y registra cada
-        commit en la memoria. La operacion es idempotente: los commits
-        cuyo SHA ya exista en la base de datos se ignoran silenciosamente.
+        Lee la salida de ``git log --numstat`` en streaming (ver
+        ``_iter_git_log``) y la registra en bloques de
+        ``_GIT_IMPORT_CHUNK`` commits con ``log_commits_bulk``, de modo que
+        la memoria usada no depende del tamano del historial. Se rellenan
+        ``insertions``, ``deletions``, ``files_changed`` y ``committed_at``
+        (fecha de autor) a partir de la salida de git.
+
+        Cuando el recorrido llega al principio del historial o al punto de
+        control anterior, el SHA de HEAD se guarda en ``meta`` como nuevo
+        punto de control del repositorio. Con ``incremental`` las
+        siguientes ejecuciones solo recorren ``checkpoint..HEAD``. Si
+        ``limit`` corta el recorrido, el punto de control no avanza: una
+        importacion posterior con un ``limit`` mayor (o sin limite)
+        continua con los commits anteriores. Si el punto de control ya no
+        es ancestro de HEAD (rebase, force-push), se vuelve a recorrer
+        todo el historial. La operacion es idempotente: los commits cuyo
+        SHA ya exista se ignoran.
 
         Args:
             repo_path: ruta al directorio raiz del repositorio Git.
-            limit: numero maximo de commits a importar (por defecto 100).
+            limit: numero maximo de commits a recorrer (por defecto 100);
+                None o 0 para no limitar.
+            incremental: si es True, parte del punto de control guardado.
+            cancel: evento que interrumpe la importacion entre dos
+                commits. Los bloques ya confirmados se conservan y el
+                punto de control no avanza.
 
         Returns:
             Numero de commits nuevos importados (excluye los que ya
             existian en la base de datos).
+
+        Raises:
+            subprocess.CalledProcessError: si ``git log`` falla (p.ej. la
+                ruta no es un repositorio o no tiene commits).
+            subprocess.TimeoutExpired: si ``git log`` no termina en
+                ``_GIT_TIMEOUT`` segundos tras cerrar su salida.
+            OperationCancelled: si se activa ``cancel``.
         """
-        result = subprocess.run(
-            [
-                "git", "log",
-                f"--max-count={limit}",
-                "--format=%H|%s|%an|%aI",
-                "--name-only",
-            ],
-            cwd=repo_path,
-            capture_output=True,
-            text=True,
-            check=True,
+        checkpoint_key = (
+            "git_import_checkpoint:" + os.path.realpath(repo_path)
         )
+        head = self._git_output(repo_path, "rev-parse", "HEAD")
+
+        revision = head or "HEAD"
+        if incremental and head:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (checkpoint_key,)
+            ).fetchone()
+            checkpoint = row[0] if row else None
+            if checkpoint == head:
+                return 0
+            if checkpoint and self._git_is_ancestor(repo_path, checkpoint, head):
+                revision = f"{checkpoint}..{head}"
 
-        # Parsear la salida: cada commit empieza con la linea de formato
-        # (contiene |), las lineas siguientes sin | son nombres de fichero,
-        # y una linea vacia separa bloques.
         new_count = 0
-        current_commit: Optional[Dict[str, str]] = None
-        current_files: List[str] = []
-
-        for line in result.stdout.splitlines():
-            if "|" in line:
-                # Si hay un commit pendiente, registrarlo
-                if current_commit is not None:
-                    commit_id = self.log_commit(
-                        sha=current_commit["sha"],
-                        message=current_commit["message"],
-                        author=current_commit["author"],
-                        files=current_files,
-                    )
-                    if commit_id is not None:
-                        new_count += 1
-
-                # Nuevo commit
-                parts = line.split("|", 3)
-                current_commit = {
-                    "sha": parts[0],
-                    "message": parts[1] if len(parts) > 1 else "",
-                    "author": parts[2] if len(parts) > 2 else "",
-                }
-                current_files = []
-            elif line.strip():
-                # Nombre de fichero
-                current_files.append(line.strip())
-            # Linea vacia: separador entre bloques (no hace nada especial)
-
-        # Registrar el ultimo commit pendiente
-        if current_commit is not None:
-            commit_id = self.log_commit(
-                sha=current_commit["sha"],
-                message=current_commit["message"],
-                author=current_commit["author"],
-                files=current_files,
+        walked = 0
+        capped = False
+        chunk: List[Dict[str, Any]] = []
+        # Se pide un commit mas de los que se importan: si llega, limit ha
+        # cortado el recorrido antes de completar el rango.
+        commits = self._iter_git_log(
+            repo_path, revision, limit + 1 if limit else None,
+        )
+        try:
+            for commit in commits:
+                _check_cancel(cancel)
+                if limit and walked == limit:
+                    capped = True
+                    break
+                walked += 1
+                chunk.append(commit)
+                if len(chunk) >= _GIT_IMPORT_CHUNK:
+                    new_count += self.log_commits_bulk(chunk)["inserted"]
+                    chunk = []
+        finally:
+            commits.close()
+        if chunk:
+            new_count += self.log_commits_bulk(chunk)["inserted"]
+        # Cada bloque deja un segmento nuevo en commits_fts; tras una
+        # importacion grande se fusionan para que la busqueda no los
+        # recorra uno a uno.
+        if new_count >= _GIT_IMPORT_CHUNK:
+            self.optimize_fts(incremental=True)
+
+        if head and not capped:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (checkpoint_key, head),
             )
-            if commit_id is not None:
-                new_count += 1
+            self._commit()
 
         return new_count
 
-    def import_adrs(self, adr_dir: str = "docs/adr") -> int:
+    @staticmethod
+    def _git_output(repo_path: str, *args: str) -> Optional[str]:
+        """Ejecuta un comando git corto y devuelve su salida o None si falla."""
+        try:
+            result = subprocess.run(
+                ["git", *args],
+                cwd=repo_path,
+                capture_output=True,
+                text=True,
+                timeout=_GIT_TIMEOUT,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    @staticmethod
+    def _git_is_ancestor(repo_path: str, ancestor: str, head: str) -> bool:
+        """Indica si ``ancestor`` es ancestro de ``head`` en el repositorio."""
+        try:
+            result = subprocess.run(
+                ["git", "merge-base", "--is-ancestor", ancestor, head],
+                cwd=repo_path,
+                capture_output=True,
+                timeout=_GIT_TIMEOUT,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+
+    @staticmethod
+    def _iter_git_log(
+        repo_path: str,
+        revision: str = "HEAD",
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Recorre ``git log --numstat`` en streaming, un commit cada vez.
+
+        La salida se lee del pipe linea a linea en lugar de cargarla
+        entera en memoria. Cada commit empieza con el separador de
+        registro ``\\x1e`` y sus campos van separados por ``\\x1f``, de
+        modo que un ``|`` en el asunto no rompe el parseo. Las lineas
+        siguientes son las de ``--numstat`` (``ins<TAB>del<TAB>ruta``; los
+        ficheros binarios usan ``-`` y cuentan como 0 lineas).
+
+        Args:
+            repo_path: ruta al repositorio.
+            revision: revision o rango a recorrer (p.ej. ``a1b2..HEAD``).
+            limit: numero maximo de commits; None o 0 para no limitar.
+
+        Yields:
+            Diccionarios con las claves de ``log_commits_bulk``.
+
+        Raises:
+            subprocess.CalledProcessError: si ``git log`` termina con error.
+            subprocess.TimeoutExpired: si el proceso no termina en
+                ``_GIT_TIMEOUT`` segundos tras cerrar su salida.
+        """
+        cmd = [
+            "git", "log",
+            "--format=%x1e%H%x1f%s%x1f%an%x1f%aI",
+            "--numstat",
+            "--no-renames",
+        ]
+        if limit:
+            cmd.append(f"--max-count={limit}")
+        cmd.extend([revision, "--"])
+
+        # stderr va a un fichero temporal: un pipe que nadie lee mientras
+        # se consume stdout bloquearia a git si escribe mucho en el.
+        stderr_file = tempfile.TemporaryFile()
+        proc = subprocess.Popen(
+            cmd,
+            cwd=repo_path,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        current: Optional[Dict[str, Any]] = None
+        try:
+            for line in proc.stdout:
+                line = line.rstrip("\n")
+                if line.startswith("\x1e"):
+                    if current is not None:
+                        yield current
+                    parts = line[1:].split("\x1f")
+                    parts += [""] * (4 - len(parts))
+                    current = {
+                        "sha": parts[0],
+                        "message": parts[1],
+                        "author": parts[2],
+                        "committed_at": parts[3] or None,
+                        "files": [],
+                        "insertions": 0,
+                        "deletions": 0,
+                        "files_changed": 0,
+                    }
+                elif line and current is not None:
+                    stat_parts = line.split("\t", 2)
+                    if len(stat_parts) != 3:
+                        continue
+                    added, removed, path = stat_parts
+                    current["insertions"] += int(added) if added.isdigit() else 0
+                    current["deletions"] += int(removed) if removed.isdigit() else 0
+                    current["files"].append(path)
+                    current["files_changed"] += 1
+            if current is not None:
+                yield current
+
+            returncode = proc.wait(timeout=_GIT_TIMEOUT)
+            if returncode != 0:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(
+                    returncode, cmd,
+                    stderr=stderr_file.read().decode("utf-8", "replace"),
+                )
+        finally:
+            # Si el consumidor abandona el generador a medias, no dejar
+            # el proceso git huerfano.
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            stderr_file.close()
+
+    def import_adrs(
+        self,
+        adr_dir: str = "docs/adr",
+        cancel: Optional[threading.Event] = None,
+    ) -> int:
         """Importa ficheros ADR (Architecture Decision Records) como decisiones.
 
         Recorre los ficheros ``*.md`` del directorio indicado y extrae
@@ -1602,9 +4034,14 @@ class MemoryDB:
         Args:
             adr_dir: ruta al directorio que contiene los ficheros ADR.
                 Por defecto ``docs/adr``.
+            cancel: evento que interrumpe la importacion entre dos
+                ficheros; los ya importados se conservan.
 
         Returns:
             Numero de decisiones importadas.
+
+        Raises:
+            OperationCancelled: si se activa ``cancel``.
         """
         adr_path = Path(adr_dir)
         if not adr_path.is_dir():
@@ -1612,6 +4049,7 @@ class MemoryDB:
 
         count = 0
         for md_file in sorted(adr_path.glob("*.md")):
+            _check_cancel(cancel)
             content = md_file.read_text(encoding="utf-8")
             title = self._extract_heading(content)
             context = self._extract_section(
@@ -1713,7 +4151,7 @@ class MemoryDB:
             "INSERT INTO gui_actions (action_type, payload, created_at) VALUES (?, ?, ?)",
             (action_type, payload_json, now),
         )
-        self._conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def get_pending_actions(self) -> List[Dict[str, Any]]:
@@ -1741,7 +4179,7 @@ class MemoryDB:
             "processed_by = ? WHERE id = ?",
             (now, processed_by, action_id),
         )
-        self._conn.commit()
+        self._commit()
 
     # --- Pinned Items ------------------------------------------------------
 
@@ -1779,7 +4217,7 @@ class MemoryDB:
             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
             (item_type, item_id, item_ref, note, 1 if auto else 0, priority, now, session_id),
         )
-        self._conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def unpin_item(self, pin_id: int) -> None:
@@ -1789,7 +4227,7 @@ class MemoryDB:
             pin_id: ID del registro en pinned_items.
         """
         self._conn.execute("DELETE FROM pinned_items WHERE id = ?", (pin_id,))
-        self._conn.commit()
+        self._commit()
 
     def update_pin_priority(self, pin_id: int, priority: int) -> None:
         """Actualiza la prioridad de un elemento marcado.
@@ -1802,8 +4240,9 @@ class MemoryDB:
             "UPDATE pinned_items SET priority = ? WHERE id = ?",
             (priority, pin_id),
         )
-        self._conn.commit()
+        self._commit()
 
+    @_cached_read
     def get_pinned_items(
         self, item_type: Optional[str] = None
     ) -> List[Dict[str, Any]]:
@@ -12,11 +12,15 @@ responsabilidades:
 2. **Servidor WebSocket** -- Gestiona conexiones de clientes usando el
    protocolo RFC 6455 implementado en ``gui.websocket``. Envia el estado
    completo al conectar (``init``) y notifica cambios incrementales
-   (``update``) cuando el watcher detecta novedades.
+   (``update``) numerados con una secuencia. Cada cliente puede filtrar
+   por iteracion y tipo de registro, y un cliente que se reconecta
+   reanuda desde su ultima secuencia (``resume``) sin volver a
+   descargar el estado completo. Si el navegador lo ofrece, los mensajes
+   grandes viajan comprimidos con permessage-deflate.
 
-3. **SQLite watcher** -- Sondea la base de datos cada 500 ms comparando
-   checkpoints (ultimo ID de evento, decision y commit). Los cambios
-   detectados se emiten a todos los clientes conectados.
+3. **SQLite watcher** -- Comprueba ``PRAGMA data_version`` y, si la BD
+   ha cambiado, busca registros nuevos comparando checkpoints (ultimo ID
+   de evento, decision, commit y marcado). Queda en pausa sin clientes.
 
 El servidor puede arrancarse como script independiente con::
 
@@ -28,8 +32,10 @@ se buscan automaticamente puertos disponibles.
 
 import argparse
 import asyncio
+import collections
 import json
 import os
+import secrets
 import socket
 import sqlite3
 import struct
@@ -39,7 +45,8 @@ import time
 from datetime import datetime, timezone
 from functools import partial
 from http.server import HTTPServer, SimpleHTTPRequestHandler
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
 
 # Asegurar que el directorio raiz del proyecto esta en el path
 # para poder importar core.memory y gui.websocket
@@ -47,11 +54,13 @@ _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from core.memory import MemoryDB
+from core.memory import MemoryDB, connect_read_only, unpack_row
 from gui.websocket import (
+    PerMessageDeflate,
     build_handshake_response,
     decode_frame,
     encode_frame,
+    negotiate_deflate,
     parse_handshake_request,
     OPCODE_CLOSE,
     OPCODE_PING,
@@ -63,8 +72,30 @@ from gui.websocket import (
 _DEFAULT_HTTP_PORT = 7533
 _DEFAULT_WS_PORT = 7534
 
-# Intervalo de sondeo del watcher en segundos
+# Intervalo de sondeo del watcher en segundos. Mientras no hay cambios,
+# el intervalo se duplica en cada sondeo hasta _POLL_MAX_INTERVAL.
 _POLL_INTERVAL = 0.5
+_POLL_MAX_INTERVAL = 5.0
+
+# Tipos de registro que viajan en los mensajes ``update`` y numero de
+# deltas que se guardan para que un cliente reconectado pueda reanudar.
+_DELTA_TYPES = ("events", "decisions", "commits", "pinned")
+_DELTA_BUFFER = 256
+
+# Historial de la iteracion activa por vista: columna de fecha por la que
+# se ordena (con el ID como desempate; None ordena solo por ID) y registros
+# por pagina. La primera pagina llega en ``init`` y las siguientes se piden
+# con mensajes ``history``.
+_HISTORY_VIEWS: Dict[str, Tuple[Optional[str], int]] = {
+    "decisions": ("decided_at", 50),
+    "events": ("created_at", 100),
+    "commits": (None, 50),
+}
+_HISTORY_MAX_LIMIT = 500
+
+# Suscripcion de un cliente: (iteration_id o None para todas, tipos).
+Topic = Tuple[Optional[int], FrozenSet[str]]
+_ALL_TOPIC: Topic = (None, frozenset(_DELTA_TYPES))
 
 # Catalogo de agentes del sistema Alfred Dev.
 # Se envia a los clientes en el mensaje init para que el dashboard no
@@ -160,22 +191,55 @@ class GUIServer:
 
         # Conexion SQLite persistente dedicada al sondeo incremental.
         # Reutilizarla en poll_new_* evita abrir y cerrar tres conexiones
-        # por cada ciclo de 500 ms. Se cierra con el proceso.
-        self._poll_conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._poll_conn.row_factory = sqlite3.Row
-
-        # Checkpoints para detectar cambios incrementales.
-        # Se inicializan a 0; el primer poll devuelve todo lo existente.
-        self._event_checkpoint = 0
-        self._decision_checkpoint = 0
-        self._commit_checkpoint = 0
-        self._pinned_checkpoint = 0
-
-        # Clientes WebSocket conectados (asyncio.StreamWriter)
+        # por cada ciclo de 500 ms. Es de solo lectura (URI ``mode=ro``):
+        # el sondeo nunca toma bloqueos de escritura. Se cierra con el
+        # proceso.
+        self._poll_conn = connect_read_only(db_path)
+
+        # Checkpoints para detectar cambios incrementales. Arrancan en el
+        # ultimo ID existente: lo anterior llega a los clientes en ``init``.
+        (
+            self._event_checkpoint,
+            self._decision_checkpoint,
+            self._commit_checkpoint,
+            self._pinned_checkpoint,
+        ) = self._poll_conn.execute(
+            "SELECT (SELECT COALESCE(MAX(id), 0) FROM events), "
+            "(SELECT COALESCE(MAX(id), 0) FROM decisions), "
+            "(SELECT COALESCE(MAX(id), 0) FROM commits), "
+            "(SELECT COALESCE(MAX(id), 0) FROM pinned_items)"
+        ).fetchone()
+
+        # Secuencia de deltas emitidos y buffer circular con los ultimos,
+        # para reanudar clientes reconectados. ``_epoch`` identifica esta
+        # instancia: una secuencia de otra ejecucion no es reanudable.
+        self._seq = 0
+        self._epoch = secrets.token_hex(8)
+        self._deltas: Deque[Tuple[int, Dict[str, List[Dict[str, Any]]]]] = (
+            collections.deque(maxlen=_DELTA_BUFFER)
+        )
+
+        # Ultimo ``PRAGMA data_version`` visto. SQLite lo incrementa cuando
+        # otra conexion confirma una escritura, asi que basta una consulta
+        # para saber si merece la pena sondear las tablas.
+        self._data_version: Optional[int] = None
+
+        # Clientes WebSocket conectados (asyncio.StreamWriter) y la
+        # suscripcion de cada uno (por defecto, todo).
         self._ws_clients: Set[asyncio.StreamWriter] = set()
+        self._ws_topics: Dict[Any, Topic] = {}
 
-        # Control del bucle del watcher
+        # Estado permessage-deflate de los clientes que lo negociaron. El
+        # compresor de cada conexion conserva su contexto entre mensajes,
+        # asi que los frames comprimidos no se comparten entre clientes.
+        self._ws_deflate: Dict[Any, PerMessageDeflate] = {}
+
+        # Control del bucle del watcher. ``_wake`` interrumpe la espera
+        # entre sondeos: al conectarse un cliente, al procesar una accion
+        # del dashboard y al parar el servidor.
         self._running = False
+        self._wake = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     # --- Estado completo para inicializacion del cliente --------------------
 
@@ -189,10 +253,13 @@ class GUIServer:
 
         Todas las consultas usan ``_poll_conn`` para garantizar un
         snapshot consistente dentro de la misma conexion SQLite.
+        Los payloads comprimidos se devuelven como texto JSON, igual que
+        los que no lo estan.
 
         Returns:
             Diccionario con las claves: ``iteration``, ``decisions``,
-            ``events``, ``commits``, ``pinned``.
+            ``events``, ``commits``, ``pinned`` y ``history`` (por vista,
+            el ``before_id`` de la pagina anterior, o None si no hay mas).
         """
         conn = self._poll_conn
 
@@ -203,30 +270,12 @@ class GUIServer:
         ).fetchone()
         active = dict(row) if row else None
 
-        decisions = []
-        events = []
-        commits = []
-        if active:
-            rows = conn.execute(
-                "SELECT * FROM decisions WHERE iteration_id = ? "
-                "ORDER BY id DESC LIMIT 50",
-                (active["id"],),
-            ).fetchall()
-            decisions = [dict(r) for r in rows]
-
-            rows = conn.execute(
-                "SELECT * FROM events WHERE iteration_id = ? "
-                "ORDER BY id DESC LIMIT 100",
-                (active["id"],),
-            ).fetchall()
-            events = [dict(r) for r in rows]
-
-            rows = conn.execute(
-                "SELECT * FROM commits WHERE iteration_id = ? "
-                "ORDER BY id DESC LIMIT 50",
-                (active["id"],),
-            ).fetchall()
-            commits = [dict(r) for r in rows]
+        # Primera pagina del historial de cada vista
+        pages = {
+            kind: self.get_history(kind, active["id"]) if active
+            else {"items": [], "next_before_id": None}
+            for kind in _HISTORY_VIEWS
+        }
 
         # Marcados: no dependen de la iteracion
         rows = conn.execute(
@@ -236,15 +285,97 @@ class GUIServer:
 
         return {
             "iteration": active,
-            "decisions": decisions,
-            "events": events,
-            "commits": commits,
+            "decisions": pages["decisions"]["items"],
+            "events": pages["events"]["items"],
+            "commits": pages["commits"]["items"],
             "pinned": pinned,
+            "history": {
+                kind: page["next_before_id"] for kind, page in pages.items()
+            },
             "registered_agents": _REGISTERED_AGENTS,
         }
 
+    def get_history(
+        self,
+        kind: str,
+        iteration_id: int,
+        before_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Devuelve una pagina del historial de una vista, de nuevo a viejo.
+
+        Paginacion por clave: ``before_id`` es el ultimo registro que tiene
+        el cliente y la pagina empieza justo despues de el en el orden de
+        la vista (``(fecha, id)`` descendente, ver ``_HISTORY_VIEWS``). La
+        clave del ancla se resuelve por la clave primaria y el resto es un
+        recorrido del indice de la iteracion, asi que una pagina profunda
+        cuesta lo mismo que la primera.
+
+        Args:
+            kind: vista (``decisions``, ``events`` o ``commits``).
+            iteration_id: iteracion cuyo historial se pagina.
+            before_id: ID del ultimo registro recibido; None para la
+                primera pagina.
+            limit: registros por pagina (por defecto el de la vista, como
+                maximo ``_HISTORY_MAX_LIMIT``).
+
+        Returns:
+            Diccionario con ``kind``, ``items`` y ``next_before_id`` (el
+            ``before_id`` de la pagina siguiente, o None si no hay mas).
+
+        Raises:
+            ValueError: si la vista no existe.
+        """
+        if kind not in _HISTORY_VIEWS:
+            raise ValueError(f"Vista de historial desconocida: '{kind}'")
+        date_col, default_limit = _HISTORY_VIEWS[kind]
+        limit = max(1, min(limit or default_limit, _HISTORY_MAX_LIMIT))
+
+        keyset = ""
+        params: List[Any] = [iteration_id]
+        if before_id is not None:
+            if date_col:
+                keyset = (
+                    f" AND ({date_col}, id) < "
+                    f"(SELECT {date_col}, id FROM {kind} WHERE id = ?)"
+                )
+            else:
+                keyset = " AND id < ?"
+            params.append(before_id)
+        order = f"{date_col} DESC, id DESC" if date_col else "id DESC"
+
+        rows = self._poll_conn.execute(
+            f"SELECT * FROM {kind} WHERE iteration_id = ?{keyset} "
+            f"ORDER BY {order} LIMIT ?",
+            [*params, limit + 1],
+        ).fetchall()
+        items = [unpack_row(r) for r in rows[:limit]]
+        more = len(rows) > limit
+        return {
+            "kind": kind,
+            "items": items,
+            "next_before_id": items[-1]["id"] if more else None,
+        }
+
     # --- Sondeo incremental de cambios --------------------------------------
 
+    def has_changes(self) -> bool:
+        """Indica si la BD ha cambiado desde la ultima comprobacion.
+
+        Compara ``PRAGMA data_version`` de la conexion de sondeo con el
+        ultimo valor visto. Es una lectura del indice WAL en memoria
+        compartida, mucho mas barata que consultar las cuatro tablas.
+        La primera llamada devuelve siempre True.
+
+        Returns:
+            True si otra conexion ha confirmado escrituras desde la
+            llamada anterior.
+        """
+        version = self._poll_conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
     def poll_new_events(self) -> List[Dict[str, Any]]:
         """Obtiene los eventos creados desde el ultimo checkpoint.
 
@@ -259,7 +390,7 @@ class GUIServer:
             "SELECT * FROM events WHERE id > ? ORDER BY id ASC",
             (self._event_checkpoint,),
         ).fetchall()
-        results = [dict(r) for r in rows]
+        results = [unpack_row(r) for r in rows]
         if results:
             self._event_checkpoint = results[-1]["id"]
         return results
@@ -318,6 +449,138 @@ class GUIServer:
             self._pinned_checkpoint = results[-1]["id"]
         return results
 
+    # --- Deltas, suscripciones y reanudacion ---------------------------------
+
+    def record_delta(self, delta: Dict[str, List[Dict[str, Any]]]) -> int:
+        """Asigna el siguiente numero de secuencia a un delta y lo guarda.
+
+        Args:
+            delta: registros nuevos por tipo (claves de ``_DELTA_TYPES``).
+
+        Returns:
+            Numero de secuencia asignado.
+        """
+        self._seq += 1
+        self._deltas.append((self._seq, delta))
+        return self._seq
+
+    def deltas_since(
+        self, since: int,
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Fusiona los deltas posteriores a una secuencia.
+
+        Args:
+            since: ultima secuencia que el cliente ya aplico.
+
+        Returns:
+            Registros nuevos por tipo en orden de secuencia, o None si la
+            secuencia es desconocida o ya salio del buffer (el cliente
+            necesita un ``init`` completo).
+        """
+        if since < 0 or since > self._seq:
+            return None
+        oldest = self._deltas[0][0] if self._deltas else self._seq + 1
+        if since < oldest - 1:
+            return None
+        merged: Dict[str, List[Dict[str, Any]]] = {t: [] for t in _DELTA_TYPES}
+        for seq, delta in self._deltas:
+            if seq > since:
+                for kind in _DELTA_TYPES:
+                    merged[kind].extend(delta.get(kind, []))
+        return merged
+
+    @staticmethod
+    def parse_topic(params: Dict[str, Any]) -> Topic:
+        """Construye una suscripcion a partir de los parametros del cliente.
+
+        Args:
+            params: diccionario con ``iteration_id`` (entero, opcional) y
+                ``types`` (lista o cadena separada por comas, opcional).
+                Los tipos desconocidos se ignoran.
+
+        Returns:
+            Tupla ``(iteration_id, tipos)``. Sin tipos validos se
+            suscribe a todos.
+        """
+        iteration_id = params.get("iteration_id")
+        try:
+            iteration_id = int(iteration_id) if iteration_id not in (None, "") else None
+        except (TypeError, ValueError):
+            iteration_id = None
+
+        types = params.get("types") or []
+        if isinstance(types, str):
+            types = types.split(",")
+        kinds = frozenset(t for t in types if t in _DELTA_TYPES)
+        return (iteration_id, kinds or frozenset(_DELTA_TYPES))
+
+    @staticmethod
+    def filter_delta(
+        delta: Dict[str, List[Dict[str, Any]]], topic: Topic,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Reduce un delta a lo que pide una suscripcion.
+
+        Los marcados no pertenecen a ninguna iteracion y no se filtran
+        por ella.
+
+        Args:
+            delta: registros nuevos por tipo.
+            topic: suscripcion ``(iteration_id, tipos)``.
+
+        Returns:
+            Diccionario solo con los tipos suscritos.
+        """
+        iteration_id, kinds = topic
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for kind in _DELTA_TYPES:
+            if kind not in kinds:
+                continue
+            rows = delta.get(kind, [])
+            if iteration_id is not None and kind != "pinned":
+                rows = [r for r in rows if r.get("iteration_id") == iteration_id]
+            result[kind] = rows
+        return result
+
+    @staticmethod
+    def _handshake_params(request_data: bytes) -> Dict[str, str]:
+        """Extrae los parametros de la query de la peticion de handshake.
+
+        El cliente indica su suscripcion y desde donde reanudar en la URL
+        (``/?since=42&epoch=...&iteration_id=3&types=events,decisions``).
+        """
+        try:
+            request_line = request_data.split(b"\r\n", 1)[0].decode("ascii")
+            target = request_line.split(" ")[1]
+        except (UnicodeDecodeError, IndexError):
+            return {}
+        query = parse_qs(urlsplit(target).query)
+        return {k: v[-1] for k, v in query.items()}
+
+    def _initial_message(self, params: Dict[str, str], topic: Topic) -> str:
+        """Construye el primer mensaje para un cliente recien conectado.
+
+        Si el cliente trae ``since`` y ``epoch`` de esta instancia y los
+        deltas posteriores siguen en el buffer, recibe un ``resume`` solo
+        con ellos; en otro caso, el ``init`` con el estado completo.
+        """
+        merged = None
+        if params.get("epoch") == self._epoch:
+            try:
+                merged = self.deltas_since(int(params.get("since", "")))
+            except ValueError:
+                merged = None
+
+        if merged is not None:
+            msg_type, payload = "resume", self.filter_delta(merged, topic)
+        else:
+            msg_type, payload = "init", self.get_full_state()
+        return json.dumps({
+            "type": msg_type,
+            "seq": self._seq,
+            "epoch": self._epoch,
+            "payload": payload,
+        }, ensure_ascii=False, default=str)
+
     # --- Procesamiento de acciones del dashboard ----------------------------
 
     def process_gui_action(self, action: Dict[str, Any]) -> None:
@@ -368,11 +631,58 @@ class GUIServer:
             # para trazabilidad, aunque ningun hook lo procese.
             self._db.create_gui_action(action_type, action)
 
+    def _history_request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Atiende un mensaje ``history`` con ``get_history``.
+
+        Args:
+            params: payload con ``kind``, ``iteration_id`` y, opcionalmente,
+                ``before_id`` y ``limit``.
+
+        Returns:
+            La pagina de ``get_history`` o un diccionario con ``error``.
+        """
+        try:
+            before_id = params.get("before_id")
+            return self.get_history(
+                str(params.get("kind", "")),
+                int(params["iteration_id"]),
+                before_id=int(before_id) if before_id is not None else None,
+                limit=int(params.get("limit") or 0) or None,
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            return {"error": f"Peticion de historial no valida: {exc}"}
+
+    def get_lineage(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Devuelve el linaje de una decision para la vista de decisiones.
+
+        Delega en ``MemoryDB.traverse_decisions``, que resuelve todo el
+        subgrafo en una consulta en lugar de una peticion por relacion.
+
+        Args:
+            params: payload del mensaje ``lineage`` con ``decision_id`` y,
+                opcionalmente, ``link_types``, ``max_depth`` y ``direction``
+                (por defecto ``both``, para ver antecesores y sucesores).
+
+        Returns:
+            Subgrafo con ``root_id``, ``nodes`` y ``edges``, o un
+            diccionario con ``error`` si los parametros no son validos.
+        """
+        try:
+            return self._db.traverse_decisions(
+                int(params["decision_id"]),
+                link_types=params.get("link_types"),
+                max_depth=int(params.get("max_depth", 10)),
+                direction=str(params.get("direction", "both")),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            return {"error": f"Parametros de linaje no validos: {exc}"}
+
     # --- Gestion de clientes WebSocket --------------------------------------
 
     @staticmethod
     async def _read_ws_frame(
         reader: asyncio.StreamReader,
+        deflate: Optional[PerMessageDeflate] = None,
     ) -> Tuple[int, bytes]:
         """Lee un frame WebSocket completo manejando fragmentacion TCP.
 
@@ -383,6 +693,8 @@ class GUIServer:
 
         Args:
             reader: stream de lectura del socket.
+            deflate: estado permessage-deflate de la conexion, para
+                descomprimir los frames marcados con RSV1.
 
         Returns:
             Tupla (opcode, payload) con el contenido del frame.
@@ -390,6 +702,8 @@ class GUIServer:
         Raises:
             asyncio.IncompleteReadError: si la conexion se cierra a mitad
                 de frame.
+            ValueError: si el frame esta comprimido sin haberlo negociado
+                o no se puede descomprimir.
         """
         header = await reader.readexactly(2)
         opcode = header[0] & 0x0F
@@ -412,6 +726,11 @@ class GUIServer:
         if mask_key:
             payload = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
 
+        if header[0] & 0x40:
+            if deflate is None:
+                raise ValueError("Frame comprimido sin permessage-deflate negociado")
+            payload = deflate.decompress(payload)
+
         return opcode, payload
 
     async def handle_ws_client(
@@ -439,26 +758,39 @@ class GUIServer:
                 writer.close()
                 return
 
-            # Completar el handshake
-            response = build_handshake_response(client_key)
+            # Completar el handshake, aceptando permessage-deflate si el
+            # navegador lo ofrece
+            deflate = negotiate_deflate(request_data)
+            response = build_handshake_response(
+                client_key, deflate.response_header() if deflate else None,
+            )
             writer.write(response)
             await writer.drain()
 
-            # Registrar el cliente
+            # Recoger los cambios pendientes (el watcher puede estar en
+            # pausa) para que el primer mensaje parta de la secuencia
+            # actual. Entre construir ese mensaje y registrar al cliente
+            # no hay ningun await: no se pierde ningun delta.
+            try:
+                await self.poll_once()
+            except sqlite3.OperationalError:
+                # BD ocupada: el watcher recogera el cambio en su ciclo
+                self._data_version = None
+            params = self._handshake_params(request_data)
+            topic = self.parse_topic(params)
+            first_msg = self._initial_message(params, topic)
             self._ws_clients.add(writer)
+            self._ws_topics[writer] = topic
+            if deflate is not None:
+                self._ws_deflate[writer] = deflate
+            self._wake.set()
 
-            # Enviar estado completo como mensaje de inicializacion
-            full_state = self.get_full_state()
-            init_msg = json.dumps({
-                "type": "init",
-                "payload": full_state,
-            }, ensure_ascii=False, default=str)
-            writer.write(encode_frame(init_msg))
+            writer.write(encode_frame(first_msg, deflate=deflate))
             await writer.drain()
 
             # Bucle de recepcion de mensajes usando lector con buffer
             while True:
-                opcode, payload = await self._read_ws_frame(reader)
+                opcode, payload = await self._read_ws_frame(reader, deflate)
 
                 if opcode == OPCODE_CLOSE:
                     break
@@ -473,11 +805,42 @@ class GUIServer:
                         msg = json.loads(payload.decode("utf-8"))
                         if msg.get("type") == "action":
                             self.process_gui_action(msg.get("payload", {}))
+                            # Difundir el cambio sin esperar al backoff
+                            self._wake.set()
                             ack = json.dumps({
                                 "type": "action_ack",
                                 "payload": {"status": "ok"},
                             })
-                            writer.write(encode_frame(ack))
+                            writer.write(encode_frame(ack, deflate=deflate))
+                            await writer.drain()
+                        elif msg.get("type") == "subscribe":
+                            topic = self.parse_topic(msg.get("payload") or {})
+                            self._ws_topics[writer] = topic
+                            ack = json.dumps({
+                                "type": "subscribed",
+                                "seq": self._seq,
+                                "payload": {
+                                    "iteration_id": topic[0],
+                                    "types": sorted(topic[1]),
+                                },
+                            })
+                            writer.write(encode_frame(ack, deflate=deflate))
+                            await writer.drain()
+                        elif msg.get("type") == "history":
+                            reply = json.dumps({
+                                "type": "history",
+                                "payload": self._history_request(
+                                    msg.get("payload") or {}),
+                            }, ensure_ascii=False, default=str)
+                            writer.write(encode_frame(reply, deflate=deflate))
+                            await writer.drain()
+                        elif msg.get("type") == "lineage":
+                            reply = json.dumps({
+                                "type": "lineage",
+                                "payload": self.get_lineage(
+                                    msg.get("payload") or {}),
+                            }, ensure_ascii=False, default=str)
+                            writer.write(encode_frame(reply, deflate=deflate))
                             await writer.drain()
                     except (json.JSONDecodeError, UnicodeDecodeError) as exc:
                         print(
@@ -491,8 +854,13 @@ class GUIServer:
             asyncio.IncompleteReadError,
         ):
             pass
+        except ValueError as exc:
+            # Frame comprimido invalido: se cierra la conexion
+            print(f"[Alfred GUI] Frame invalido del cliente: {exc}", file=sys.stderr)
         finally:
             self._ws_clients.discard(writer)
+            self._ws_topics.pop(writer, None)
+            self._ws_deflate.pop(writer, None)
             try:
                 writer.close()
             except Exception:
@@ -507,10 +875,55 @@ class GUIServer:
         Args:
             message: texto JSON a enviar como frame WebSocket.
         """
-        frame = encode_frame(message)
-        disconnected: Set[asyncio.StreamWriter] = set()
+        await self._send_message(message, list(self._ws_clients))
+
+    async def broadcast_delta(
+        self, seq: int, delta: Dict[str, List[Dict[str, Any]]],
+    ) -> None:
+        """Envia un delta a cada cliente segun su suscripcion.
+
+        Los clientes se agrupan por suscripcion: el mensaje ``update`` se
+        filtra, serializa y codifica una vez por grupo, no por cliente.
+        Un grupo al que el delta no aporta nada no recibe mensaje.
 
+        Args:
+            seq: numero de secuencia del delta.
+            delta: registros nuevos por tipo.
+        """
+        groups: Dict[Topic, List[Any]] = {}
         for writer in self._ws_clients:
+            topic = self._ws_topics.get(writer, _ALL_TOPIC)
+            groups.setdefault(topic, []).append(writer)
+
+        for topic, writers in groups.items():
+            payload = self.filter_delta(delta, topic)
+            if not any(payload.values()):
+                continue
+            msg = json.dumps({
+                "type": "update",
+                "seq": seq,
+                "payload": payload,
+            }, ensure_ascii=False, default=str)
+            await self._send_message(msg, writers)
+
+    async def _send_message(self, message: str, writers: List[Any]) -> None:
+        """Envia un mensaje ya serializado a varios clientes.
+
+        El frame sin comprimir se codifica una sola vez y se comparte; los
+        clientes con permessage-deflate reciben un frame comprimido con su
+        propio contexto. Los clientes cuyo envio falla se dan de baja.
+        """
+        raw_frame: Optional[bytes] = None
+        disconnected: Set[asyncio.StreamWriter] = set()
+
+        for writer in writers:
+            deflate = self._ws_deflate.get(writer)
+            if deflate is not None:
+                frame = encode_frame(message, deflate=deflate)
+            else:
+                if raw_frame is None:
+                    raw_frame = encode_frame(message)
+                frame = raw_frame
             try:
                 writer.write(frame)
                 await writer.drain()
@@ -518,49 +931,80 @@ class GUIServer:
                 disconnected.add(writer)
 
         self._ws_clients -= disconnected
+        for writer in disconnected:
+            self._ws_topics.pop(writer, None)
+            self._ws_deflate.pop(writer, None)
 
     # --- Bucle del watcher --------------------------------------------------
 
+    async def poll_once(self) -> bool:
+        """Ejecuta un ciclo de sondeo y difunde el delta si lo hay.
+
+        Returns:
+            True si la BD habia cambiado desde el ciclo anterior.
+        """
+        if not self.has_changes():
+            return False
+
+        delta = {
+            "events": self.poll_new_events(),
+            "decisions": self.poll_new_decisions(),
+            "commits": self.poll_new_commits(),
+            "pinned": self.poll_new_pinned(),
+        }
+        if any(delta.values()):
+            seq = self.record_delta(delta)
+            await self.broadcast_delta(seq, delta)
+        return True
+
     async def watch_loop(self) -> None:
         """Bucle principal del watcher de SQLite.
 
-        Sondea la base de datos cada 500 ms en busca de eventos, decisiones
-        y commits nuevos. Cuando detecta cambios, construye un mensaje
-        ``update`` y lo emite a todos los clientes conectados.
+        En cada ciclo ejecuta ``poll_once``: consulta ``PRAGMA
+        data_version`` y solo si ha cambiado sondea eventos, decisiones,
+        commits y marcados nuevos, que se emiten como un delta numerado.
+
+        Sin clientes conectados el bucle queda en pausa (no toca la BD)
+        hasta que se conecta uno. Mientras no hay cambios, el intervalo
+        entre comprobaciones se duplica desde ``_POLL_INTERVAL`` hasta
+        ``_POLL_MAX_INTERVAL`` y vuelve al minimo en cuanto hay actividad.
 
         El bucle se ejecuta hasta que se llame a ``stop()``.
         """
         self._running = True
+        self._loop = asyncio.get_running_loop()
+        interval = _POLL_INTERVAL
         while self._running:
+            if not self._ws_clients:
+                # Nadie a quien notificar: esperar a la primera conexion
+                self._wake.clear()
+                await self._wake.wait()
+                interval = _POLL_INTERVAL
+                continue
+
+            self._wake.clear()
             try:
-                new_events = self.poll_new_events()
-                new_decisions = self.poll_new_decisions()
-                new_commits = self.poll_new_commits()
-                new_pinned = self.poll_new_pinned()
-
-                if new_events or new_decisions or new_commits or new_pinned:
-                    msg = json.dumps({
-                        "type": "update",
-                        "payload": {
-                            "events": new_events,
-                            "decisions": new_decisions,
-                            "commits": new_commits,
-                            "pinned": new_pinned,
-                        },
-                    }, ensure_ascii=False, default=str)
-                    await self.broadcast(msg)
+                if await self.poll_once():
+                    interval = _POLL_INTERVAL
+                else:
+                    interval = min(interval * 2, _POLL_MAX_INTERVAL)
 
             except sqlite3.OperationalError as exc:
                 # Bloqueo temporal de la BD u otro error operativo de SQLite.
                 # Esperado en escrituras concurrentes; se reintenta en el
                 # siguiente ciclo sin contaminar stderr con falsos positivos.
+                # Se olvida data_version para no perder el cambio pendiente.
+                self._data_version = None
                 print(f"[Alfred GUI] BD ocupada, reintentando: {exc}", file=sys.stderr)
             except Exception as exc:
                 # Error inesperado de logica; registrar con detalle para
                 # distinguirlo de bloqueos temporales de SQLite.
                 print(f"[Alfred GUI] Error inesperado en watch_loop: {exc}", file=sys.stderr)
 
-            await asyncio.sleep(_POLL_INTERVAL)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
 
     # --- Servidor HTTP ------------------------------------------------------
 
@@ -691,9 +1135,11 @@ class GUIServer:
 
         Establece la bandera de parada que el ``watch_loop`` comprueba
         en cada iteracion. El servidor se detiene limpiamente en el
-        siguiente ciclo de sondeo.
+        siguiente ciclo de sondeo. Puede llamarse desde otro hilo.
         """
         self._running = False
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
 
     def close(self) -> None:
         """Libera los recursos del servidor: WebSocket, SQLite y watcher.
@@ -710,6 +1156,8 @@ class GUIServer:
             except Exception:
                 pass
         self._ws_clients.clear()
+        self._ws_topics.clear()
+        self._ws_deflate.clear()
         try:
             self._poll_conn.close()
         except Exception:
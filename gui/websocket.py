@@ -6,18 +6,28 @@ Cubre el handshake HTTP Upgrade, el framing de mensajes de texto y los
 frames de control (ping, pong, close). Disenado para uso local con un
 numero reducido de conexiones (dashboard de Alfred Dev).
 
+Implementa la extension permessage-deflate (RFC 7692) con context
+takeover: los mensajes por encima de un umbral se comprimen con un
+compresor por conexion que conserva su diccionario entre mensajes, de
+modo que los ``update`` consecutivos (muy parecidos entre si) ocupan
+una fraccion de su tamano. Util cuando el dashboard se usa a traves de
+un tunel SSH.
+
 No implementa:
     - Fragmentacion de mensajes (no necesaria para JSON corto).
-    - Extensiones (permessage-deflate, etc.).
+    - Otras extensiones.
     - Subprotocolos.
 
-Referencia: https://datatracker.ietf.org/doc/html/rfc6455
+Referencias:
+    https://datatracker.ietf.org/doc/html/rfc6455
+    https://datatracker.ietf.org/doc/html/rfc7692
 """
 
 import base64
 import hashlib
 import struct
-from typing import Optional, Tuple
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
 
 # GUID magico definido por el RFC 6455 para el handshake
 _WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
@@ -30,6 +40,20 @@ OPCODE_CLOSE = 0x8
 OPCODE_PING = 0x9
 OPCODE_PONG = 0xA
 
+# Bit RSV1 del primer byte: marca un mensaje comprimido (RFC 7692, 6)
+_RSV1 = 0x40
+
+# Mensajes por debajo de este tamano (bytes) se envian sin comprimir:
+# la cabecera de deflate y el coste de CPU no compensan.
+DEFLATE_THRESHOLD = 512
+
+# Cola que el emisor elimina de cada mensaje comprimido y el receptor
+# vuelve a anadir antes de descomprimir (RFC 7692, 7.2.1).
+_DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+# Tamano maximo de un mensaje descomprimido, para no aceptar bombas zip.
+_MAX_INFLATED_BYTES = 16 * 1024 * 1024
+
 
 def build_accept_key(client_key: str) -> str:
     """Genera la clave Sec-WebSocket-Accept para el handshake.
@@ -48,11 +72,16 @@ def build_accept_key(client_key: str) -> str:
     return base64.b64encode(sha1).decode("utf-8")
 
 
-def build_handshake_response(client_key: str) -> bytes:
+def build_handshake_response(
+    client_key: str, extensions: Optional[str] = None,
+) -> bytes:
     """Construye la respuesta HTTP 101 para completar el handshake.
 
     Args:
         client_key: valor del header Sec-WebSocket-Key.
+        extensions: valor del header Sec-WebSocket-Extensions aceptado
+            (p.ej. ``PerMessageDeflate.response_header()``), o None si no
+            se negocia ninguna extension.
 
     Returns:
         Respuesta HTTP completa como bytes, lista para enviar por socket.
@@ -63,12 +92,181 @@ def build_handshake_response(client_key: str) -> bytes:
         "Upgrade: websocket\r\n"
         "Connection: Upgrade\r\n"
         f"Sec-WebSocket-Accept: {accept}\r\n"
-        "\r\n"
     )
+    if extensions:
+        response += f"Sec-WebSocket-Extensions: {extensions}\r\n"
+    response += "\r\n"
     return response.encode("utf-8")
 
 
-def encode_frame(data: str, opcode: int = OPCODE_TEXT) -> bytes:
+class PerMessageDeflate:
+    """Estado de permessage-deflate negociado para una conexion.
+
+    Mantiene un compresor (servidor a cliente) y un descompresor (cliente
+    a servidor). Con context takeover, ambos conservan la ventana entre
+    mensajes; con ``*_no_context_takeover`` se reinician en cada uno.
+
+    Como el compresor tiene estado, un frame comprimido solo es valido
+    para la conexion que lo genero: no se puede reutilizar entre clientes.
+
+    Args:
+        server_no_context_takeover: reiniciar el compresor en cada mensaje.
+        client_no_context_takeover: el cliente reinicia el suyo; el
+            descompresor tambien se reinicia.
+        server_max_window_bits: tamano de ventana pedido por el cliente
+            (9-15), o None si no lo limito (se usa 15 y no se anuncia).
+        threshold: tamano minimo en bytes para comprimir un mensaje.
+    """
+
+    def __init__(
+        self,
+        server_no_context_takeover: bool = False,
+        client_no_context_takeover: bool = False,
+        server_max_window_bits: Optional[int] = None,
+        threshold: int = DEFLATE_THRESHOLD,
+    ) -> None:
+        self.server_no_context_takeover = server_no_context_takeover
+        self.client_no_context_takeover = client_no_context_takeover
+        self._announce_window_bits = server_max_window_bits is not None
+        self.server_max_window_bits = server_max_window_bits or 15
+        self.threshold = threshold
+        self._compressor = self._new_compressor()
+        self._decompressor = zlib.decompressobj(-15)
+
+    def _new_compressor(self) -> Any:
+        return zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+            -self.server_max_window_bits,
+        )
+
+    def response_header(self) -> str:
+        """Devuelve el valor de Sec-WebSocket-Extensions para la respuesta."""
+        parts = ["permessage-deflate"]
+        if self.server_no_context_takeover:
+            parts.append("server_no_context_takeover")
+        if self.client_no_context_takeover:
+            parts.append("client_no_context_takeover")
+        if self._announce_window_bits:
+            parts.append(f"server_max_window_bits={self.server_max_window_bits}")
+        return "; ".join(parts)
+
+    def compress(self, payload: bytes) -> bytes:
+        """Comprime un mensaje completo segun RFC 7692.
+
+        Args:
+            payload: bytes del mensaje sin comprimir.
+
+        Returns:
+            Bytes comprimidos sin la cola ``00 00 ff ff``.
+        """
+        if self.server_no_context_takeover:
+            self._compressor = self._new_compressor()
+        data = self._compressor.compress(payload)
+        data += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data.endswith(_DEFLATE_TAIL):
+            data = data[:-len(_DEFLATE_TAIL)]
+        return data
+
+    def decompress(self, payload: bytes) -> bytes:
+        """Descomprime un mensaje recibido con RSV1.
+
+        Args:
+            payload: bytes comprimidos del mensaje.
+
+        Returns:
+            Bytes del mensaje original.
+
+        Raises:
+            ValueError: si los datos no son deflate valido o el mensaje
+                descomprimido supera el limite de tamano.
+        """
+        if self.client_no_context_takeover:
+            self._decompressor = zlib.decompressobj(-15)
+        try:
+            data = self._decompressor.decompress(
+                payload + _DEFLATE_TAIL, _MAX_INFLATED_BYTES,
+            )
+        except zlib.error as e:
+            raise ValueError(f"Mensaje comprimido invalido: {e}") from e
+        if self._decompressor.unconsumed_tail:
+            raise ValueError("Mensaje descomprimido demasiado grande")
+        return data
+
+
+def parse_extensions(data: bytes) -> List[Tuple[str, Dict[str, Optional[str]]]]:
+    """Extrae las ofertas de Sec-WebSocket-Extensions de un handshake.
+
+    Args:
+        data: peticion HTTP completa como bytes.
+
+    Returns:
+        Lista de tuplas ``(nombre, parametros)`` en el orden de preferencia
+        del cliente. Los parametros sin valor se representan con None.
+    """
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return []
+
+    offers: List[Tuple[str, Dict[str, Optional[str]]]] = []
+    for line in text.split("\r\n"):
+        if not line.lower().startswith("sec-websocket-extensions:"):
+            continue
+        for offer in line.split(":", 1)[1].split(","):
+            tokens = [t.strip() for t in offer.split(";") if t.strip()]
+            if not tokens:
+                continue
+            params: Dict[str, Optional[str]] = {}
+            for token in tokens[1:]:
+                key, _, value = token.partition("=")
+                params[key.strip().lower()] = value.strip().strip('"') or None
+            offers.append((tokens[0].lower(), params))
+    return offers
+
+
+def negotiate_deflate(
+    data: bytes, threshold: int = DEFLATE_THRESHOLD,
+) -> Optional[PerMessageDeflate]:
+    """Acepta la primera oferta valida de permessage-deflate del cliente.
+
+    Args:
+        data: peticion HTTP de handshake como bytes.
+        threshold: tamano minimo en bytes para comprimir un mensaje.
+
+    Returns:
+        Estado de compresion para la conexion, o None si el cliente no
+        ofrece permessage-deflate o ninguna oferta es aceptable.
+    """
+    known = {
+        "server_no_context_takeover", "client_no_context_takeover",
+        "server_max_window_bits", "client_max_window_bits",
+    }
+    for name, params in parse_extensions(data):
+        if name != "permessage-deflate" or not set(params) <= known:
+            continue
+        window_bits = None
+        if "server_max_window_bits" in params:
+            try:
+                window_bits = int(params["server_max_window_bits"] or "")
+            except ValueError:
+                continue
+            # zlib no admite ventanas de 8 bits en deflate crudo
+            if not 9 <= window_bits <= 15:
+                continue
+        return PerMessageDeflate(
+            server_no_context_takeover="server_no_context_takeover" in params,
+            client_no_context_takeover="client_no_context_takeover" in params,
+            server_max_window_bits=window_bits,
+            threshold=threshold,
+        )
+    return None
+
+
+def encode_frame(
+    data: str,
+    opcode: int = OPCODE_TEXT,
+    deflate: Optional[PerMessageDeflate] = None,
+) -> bytes:
     """Codifica un mensaje como frame WebSocket (servidor a cliente, sin mascara).
 
     Soporta payloads de hasta 65535 bytes con el campo de longitud de 2 bytes.
@@ -77,14 +275,26 @@ def encode_frame(data: str, opcode: int = OPCODE_TEXT) -> bytes:
     Args:
         data: texto a enviar.
         opcode: opcode del frame (OPCODE_TEXT, OPCODE_CLOSE, etc.).
+        deflate: estado permessage-deflate de la conexion destino. Si se
+            indica y el mensaje de datos supera su umbral, se comprime y
+            se marca con RSV1. Los frames de control nunca se comprimen.
 
     Returns:
         Frame WebSocket como bytes.
     """
     payload = data.encode("utf-8") if isinstance(data, str) else data
-    length = len(payload)
 
-    header = bytes([0x80 | opcode])
+    first = 0x80 | opcode
+    if (
+        deflate is not None
+        and opcode in (OPCODE_TEXT, OPCODE_BINARY)
+        and len(payload) >= deflate.threshold
+    ):
+        payload = deflate.compress(payload)
+        first |= _RSV1
+
+    length = len(payload)
+    header = bytes([first])
 
     if length < 126:
         header += bytes([length])
@@ -96,7 +306,9 @@ def encode_frame(data: str, opcode: int = OPCODE_TEXT) -> bytes:
     return header + payload
 
 
-def decode_frame(data: bytes) -> Tuple[int, bytes]:
+def decode_frame(
+    data: bytes, deflate: Optional[PerMessageDeflate] = None,
+) -> Tuple[int, bytes]:
     """Decodifica un frame WebSocket (puede venir con o sin mascara).
 
     Los frames de cliente a servidor siempre llevan mascara (RFC 6455,
@@ -104,6 +316,8 @@ def decode_frame(data: bytes) -> Tuple[int, bytes]:
 
     Args:
         data: bytes crudos del frame.
+        deflate: estado permessage-deflate para descomprimir frames con
+            RSV1. Sin el, un frame con RSV1 se considera malformado.
 
     Returns:
         Tupla (opcode, payload) donde payload son los bytes del mensaje.
@@ -143,6 +357,11 @@ def decode_frame(data: bytes) -> Tuple[int, bytes]:
     if mask_key:
         payload = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
 
+    if data[0] & _RSV1:
+        if deflate is None:
+            raise ValueError("Frame comprimido sin permessage-deflate negociado")
+        payload = deflate.decompress(payload)
+
     return opcode, payload
 
 
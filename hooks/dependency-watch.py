@@ -149,4 +149,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # Si el daemon de hooks esta activo, se delega en el; si no, se
+    # ejecuta en este proceso (ver core/hook_daemon.py).
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        from core.hook_daemon import dispatch
+    except ImportError:
+        main()
+    else:
+        dispatch("dependency-watch", main)
@@ -96,7 +96,9 @@ def main():
         sys.exit(0)
 
     try:
-        _process_state(db, new_state, db_exists)
+        # Una sola transaccion para todos los eventos del cambio de estado
+        with db.batch():
+            _process_state(db, new_state, db_exists)
     except Exception as e:
         print(
             f"[memory-capture] Aviso: error al procesar estado: {e}",
@@ -212,10 +214,15 @@ def _process_state(db, new_state: dict, db_existed: bool) -> None:
     # --- Detectar fases nuevas completadas ---
     # Las fases ya registradas se obtienen de los eventos de tipo
     # "phase_completed" para esta iteracion. Se comparan por nombre de fase.
-    existing_events = db.get_timeline(iteration_id)
+    # La cronologia se recorre por paginas: con mas de una pagina de
+    # eventos, las fases antiguas tambien cuentan.
     existing_phases = set()
-    for event in existing_events:
-        if event.get("event_type") == "phase_completed":
+    cursor = None
+    while True:
+        page = db.get_timeline(iteration_id, limit=500, cursor=cursor)
+        for event in page:
+            if event.get("event_type") != "phase_completed":
+                continue
             # El nombre de la fase se guarda en el payload del evento
             payload_raw = event.get("payload")
             if payload_raw:
@@ -226,6 +233,9 @@ def _process_state(db, new_state: dict, db_existed: bool) -> None:
                         existing_phases.add(phase_name)
                 except (json.JSONDecodeError, AttributeError):
                     pass
+        cursor = page.next_cursor
+        if cursor is None:
+            break
 
     # Registrar cada fase completada que aun no tenga evento
     for fase in fases_completadas:
@@ -285,4 +295,12 @@ def _process_state(db, new_state: dict, db_existed: bool) -> None:
 
 
 if __name__ == "__main__":
-    main()
+    # Si el daemon de hooks esta activo, se delega en el; si no, se
+    # ejecuta en este proceso (ver core/hook_daemon.py).
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        from core.hook_daemon import dispatch
+    except ImportError:
+        main()
+    else:
+        dispatch("memory-capture", main)
@@ -100,7 +100,7 @@ def main():
         sys.exit(0)
 
     try:
-        db = MemoryDB(db_path)
+        db = MemoryDB(db_path, read_only=True)
 
         active = db.get_active_iteration()
         if active:
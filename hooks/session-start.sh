@@ -172,7 +172,8 @@ import sys
 try:
     from core.memory import MemoryDB
 
-    db = MemoryDB(sys.argv[1])
+    # Solo lectura: si el esquema esta desactualizado, MemoryDB lo migra antes
+    db = MemoryDB(sys.argv[1], read_only=True)
 
     # Estadísticas generales para saber cuántas decisiones hay
     stats = db.get_stats()
@@ -387,6 +388,30 @@ El servidor del dashboard esta activo (HTTP: ${GUI_HTTP_PORT}, WS: ${GUI_WS_PORT
   fi
 fi
 
+# --- Daemon de hooks (opt-in) ---
+
+# Con ALFRED_HOOK_DAEMON=1 se arranca un proceso persistente que ejecuta
+# los hooks de PostToolUse con los módulos y la memoria ya cargados. Los
+# hooks lo usan si encuentran su socket y, si no, se ejecutan como
+# siempre. El daemon se detiene solo tras 30 minutos sin peticiones.
+HOOK_DAEMON="${PLUGIN_ROOT}/core/hook_daemon.py"
+HOOK_DAEMON_PID_FILE="${PROJECT_DIR}/.claude/alfred-hooks.pid"
+
+if [[ -f "$HOOK_DAEMON_PID_FILE" ]]; then
+  OLD_PID=$(cat "$HOOK_DAEMON_PID_FILE" 2>/dev/null)
+  if [[ -n "$OLD_PID" ]] && kill -0 "$OLD_PID" 2>/dev/null && \
+     ps -p "$OLD_PID" -o args= 2>/dev/null | grep -q "core/hook_daemon.py"; then
+    kill "$OLD_PID" 2>/dev/null || true
+    sleep 0.5
+  fi
+  rm -f "$HOOK_DAEMON_PID_FILE" "${PROJECT_DIR}/.claude/alfred-hooks.sock"
+fi
+
+if [[ "${ALFRED_HOOK_DAEMON:-}" == "1" && -f "$HOOK_DAEMON" ]]; then
+  PYTHONPATH="${PLUGIN_ROOT}" python3 "$HOOK_DAEMON" --project "$PROJECT_DIR" \
+    >> "${PROJECT_DIR}/.claude/alfred-hooks.log" 2>&1 &
+fi
+
 # --- Emisión del JSON de salida ---
 
 ESCAPED_CONTEXT=$(escape_for_json "$CONTEXT")
@@ -7,7 +7,7 @@ exclusivamente la biblioteca estandar de Python (json, sys, struct, logging).
 El formato de transporte es JSON-RPC 2.0 con encabezados Content-Length,
 identico al que usa LSP (Language Server Protocol).
 
-El servidor expone quince herramientas que permiten a los agentes de Alfred
+El servidor expone dieciocho herramientas que permiten a los agentes de Alfred
 consultar, registrar y gestionar la base de datos de memoria del proyecto:
 
     Consulta (10 originales):
@@ -25,14 +25,27 @@ consultar, registrar y gestionar la base de datos de memoria del proyecto:
     - memory_update_decision: actualiza estado y etiquetas de una decision.
     - memory_link_decisions: crea relaciones entre decisiones.
     - memory_health: validacion de integridad de la base de datos.
-    - memory_export: exporta decisiones a Markdown (formato ADR).
+    - memory_export: exporta decisiones a Markdown, ADR por fichero o JSONL.
     - memory_import: importa desde historial Git o ficheros ADR.
 
+    Trazabilidad:
+    - memory_file_history: commits y decisiones que tocaron una ruta.
+    - memory_traverse_decisions: subgrafo de relaciones de una decision.
+
+    Composicion:
+    - memory_batch: varias herramientas en una sola peticion y una sola
+      transaccion.
+
 Ciclo de vida:
     Claude Code lanza este proceso al inicio de sesion y lo mantiene vivo.
     Al arrancar, el servidor resuelve la ruta de la DB relativa al directorio
     de trabajo (``$PWD/.claude/alfred-memory.db``), abre la conexion, asegura
-    el esquema y queda a la escucha de invocaciones MCP por stdin.
+    el esquema y queda a la escucha de invocaciones MCP por stdin. El bucle
+    es asyncio: las lecturas se atienden en un pool de conexiones de solo
+    lectura y las escrituras en un unico hilo escritor, sin que una
+    herramienta lenta retenga a las demas (ver ``MemoryMCPServer``). Un
+    hilo de mantenimiento aprovecha los huecos entre peticiones para purgar,
+    analizar y compactar la BD.
 
 Seguridad:
     La sanitizacion de secretos la realiza MemoryDB internamente. Este servidor
@@ -43,12 +56,18 @@ Uso:
     traves de la configuracion en ``.claude-plugin/mcp.json``.
 """
 
+import asyncio
 import json
 import logging
 import os
+import re
 import sys
+import threading
+import time
 import traceback
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # ---------------------------------------------------------------------------
 # Configuracion de logging
@@ -74,7 +93,7 @@ _PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if _PLUGIN_ROOT not in sys.path:
     sys.path.insert(0, _PLUGIN_ROOT)
 
-from core.memory import MemoryDB  # noqa: E402
+from core.memory import MemoryDB, OperationCancelled  # noqa: E402
 
 
 # ---------------------------------------------------------------------------
@@ -84,12 +103,59 @@ from core.memory import MemoryDB  # noqa: E402
 # Schema draft-07). El servidor devuelve esta lista cuando recibe el metodo
 # ``tools/list`` y la usa para despachar en ``tools/call``.
 
+# Parametro comun de los listados paginados: el ``next_cursor`` devuelto
+# por la pagina anterior.
+_CURSOR_SCHEMA: Dict[str, Any] = {
+    "type": "string",
+    "description": (
+        "Cursor opaco (next_cursor de la respuesta anterior) para pedir la "
+        "pagina siguiente con los mismos filtros."
+    ),
+}
+
+# Destino de memory_export cuando no se indica ``path``. El de ``adr`` es
+# el directorio que lee memory_import por defecto.
+_EXPORT_DEFAULT_PATHS: Dict[str, str] = {
+    "markdown": "DECISIONS.md",
+    "adr": "docs/adr",
+    "jsonl": "decisions.jsonl",
+}
+
+# Herramienta que agrupa invocaciones de las demas y tope de llamadas por
+# lote: una sola peticion ocupa su ejecutor hasta terminarlas todas.
+_BATCH_TOOL = "memory_batch"
+_BATCH_MAX_CALLS = 20
+
+# Parametros de forma de la respuesta, comunes a todas las herramientas
+# (ver _shape_result). Se anaden al esquema de cada una tras definir _TOOLS.
+_SHAPING_PROPERTIES: Dict[str, Any] = {
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": (
+            "Campos a conservar en cada registro de las listas del "
+            "resultado (el id se conserva siempre)."
+        ),
+    },
+    "max_chars": {
+        "type": "integer",
+        "minimum": 1,
+        "description": (
+            "Longitud maxima de cada campo de texto; lo que sobra se "
+            "recorta con una marca que indica cuanto falta."
+        ),
+    },
+}
+
 _TOOLS: List[Dict[str, Any]] = [
     {
         "name": "memory_search",
         "description": (
             "Busca en la memoria del proyecto (decisiones y commits) por texto. "
-            "Usa FTS5 si esta disponible, o LIKE como fallback."
+            "Usa FTS5 si esta disponible, o LIKE como fallback. Los resultados "
+            "se ordenan por relevancia (BM25) e incluyen un fragmento con el "
+            "termino resaltado. Con mode se busca por prefijo, subcadena "
+            "(identificadores parciales, rutas de fichero) o con operadores."
         ),
         "inputSchema": {
             "type": "object",
@@ -125,6 +191,27 @@ _TOOLS: List[Dict[str, Any]] = [
                     "enum": ["active", "superseded", "deprecated"],
                     "description": "Filtrar decisiones por estado.",
                 },
+                "mode": {
+                    "type": "string",
+                    "enum": ["phrase", "prefix", "substring", "boolean"],
+                    "description": (
+                        "Interpretacion de la consulta: phrase (frase "
+                        "literal, por defecto), prefix (cada palabra es un "
+                        "prefijo), substring (fragmento en cualquier "
+                        "posicion, incluidas rutas de ficheros de commits) "
+                        "o boolean (sintaxis FTS5: AND, OR, NOT, NEAR, *)."
+                    ),
+                    "default": "phrase",
+                },
+                "full": {
+                    "type": "boolean",
+                    "description": (
+                        "Devolver los registros completos en lugar de "
+                        "resultados compactos (por defecto false)."
+                    ),
+                    "default": False,
+                },
+                "cursor": _CURSOR_SCHEMA,
             },
             "required": ["query"],
         },
@@ -239,8 +326,9 @@ _TOOLS: List[Dict[str, Any]] = [
     {
         "name": "memory_get_timeline",
         "description": (
-            "Obtiene la cronologia completa de eventos de una iteracion, "
-            "ordenados de mas antiguo a mas reciente."
+            "Obtiene la cronologia de eventos de una iteracion, ordenados "
+            "de mas antiguo a mas reciente. Si hay mas eventos que limit, "
+            "la respuesta incluye next_cursor para pedir la pagina siguiente."
         ),
         "inputSchema": {
             "type": "object",
@@ -249,6 +337,12 @@ _TOOLS: List[Dict[str, Any]] = [
                     "type": "integer",
                     "description": "ID de la iteracion cuya cronologia consultar.",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Numero maximo de eventos (por defecto 100).",
+                    "default": 100,
+                },
+                "cursor": _CURSOR_SCHEMA,
             },
             "required": ["iteration_id"],
         },
@@ -262,7 +356,16 @@ _TOOLS: List[Dict[str, Any]] = [
         ),
         "inputSchema": {
             "type": "object",
-            "properties": {},
+            "properties": {
+                "exact": {
+                    "type": "boolean",
+                    "description": (
+                        "Contar las filas de cada tabla en lugar de leer "
+                        "los contadores (mas lento; por defecto false)."
+                    ),
+                    "default": False,
+                },
+            },
             "required": [],
         },
     },
@@ -365,11 +468,21 @@ _TOOLS: List[Dict[str, Any]] = [
                     "items": {"type": "string"},
                     "description": "Filtrar decisiones por etiquetas.",
                 },
+                "tags_mode": {
+                    "type": "string",
+                    "enum": ["any", "all"],
+                    "description": (
+                        "Con 'any' basta con una etiqueta; con 'all' deben "
+                        "estar todas (por defecto 'any')."
+                    ),
+                    "default": "any",
+                },
                 "status": {
                     "type": "string",
                     "enum": ["active", "superseded", "deprecated"],
                     "description": "Filtrar decisiones por estado.",
                 },
+                "cursor": _CURSOR_SCHEMA,
             },
             "required": [],
         },
@@ -379,7 +492,8 @@ _TOOLS: List[Dict[str, Any]] = [
         "description": (
             "Elimina eventos antiguos de la memoria. Las decisiones e "
             "iteraciones se conservan siempre; solo se purgan eventos "
-            "anteriores a la ventana de retencion indicada."
+            "anteriores a la ventana de retencion indicada, que quedan "
+            "resumidos por iteracion, dia y tipo de evento."
         ),
         "inputSchema": {
             "type": "object",
@@ -458,33 +572,60 @@ _TOOLS: List[Dict[str, Any]] = [
         ),
         "inputSchema": {
             "type": "object",
-            "properties": {},
+            "properties": {
+                "repair": {
+                    "type": "boolean",
+                    "description": (
+                        "Resincronizar el indice FTS5 si esta "
+                        "desincronizado (por defecto false)."
+                    ),
+                    "default": False,
+                },
+            },
             "required": [],
         },
     },
     {
         "name": "memory_export",
         "description": (
-            "Exporta las decisiones del proyecto a un fichero Markdown "
-            "con formato ADR-like. Incluye fecha, estado, etiquetas, "
-            "contexto, decision, alternativas y justificacion."
+            "Exporta las decisiones del proyecto sin limite: a un fichero "
+            "Markdown con formato ADR-like, a un directorio con un ADR por "
+            "decision o a JSONL. Con incremental solo escribe las "
+            "decisiones creadas o modificadas desde la ultima exportacion "
+            "a la misma ruta."
         ),
         "inputSchema": {
             "type": "object",
             "properties": {
                 "format": {
                     "type": "string",
-                    "enum": ["markdown"],
-                    "description": "Formato de exportacion (por ahora solo markdown).",
+                    "enum": ["markdown", "adr", "jsonl"],
+                    "description": (
+                        "markdown (documento unico), adr (un fichero por "
+                        "decision en un directorio) o jsonl (una decision "
+                        "por linea)."
+                    ),
                 },
                 "path": {
                     "type": "string",
-                    "description": "Ruta del fichero de salida. Por defecto DECISIONS.md.",
+                    "description": (
+                        "Fichero o directorio de salida. Por defecto "
+                        "DECISIONS.md, docs/adr o decisions.jsonl segun "
+                        "el formato."
+                    ),
                 },
                 "iteration_id": {
                     "type": "integer",
                     "description": "Exportar solo decisiones de esta iteracion.",
                 },
+                "incremental": {
+                    "type": "boolean",
+                    "description": (
+                        "Solo decisiones nuevas o modificadas desde la "
+                        "ultima exportacion (adr y jsonl)."
+                    ),
+                    "default": False,
+                },
             },
             "required": ["format"],
         },
@@ -509,94 +650,456 @@ _TOOLS: List[Dict[str, Any]] = [
                 },
                 "limit": {
                     "type": "integer",
-                    "description": "Numero maximo de registros a importar (para git).",
+                    "description": (
+                        "Numero maximo de commits a recorrer (para git, "
+                        "0 = sin limite). Si corta el recorrido, una "
+                        "importacion posterior con un limit mayor importa "
+                        "los commits anteriores."
+                    ),
                     "default": 100,
                 },
+                "incremental": {
+                    "type": "boolean",
+                    "description": (
+                        "Para git: recorrer solo los commits posteriores "
+                        "a la ultima importacion (por defecto true)."
+                    ),
+                    "default": True,
+                },
             },
             "required": ["source"],
         },
     },
+    {
+        "name": "memory_file_history",
+        "description": (
+            "Historial de una ruta: commits que tocaron un fichero o "
+            "cualquier fichero bajo un directorio, del mas reciente al mas "
+            "antiguo, con las decisiones vinculadas a esos commits."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": (
+                        "Ruta o prefijo relativo a la raiz del repositorio "
+                        "(p.ej. 'src/auth/' o 'core/memory.py')."
+                    ),
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Numero maximo de commits (por defecto 50).",
+                    "default": 50,
+                },
+                "cursor": _CURSOR_SCHEMA,
+            },
+            "required": ["path"],
+        },
+    },
+    {
+        "name": "memory_traverse_decisions",
+        "description": (
+            "Recorre el grafo de relaciones entre decisiones a partir de "
+            "una decision y devuelve el subgrafo completo (decisiones "
+            "alcanzadas con su profundidad y relaciones entre ellas) en una "
+            "sola respuesta. Util para reconstruir el linaje de una decision."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "root_id": {
+                    "type": "integer",
+                    "description": "ID de la decision de partida.",
+                },
+                "link_types": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": ["supersedes", "depends_on", "contradicts", "relates"],
+                    },
+                    "description": (
+                        "Tipos de relacion a seguir. Si se omite, se siguen todos."
+                    ),
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Numero maximo de saltos (0-50, por defecto 10).",
+                    "default": 10,
+                },
+                "direction": {
+                    "type": "string",
+                    "enum": ["outgoing", "incoming", "both"],
+                    "description": (
+                        "Sentido del recorrido: outgoing (de origen a destino, "
+                        "por defecto), incoming (hacia las decisiones que "
+                        "apuntan a esta) o both."
+                    ),
+                    "default": "outgoing",
+                },
+            },
+            "required": ["root_id"],
+        },
+    },
+    {
+        "name": _BATCH_TOOL,
+        "description": (
+            "Ejecuta varias herramientas de memoria en una sola peticion, "
+            "en orden y dentro de una unica transaccion, de modo que todas "
+            "las lecturas ven el mismo estado de la BD. Devuelve el "
+            "resultado de cada llamada; el error de una no afecta a las "
+            "demas. Util para encadenar consultas como memory_get_iteration, "
+            "memory_get_decisions y memory_get_timeline."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "calls": {
+                    "type": "array",
+                    "minItems": 1,
+                    "maxItems": _BATCH_MAX_CALLS,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {
+                                "type": "string",
+                                "description": (
+                                    "Nombre de la herramienta (cualquiera "
+                                    "salvo memory_batch)."
+                                ),
+                            },
+                            "arguments": {
+                                "type": "object",
+                                "description": "Argumentos de la herramienta.",
+                            },
+                        },
+                        "required": ["name"],
+                    },
+                    "description": (
+                        f"Llamadas a ejecutar, en orden (maximo "
+                        f"{_BATCH_MAX_CALLS}). fields y max_chars del lote "
+                        f"se aplican a las llamadas que no los indiquen."
+                    ),
+                },
+            },
+            "required": ["calls"],
+        },
+    },
 ]
 
+for _tool in _TOOLS:
+    _tool["inputSchema"]["properties"].update(_SHAPING_PROPERTIES)
+
 # Mapa de nombre a indice para acceso rapido en tools/call
 _TOOL_NAMES = {t["name"] for t in _TOOLS}
 
+# Herramientas que solo leen. Se ejecutan en el pool de lectores, cada hilo
+# con su propia conexion ``mode=ro``; el resto pasa por el hilo escritor.
+_READ_TOOLS = frozenset({
+    "memory_search",
+    "memory_get_iteration",
+    "memory_get_timeline",
+    "memory_stats",
+    "memory_get_decisions",
+    "memory_file_history",
+    "memory_traverse_decisions",
+})
+
+# Herramientas largas cuyo handler recibe el evento de cancelacion.
+_CANCELLABLE_TOOLS = frozenset({"memory_import", "memory_export", _BATCH_TOOL})
+
+# Hilos del pool de lectores.
+_READ_WORKERS = 4
+
+# Tamano inicial del buffer de lectura de stdin y de cada lectura.
+_READ_CHUNK = 64 * 1024
+
+# Encabezado Content-Length, buscado directamente en el buffer de lectura.
+# _SIMPLE_HEADER_RE reconoce de una vez el caso habitual (un unico
+# encabezado y \r\n\r\n); el resto pasa por el parseo general.
+_CONTENT_LENGTH_RE = re.compile(rb"content-length[ \t]*:([^\r\n]*)", re.IGNORECASE)
+_SIMPLE_HEADER_RE = re.compile(rb"[\r\n]*Content-Length: ?(\d+)\r\n\r\n")
+
+# Serializacion compacta de resultados y mensajes. Una instancia
+# compartida: json.dumps con opciones crea un JSONEncoder en cada llamada.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# Buffers por llamada a os.writev (el minimo IOV_MAX que garantiza POSIX
+# es 16; Linux y macOS admiten 1024).
+_IOV_MAX = 1024
+
+# Segundos entre comprobaciones del hilo de mantenimiento (como maximo;
+# con un maintenance_idle menor se comprueba mas a menudo).
+_MAINTENANCE_POLL = 5.0
+
+# Codigo JSON-RPC de una peticion cancelada (el mismo que usa LSP).
+_REQUEST_CANCELLED = -32800
+
+# Columnas que SQLite guarda como texto JSON. En la respuesta se decodifican
+# para no enviar JSON dentro de JSON (con todas sus comillas escapadas).
+_JSON_COLUMNS = frozenset({
+    "tags", "alternatives", "files", "payload", "phases_completed",
+    "artifacts",
+})
+
+# Claves que max_chars no recorta: un cursor, un SHA, una ruta o una
+# lista de IDs cortados dejan de servir.
+_UNTRUNCATED_KEYS = frozenset({
+    "next_cursor", "sha", "path", "paths", "files", "db_path",
+    "decision_ids", "commit_ids",
+})
+
+_TRUNCATION_MARKER = "...[+{} caracteres]"
+
 
 # ---------------------------------------------------------------------------
 # Transporte JSON-RPC sobre stdio
 # ---------------------------------------------------------------------------
 
 
-def _read_message() -> Optional[Dict[str, Any]]:
+class _FrameReader:
     """
-    Lee un mensaje JSON-RPC de stdin con encabezado Content-Length.
+    Lee mensajes JSON-RPC con encabezado Content-Length de un flujo binario.
 
     El formato es identico al de LSP:
         Content-Length: <N>\\r\\n
         \\r\\n
         <N bytes de JSON>
 
-    Returns:
-        Diccionario con el mensaje parseado, o None si stdin se cierra.
+    Los bytes se leen con ``readinto1`` sobre un ``bytearray`` que se
+    reutiliza entre mensajes (y crece si llega uno mayor), en lugar de una
+    lectura por linea de encabezado y otra para el cuerpo. Los encabezados
+    se buscan y se parsean sobre ese mismo buffer. El cuerpo se decodifica
+    a ``str`` directamente desde una vista del buffer, sin copiarlo antes
+    a un ``bytes`` aparte, y se pasa a ``json.loads`` como texto: con
+    bytes, ``json.loads`` tiene que detectar la codificacion y resulta mas
+    lento. Una lectura puede traer varios mensajes; los siguientes se
+    sirven del buffer sin volver a leer del flujo.
 
-    Raises:
-        ValueError: si el encabezado no tiene el formato esperado.
+    Args:
+        stream: flujo binario de entrada (``sys.stdin.buffer``).
+        chunk_size: tamano inicial del buffer y de cada lectura.
     """
-    # Leer encabezados hasta encontrar la linea vacia
-    content_length: Optional[int] = None
 
-    while True:
-        line = sys.stdin.buffer.readline()
+    def __init__(self, stream: Any, chunk_size: int = _READ_CHUNK) -> None:
+        self._stream = stream
+        self._readinto = getattr(stream, "readinto1", stream.readinto)
+        self._chunk_size = chunk_size
+        self._buffer = bytearray(chunk_size)
+        # Vista permanente del buffer: se libera y se vuelve a crear solo
+        # cuando el buffer crece (un bytearray con vistas no se redimensiona).
+        self._view = memoryview(self._buffer)
+        # Bytes pendientes de procesar: self._buffer[self._start:self._end]
+        self._start = 0
+        self._end = 0
+
+    def read_message(self) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el siguiente mensaje del flujo.
+
+        Returns:
+            Diccionario con el mensaje parseado, o None si el flujo se
+            cierra (tambien a mitad de un mensaje).
 
-        # Si stdin se cierra, terminar
-        if not line:
+        Raises:
+            ValueError: si el encabezado Content-Length no es un numero o
+                el cuerpo no es JSON valido. El mensaje se descarta y la
+                siguiente llamada continua con el siguiente.
+        """
+        while True:
+            simple = _SIMPLE_HEADER_RE.match(self._buffer, self._start, self._end)
+            if simple is not None:
+                content_length = int(simple.group(1))
+                body_start = simple.end()
+            else:
+                # Lineas vacias espurias antes de los encabezados
+                while (self._start < self._end
+                       and self._buffer[self._start] in b"\r\n"):
+                    self._start += 1
+
+                header_end, separator = self._find_header_end()
+                if header_end < 0:
+                    if not self._fill():
+                        return None
+                    continue
+
+                content_length = self._parse_headers(header_end)
+                body_start = header_end + separator
+                if content_length is None:
+                    # Bloque de encabezados sin Content-Length: se ignora
+                    self._start = body_start
+                    continue
+
+            # _fill mueve los bytes pendientes al principio del buffer: las
+            # posiciones se llevan relativas a self._start.
+            frame_size = body_start - self._start + content_length
+            while self._end - self._start < frame_size:
+                if not self._fill(frame_size):
+                    _log.warning(
+                        "Cuerpo truncado: esperados %d bytes, recibidos %d",
+                        content_length,
+                        self._end - self._start - frame_size + content_length,
+                    )
+                    return None
+
+            body_end = self._start + frame_size
+            # El mensaje se da por consumido antes de decodificarlo: si no es
+            # UTF-8 o JSON valido, la siguiente lectura pasa al siguiente.
+            self._start = body_end
+            # Decodifica directamente del buffer, sin copiar antes el cuerpo
+            # a un bytes intermedio.
+            body = str(self._view[body_end - content_length:body_end], "utf-8")
+            return json.loads(body)
+
+    def _find_header_end(self) -> Tuple[int, int]:
+        """Posicion de la linea vacia que cierra los encabezados y su longitud."""
+        crlf = self._buffer.find(b"\r\n\r\n", self._start, self._end)
+        # El separador sin \r solo se busca antes del primer \r\n\r\n:
+        # recorrer el resto del buffer costaria en cada mensaje.
+        lf = self._buffer.find(
+            b"\n\n", self._start, self._end if crlf < 0 else crlf,
+        )
+        if lf >= 0:
+            return lf, 2
+        return crlf, 4
+
+    def _parse_headers(self, header_end: int) -> Optional[int]:
+        """
+        Extrae Content-Length de los encabezados en el buffer.
+
+        Args:
+            header_end: posicion de la linea vacia final.
+
+        Returns:
+            La longitud del cuerpo, o None si no hay Content-Length.
+
+        Raises:
+            ValueError: si Content-Length no es un numero.
+        """
+        # Otros encabezados (ej. Content-Type) se ignoran
+        match = _CONTENT_LENGTH_RE.search(self._buffer, self._start, header_end)
+        if match is None:
             return None
+        try:
+            return int(match.group(1))
+        except ValueError as exc:
+            self._start = header_end
+            raise ValueError(
+                f"Encabezado Content-Length malformado: "
+                f"{match.group(0).strip().decode('ascii', 'replace')!r}"
+            ) from exc
+
+    def _fill(self, needed: int = 0) -> bool:
+        """
+        Lee mas bytes del flujo al final del buffer.
+
+        Antes de leer mueve los bytes pendientes al principio. Con
+        ``needed`` (el tamano del mensaje en curso) amplia el buffer si
+        hace falta y no lee mas alla del mensaje: asi, tras un cuerpo
+        grande, no queda un resto grande que mover en la siguiente
+        llamada. Sin el, lee hasta ``chunk_size`` bytes, que pueden traer
+        varios mensajes pequenos.
+
+        Args:
+            needed: bytes pendientes que deben caber en el buffer.
+
+        Returns:
+            False si el flujo se ha cerrado.
+        """
+        pending = self._end - self._start
+        if self._start:
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, pending
+        limit = needed if needed > pending else pending + self._chunk_size
+        if len(self._buffer) < limit:
+            self._view.release()
+            self._buffer.extend(bytes(limit - len(self._buffer)))
+            self._view = memoryview(self._buffer)
+        count = self._readinto(self._view[self._end:limit])
+        if not count:
+            return False
+        self._end += count
+        return True
+
+
+class _FrameWriter:
+    """
+    Escribe mensajes JSON-RPC con encabezado Content-Length en un flujo.
 
-        # Decodificar la linea como ASCII (los encabezados son ASCII puro)
-        line_str = line.decode("ascii").strip()
+    ``enqueue`` serializa el mensaje y deja encabezado y cuerpo en una
+    cola, sin concatenarlos. ``flush`` los escribe todos de una vez con
+    ``os.writev`` (escritura vectorial: una llamada al sistema para varios
+    buffers) y vacia la cola. Si el flujo no tiene descriptor o el sistema
+    no tiene ``writev``, usa ``writelines`` y un unico ``flush``.
 
-        # Linea vacia marca el fin de los encabezados
-        if line_str == "":
-            if content_length is not None:
-                break
-            # Si aun no tenemos Content-Length, seguir leyendo
-            # (puede haber lineas vacias espurias al inicio)
-            continue
+    Args:
+        stream: flujo binario de salida (``sys.stdout.buffer``).
+    """
 
-        # Parsear encabezado Content-Length
-        if line_str.lower().startswith("content-length:"):
+    def __init__(self, stream: Any) -> None:
+        self._stream = stream
+        self._queue: List[bytes] = []
+        self._fd: Optional[int] = None
+        if hasattr(os, "writev"):
             try:
-                content_length = int(line_str.split(":", 1)[1].strip())
-            except (ValueError, IndexError) as exc:
-                raise ValueError(
-                    f"Encabezado Content-Length malformado: {line_str!r}"
-                ) from exc
-        # Ignorar otros encabezados (ej. Content-Type)
-
-    # Leer el cuerpo exacto
-    body = sys.stdin.buffer.read(content_length)
-    if len(body) < content_length:
-        _log.warning(
-            "Cuerpo truncado: esperados %d bytes, recibidos %d",
-            content_length,
-            len(body),
-        )
-        return None
+                self._fd = stream.fileno()
+            except (AttributeError, OSError, ValueError):
+                self._fd = None
 
-    return json.loads(body.decode("utf-8"))
+    @property
+    def pending(self) -> bool:
+        """Indica si hay mensajes en cola sin escribir."""
+        return bool(self._queue)
 
+    def enqueue(self, msg: Dict[str, Any]) -> None:
+        """
+        Serializa un mensaje y lo deja en la cola de salida.
 
-def _write_message(msg: Dict[str, Any]) -> None:
+        Args:
+            msg: diccionario con el mensaje JSON-RPC a enviar.
+        """
+        body = _JSON_ENCODER.encode(msg).encode("utf-8")
+        self._queue.append(b"Content-Length: %d\r\n\r\n" % len(body))
+        self._queue.append(body)
+
+    def flush(self) -> None:
+        """Escribe todos los mensajes en cola."""
+        if not self._queue:
+            return
+        buffers, self._queue = self._queue, []
+        if self._fd is None:
+            self._stream.writelines(buffers)
+            self._stream.flush()
+            return
+        # Lo que otro codigo haya dejado en el buffer del flujo va primero
+        self._stream.flush()
+        _writev_all(self._fd, buffers)
+
+
+def _writev_all(fd: int, buffers: List[bytes]) -> None:
     """
-    Escribe un mensaje JSON-RPC a stdout con encabezado Content-Length.
+    Escribe ``buffers`` completos en ``fd`` con ``os.writev``.
+
+    ``writev`` puede escribir menos bytes de los pedidos (y admite como
+    maximo ``_IOV_MAX`` buffers por llamada): se repite desde el punto en
+    que se quedo hasta escribirlo todo.
 
     Args:
-        msg: diccionario con el mensaje JSON-RPC a enviar.
+        fd: descriptor de fichero de salida.
+        buffers: buffers a escribir, en orden.
     """
-    body = json.dumps(msg, ensure_ascii=False).encode("utf-8")
-    header = f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
-    sys.stdout.buffer.write(header + body)
-    sys.stdout.buffer.flush()
+    views = [memoryview(buf) for buf in buffers if buf]
+    index = 0
+    while index < len(views):
+        written = os.writev(fd, views[index:index + _IOV_MAX])
+        while written:
+            size = len(views[index])
+            if written >= size:
+                written -= size
+                index += 1
+            else:
+                views[index] = views[index][written:]
+                written = 0
 
 
 def _make_response(request_id: Any, result: Any) -> Dict[str, Any]:
@@ -652,6 +1155,154 @@ def _make_error(
     }
 
 
+# ---------------------------------------------------------------------------
+# Forma de las respuestas
+# ---------------------------------------------------------------------------
+
+
+def _shaping_options(
+    arguments: Dict[str, Any],
+) -> Tuple[Optional[List[str]], Optional[int]]:
+    """
+    Valida los parametros ``fields`` y ``max_chars`` de una invocacion.
+
+    Args:
+        arguments: argumentos de la herramienta.
+
+    Returns:
+        Tupla ``(fields, max_chars)``; None si no se indicaron.
+
+    Raises:
+        ValueError: si ``fields`` no es una lista de cadenas o
+            ``max_chars`` no es un entero positivo.
+    """
+    fields = arguments.get("fields")
+    max_chars = arguments.get("max_chars")
+    if fields is not None and (
+        not isinstance(fields, list)
+        or not all(isinstance(f, str) for f in fields)
+    ):
+        raise ValueError("fields debe ser una lista de nombres de campo.")
+    if max_chars is not None and (
+        isinstance(max_chars, bool)
+        or not isinstance(max_chars, int)
+        or max_chars < 1
+    ):
+        raise ValueError("max_chars debe ser un entero positivo.")
+    return fields or None, max_chars
+
+
+def _int_argument(
+    arguments: Dict[str, Any], name: str, default: Optional[int],
+) -> Optional[int]:
+    """
+    Lee un argumento entero, aceptando tambien su forma en texto (``"5"``).
+
+    Algunos clientes MCP envian los numeros como cadenas. SQLite los
+    aceptaba en ``LIMIT``, pero la paginacion por clave opera con el
+    valor en Python, asi que se convierte aqui.
+
+    Args:
+        arguments: argumentos de la herramienta.
+        name: nombre del argumento.
+        default: valor si no se indica.
+
+    Returns:
+        El entero, o ``default`` si el argumento no esta o es null.
+
+    Raises:
+        ValueError: si el valor no representa un entero.
+    """
+    value = arguments.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool) or (
+        isinstance(value, float) and not value.is_integer()
+    ):
+        raise ValueError(f"{name} debe ser un entero.")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} debe ser un entero.") from None
+
+
+def _decode_json_column(value: str) -> Any:
+    """Decodifica el texto de una columna JSON; si no es valido, lo deja igual."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _shape_result(
+    value: Any,
+    fields: Optional[List[str]] = None,
+    max_chars: Optional[int] = None,
+    in_list: bool = False,
+) -> Any:
+    """
+    Reduce el resultado de una herramienta antes de serializarlo.
+
+    Recorre el resultado y devuelve una copia en la que:
+
+    - se omiten las claves con valor None (una clave ausente equivale
+      a null);
+    - las columnas de ``_JSON_COLUMNS`` guardadas como texto JSON se
+      decodifican a listas u objetos;
+    - con ``fields``, cada registro de una lista (decisiones, commits,
+      eventos, resultados de busqueda...) conserva solo esos campos y su
+      ``id``; un registro sin ninguno de ellos se deja completo;
+    - con ``max_chars``, las cadenas mas largas se recortan y terminan en
+      ``_TRUNCATION_MARKER``, salvo las de ``_UNTRUNCATED_KEYS``.
+
+    Args:
+        value: resultado del handler (o una parte, en la recursion).
+        fields: campos a conservar en los registros.
+        max_chars: longitud maxima de cada cadena.
+        in_list: si ``value`` es un elemento de una lista.
+
+    Returns:
+        Valor con la misma estructura, listo para ``json.dumps``.
+    """
+    if isinstance(value, dict):
+        if in_list and fields:
+            projected = {
+                key: value[key]
+                for key in value
+                if key in fields or key == "id"
+            }
+            if any(key in value for key in fields):
+                value = projected
+        shaped: Dict[str, Any] = {}
+        for key, item in value.items():
+            if item is None:
+                continue
+            if key in _JSON_COLUMNS and isinstance(item, str):
+                item = _decode_json_column(item)
+            shaped[key] = _shape_result(
+                item,
+                fields,
+                None if key in _UNTRUNCATED_KEYS else max_chars,
+            )
+        return shaped
+    if isinstance(value, (list, tuple)):
+        return [_shape_result(item, fields, max_chars, True) for item in value]
+    if isinstance(value, str) and max_chars is not None and len(value) > max_chars:
+        return value[:max_chars] + _TRUNCATION_MARKER.format(
+            len(value) - max_chars
+        )
+    return value
+
+
+def _encode_result(
+    result: Any,
+    fields: Optional[List[str]] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    """Serializa un resultado ya reducido, sin sangria ni espacios."""
+    return _JSON_ENCODER.encode(_shape_result(result, fields, max_chars))
+
+
 # ---------------------------------------------------------------------------
 # Servidor MCP
 # ---------------------------------------------------------------------------
@@ -666,24 +1317,79 @@ class MemoryMCPServer:
     correspondientes. Las respuestas se escriben por stdout en el mismo
     formato Content-Length + JSON-RPC.
 
-    El servidor soporta cuatro metodos del protocolo MCP:
+    El bucle principal es asyncio y no espera a una herramienta para leer
+    el siguiente mensaje: las de ``_READ_TOOLS`` (y los ``memory_batch``
+    que solo contienen lecturas) van a un pool de hilos con conexiones de
+    solo lectura y las demas a un unico hilo escritor, que las ejecuta en
+    orden de llegada. Cada respuesta se escribe en cuanto
+    esta lista, con el ``id`` de su peticion, asi que pueden salir en
+    distinto orden que las peticiones.
+
+    El servidor soporta estos metodos del protocolo MCP:
         - ``initialize``: negociacion de capacidades.
         - ``notifications/initialized``: confirmacion del cliente.
+        - ``notifications/cancelled``: cancelacion de una peticion en curso.
         - ``tools/list``: listado de herramientas disponibles.
         - ``tools/call``: invocacion de una herramienta concreta.
+        - ``ping``: latido.
+
+    Un hilo de mantenimiento de baja prioridad aprovecha los huecos entre
+    peticiones para purgar eventos antiguos, actualizar las estadisticas
+    del planificador, fusionar los indices FTS5 y truncar el WAL (ver
+    ``_maintenance_loop``).
 
     Args:
         db_path: ruta al fichero SQLite de la memoria. Si no existe, se crea
                  automaticamente con el esquema completo.
         retention_days: dias de retencion para la purga de eventos antiguos.
                         Si es 0 o negativo, no se ejecuta la purga.
+        maintenance_interval: segundos entre pasadas de mantenimiento. Si es
+                        0 o negativo, no se lanza el hilo de mantenimiento.
+        maintenance_idle: segundos sin peticiones que deben pasar antes de
+                        empezar una pasada.
+        analysis_limit: ``analysis_limit`` de ``MemoryDB.optimize``; None
+                        usa el valor por defecto.
+        fts_merge_pages: paginas por indice de la fusion FTS5; None usa el
+                        valor por defecto.
     """
 
-    def __init__(self, db_path: str, retention_days: int = 365) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        retention_days: int = 365,
+        maintenance_interval: float = 3600,
+        maintenance_idle: float = 30,
+        analysis_limit: Optional[int] = None,
+        fts_merge_pages: Optional[int] = None,
+    ) -> None:
         self._db: Optional[MemoryDB] = None
         self._db_path = db_path
         self._retention_days = retention_days
         self._initialized = False
+        # Mantenimiento en segundo plano: configuracion, hilo y eventos de
+        # parada y de cesion (lo activa cada tools/call).
+        self._maintenance_interval = maintenance_interval
+        self._maintenance_idle = maintenance_idle
+        self._maintenance_options: Dict[str, int] = {
+            key: value for key, value in (
+                ("analysis_limit", analysis_limit),
+                ("fts_merge_pages", fts_merge_pages),
+            ) if value is not None
+        }
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._maintenance_stop = threading.Event()
+        self._maintenance_cancel = threading.Event()
+        self._last_activity = time.monotonic()
+        # Estado del bucle asyncio (ver run): ejecutores, conexiones de
+        # solo lectura por hilo y peticiones en curso por id.
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._read_local = threading.local()
+        self._read_dbs: List[MemoryDB] = []
+        self._read_dbs_lock = threading.Lock()
+        self._pending: Dict[Any, Tuple["asyncio.Task[None]", threading.Event]] = {}
+        self._output: Optional[_FrameWriter] = None
+        self._flush_scheduled = False
 
     def _ensure_db(self) -> MemoryDB:
         """
@@ -711,20 +1417,118 @@ class MemoryMCPServer:
                 f"No se pudo abrir la base de datos: {exc}"
             ) from exc
 
-        # Purgar eventos antiguos si procede
-        if self._retention_days > 0:
+        self._start_maintenance()
+        return self._db
+
+    # --- Mantenimiento en segundo plano -------------------------------------
+
+    def _start_maintenance(self) -> None:
+        """
+        Lanza el hilo de mantenimiento en segundo plano.
+
+        Solo se lanza una vez por proceso y no se lanza si
+        ``maintenance_interval`` es 0 o negativo.
+        """
+        if self._maintenance_interval <= 0 or self._maintenance_thread is not None:
+            return
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop,
+            name="alfred-memory-maintenance",
+            daemon=True,
+        )
+        self._maintenance_thread.start()
+
+    def _maintenance_loop(self) -> None:
+        """
+        Ejecuta una pasada de mantenimiento en cada hueco entre peticiones.
+
+        Comprueba periodicamente si el servidor esta ocioso (sin peticiones
+        en curso ni recibidas en los ultimos ``maintenance_idle`` segundos)
+        y si ya toca una pasada. La primera no espera al intervalo, salvo
+        que la ultima pasada guardada en la BD, quiza de una sesion
+        anterior, sea mas reciente.
+        """
+        poll = max(0.01, min(_MAINTENANCE_POLL, self._maintenance_idle))
+        next_run = 0.0
+        while not self._maintenance_stop.wait(poll):
+            if time.monotonic() < next_run or not self._is_idle():
+                continue
+            next_run = time.monotonic() + self._run_maintenance_pass()
+
+    def _is_idle(self) -> bool:
+        """Indica si no hay peticiones en curso ni recientes."""
+        return not self._pending and (
+            time.monotonic() - self._last_activity >= self._maintenance_idle
+        )
+
+    def _run_maintenance_pass(self) -> float:
+        """
+        Ejecuta ``MemoryDB.run_maintenance`` con una conexion propia.
+
+        Cada ``tools/call`` activa ``_maintenance_cancel``: la pasada cede
+        en cuanto llega una peticion (entre pasos y entre lotes de la
+        purga) y se repite en el siguiente hueco.
+
+        Returns:
+            Segundos hasta la siguiente pasada.
+        """
+        try:
+            db = MemoryDB(self._db_path)
             try:
-                purged = self._db.purge_old_events(self._retention_days)
-                if purged > 0:
-                    _log.info(
-                        "Purgados %d eventos con mas de %d dias",
-                        purged,
-                        self._retention_days,
-                    )
-            except Exception as exc:
-                _log.warning("Error en purga de eventos: %s", exc)
+                wait = self._maintenance_wait(db.get_maintenance_report())
+                if wait > 0:
+                    return wait
+                self._maintenance_cancel.clear()
+                if not self._is_idle():
+                    return 0.0
+                report = db.run_maintenance(
+                    retention_days=max(self._retention_days, 0),
+                    cancel=self._maintenance_cancel,
+                    **self._maintenance_options,
+                )
+            finally:
+                db.close()
+        except Exception as exc:
+            _log.warning("Error en el mantenimiento de la memoria: %s", exc)
+            return self._maintenance_interval
+
+        if report["interrupted"]:
+            _log.info("Mantenimiento interrumpido por una peticion")
+            return 0.0
+        purge = report["steps"].get("purge", {})
+        _log.info(
+            "Mantenimiento completado en %.1f ms (%d eventos compactados)",
+            report["duration_ms"],
+            purge.get("deleted", 0),
+        )
+        return self._maintenance_interval
 
-        return self._db
+    def _maintenance_wait(self, report: Optional[Dict[str, Any]]) -> float:
+        """
+        Segundos que faltan para la siguiente pasada segun la ultima.
+
+        Args:
+            report: informe de ``MemoryDB.get_maintenance_report``.
+
+        Returns:
+            0 si no hay pasada anterior, si se interrumpio o si ya ha
+            pasado el intervalo; si no, lo que falta para cumplirlo.
+        """
+        if not report or report.get("interrupted"):
+            return 0.0
+        try:
+            finished = datetime.fromisoformat(report["finished_at"])
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+        elapsed = (datetime.now(timezone.utc) - finished).total_seconds()
+        return max(0.0, self._maintenance_interval - elapsed)
+
+    def _stop_maintenance(self) -> None:
+        """Detiene el hilo de mantenimiento, interrumpiendo la pasada en curso."""
+        self._maintenance_stop.set()
+        self._maintenance_cancel.set()
+        if self._maintenance_thread is not None:
+            self._maintenance_thread.join(timeout=10)
 
     # --- Handlers de protocolo MCP -----------------------------------------
 
@@ -769,9 +1573,10 @@ class MemoryMCPServer:
         Despacha una invocacion de herramienta al metodo correspondiente.
 
         Valida que la herramienta exista, abre la DB si es necesario y
-        delega la ejecucion al metodo ``_call_<nombre_herramienta>``.
-        El resultado se serializa como JSON y se devuelve en un bloque
-        ``content`` con tipo ``text``.
+        delega la ejecucion al metodo ``_call_<nombre_herramienta>`` en el
+        hilo actual. El bucle de ``run`` usa las mismas piezas
+        (``_resolve_tool`` y ``_execute_tool``) repartidas entre el pool de
+        lectores y el hilo escritor.
 
         Args:
             request_id: ID del request JSON-RPC.
@@ -780,6 +1585,33 @@ class MemoryMCPServer:
         Returns:
             Respuesta JSON-RPC con el resultado o un error.
         """
+        resolved = self._resolve_tool(request_id, params)
+        if isinstance(resolved, dict):
+            return resolved
+        tool_name, handler, arguments = resolved
+
+        # Abrir la DB si aun no esta abierta
+        try:
+            db = self._ensure_db()
+        except RuntimeError as exc:
+            return _make_error(request_id, -32603, str(exc))
+
+        return self._execute_tool(request_id, tool_name, handler, db, arguments)
+
+    def _resolve_tool(
+        self, request_id: Any, params: Dict[str, Any]
+    ) -> Any:
+        """
+        Localiza el handler de una invocacion ``tools/call``.
+
+        Args:
+            request_id: ID del request JSON-RPC.
+            params: debe contener ``name`` (str) y opcionalmente ``arguments`` (dict).
+
+        Returns:
+            Tupla ``(nombre, handler, argumentos)`` o, si la herramienta no
+            existe o no tiene handler, la respuesta de error JSON-RPC.
+        """
         tool_name: str = params.get("name", "")
         arguments: Dict[str, Any] = params.get("arguments", {})
 
@@ -793,16 +1625,6 @@ class MemoryMCPServer:
                 f"Herramienta desconocida: {tool_name}",
             )
 
-        # Abrir la DB si aun no esta abierta
-        try:
-            db = self._ensure_db()
-        except RuntimeError as exc:
-            return _make_error(
-                request_id,
-                -32603,
-                str(exc),
-            )
-
         # Despachar al handler concreto
         handler_name = f"_call_{tool_name}"
         handler = getattr(self, handler_name, None)
@@ -812,10 +1634,59 @@ class MemoryMCPServer:
                 -32603,
                 f"Handler no implementado para: {tool_name}",
             )
+        return tool_name, handler, arguments
+
+    def _execute_tool(
+        self,
+        request_id: Any,
+        tool_name: str,
+        handler: Callable[..., Dict[str, Any]],
+        db: MemoryDB,
+        arguments: Dict[str, Any],
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta un handler y construye la respuesta ``tools/call``.
+
+        El resultado se reduce con ``_shape_result`` (segun ``fields`` y
+        ``max_chars``), se serializa como JSON compacto y se devuelve en un
+        bloque ``content`` con tipo ``text``.
+
+        Args:
+            request_id: ID del request JSON-RPC.
+            tool_name: nombre de la herramienta.
+            handler: metodo ``_call_<nombre>``.
+            db: conexion con la que se ejecuta (de escritura o de lectura).
+            arguments: argumentos de la herramienta.
+            cancel: evento de cancelacion; solo lo reciben los handlers de
+                ``_CANCELLABLE_TOOLS``.
+
+        Returns:
+            Respuesta JSON-RPC con el resultado o un error.
+        """
+        # La cancelacion de una peticion en cola llega al futuro del
+        # ejecutor unas vueltas del bucle despues de activar el evento; si
+        # el hilo ya la ha tomado, se descarta aqui.
+        if cancel is not None and cancel.is_set():
+            return _make_error(
+                request_id, _REQUEST_CANCELLED, f"{tool_name} cancelada",
+            )
 
         try:
-            result = handler(db, arguments)
-            text_content = json.dumps(result, ensure_ascii=False, indent=2)
+            fields, max_chars = _shaping_options(arguments)
+        except ValueError as exc:
+            return _make_error(request_id, -32602, str(exc))
+
+        try:
+            if tool_name in _CANCELLABLE_TOOLS:
+                result = handler(db, arguments, cancel=cancel)
+            else:
+                result = handler(db, arguments)
+            if tool_name == _BATCH_TOOL:
+                # memory_batch ya ha aplicado fields y max_chars a cada
+                # llamada; recortar otra vez alargaria las marcas.
+                fields = max_chars = None
+            text_content = _encode_result(result, fields, max_chars)
             # Si el handler devuelve {"error": ...}, marcamos isError para
             # que el consumidor MCP distinga errores de validacion de
             # resultados exitosos (protocolo MCP tools/call).
@@ -826,6 +1697,13 @@ class MemoryMCPServer:
                 ],
                 "isError": is_error,
             })
+        except OperationCancelled:
+            _log.info("Herramienta %s cancelada", tool_name)
+            return _make_error(
+                request_id,
+                _REQUEST_CANCELLED,
+                f"{tool_name} cancelada",
+            )
         except Exception as exc:
             _log.error(
                 "Error ejecutando %s: %s\n%s",
@@ -852,36 +1730,89 @@ class MemoryMCPServer:
 
         Args:
             db: instancia de MemoryDB abierta.
-            args: ``query`` (str, obligatorio), ``limit`` (int), ``iteration_id`` (int).
+            args: ``query`` (str, obligatorio), ``limit`` (int), ``iteration_id`` (int),
+                filtros ``since``/``until``/``tags``/``status``, ``mode`` (str),
+                ``full`` (bool) y ``cursor`` (str).
 
         Returns:
-            Diccionario con la lista de resultados y metadatos de la busqueda.
+            Diccionario con la lista de resultados, metadatos de la busqueda
+            y ``next_cursor`` (None en la ultima pagina). Por defecto cada
+            resultado es compacto (ver ``_compact_search_hit``); con
+            ``full`` se devuelve el registro completo.
         """
         query: str = args.get("query", "")
-        limit: int = args.get("limit", 20)
         iteration_id: Optional[int] = args.get("iteration_id")
         since: Optional[str] = args.get("since")
         until: Optional[str] = args.get("until")
         tags: Optional[List[str]] = args.get("tags")
         status: Optional[str] = args.get("status")
+        mode: str = args.get("mode") or "phrase"
+        full: bool = bool(args.get("full", False))
+        cursor: Optional[str] = args.get("cursor")
 
         if not query.strip():
             return {"results": [], "message": "La consulta esta vacia."}
 
-        results = db.search(
-            query,
-            limit=limit,
-            iteration_id=iteration_id,
-            since=since,
-            until=until,
-            tags=tags,
-            status=status,
-        )
+        try:
+            results = db.search(
+                query,
+                limit=_int_argument(args, "limit", 20),
+                iteration_id=iteration_id,
+                since=since,
+                until=until,
+                tags=tags,
+                status=status,
+                mode=mode,
+                cursor=cursor,
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
+        next_cursor = results.next_cursor
+        if not full:
+            results = [self._compact_search_hit(r) for r in results]
         return {
             "results": results,
             "total": len(results),
             "query": query,
             "fts_enabled": db.fts_enabled,
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def _compact_search_hit(hit: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reduce un resultado de busqueda a los campos utiles para un agente.
+
+        En lugar del registro completo (contexto, alternativas, ficheros...)
+        se devuelven el identificador, un titulo, la fecha, la relevancia y
+        el fragmento resaltado. Para commits, el titulo es la primera linea
+        del mensaje. El agente puede pedir el detalle con ``full``.
+
+        Args:
+            hit: resultado devuelto por ``MemoryDB.search``.
+
+        Returns:
+            Diccionario compacto con el resultado.
+        """
+        if hit.get("source_type") == "decision":
+            return {
+                "source_type": "decision",
+                "id": hit.get("id"),
+                "title": hit.get("title"),
+                "status": hit.get("status"),
+                "date": hit.get("decided_at"),
+                "score": hit.get("score"),
+                "snippet": hit.get("snippet"),
+            }
+        message = hit.get("message") or ""
+        return {
+            "source_type": "commit",
+            "id": hit.get("id"),
+            "sha": hit.get("sha"),
+            "title": message.split("\n", 1)[0],
+            "date": hit.get("committed_at"),
+            "score": hit.get("score"),
+            "snippet": hit.get("snippet"),
         }
 
     def _call_memory_log_decision(
@@ -1054,21 +1985,31 @@ class MemoryMCPServer:
 
         Args:
             db: instancia de MemoryDB abierta.
-            args: ``iteration_id`` (int, obligatorio).
+            args: ``iteration_id`` (int, obligatorio), ``limit`` (int) y
+                ``cursor`` (str).
 
         Returns:
-            Diccionario con la lista de eventos y metadatos.
+            Diccionario con la lista de eventos, metadatos y
+            ``next_cursor`` (None en la ultima pagina).
         """
         iteration_id: Optional[int] = args.get("iteration_id")
+        cursor: Optional[str] = args.get("cursor")
 
         if iteration_id is None:
             return {"error": "El campo 'iteration_id' es obligatorio."}
 
-        events = db.get_timeline(iteration_id)
+        try:
+            events = db.get_timeline(
+                iteration_id, limit=_int_argument(args, "limit", 100),
+                cursor=cursor,
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
         return {
             "iteration_id": iteration_id,
             "events": events,
             "total": len(events),
+            "next_cursor": events.next_cursor,
         }
 
     def _call_memory_stats(
@@ -1082,12 +2023,13 @@ class MemoryMCPServer:
 
         Args:
             db: instancia de MemoryDB abierta.
-            args: sin parametros (se ignora).
+            args: diccionario con ``exact`` (opcional) para contar las filas
+                en lugar de leer los contadores.
 
         Returns:
             Diccionario con todas las estadisticas.
         """
-        stats = db.get_stats()
+        stats = db.get_stats(exact=bool(args.get("exact", False)))
         stats["fts_enabled"] = db.fts_enabled
         stats["db_path"] = self._db_path
         return stats
@@ -1214,27 +2156,40 @@ class MemoryMCPServer:
 
         Args:
             db: instancia de MemoryDB abierta.
-            args: ``iteration_id`` (int, opcional), ``limit`` (int).
+            args: ``iteration_id`` (int, opcional), ``limit`` (int),
+                ``tags`` (list), ``tags_mode`` ('any' o 'all'), ``status``
+                y ``cursor`` (str).
 
         Returns:
-            Diccionario con la lista de decisiones y metadatos.
+            Diccionario con la lista de decisiones, metadatos y
+            ``next_cursor`` (None en la ultima pagina).
         """
         iteration_id: Optional[int] = args.get("iteration_id")
-        limit: int = args.get("limit", 50)
         tags: Optional[List[str]] = args.get("tags")
+        tags_mode: str = args.get("tags_mode", "any")
         status: Optional[str] = args.get("status")
+        cursor: Optional[str] = args.get("cursor")
 
-        decisions = db.get_decisions(
-            iteration_id=iteration_id,
-            limit=limit,
-            tags=tags,
-            status=status,
-        )
+        if tags_mode not in ("any", "all"):
+            return {"error": "tags_mode debe ser 'any' o 'all'."}
+
+        try:
+            decisions = db.get_decisions(
+                iteration_id=iteration_id,
+                limit=_int_argument(args, "limit", 50),
+                tags=tags,
+                status=status,
+                tags_mode=tags_mode,
+                cursor=cursor,
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
 
         return {
             "decisions": decisions,
             "total": len(decisions),
             "iteration_id": iteration_id,
+            "next_cursor": decisions.next_cursor,
         }
 
     def _call_memory_purge(
@@ -1245,15 +2200,20 @@ class MemoryMCPServer:
 
         Solo se purgan eventos: las decisiones e iteraciones se conservan
         siempre. El numero de dias de retencion determina el corte temporal.
+        Los eventos eliminados quedan resumidos por iteracion, dia y tipo.
 
         Args:
             db: instancia de MemoryDB abierta.
             args: ``retention_days`` (int, obligatorio).
 
         Returns:
-            Diccionario con el numero de eventos eliminados.
+            Diccionario con el numero de eventos eliminados, los resumenes
+            actualizados y los bytes liberados.
         """
-        retention_days: Optional[int] = args.get("retention_days")
+        try:
+            retention_days = _int_argument(args, "retention_days", None)
+        except ValueError:
+            retention_days = None
 
         if retention_days is None or retention_days < 1:
             return {
@@ -1263,9 +2223,12 @@ class MemoryMCPServer:
                 ),
             }
 
-        purged = db.purge_old_events(retention_days)
+        report = db.compact_events(retention_days)
+        purged = report["deleted"]
         return {
             "purged_events": purged,
+            "summarized": report["summarized"],
+            "bytes_reclaimed": report["bytes_reclaimed"],
             "retention_days": retention_days,
             "message": (
                 f"Eliminados {purged} eventos con mas de "
@@ -1360,60 +2323,69 @@ class MemoryMCPServer:
         """
         Valida la integridad de la base de datos de memoria.
 
-        Delega en ``MemoryDB.check_health()`` y devuelve el resultado
-        directamente, que incluye version del esquema, estado de FTS5,
-        permisos y tamano del fichero.
+        Delega en ``MemoryDB.check_health()``, que incluye version del
+        esquema, estado de FTS5, permisos y tamano del fichero, y anade
+        ``maintenance`` con la configuracion del mantenimiento en segundo
+        plano y el informe de su ultima pasada.
 
         Args:
             db: instancia de MemoryDB abierta.
-            args: sin parametros (se ignora).
+            args: diccionario con ``repair`` (opcional) para resincronizar
+                el indice FTS5 si esta desincronizado.
 
         Returns:
             Diccionario con el informe de salud de la base de datos.
         """
-        return db.check_health()
+        report = db.check_health(repair=bool(args.get("repair", False)))
+        report["maintenance"] = {
+            "enabled": self._maintenance_interval > 0,
+            "interval_seconds": self._maintenance_interval,
+            "idle_seconds": self._maintenance_idle,
+            "last_run": db.get_maintenance_report(),
+        }
+        return report
 
     def _call_memory_export(
-        self, db: MemoryDB, args: Dict[str, Any]
+        self,
+        db: MemoryDB,
+        args: Dict[str, Any],
+        cancel: Optional[threading.Event] = None,
     ) -> Dict[str, Any]:
         """
-        Exporta las decisiones a un fichero Markdown con formato ADR-like.
-
-        Por ahora solo soporta el formato ``markdown``. El fichero de
-        salida incluye fecha, estado, etiquetas, contexto, decision
-        elegida, alternativas y justificacion de cada decision.
+        Exporta las decisiones en el formato pedido (ver ``export_decisions``).
 
         Args:
             db: instancia de MemoryDB abierta.
             args: ``format`` (str, obligatorio), ``path`` (str),
-                  ``iteration_id`` (int).
+                  ``iteration_id`` (int), ``incremental`` (bool).
+            cancel: evento de cancelacion de la peticion.
 
         Returns:
-            Diccionario con el numero de decisiones exportadas, la ruta
-            y el formato.
+            Diccionario con el numero de decisiones exportadas, la ruta,
+            el formato y si la exportacion fue incremental, o ``error``
+            si el formato no es valido.
         """
         fmt: str = args.get("format", "")
-        path: str = args.get("path", "DECISIONS.md")
-        iteration_id: Optional[int] = args.get("iteration_id")
-
-        if fmt != "markdown":
-            return {
-                "error": (
-                    f"Formato no soportado: '{fmt}'. "
-                    "Solo se admite 'markdown'."
-                ),
-            }
-
-        count = db.export_decisions_markdown(path, iteration_id)
+        path: str = args.get("path") or _EXPORT_DEFAULT_PATHS.get(
+            fmt, "DECISIONS.md"
+        )
 
-        return {
-            "exported": count,
-            "path": path,
-            "format": fmt,
-        }
+        try:
+            return db.export_decisions(
+                path,
+                fmt,
+                iteration_id=args.get("iteration_id"),
+                incremental=bool(args.get("incremental", False)),
+                cancel=cancel,
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
 
     def _call_memory_import(
-        self, db: MemoryDB, args: Dict[str, Any]
+        self,
+        db: MemoryDB,
+        args: Dict[str, Any],
+        cancel: Optional[threading.Event] = None,
     ) -> Dict[str, Any]:
         """
         Importa datos en la memoria desde fuentes externas.
@@ -1426,21 +2398,29 @@ class MemoryMCPServer:
         Args:
             db: instancia de MemoryDB abierta.
             args: ``source`` (str, obligatorio), ``path`` (str),
-                  ``limit`` (int, solo para git).
+                  ``limit`` (int, solo para git; 0 = sin limite) e
+                  ``incremental`` (bool, solo para git).
+            cancel: evento de cancelacion de la peticion.
 
         Returns:
             Diccionario con el numero de registros importados y la fuente.
         """
         source: str = args.get("source", "")
         path: Optional[str] = args.get("path")
-        limit: int = args.get("limit", 100)
+        incremental: bool = bool(args.get("incremental", True))
+        try:
+            limit = _int_argument(args, "limit", 100)
+        except ValueError as exc:
+            return {"error": str(exc)}
 
         if source == "git":
             repo_path = path or os.getcwd()
-            count = db.import_git_history(repo_path, limit)
+            count = db.import_git_history(
+                repo_path, limit, incremental=incremental, cancel=cancel,
+            )
         elif source == "adr":
             adr_path = path or "docs/adr"
-            count = db.import_adrs(adr_path)
+            count = db.import_adrs(adr_path, cancel=cancel)
         else:
             return {
                 "error": (
@@ -1454,105 +2434,612 @@ class MemoryMCPServer:
             "source": source,
         }
 
+    def _call_memory_file_history(
+        self, db: MemoryDB, args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Obtiene los commits y decisiones que tocaron una ruta.
+
+        La ruta se trata como prefijo, de modo que un directorio terminado
+        en ``/`` cubre todos sus ficheros. La consulta usa el indice de
+        ``commit_files`` en lugar de recorrer los commits.
+
+        Args:
+            db: instancia de MemoryDB abierta.
+            args: ``path`` (str, obligatorio), ``limit`` (int) y
+                ``cursor`` (str).
+
+        Returns:
+            Diccionario con los commits, las decisiones vinculadas, el
+            total de commits devueltos y ``next_cursor``.
+        """
+        path: str = args.get("path") or ""
+        cursor: Optional[str] = args.get("cursor")
+
+        try:
+            history = db.get_file_history(
+                path, limit=_int_argument(args, "limit", 50), cursor=cursor,
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
+        history["total"] = len(history["commits"])
+        return history
+
+    def _call_memory_traverse_decisions(
+        self, db: MemoryDB, args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Recorre el grafo de decisiones a partir de una decision.
+
+        Resuelve todo el subgrafo con una consulta recursiva, en lugar de
+        que el agente encadene una llamada por relacion.
+
+        Args:
+            db: instancia de MemoryDB abierta.
+            args: ``root_id`` (int, obligatorio), ``link_types`` (list),
+                ``max_depth`` (int) y ``direction`` (str).
+
+        Returns:
+            Diccionario con las decisiones alcanzadas, las relaciones entre
+            ellas y sus totales, o un error si la decision no existe.
+        """
+        root_id = args.get("root_id")
+        if root_id is None:
+            return {"error": "root_id es obligatorio"}
+
+        try:
+            graph = db.traverse_decisions(
+                int(root_id),
+                link_types=args.get("link_types"),
+                max_depth=_int_argument(args, "max_depth", 10),
+                direction=args.get("direction", "outgoing"),
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
+        if not graph["nodes"]:
+            return {"error": f"Decision {root_id} no encontrada"}
+        graph["total_nodes"] = len(graph["nodes"])
+        graph["total_edges"] = len(graph["edges"])
+        return graph
+
+    def _call_memory_batch(
+        self,
+        db: MemoryDB,
+        args: Dict[str, Any],
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta varias herramientas en una sola invocacion.
+
+        Todas las llamadas se ejecutan en orden dentro de un mismo
+        ``db.batch()`` (``BEGIN DEFERRED``): las lecturas ven una unica
+        instantanea de la BD y las escrituras se confirman juntas al
+        final. Cada llamada va ademas en su propio SAVEPOINT, asi que una
+        excepcion solo deshace sus escrituras y se devuelve como error de
+        esa llamada, sin afectar a las demas. La cancelacion, en cambio,
+        revierte el lote completo.
+
+        Args:
+            db: instancia de MemoryDB abierta (de escritura, o de solo
+                lectura si todas las llamadas son de ``_READ_TOOLS``).
+            args: ``calls`` (list de ``{name, arguments}``, obligatorio);
+                ``fields`` y ``max_chars`` se aplican a las llamadas que
+                no los indiquen.
+            cancel: evento de cancelacion; se comprueba antes de cada
+                llamada y se pasa a las de ``_CANCELLABLE_TOOLS``.
+
+        Returns:
+            Diccionario con ``results`` (una entrada por llamada, en orden,
+            con ``name`` y ``result`` o ``error``) y los totales ``succeeded``
+            y ``failed``.
+
+        Raises:
+            OperationCancelled: si ``cancel`` se activa durante el lote.
+        """
+        calls = args.get("calls")
+        if not isinstance(calls, list) or not calls:
+            return {"error": "calls debe ser una lista no vacia de llamadas."}
+        if len(calls) > _BATCH_MAX_CALLS:
+            return {
+                "error": (
+                    f"Un lote admite como maximo {_BATCH_MAX_CALLS} llamadas "
+                    f"(recibidas {len(calls)})."
+                ),
+            }
+
+        defaults = {
+            key: args[key] for key in _SHAPING_PROPERTIES if key in args
+        }
+        results: List[Dict[str, Any]] = []
+        with db.batch():
+            for call in calls:
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled()
+                results.append(self._run_batch_call(db, call, defaults, cancel))
+
+        failed = sum(1 for entry in results if entry.get("is_error"))
+        return {
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+        }
+
+    def _run_batch_call(
+        self,
+        db: MemoryDB,
+        call: Any,
+        defaults: Dict[str, Any],
+        cancel: Optional[threading.Event],
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta una llamada de ``memory_batch`` y aisla sus errores.
+
+        Args:
+            db: instancia de MemoryDB con el lote abierto.
+            call: elemento de ``calls`` (se valida aqui).
+            defaults: ``fields`` y ``max_chars`` del lote.
+            cancel: evento de cancelacion del lote.
+
+        Returns:
+            ``{name, result}`` con el resultado ya reducido por
+            ``_shape_result``, o ``{name, error}``. Ambas llevan
+            ``is_error`` cuando la llamada ha fallado.
+        """
+        name = call.get("name") if isinstance(call, dict) else None
+        arguments = call.get("arguments", {}) if isinstance(call, dict) else None
+        if name == _BATCH_TOOL:
+            return {
+                "name": name,
+                "is_error": True,
+                "error": "memory_batch no puede anidarse.",
+            }
+        if name not in _TOOL_NAMES or not isinstance(arguments, dict):
+            return {
+                "name": name,
+                "is_error": True,
+                "error": (
+                    f"Herramienta desconocida: {name}"
+                    if isinstance(arguments, dict)
+                    else "Cada llamada necesita name y arguments (objeto)."
+                ),
+            }
+
+        arguments = {**defaults, **arguments}
+        handler = getattr(self, f"_call_{name}")
+        try:
+            fields, max_chars = _shaping_options(arguments)
+            with db.batch():
+                if name in _CANCELLABLE_TOOLS:
+                    result = handler(db, arguments, cancel=cancel)
+                else:
+                    result = handler(db, arguments)
+        except OperationCancelled:
+            raise
+        except Exception as exc:
+            _log.error(
+                "Error ejecutando %s en memory_batch: %s\n%s",
+                name,
+                exc,
+                traceback.format_exc(),
+            )
+            return {"name": name, "is_error": True, "error": f"Error en {name}: {exc}"}
+
+        entry: Dict[str, Any] = {
+            "name": name,
+            "result": _shape_result(result, fields, max_chars),
+        }
+        if isinstance(result, dict) and "error" in result:
+            entry["is_error"] = True
+        return entry
+
     # --- Bucle principal ---------------------------------------------------
 
     def run(self) -> None:
         """
         Bucle principal del servidor MCP.
 
-        Lee mensajes JSON-RPC de stdin, los despacha al handler apropiado
-        y escribe las respuestas en stdout. El bucle termina cuando stdin
-        se cierra (fin del proceso padre) o cuando se recibe una senal
-        de terminacion.
-
-        Las notificaciones (mensajes sin ``id``) se procesan pero no generan
-        respuesta, conforme al protocolo JSON-RPC 2.0.
+        Ejecuta ``_serve`` en un bucle asyncio hasta que stdin se cierra
+        (fin del proceso padre) o se recibe una interrupcion. Al salir
+        cierra todas las conexiones con la base de datos.
         """
         _log.info("Servidor MCP alfred-memory iniciado")
         _log.info("DB path: %s", self._db_path)
 
         try:
-            while True:
-                try:
-                    message = _read_message()
-                except ValueError as exc:
-                    _log.error("Error leyendo mensaje: %s", exc)
-                    # Intentar enviar error de parse si es posible
-                    _write_message(_make_error(None, -32700, str(exc)))
-                    continue
-                except Exception as exc:
-                    _log.error(
-                        "Error inesperado leyendo stdin: %s\n%s",
-                        exc,
-                        traceback.format_exc(),
-                    )
-                    break
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            _log.info("Interrupcion recibida. Cerrando servidor.")
 
+        _log.info("Servidor MCP alfred-memory finalizado")
+
+    async def _serve(self) -> None:
+        """
+        Lee mensajes de forma continua y atiende cada uno sin bloquear.
+
+        Un hilo lector (``_read_stdin``) deja los mensajes en una cola del
+        bucle. Cada ``tools/call`` se lanza como tarea y el bucle vuelve a
+        la cola de inmediato, de modo que un ``ping`` o una lectura no
+        esperan a que termine una importacion. Al cerrarse stdin se esperan
+        las peticiones en curso, para que sus respuestas salgan igual que
+        con el bucle secuencial, y se cierran ejecutores y conexiones.
+        """
+        loop = asyncio.get_running_loop()
+        inbox: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self._output = _FrameWriter(sys.stdout.buffer)
+        self._read_pool = ThreadPoolExecutor(
+            max_workers=_READ_WORKERS,
+            thread_name_prefix="alfred-memory-read",
+        )
+        self._writer = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="alfred-memory-write",
+        )
+        # Hilo daemon y no un ejecutor: una lectura bloqueada en stdin no
+        # debe impedir que el proceso termine tras una interrupcion.
+        threading.Thread(
+            target=self._read_stdin,
+            args=(loop, inbox),
+            name="alfred-memory-stdin",
+            daemon=True,
+        ).start()
+
+        try:
+            while True:
+                message = await inbox.get()
                 # stdin cerrado: el proceso padre termino
                 if message is None:
                     _log.info("Stdin cerrado. Terminando servidor.")
                     break
+                self._dispatch(message)
+
+            pending = [task for task, _ in self._pending.values()]
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            await self._shutdown()
+            self._flush_output()
+
+    def _read_stdin(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        inbox: "asyncio.Queue[Optional[Dict[str, Any]]]",
+    ) -> None:
+        """
+        Lee mensajes de stdin en un hilo propio y los entrega al bucle.
+
+        Un mensaje malformado se responde con un error de parseo y la
+        lectura continua. Stdin cerrado o un error inesperado entregan
+        None, que termina el servidor.
+
+        Args:
+            loop: bucle asyncio del servidor.
+            inbox: cola de mensajes que consume ``_serve``.
+        """
+        reader = _FrameReader(sys.stdin.buffer)
+        while True:
+            try:
+                message = reader.read_message()
+            except ValueError as exc:
+                _log.error("Error leyendo mensaje: %s", exc)
+                # Intentar enviar error de parse si es posible
+                loop.call_soon_threadsafe(
+                    self._send, _make_error(None, -32700, str(exc)),
+                )
+                continue
+            except Exception as exc:
+                _log.error(
+                    "Error inesperado leyendo stdin: %s\n%s",
+                    exc,
+                    traceback.format_exc(),
+                )
+                message = None
 
-                _log.debug("Mensaje recibido: %s", json.dumps(message)[:200])
+            try:
+                loop.call_soon_threadsafe(inbox.put_nowait, message)
+            except RuntimeError:
+                # El bucle ya se ha cerrado (interrupcion)
+                return
+            if message is None:
+                return
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        """
+        Atiende un mensaje JSON-RPC desde el bucle asyncio.
 
-                # Extraer campos del mensaje JSON-RPC
-                method: str = message.get("method", "")
-                request_id = message.get("id")
-                params: Dict[str, Any] = message.get("params", {})
+        Los metodos de protocolo se responden en el acto. Cada
+        ``tools/call`` se lanza como tarea (``_run_tool_call``) y se
+        registra en ``_pending`` por su id, para poder cancelarla.
 
-                # Las notificaciones no tienen id y no requieren respuesta
-                is_notification = request_id is None
+        Las notificaciones (mensajes sin ``id``) se procesan pero no generan
+        respuesta, conforme al protocolo JSON-RPC 2.0.
 
-                # Despachar segun el metodo
-                response: Optional[Dict[str, Any]] = None
+        Args:
+            message: mensaje JSON-RPC recibido.
+        """
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug("Mensaje recibido: %s", json.dumps(message)[:200])
 
-                if method == "initialize":
-                    response = self._handle_initialize(request_id, params)
+        # Extraer campos del mensaje JSON-RPC
+        method: str = message.get("method", "")
+        request_id = message.get("id")
+        params: Dict[str, Any] = message.get("params", {})
+        self._last_activity = time.monotonic()
 
-                elif method == "notifications/initialized":
-                    # Notificacion de confirmacion del cliente. No requiere
-                    # respuesta segun el protocolo.
-                    _log.info("Cliente confirma inicializacion")
+        # Las notificaciones no tienen id y no requieren respuesta
+        is_notification = request_id is None
 
-                elif method == "tools/list":
-                    response = self._handle_tools_list(request_id, params)
+        # Despachar segun el metodo
+        response: Optional[Dict[str, Any]] = None
 
-                elif method == "tools/call":
-                    response = self._handle_tools_call(request_id, params)
+        if method == "initialize":
+            response = self._handle_initialize(request_id, params)
 
-                elif method == "ping":
-                    # Metodo de heartbeat: responder con un objeto vacio
-                    response = _make_response(request_id, {})
+        elif method == "notifications/initialized":
+            # Notificacion de confirmacion del cliente. No requiere
+            # respuesta segun el protocolo.
+            _log.info("Cliente confirma inicializacion")
 
-                else:
-                    # Metodo desconocido: si es una peticion con id, devolver
-                    # error. Si es notificacion, ignorar silenciosamente.
-                    if not is_notification:
-                        response = _make_error(
-                            request_id,
-                            -32601,
-                            f"Metodo no soportado: {method}",
-                        )
-                    else:
-                        _log.debug(
-                            "Notificacion ignorada: %s", method
-                        )
-
-                # Enviar respuesta solo si es una peticion (tiene id)
-                if response is not None and not is_notification:
-                    _write_message(response)
-                    _log.debug(
-                        "Respuesta enviada para id=%s", request_id
-                    )
+        elif method == "notifications/cancelled":
+            self._cancel_request(params.get("requestId"), params.get("reason"))
 
-        except KeyboardInterrupt:
-            _log.info("Interrupcion recibida. Cerrando servidor.")
-        finally:
-            if self._db is not None:
-                _log.info("Cerrando conexion con la base de datos")
-                self._db.close()
+        elif method == "tools/list":
+            response = self._handle_tools_list(request_id, params)
 
-        _log.info("Servidor MCP alfred-memory finalizado")
+        elif method == "tools/call":
+            # El mantenimiento en segundo plano cede a las peticiones
+            self._maintenance_cancel.set()
+            cancel = threading.Event()
+            task = asyncio.get_running_loop().create_task(
+                self._run_tool_call(request_id, params, cancel)
+            )
+            # Una invocacion sin id no se puede cancelar, pero se registra
+            # igualmente para esperarla al cerrar.
+            key = object() if is_notification else request_id
+            self._pending[key] = (task, cancel)
+            task.add_done_callback(
+                lambda done, key=key: self._forget_request(key, done)
+            )
+
+        elif method == "ping":
+            # Metodo de heartbeat: responder con un objeto vacio
+            response = _make_response(request_id, {})
+
+        else:
+            # Metodo desconocido: si es una peticion con id, devolver
+            # error. Si es notificacion, ignorar silenciosamente.
+            if not is_notification:
+                response = _make_error(
+                    request_id,
+                    -32601,
+                    f"Metodo no soportado: {method}",
+                )
+            else:
+                _log.debug("Notificacion ignorada: %s", method)
+
+        # Enviar respuesta solo si es una peticion (tiene id)
+        if response is not None and not is_notification:
+            self._send(response)
+
+    async def _run_tool_call(
+        self, request_id: Any, params: Dict[str, Any], cancel: threading.Event,
+    ) -> None:
+        """
+        Ejecuta un ``tools/call`` en su ejecutor y escribe la respuesta.
+
+        Las herramientas de ``_READ_TOOLS`` van al pool de lectores y el
+        resto al hilo escritor, que las atiende de una en una y en orden
+        de llegada. Si la peticion se cancela no se responde, como pide
+        el protocolo MCP.
+
+        Args:
+            request_id: ID del request JSON-RPC (None en una notificacion).
+            params: parametros de ``tools/call``.
+            cancel: evento que activa ``notifications/cancelled``.
+        """
+        resolved = self._resolve_tool(request_id, params)
+        if isinstance(resolved, dict):
+            response = resolved
+        else:
+            response = await self._run_in_executor(request_id, resolved, cancel)
+
+        if cancel.is_set():
+            _log.info("Peticion %s cancelada: no se responde", request_id)
+            return
+        if request_id is not None:
+            self._send(response)
+
+    async def _run_in_executor(
+        self,
+        request_id: Any,
+        resolved: Tuple[str, Callable[..., Dict[str, Any]], Dict[str, Any]],
+        cancel: threading.Event,
+    ) -> Dict[str, Any]:
+        """
+        Lleva una herramienta al pool de lectores o al hilo escritor.
+
+        La conexion de escritura se abre en el hilo escritor, que es el
+        unico que la usa; las lecturas esperan a esa primera apertura
+        porque es la que crea o migra el esquema.
+
+        Args:
+            request_id: ID del request JSON-RPC.
+            resolved: tupla de ``_resolve_tool``.
+            cancel: evento de cancelacion de la peticion.
+
+        Returns:
+            Respuesta JSON-RPC con el resultado o un error.
+        """
+        tool_name, handler, arguments = resolved
+        loop = asyncio.get_running_loop()
+
+        if self._db is None:
+            try:
+                await loop.run_in_executor(self._writer, self._ensure_db)
+            except RuntimeError as exc:
+                return _make_error(request_id, -32603, str(exc))
+
+        if self._is_read_call(tool_name, arguments):
+            return await loop.run_in_executor(
+                self._read_pool, self._execute_read,
+                request_id, tool_name, handler, arguments, cancel,
+            )
+        return await loop.run_in_executor(
+            self._writer, self._execute_tool,
+            request_id, tool_name, handler, self._db, arguments, cancel,
+        )
+
+    def _execute_read(
+        self,
+        request_id: Any,
+        tool_name: str,
+        handler: Callable[..., Dict[str, Any]],
+        arguments: Dict[str, Any],
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """Ejecuta una herramienta de lectura con la conexion del hilo."""
+        try:
+            db = self._read_db()
+        except Exception as exc:
+            return _make_error(
+                request_id,
+                -32603,
+                f"No se pudo abrir la base de datos: {exc}",
+            )
+        return self._execute_tool(
+            request_id, tool_name, handler, db, arguments, cancel,
+        )
+
+    @staticmethod
+    def _is_read_call(tool_name: str, arguments: Dict[str, Any]) -> bool:
+        """
+        Indica si una invocacion puede ir al pool de lectores.
+
+        Un ``memory_batch`` es de lectura si todas sus llamadas lo son; basta
+        una escritura para que el lote completo pase por el hilo escritor.
+
+        Args:
+            tool_name: nombre de la herramienta.
+            arguments: argumentos de la invocacion.
+
+        Returns:
+            True si solo lee de la BD.
+        """
+        if tool_name == _BATCH_TOOL:
+            calls = arguments.get("calls")
+            return isinstance(calls, list) and bool(calls) and all(
+                isinstance(call, dict) and call.get("name") in _READ_TOOLS
+                for call in calls
+            )
+        return tool_name in _READ_TOOLS
+
+    def _read_db(self) -> MemoryDB:
+        """
+        Devuelve la conexion de solo lectura del hilo actual.
+
+        Cada hilo del pool abre la suya la primera vez (``mode=ro``): en
+        WAL los lectores no se bloquean entre si ni con el escritor, y
+        cada conexion conserva su cache de lecturas.
+
+        Returns:
+            Instancia de MemoryDB en modo solo lectura.
+        """
+        db = getattr(self._read_local, "db", None)
+        if db is None:
+            db = MemoryDB(self._db_path, read_only=True)
+            self._read_local.db = db
+            with self._read_dbs_lock:
+                self._read_dbs.append(db)
+        return db
+
+    def _cancel_request(self, request_id: Any, reason: Optional[str]) -> None:
+        """
+        Atiende ``notifications/cancelled`` para una peticion en curso.
+
+        Activa su evento de cancelacion, que las importaciones y
+        exportaciones comprueban entre registros, y cancela la tarea: si
+        la herramienta aun esperaba turno en su ejecutor, ya no se
+        ejecuta. Una cancelacion que llega tarde se ignora.
+
+        Args:
+            request_id: ``requestId`` de la notificacion.
+            reason: motivo opcional indicado por el cliente.
+        """
+        entry = self._pending.get(request_id)
+        if entry is None:
+            _log.debug("Cancelacion ignorada para id=%s", request_id)
+            return
+        task, cancel = entry
+        _log.info(
+            "Cancelando peticion %s: %s", request_id, reason or "sin motivo",
+        )
+        cancel.set()
+        task.cancel()
+
+    def _forget_request(self, key: Any, task: "asyncio.Task[None]") -> None:
+        """Retira de ``_pending`` una peticion terminada."""
+        self._last_activity = time.monotonic()
+        entry = self._pending.get(key)
+        if entry is not None and entry[0] is task:
+            del self._pending[key]
+
+    def _send(self, response: Dict[str, Any]) -> None:
+        """
+        Encola una respuesta para stdout desde el hilo del bucle.
+
+        No se escribe en el acto: ``_flush_output`` se programa para la
+        siguiente vuelta del bucle, asi que las respuestas que terminan en
+        la misma vuelta salen juntas en una sola escritura.
+
+        Args:
+            response: mensaje JSON-RPC de respuesta.
+        """
+        self._output.enqueue(response)
+        _log.debug("Respuesta encolada para id=%s", response.get("id"))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_output)
+
+    def _flush_output(self) -> None:
+        """Escribe de una vez las respuestas encoladas."""
+        self._flush_scheduled = False
+        if self._output is not None:
+            self._output.flush()
+
+    async def _shutdown(self) -> None:
+        """
+        Cancela lo pendiente y cierra ejecutores y conexiones.
+
+        La conexion de escritura se cierra en el hilo escritor, el mismo
+        que la abrio.
+        """
+        self._stop_maintenance()
+        for task, cancel in list(self._pending.values()):
+            cancel.set()
+            task.cancel()
+        pending = [task for task, _ in self._pending.values()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if self._writer is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                self._writer, self._close_db,
+            )
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._read_pool is not None:
+            self._read_pool.shutdown(wait=True)
+            self._read_pool = None
+        with self._read_dbs_lock:
+            for db in self._read_dbs:
+                db.close()
+            self._read_dbs.clear()
+
+    def _close_db(self) -> None:
+        """Cierra la conexion de escritura si esta abierta."""
+        if self._db is not None:
+            _log.info("Cerrando conexion con la base de datos")
+            self._db.close()
+            self._db = None
 
 
 # ---------------------------------------------------------------------------
@@ -1560,6 +3047,22 @@ class MemoryMCPServer:
 # ---------------------------------------------------------------------------
 
 
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Lee un entero de una variable de entorno, o ``default`` si no es valido."""
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Lee un numero (admite decimales) de una variable de entorno, o ``default``."""
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
 def main() -> None:
     """
     Punto de entrada del servidor MCP.
@@ -1572,14 +3075,18 @@ def main() -> None:
     # Claude Code, no en el directorio del plugin.
     db_path = os.path.join(os.getcwd(), ".claude", "alfred-memory.db")
 
-    # Dias de retencion configurables via variable de entorno (fallback 365)
-    retention_str = os.environ.get("ALFRED_MEMORY_RETENTION_DAYS", "365")
-    try:
-        retention_days = int(retention_str)
-    except ValueError:
-        retention_days = 365
-
-    server = MemoryMCPServer(db_path=db_path, retention_days=retention_days)
+    # Retencion y presupuestos del mantenimiento configurables via
+    # variables de entorno
+    server = MemoryMCPServer(
+        db_path=db_path,
+        retention_days=_env_int("ALFRED_MEMORY_RETENTION_DAYS", 365),
+        maintenance_interval=_env_float(
+            "ALFRED_MEMORY_MAINTENANCE_INTERVAL", 3600,
+        ),
+        maintenance_idle=_env_float("ALFRED_MEMORY_MAINTENANCE_IDLE", 30),
+        analysis_limit=_env_int("ALFRED_MEMORY_ANALYSIS_LIMIT"),
+        fts_merge_pages=_env_int("ALFRED_MEMORY_FTS_MERGE_PAGES"),
+    )
     server.run()
 
 
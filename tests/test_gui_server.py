@@ -102,6 +102,24 @@ class TestGUIServerWatcher(unittest.TestCase):
         self.assertIn("events", state)
         self.assertIn("pinned", state)
 
+    def test_full_state_unpacks_large_columns(self):
+        """Los payloads y ficheros comprimidos llegan como texto JSON."""
+        from gui.server import GUIServer
+        server = GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+
+        iter_id = self.db.start_iteration("feature", "Compresion")
+        files = [f"src/generated/file_{i}.py" for i in range(300)]
+        self.db.log_event("phase_completed", payload={"artefactos": files},
+                          iteration_id=iter_id)
+        self.db.log_commit(sha="d" * 40, message="chore: generar",
+                           files=files, iteration_id=iter_id)
+
+        state = server.get_full_state()
+        self.assertEqual(json.loads(state["events"][0]["payload"]),
+                         {"artefactos": files})
+        self.assertEqual(json.loads(state["commits"][0]["files"]), files)
+        self.assertEqual(json.loads(server.poll_new_commits()[0]["files"]), files)
+
     def test_process_gui_action(self):
         """Las acciones de la GUI se escriben en SQLite."""
         from gui.server import GUIServer
@@ -119,5 +137,331 @@ class TestGUIServerWatcher(unittest.TestCase):
         self.assertEqual(pinned[0]["note"], "Importante")
 
 
+    def test_has_changes_uses_data_version(self):
+        """has_changes solo es True tras una escritura de otra conexion."""
+        from gui.server import GUIServer
+        server = GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+
+        self.assertTrue(server.has_changes())
+        self.assertFalse(server.has_changes())
+        self.db.start_iteration("feature", "Cambio")
+        self.assertTrue(server.has_changes())
+        self.assertFalse(server.has_changes())
+        server.close()
+
+
+class TestGUIServerWatchLoop(unittest.TestCase):
+    """Tests de la pausa y el despertar del watcher."""
+
+    def setUp(self):
+        self.tmp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.tmp_db.close()
+        self.db = MemoryDB(self.tmp_db.name)
+
+    def tearDown(self):
+        self.db.close()
+        os.unlink(self.tmp_db.name)
+
+    def test_paused_without_clients_and_wakes_on_connect(self):
+        """Sin clientes no se consulta la BD; al conectar uno, se reanuda."""
+        from gui.server import GUIServer
+        server = GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+        probes = []
+        original = server.has_changes
+
+        def counting_has_changes():
+            probes.append(1)
+            return original()
+
+        server.has_changes = counting_has_changes
+
+        async def scenario():
+            task = asyncio.ensure_future(server.watch_loop())
+            await asyncio.sleep(0.1)
+            idle_probes = len(probes)
+            server._ws_clients.add(object())
+            server._wake.set()
+            await asyncio.sleep(0.1)
+            server._ws_clients.clear()
+            server.stop()
+            await asyncio.wait_for(task, timeout=2)
+            return idle_probes
+
+        idle_probes = asyncio.run(scenario())
+        server.close()
+        self.assertEqual(idle_probes, 0)
+        self.assertGreater(len(probes), 0)
+
+    def test_backoff_while_idle(self):
+        """Sin cambios, los sondeos se espacian con backoff exponencial."""
+        from gui import server as server_mod
+        server = server_mod.GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+        server._ws_clients.add(object())
+        waits = []
+        original_wait_for = asyncio.wait_for
+
+        async def recording_wait_for(aw, timeout):
+            waits.append(timeout)
+            if len(waits) >= 6:
+                server.stop()
+            return await original_wait_for(aw, timeout=0.001)
+
+        with patch.object(server_mod.asyncio, "wait_for", recording_wait_for):
+            asyncio.run(server.watch_loop())
+        server.close()
+
+        self.assertEqual(waits[0], server_mod._POLL_INTERVAL)
+        self.assertEqual(waits[1], server_mod._POLL_INTERVAL * 2)
+        self.assertEqual(waits[-1], server_mod._POLL_MAX_INTERVAL)
+
+
+
+class _FakeWriter:
+    """Writer minimo que acumula los frames enviados."""
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data):
+        self.frames.append(data)
+
+    async def drain(self):
+        pass
+
+
+class TestGUIServerDeltas(unittest.TestCase):
+    """Tests de la secuencia de deltas, suscripciones y reanudacion."""
+
+    def setUp(self):
+        self.tmp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.tmp_db.close()
+        self.db = MemoryDB(self.tmp_db.name)
+        from gui.server import GUIServer
+        self.server = GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+
+    def tearDown(self):
+        self.server.close()
+        self.db.close()
+        os.unlink(self.tmp_db.name)
+
+    def test_checkpoints_start_after_existing_rows(self):
+        """Lo que ya existia al arrancar llega en init, no como update."""
+        from gui.server import GUIServer
+        iter_id = self.db.start_iteration("feature", "Previa")
+        self.db.log_event("old_event", payload={}, iteration_id=iter_id)
+        server = GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+        self.assertEqual(server.poll_new_events(), [])
+        self.db.log_event("new_event", payload={}, iteration_id=iter_id)
+        self.assertEqual(len(server.poll_new_events()), 1)
+        server.close()
+
+    def test_deltas_since_merges_in_order(self):
+        """deltas_since devuelve los registros posteriores a la secuencia."""
+        self.server.record_delta({"events": [{"id": 1}]})
+        self.server.record_delta({"events": [{"id": 2}], "decisions": [{"id": 7}]})
+        merged = self.server.deltas_since(0)
+        self.assertEqual([e["id"] for e in merged["events"]], [1, 2])
+        self.assertEqual(self.server.deltas_since(1)["events"], [{"id": 2}])
+        self.assertEqual(self.server.deltas_since(2)["events"], [])
+        self.assertIsNone(self.server.deltas_since(3))
+
+    def test_deltas_since_detects_gap(self):
+        """Si la secuencia ya salio del buffer, hace falta un init."""
+        import collections
+        self.server._deltas = collections.deque(maxlen=2)
+        for i in range(4):
+            self.server.record_delta({"events": [{"id": i}]})
+        self.assertIsNone(self.server.deltas_since(1))
+        self.assertEqual(len(self.server.deltas_since(2)["events"]), 2)
+
+    def test_parse_topic(self):
+        """La suscripcion acepta lista o cadena e ignora tipos desconocidos."""
+        iteration_id, kinds = self.server.parse_topic(
+            {"iteration_id": "3", "types": "events,bogus"})
+        self.assertEqual(iteration_id, 3)
+        self.assertEqual(kinds, frozenset({"events"}))
+        iteration_id, kinds = self.server.parse_topic({})
+        self.assertIsNone(iteration_id)
+        self.assertEqual(len(kinds), 4)
+
+    def test_get_lineage(self):
+        """El mensaje lineage devuelve el subgrafo en ambas direcciones."""
+        first = self.db.log_decision(title="Origen", chosen="A")
+        second = self.db.log_decision(title="Destino", chosen="B")
+        self.db.link_decisions(first, second, "supersedes")
+        lineage = self.server.get_lineage({"decision_id": second})
+        self.assertEqual([n["id"] for n in lineage["nodes"]], [second, first])
+        self.assertEqual(len(lineage["edges"]), 1)
+        self.assertIn("error", self.server.get_lineage({}))
+        self.assertIn("error", self.server.get_lineage(
+            {"decision_id": first, "direction": "sideways"}))
+
+    def test_history_pages_after_init(self):
+        """init trae la primera pagina y history las siguientes, sin huecos."""
+        iter_id = self.db.start_iteration("feature", "Historial")
+        self.db.log_events_bulk([{"event_type": "e"}] * 130)
+        state = self.server.get_full_state()
+        self.assertEqual(len(state["events"]), 100)
+        before_id = state["history"]["events"]
+        self.assertIsNotNone(before_id)
+        self.assertIsNone(state["history"]["decisions"])
+
+        page = self.server.get_history("events", iter_id, before_id=before_id)
+        self.assertIsNone(page["next_before_id"])
+        seen = [e["id"] for e in state["events"] + page["items"]]
+        self.assertEqual(len(seen), 130)
+        self.assertEqual(len(set(seen)), 130)
+
+        reply = self.server._history_request(
+            {"kind": "bogus", "iteration_id": iter_id})
+        self.assertIn("error", reply)
+
+    def test_filter_delta_by_iteration_and_type(self):
+        """El filtro por iteracion no afecta a los marcados."""
+        delta = {
+            "events": [{"id": 1, "iteration_id": 1}, {"id": 2, "iteration_id": 2}],
+            "decisions": [{"id": 5, "iteration_id": 2}],
+            "pinned": [{"id": 9}],
+        }
+        topic = (2, frozenset({"events", "pinned"}))
+        result = self.server.filter_delta(delta, topic)
+        self.assertEqual(result, {"events": [{"id": 2, "iteration_id": 2}],
+                                  "pinned": [{"id": 9}]})
+
+    def test_handshake_params(self):
+        """Los parametros de la URL del handshake se extraen."""
+        request = (b"GET /?since=4&epoch=abc&types=events HTTP/1.1\r\n"
+                   b"Upgrade: websocket\r\n\r\n")
+        params = self.server._handshake_params(request)
+        self.assertEqual(params, {"since": "4", "epoch": "abc", "types": "events"})
+
+    def test_initial_message_resume_or_init(self):
+        """Con epoch y secuencia validos se reanuda; si no, init completo."""
+        from gui.server import _ALL_TOPIC
+        self.server.record_delta({"events": [{"id": 1}]})
+        self.server.record_delta({"events": [{"id": 2}]})
+
+        msg = json.loads(self.server._initial_message(
+            {"since": "1", "epoch": self.server._epoch}, _ALL_TOPIC))
+        self.assertEqual(msg["type"], "resume")
+        self.assertEqual(msg["seq"], 2)
+        self.assertEqual(msg["payload"]["events"], [{"id": 2}])
+
+        msg = json.loads(self.server._initial_message(
+            {"since": "1", "epoch": "otra-instancia"}, _ALL_TOPIC))
+        self.assertEqual(msg["type"], "init")
+        self.assertEqual(msg["epoch"], self.server._epoch)
+        self.assertIn("iteration", msg["payload"])
+
+    def test_broadcast_serializes_once_per_topic(self):
+        """Tres clientes en dos suscripciones producen dos frames distintos."""
+        from gui import server as server_mod
+        all_a, all_b, only_pins = _FakeWriter(), _FakeWriter(), _FakeWriter()
+        commits_only = _FakeWriter()
+        for w in (all_a, all_b, only_pins, commits_only):
+            self.server._ws_clients.add(w)
+        self.server._ws_topics[only_pins] = (None, frozenset({"pinned"}))
+        self.server._ws_topics[commits_only] = (None, frozenset({"commits"}))
+
+        delta = {"events": [{"id": 1, "iteration_id": 1}], "pinned": [{"id": 3}],
+                 "decisions": [], "commits": []}
+        with patch.object(server_mod, "encode_frame",
+                          wraps=server_mod.encode_frame) as spy:
+            asyncio.run(self.server.broadcast_delta(1, delta))
+
+        self.assertEqual(spy.call_count, 2)
+        self.assertIs(all_a.frames[0], all_b.frames[0])
+        self.assertEqual(len(only_pins.frames), 1)
+        self.assertNotEqual(only_pins.frames[0], all_a.frames[0])
+        self.assertEqual(commits_only.frames, [])
+
+    def test_poll_once_records_sequence(self):
+        """poll_once numera y guarda el delta cuando hay cambios."""
+        asyncio.run(self.server.poll_once())
+        self.assertEqual(self.server._seq, 0)
+        iter_id = self.db.start_iteration("feature", "Delta")
+        self.db.log_event("delta_event", payload={}, iteration_id=iter_id)
+        self.assertTrue(asyncio.run(self.server.poll_once()))
+        self.assertEqual(self.server._seq, 1)
+        self.assertEqual(len(self.server.deltas_since(0)["events"]), 1)
+
+
+
+class TestGUIServerDeflate(unittest.TestCase):
+    """Negociacion de permessage-deflate con un cliente real."""
+
+    def setUp(self):
+        self.tmp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.tmp_db.close()
+        self.db = MemoryDB(self.tmp_db.name)
+        iter_id = self.db.start_iteration("feature", "Compresion")
+        for i in range(40):
+            self.db.log_decision(
+                title=f"Decision {i}", chosen="Opcion A",
+                rationale="Texto repetido " * 10, iteration_id=iter_id,
+            )
+
+    def tearDown(self):
+        self.db.close()
+        os.unlink(self.tmp_db.name)
+
+    def _connect_and_read_init(self, extensions):
+        from gui.server import GUIServer
+        from gui.websocket import PerMessageDeflate, decode_frame
+        server = GUIServer(self.tmp_db.name, http_port=0, ws_port=0)
+
+        async def scenario():
+            ws = await asyncio.start_server(server.handle_ws_client, "127.0.0.1", 0)
+            port = ws.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            request = (
+                "GET / HTTP/1.1\r\nHost: localhost\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                "Sec-WebSocket-Version: 13\r\n"
+            )
+            if extensions:
+                request += f"Sec-WebSocket-Extensions: {extensions}\r\n"
+            writer.write((request + "\r\n").encode())
+            response = await reader.readuntil(b"\r\n\r\n")
+            header = await reader.readexactly(2)
+            length = header[1] & 0x7F
+            raw_len = b""
+            if length == 126:
+                raw_len = await reader.readexactly(2)
+                length = int.from_bytes(raw_len, "big")
+            elif length == 127:
+                raw_len = await reader.readexactly(8)
+                length = int.from_bytes(raw_len, "big")
+            body = await reader.readexactly(length)
+            writer.close()
+            ws.close()
+            await ws.wait_closed()
+            return response, header + raw_len + body
+
+        response, frame = asyncio.run(scenario())
+        server.close()
+        _, payload = decode_frame(frame, deflate=PerMessageDeflate())
+        return response, frame, json.loads(payload)
+
+    def test_init_compressed_when_offered(self):
+        """Con la oferta del navegador, init viaja comprimido."""
+        response, frame, msg = self._connect_and_read_init(
+            "permessage-deflate; client_max_window_bits")
+        self.assertIn(b"Sec-WebSocket-Extensions: permessage-deflate", response)
+        self.assertTrue(frame[0] & 0x40)
+        self.assertEqual(msg["type"], "init")
+        self.assertEqual(len(msg["payload"]["decisions"]), 40)
+        raw_size = len(json.dumps(msg, ensure_ascii=False).encode())
+        self.assertLess(len(frame), raw_size // 3)
+
+    def test_init_raw_without_offer(self):
+        """Sin oferta, ni cabecera de extension ni RSV1."""
+        response, frame, msg = self._connect_and_read_init(None)
+        self.assertNotIn(b"Sec-WebSocket-Extensions", response)
+        self.assertFalse(frame[0] & 0x40)
+        self.assertEqual(msg["type"], "init")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Tests para el daemon de hooks (core/hook_daemon.py)."""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import core.memory
+from core.hook_daemon import (
+    HookDaemon, _WarmDBPool, dispatch, request, socket_path_for,
+)
+
+_PLUGIN_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_FAILING_TESTS = {
+    "tool_input": {"command": "pytest tests/"},
+    "tool_output": {"stdout": "1 failed, 3 passed", "stderr": ""},
+}
+
+
+class TestHookDaemon(unittest.TestCase):
+    """Verifica el servidor de hooks sobre un socket Unix real."""
+
+    def setUp(self):
+        self.project = tempfile.mkdtemp(prefix="alfred-hd-")
+        os.makedirs(os.path.join(self.project, ".claude"))
+        self.db_path = os.path.join(self.project, ".claude", "alfred-memory.db")
+        self.daemon = HookDaemon(self.project, idle_timeout=60)
+        self.daemon.install()
+        self.daemon.bind()
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join(timeout=5)
+        shutil.rmtree(self.project, ignore_errors=True)
+
+    def _request(self, hook, payload):
+        return request(
+            self.daemon.socket_path, hook, json.dumps(payload), cwd=self.project,
+        )
+
+    def test_socket_is_private(self):
+        mode = os.stat(self.daemon.socket_path).st_mode & 0o777
+        self.assertEqual(mode, 0o600)
+
+    def test_runs_hook_and_returns_output(self):
+        resp = self._request("quality-gate", _FAILING_TESTS)
+        self.assertEqual(resp["exit_code"], 0)
+        self.assertIn("Rompe-cosas", resp["stderr"])
+        self.assertEqual(resp["stdout"], "")
+
+    def test_hook_module_is_loaded_once(self):
+        self._request("quality-gate", _FAILING_TESTS)
+        module = self.daemon._modules["quality-gate"]
+        self._request("quality-gate", _FAILING_TESTS)
+        self.assertIs(self.daemon._modules["quality-gate"], module)
+
+    def test_unknown_hook_is_rejected(self):
+        resp = self._request("../../evil", {})
+        self.assertEqual(resp["exit_code"], 0)
+        self.assertIn("no soportado", resp["stderr"])
+
+    def test_restores_process_state(self):
+        cwd = os.getcwd()
+        stdin = sys.stdin
+        self._request("quality-gate", _FAILING_TESTS)
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertIs(sys.stdin, stdin)
+
+    def _real_db(self):
+        # Conexion propia del hilo de test, fuera del pool del daemon
+        return self.daemon._pool._factory(self.db_path)
+
+    def test_memory_db_is_reused_between_calls(self):
+        self._real_db().close()
+        pool = _WarmDBPool(self.daemon._pool._factory)
+        try:
+            first = pool(self.db_path)
+            first.close()
+            second = pool(self.db_path)
+            self.assertIs(first._pooled_db, second._pooled_db)
+            # close() no cierra la conexion compartida
+            self.assertEqual(second.get_stats()["total_decisions"], 0)
+        finally:
+            pool.close_all()
+
+    def test_memory_db_is_reopened_if_file_is_removed(self):
+        pool = _WarmDBPool(self.daemon._pool._factory)
+        try:
+            first = pool(self.db_path)._pooled_db
+            os.unlink(self.db_path)
+            self.assertIsNot(pool(self.db_path)._pooled_db, first)
+        finally:
+            pool.close_all()
+
+    def test_memory_capture_writes_through_pool(self):
+        self._real_db().close()
+        with open(os.path.join(self.project, ".claude",
+                               "alfred-dev.local.md"), "w") as f:
+            f.write("memoria:\n  enabled: true\n")
+        state = {"comando": "feature", "fase_actual": "producto",
+                 "fases_completadas": []}
+        payload = {
+            "tool_input": {
+                "file_path": os.path.join(
+                    self.project, ".claude", "alfred-dev-state.json"),
+                "content": json.dumps(state),
+            },
+        }
+        with open(payload["tool_input"]["file_path"], "w") as f:
+            json.dump(state, f)
+        resp = self._request("memory-capture", payload)
+        self.assertEqual(resp["exit_code"], 0, resp["stderr"])
+        db = self._real_db()
+        self.assertEqual(db.get_stats()["total_iterations"], 1)
+        db.close()
+        # Segunda invocacion: reutiliza la conexion caliente del daemon
+        pooled = self.daemon._pool._dbs[os.path.realpath(self.db_path)]
+        self._request("memory-capture", payload)
+        self.assertIs(
+            self.daemon._pool._dbs[os.path.realpath(self.db_path)], pooled,
+        )
+
+    def test_close_restores_memory_class(self):
+        pool = core.memory.MemoryDB
+        self.daemon.shutdown()
+        self.thread.join(timeout=5)
+        self.assertIsNot(core.memory.MemoryDB, pool)
+        self.assertIsInstance(core.memory.MemoryDB, type)
+        self.assertFalse(os.path.exists(self.daemon.socket_path))
+
+
+class TestDispatchFallback(unittest.TestCase):
+    """Sin daemon, los hooks se ejecutan en su propio proceso."""
+
+    def setUp(self):
+        self.project = tempfile.mkdtemp(prefix="alfred-hd-")
+        self._cwd = os.getcwd()
+        os.chdir(self.project)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        shutil.rmtree(self.project, ignore_errors=True)
+
+    def test_request_without_socket_returns_none(self):
+        self.assertIsNone(request(socket_path_for(self.project), "quality-gate", "{}"))
+
+    def test_stale_socket_falls_back_to_main(self):
+        os.makedirs(os.path.join(self.project, ".claude"))
+        open(socket_path_for(self.project), "w").close()
+        seen = []
+        stdin = sys.stdin
+        sys.stdin = io.StringIO('{"a": 1}')
+        try:
+            dispatch("quality-gate", lambda: seen.append(sys.stdin.read()))
+        finally:
+            sys.stdin = stdin
+        self.assertEqual(seen, ['{"a": 1}'])
+
+    def test_hook_script_runs_without_daemon(self):
+        proc = subprocess.run(
+            [sys.executable, os.path.join(_PLUGIN_ROOT, "hooks", "quality-gate.py")],
+            input=json.dumps(_FAILING_TESTS), capture_output=True, text=True,
+            cwd=self.project, timeout=30,
+        )
+        self.assertEqual(proc.returncode, 0)
+        self.assertIn("Rompe-cosas", proc.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
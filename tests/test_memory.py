@@ -17,12 +17,16 @@ import stat
 import sqlite3
 import sys
 import tempfile
+import threading
 import time
 import unittest
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from core.memory import MemoryDB, sanitize_content
+from core.memory import (
+    _SCHEMA_VERSION, MemoryDB, OperationCancelled, pack_text,
+    sanitize_content, unpack_text,
+)
 
 
 class TestMemoryDBCreation(unittest.TestCase):
@@ -69,7 +73,7 @@ class TestMemoryDBCreation(unittest.TestCase):
         conn.close()
 
         self.assertIsNotNone(row)
-        self.assertEqual(row[0], "3")
+        self.assertEqual(row[0], str(_SCHEMA_VERSION))
 
     def test_wal_mode_active(self):
         """El modo WAL debe estar activado para mejor concurrencia."""
@@ -113,7 +117,7 @@ class TestMemoryDBCreation(unittest.TestCase):
                          f"Permisos esperados 0600, obtenidos {oct(perms)}")
 
     def test_indices_exist(self):
-        """Los 8 indices definidos en el esquema deben existir."""
+        """Los 12 indices definidos en el esquema deben existir."""
         conn = sqlite3.connect(self._db_path)
         cursor = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='index' "
@@ -125,12 +129,18 @@ class TestMemoryDBCreation(unittest.TestCase):
         expected = {
             "idx_iterations_status",
             "idx_decisions_iteration",
+            "idx_decisions_decided",
+            "idx_decisions_updated",
             "idx_commits_iteration",
             "idx_events_iteration",
             "idx_events_type",
             "idx_decision_links_target",
             "idx_gui_actions_status",
             "idx_pinned_items_type",
+            "idx_decision_tags_tag",
+            "idx_events_created",
+            "idx_event_summaries_iteration",
+            "idx_commit_files_path",
         }
         self.assertEqual(expected, indices)
 
@@ -635,6 +645,398 @@ class TestSearch(unittest.TestCase):
         results = self.db.search("Optimizacion", limit=3)
         self.assertLessEqual(len(results), 3)
 
+    def test_search_ranks_title_matches_first(self):
+        """Con FTS5, un termino en el titulo pesa mas que en el contexto."""
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        self.db.log_decision(
+            title="Formato de logs",
+            chosen="JSON",
+            context="Los logs de Kafka son dificiles de leer",
+        )
+        self.db.log_decision(title="Broker Kafka", chosen="Kafka")
+
+        results = self.db.search("Kafka")
+        self.assertEqual(results[0]["title"], "Broker Kafka")
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+
+    def test_search_returns_highlighted_snippet(self):
+        """Cada resultado lleva un fragmento con el termino resaltado."""
+        results = self.db.search("Stripe")
+        self.assertGreater(len(results), 0)
+        for r in results:
+            self.assertIn("**Stripe**", r["snippet"])
+            self.assertIn("score", r)
+
+    def test_like_fallback_returns_snippet(self):
+        """El fallback LIKE tambien devuelve fragmento (sin score)."""
+        self.db._fts_enabled = False
+        results = self.db.search("stripe")
+        self.assertGreater(len(results), 0)
+        for r in results:
+            self.assertIsNone(r["score"])
+            self.assertIn("**Stripe**", r["snippet"])
+
+    def test_legacy_fts_table_is_rebuilt(self):
+        """Una BD con el indice de columna unica se reconstruye al abrir."""
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        self.db.close()
+
+        # Simular el indice antiguo: columna content y sin fts_version
+        conn = sqlite3.connect(self._db_path)
+        conn.executescript("""
+            DROP TRIGGER fts_insert_decision;
+            DROP TRIGGER fts_insert_commit;
+            DROP TRIGGER fts_update_decision;
+            DROP TRIGGER fts_update_commit;
+            DROP TRIGGER fts_delete_decision;
+            DROP TRIGGER fts_delete_commit;
+            DROP TABLE decisions_fts;
+            DROP TABLE commits_fts;
+            CREATE VIRTUAL TABLE memory_fts
+                USING fts5(source_type, source_id, content);
+            DELETE FROM meta WHERE key = 'fts_version';
+        """)
+        conn.commit()
+        conn.close()
+
+        self.db = MemoryDB(self._db_path)
+        results = self.db.search("Pasarela")
+        self.assertEqual(results[0]["title"], "Pasarela de pago")
+        tables = {
+            r[0] for r in self.db._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+        }
+        self.assertIn("decisions_fts", tables)
+        self.assertNotIn("memory_fts", tables)
+
+
+class TestSearchModes(unittest.TestCase):
+    """Tests de los modos de busqueda (frase, prefijo, subcadena, booleano)."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        self.db.start_iteration("feature", "Autenticacion")
+        self.db.log_decision(
+            title="Crear authMiddleware para las rutas privadas",
+            chosen="Middleware de Express",
+            rationale="Centraliza la validacion del token",
+        )
+        self.db.log_decision(
+            title="Rotar claves de firma", chosen="JWKS",
+        )
+        self.db.log_commit(
+            sha="b2", message="refactor: mover validacion",
+            files=["src/auth/middleware/session.ts"],
+        )
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _titles(self, query, mode):
+        return [
+            r.get("title") or r.get("message")
+            for r in self.db.search(query, mode=mode)
+        ]
+
+    def test_phrase_is_default_and_exact(self):
+        """En modo frase un identificador parcial no coincide."""
+        self.assertEqual(self.db.search("authMidd"), [])
+        self.assertEqual(len(self.db.search("rutas privadas")), 1)
+
+    def test_prefix_matches_partial_identifier(self):
+        """En modo prefijo cada palabra puede estar incompleta."""
+        self.assertEqual(
+            self._titles("authMidd rut", "prefix"),
+            ["Crear authMiddleware para las rutas privadas"],
+        )
+
+    def test_substring_matches_inside_words_and_paths(self):
+        """El modo subcadena encuentra fragmentos internos y rutas."""
+        if not self.db._trigram_enabled:
+            self.skipTest("tokenizador trigram no disponible")
+        self.assertEqual(
+            self._titles("Middleware", "substring")[0],
+            "Crear authMiddleware para las rutas privadas",
+        )
+        results = self.db.search("auth/middle", mode="substring")
+        self.assertEqual([r["sha"] for r in results], ["b2"])
+        self.assertIn("**", results[0]["snippet"])
+
+    def test_short_substring_uses_like(self):
+        """Con menos de 3 caracteres la subcadena se resuelve con LIKE."""
+        results = self.db.search("KS", mode="substring")
+        self.assertEqual([r["title"] for r in results],
+                         ["Rotar claves de firma"])
+        self.assertIsNone(results[0]["score"])
+
+    def test_like_fallback_matches_paths(self):
+        """Sin trigram, la subcadena tambien busca en la lista de ficheros."""
+        trigram = self.db.search("auth/middle", mode="substring")
+        self.db._trigram_enabled = False
+        like = self.db.search("auth/middle", mode="substring")
+        self.assertEqual([r["sha"] for r in like], ["b2"])
+        self.assertEqual([r["sha"] for r in like], [r["sha"] for r in trigram])
+        self.assertIn("**auth/middle**", like[0]["snippet"])
+        # En modo frase el LIKE sigue buscando solo en el mensaje
+        self.db._fts_enabled = False
+        self.assertEqual(self.db.search("auth/middle"), [])
+
+    def test_boolean_operators(self):
+        """El modo booleano acepta la sintaxis de FTS5."""
+        self.assertEqual(
+            sorted(self._titles("claves OR validacion", "boolean")),
+            ["Crear authMiddleware para las rutas privadas",
+             "Rotar claves de firma", "refactor: mover validacion"],
+        )
+        titles = self._titles("(claves OR token) NOT rotar", "boolean")
+        self.assertEqual(titles, ["Crear authMiddleware para las rutas privadas"])
+
+    def test_boolean_syntax_error_raises_value_error(self):
+        """Una consulta booleana mal formada es un ValueError."""
+        with self.assertRaises(ValueError):
+            self.db.search('"sin cerrar', mode="boolean")
+
+    def test_invalid_mode_rejected(self):
+        with self.assertRaises(ValueError):
+            self.db.search("x", mode="regex")
+
+    def test_update_reflected_in_trigram_index(self):
+        """Los triggers mantienen tambien los indices trigram."""
+        if not self.db._trigram_enabled:
+            self.skipTest("tokenizador trigram no disponible")
+        self.db._conn.execute(
+            "UPDATE decisions SET title = 'Crear guardSession' "
+            "WHERE title LIKE 'Crear auth%'"
+        )
+        self.assertEqual(self._titles("authMidd", "substring"), [])
+        self.assertEqual(self._titles("dSess", "substring"),
+                         ["Crear guardSession"])
+
+
+class TestReadCache(unittest.TestCase):
+    """Tests de la cache de lecturas y su invalidacion."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+        self.iter_id = self.db.start_iteration("feature", "Cache")
+        self.db.log_decision(title="Primera", chosen="A")
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _selects(self, fn):
+        """Ejecuta fn y devuelve las sentencias SELECT sobre tablas."""
+        statements = []
+        self.db._conn.set_trace_callback(statements.append)
+        try:
+            fn()
+        finally:
+            self.db._conn.set_trace_callback(None)
+        return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+    def test_repeated_read_is_served_from_cache(self):
+        self.db.get_decisions(iteration_id=self.iter_id, limit=10)
+        hits = self.db.get_stats()["cache_hits"]
+        selects = self._selects(
+            lambda: self.db.get_decisions(iteration_id=self.iter_id, limit=10)
+        )
+        self.assertEqual(selects, [])
+        self.assertEqual(self.db.get_stats()["cache_hits"], hits + 2)
+
+    def test_own_write_invalidates(self):
+        self.assertEqual(len(self.db.get_decisions()), 1)
+        self.db.log_decision(title="Segunda", chosen="B")
+        self.assertEqual(len(self.db.get_decisions()), 2)
+
+    def test_raw_sql_write_invalidates(self):
+        self.db.get_active_iteration()
+        self.db._conn.execute(
+            "UPDATE iterations SET status = 'completed' WHERE id = ?",
+            (self.iter_id,),
+        )
+        self.assertIsNone(self.db.get_active_iteration())
+
+    def test_other_connection_write_invalidates(self):
+        self.assertEqual(self.db.get_stats()["total_decisions"], 1)
+        other = MemoryDB(self._db_path)
+        try:
+            other.log_decision(title="Desde otro proceso", chosen="C")
+        finally:
+            other.close()
+        self.assertEqual(self.db.get_stats()["total_decisions"], 2)
+
+    def test_rollback_invalidates(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.batch():
+                self.db.log_decision(title="Revertida", chosen="X")
+                self.assertEqual(len(self.db.get_decisions()), 2)
+                raise RuntimeError("fallo")
+        self.assertEqual(len(self.db.get_decisions()), 1)
+
+    def test_results_are_copies(self):
+        self.db.get_active_iteration()["status"] = "alterado"
+        self.db.get_decisions()[0]["title"] = "alterado"
+        self.assertEqual(self.db.get_active_iteration()["status"], "active")
+        self.assertEqual(self.db.get_decisions()[0]["title"], "Primera")
+
+    def test_nested_results_are_copies(self):
+        """Modificar las listas anidadas de un resultado no altera la cache."""
+        self.db.log_commit(sha="a" * 40, message="m", files=["foo.py"])
+        history = self.db.get_file_history("foo.py")
+        history["commits"].append("alterado")
+        history["commits"][0]["paths"].append("otro.py")
+
+        cached = self.db.get_file_history("foo.py")
+        self.assertEqual(len(cached["commits"]), 1)
+        self.assertEqual(cached["commits"][0]["paths"], ["foo.py"])
+
+    def test_lru_is_bounded(self):
+        db = MemoryDB(self._db_path, cache_size=2)
+        try:
+            for limit in (1, 2, 3):
+                db.get_decisions(limit=limit)
+            self.assertEqual(len(db._cache), 2)
+        finally:
+            db.close()
+
+    def test_cache_can_be_disabled(self):
+        db = MemoryDB(self._db_path, cache_size=0)
+        try:
+            db.get_active_iteration()
+            db.get_active_iteration()
+            stats = db.get_stats()
+            self.assertEqual((stats["cache_hits"], stats["cache_misses"]),
+                             (0, 0))
+        finally:
+            db.close()
+
+
+class TestFTSMaintenance(unittest.TestCase):
+    """Tests de los indices FTS5 de contenido externo y su mantenimiento."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        self.db.start_iteration("feature", "Indices")
+        self.dec_id = self.db.log_decision(
+            title="Usar Redis", chosen="Redis", rationale="Latencia baja",
+        )
+        self.commit_id = self.db.log_commit(sha="a1", message="feat: cache Redis")
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _titles(self, query):
+        return [r.get("title") or r.get("message") for r in self.db.search(query)]
+
+    def test_text_is_not_duplicated(self):
+        """El indice lee el texto de las tablas origen, no guarda copia."""
+        tables = {
+            r[0] for r in self.db._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+        }
+        self.assertNotIn("decisions_fts_content", tables)
+        self.assertNotIn("commits_fts_content", tables)
+
+    def test_update_is_reflected(self):
+        """Editar una columna indexada actualiza el indice."""
+        self.db._conn.execute(
+            "UPDATE decisions SET title = 'Usar Memcached' WHERE id = ?",
+            (self.dec_id,),
+        )
+        self.assertEqual(self._titles("Memcached"), ["Usar Memcached"])
+        self.assertNotIn("Usar Redis", self._titles("Usar"))
+
+    def test_delete_is_reflected(self):
+        """Borrar una fila la retira del indice."""
+        self.db._conn.execute("DELETE FROM commits WHERE id = ?",
+                              (self.commit_id,))
+        self.assertEqual(self._titles("cache"), [])
+        self.assertEqual(self.db.check_health()["status"], "healthy")
+
+    def test_status_change_keeps_results_current(self):
+        """update_decision_status no reindexa y la busqueda ve el estado."""
+        self.db.update_decision_status(self.dec_id, "superseded")
+        results = self.db.search("Redis", status="superseded")
+        self.assertEqual([r["id"] for r in results], [self.dec_id])
+        self.assertEqual(self.db.search("Redis", status="active"), [])
+
+    def test_health_detects_and_repairs_missing_rows(self):
+        """Una fila sin indexar se detecta y se indexa de forma incremental."""
+        self.db._conn.execute("DROP TRIGGER fts_insert_decision")
+        self.db.log_decision(title="Usar Kafka", chosen="Kafka")
+        health = self.db.check_health()
+        self.assertEqual(health["status"], "errors")
+        self.assertIn("1 filas sin indexar", health["issues"][0])
+
+        health = self.db.check_health(repair=True)
+        self.assertEqual(health["status"], "healthy")
+        self.assertEqual(health["fts_repair"]["mode"], "incremental")
+        self.assertEqual(health["fts_repair"]["indexed"]["decisions_fts"], 1)
+        self.assertEqual(health["fts_repair"]["indexed"]["commits_fts"], 0)
+        self.assertEqual(self._titles("Kafka"), ["Usar Kafka"])
+
+    def test_orphans_force_full_rebuild(self):
+        """Una entrada huerfana solo se puede retirar reconstruyendo."""
+        self.db._conn.execute("DROP TRIGGER fts_delete_commit")
+        self.db._conn.execute("DELETE FROM commits WHERE id = ?",
+                              (self.commit_id,))
+        self.assertEqual(self.db.rebuild_fts()["mode"], "full")
+        self.assertEqual(self.db.check_health()["status"], "healthy")
+        self.assertEqual(self._titles("cache"), [])
+
+    def test_orphans_only_rebuild_affected_index(self):
+        """La reconstruccion completa se limita a los indices con huerfanas."""
+        self.db._conn.execute("DROP TRIGGER fts_delete_commit")
+        self.db._conn.execute("DELETE FROM commits WHERE id = ?",
+                              (self.commit_id,))
+        result = self.db.rebuild_fts()
+        self.assertIn("commits_fts", result["rebuilt"])
+        self.assertNotIn("decisions_fts", result["rebuilt"])
+
+    def test_optimize_keeps_results(self):
+        """optimize y merge no alteran los resultados."""
+        for i in range(20):
+            self.db.log_decision(title=f"Decision Redis {i}", chosen="x")
+        before = self._titles("Redis")
+        self.db.optimize_fts(incremental=True)
+        self.db.optimize_fts()
+        self.assertEqual(self._titles("Redis"), before)
+
 
 class TestEvents(unittest.TestCase):
     """Tests de CRUD sobre eventos."""
@@ -758,6 +1160,97 @@ class TestEvents(unittest.TestCase):
         deleted = self.db.purge_old_events(retention_days=30)
         self.assertEqual(deleted, 0)
 
+    def _insert_old_events(self, iteration_id, count, day="2020-01-01"):
+        """Inserta ``count`` eventos con fecha antigua directamente por SQL."""
+        self.db._conn.executemany(
+            "INSERT INTO events (iteration_id, event_type, payload, created_at) "
+            "VALUES (?, 'phase_completed', ?, ?)",
+            [
+                (iteration_id, "x" * 500, f"{day}T10:{i % 60:02d}:00+00:00")
+                for i in range(count)
+            ],
+        )
+        self.db._conn.commit()
+
+    def test_compact_events_summarizes_in_batches(self):
+        """compact_events borra por lotes y deja un resumen por dia y tipo."""
+        iter_id = self.db.start_iteration("feature", "Compactar")
+        self._insert_old_events(iter_id, 25)
+        self._insert_old_events(iter_id, 5, day="2020-01-02")
+        self.db.log_event("phase_completed", iteration_id=iter_id)
+
+        report = self.db.compact_events(30, batch_size=10, pause=0)
+        self.assertEqual(report["deleted"], 30)
+        self.assertEqual(report["batches"], 3)
+        self.assertEqual(len(self.db.get_timeline(iter_id)), 1)
+
+        summaries = self.db.get_event_summaries(iter_id)
+        self.assertEqual(
+            [(s["day"], s["event_type"], s["count"]) for s in summaries],
+            [("2020-01-01", "phase_completed", 25),
+             ("2020-01-02", "phase_completed", 5)],
+        )
+        self.assertEqual(summaries[0]["first_at"], "2020-01-01T10:00:00+00:00")
+        self.assertEqual(self.db.get_stats()["total_events"], 1)
+
+    def test_compact_events_accumulates_existing_summary(self):
+        """Una segunda compactacion suma al resumen existente del mismo dia."""
+        self._insert_old_events(None, 3)
+        self.db.compact_events(30, pause=0)
+        self._insert_old_events(None, 2)
+        self.db.compact_events(30, pause=0)
+
+        summaries = self.db.get_event_summaries()
+        self.assertEqual(len(summaries), 1)
+        self.assertIsNone(summaries[0]["iteration_id"])
+        self.assertEqual(summaries[0]["count"], 5)
+
+    def test_compact_events_reclaims_space(self):
+        """Tras compactar, incremental_vacuum devuelve las paginas libres."""
+        auto_vacuum = self.db._conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        self.assertEqual(auto_vacuum, 2)
+        self._insert_old_events(None, 2000)
+
+        report = self.db.compact_events(30, batch_size=500, pause=0)
+        self.assertEqual(report["deleted"], 2000)
+        self.assertGreater(report["bytes_reclaimed"], 0)
+        freelist = self.db._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        self.assertEqual(freelist, 0)
+
+    def test_run_maintenance_reports_each_step(self):
+        """run_maintenance purga, analiza, fusiona, hace checkpoint y lo guarda."""
+        self._insert_old_events(None, 3)
+        self.assertIsNone(self.db.get_maintenance_report())
+
+        report = self.db.run_maintenance(retention_days=30)
+        self.assertFalse(report["interrupted"])
+        self.assertEqual(
+            list(report["steps"]),
+            ["purge", "optimize", "fts_merge", "checkpoint"],
+        )
+        self.assertEqual(report["steps"]["purge"]["deleted"], 3)
+        self.assertEqual(report["steps"]["optimize"]["action"], "analyze")
+        self.assertFalse(report["steps"]["checkpoint"]["busy"])
+        self.assertEqual(self.db.get_maintenance_report(), report)
+
+        # Con estadisticas ya calculadas basta PRAGMA optimize; sin
+        # retention_days no se purga
+        report = self.db.run_maintenance()
+        self.assertNotIn("purge", report["steps"])
+        self.assertEqual(report["steps"]["optimize"]["action"], "optimize")
+
+    def test_run_maintenance_stops_when_cancelled(self):
+        """Con el evento activo la pasada se abandona y queda interrumpida."""
+        self._insert_old_events(None, 3)
+        cancel = threading.Event()
+        cancel.set()
+
+        report = self.db.run_maintenance(retention_days=30, cancel=cancel)
+        self.assertTrue(report["interrupted"])
+        self.assertEqual(report["steps"], {})
+        self.assertEqual(self.db.get_stats()["total_events"], 3)
+        self.assertTrue(self.db.get_maintenance_report()["interrupted"])
+
 
 class TestStats(unittest.TestCase):
     """Tests de estadisticas generales."""
@@ -806,7 +1299,7 @@ class TestStats(unittest.TestCase):
         stats = self.db.get_stats()
 
         self.assertIn("schema_version", stats)
-        self.assertEqual(stats["schema_version"], "3")
+        self.assertEqual(stats["schema_version"], str(_SCHEMA_VERSION))
         self.assertIn("fts_enabled", stats)
         self.assertIn("created_at", stats)
 
@@ -860,7 +1353,98 @@ class TestReopen(unittest.TestCase):
         stats = db2.get_stats()
         db2.close()
 
-        self.assertEqual(stats["schema_version"], "3")
+        self.assertEqual(stats["schema_version"], str(_SCHEMA_VERSION))
+
+    def test_user_version_stamped(self):
+        """La apertura completa marca PRAGMA user_version con el esquema."""
+        MemoryDB(self._db_path).close()
+        conn = sqlite3.connect(self._db_path)
+        row = conn.execute("PRAGMA user_version").fetchone()
+        conn.close()
+        self.assertEqual(row[0], _SCHEMA_VERSION)
+
+    def test_reopen_skips_schema_ddl(self):
+        """Con el esquema al dia, reabrir no ejecuta DDL ni deteccion de FTS5."""
+        MemoryDB(self._db_path).close()
+        statements = []
+        original_connect = sqlite3.connect
+
+        def tracing_connect(*args, **kwargs):
+            conn = original_connect(*args, **kwargs)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        sqlite3.connect = tracing_connect
+        try:
+            db = MemoryDB(self._db_path)
+        finally:
+            sqlite3.connect = original_connect
+        fts_enabled = db.fts_enabled
+        db.close()
+
+        ddl = [s for s in statements
+               if s.lstrip().upper().startswith(("CREATE", "DROP", "INSERT"))]
+        self.assertEqual(ddl, [])
+        self.assertTrue(fts_enabled)
+
+    def test_fts_availability_read_from_meta(self):
+        """En la apertura rapida, fts_enabled se toma de meta."""
+        MemoryDB(self._db_path).close()
+        conn = sqlite3.connect(self._db_path)
+        conn.execute("UPDATE meta SET value = '0' WHERE key = 'fts_enabled'")
+        conn.commit()
+        conn.close()
+
+        db = MemoryDB(self._db_path)
+        self.assertFalse(db.fts_enabled)
+        db.close()
+
+    def test_stale_user_version_runs_full_open(self):
+        """Un user_version antiguo fuerza la inicializacion completa."""
+        MemoryDB(self._db_path).close()
+        conn = sqlite3.connect(self._db_path)
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute("DROP TABLE decision_tags")
+        conn.close()
+
+        MemoryDB(self._db_path).close()
+        conn = sqlite3.connect(self._db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = {r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        self.assertEqual(version, _SCHEMA_VERSION)
+        self.assertIn("decision_tags", tables)
+
+    def test_read_only_reads_and_rejects_writes(self):
+        """read_only=True permite leer pero no escribir."""
+        db = MemoryDB(self._db_path)
+        db.log_decision(title="Usar SQLite", chosen="SQLite")
+        db.close()
+
+        ro = MemoryDB(self._db_path, read_only=True)
+        try:
+            self.assertEqual(len(ro.get_decisions()), 1)
+            self.assertEqual(len(ro.search("SQLite")), 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                ro.log_decision(title="Otra", chosen="X")
+        finally:
+            ro.close()
+
+    def test_read_only_upgrades_stale_schema(self):
+        """Un lector de solo lectura actualiza antes un esquema antiguo."""
+        _create_v1_db(self._db_path)
+
+        ro = MemoryDB(self._db_path, read_only=True)
+        stats = ro.get_stats()
+        ro.close()
+        self.assertEqual(stats["schema_version"], str(_SCHEMA_VERSION))
+
+    def test_read_only_missing_file_raises(self):
+        """Abrir en solo lectura un fichero inexistente falla."""
+        os.unlink(self._db_path)
+        with self.assertRaises(sqlite3.OperationalError):
+            MemoryDB(self._db_path, read_only=True)
 
 
 # ---------------------------------------------------------------------------
@@ -973,17 +1557,17 @@ class TestSchemaMigration(unittest.TestCase):
         stats = db.get_stats()
         db.close()
 
-        self.assertEqual(stats["schema_version"], "3")
+        self.assertEqual(stats["schema_version"], str(_SCHEMA_VERSION))
 
-    def test_v1_db_migrates_to_v3(self):
-        """Una DB con esquema v1 debe migrar automaticamente a v3 al abrirla."""
+    def test_v1_db_migrates_to_latest(self):
+        """Una DB con esquema v1 debe migrar automaticamente a la ultima version."""
         _create_v1_db(self._db_path)
 
         db = MemoryDB(self._db_path)
         stats = db.get_stats()
         db.close()
 
-        self.assertEqual(stats["schema_version"], "3")
+        self.assertEqual(stats["schema_version"], str(_SCHEMA_VERSION))
 
     def test_migration_creates_backup(self):
         """Al migrar, se debe crear una copia de seguridad (.bak) del fichero."""
@@ -1037,6 +1621,262 @@ class TestSchemaMigration(unittest.TestCase):
             "La tabla decision_links no se encontro en sqlite_master"
         )
 
+    def test_v3_migration_backfills_decision_tags(self):
+        """Al migrar de v3, decision_tags se puebla desde el JSON de tags."""
+        db = MemoryDB(self._db_path)
+        dec_a = db.log_decision(title="A", chosen="A", tags=["api", "auth"])
+        dec_b = db.log_decision(title="B", chosen="B", tags=["api"])
+        db.log_decision(title="C", chosen="C")
+        # Simular una BD v3: sin tabla normalizada ni version 4
+        db._conn.execute("DROP TABLE decision_tags")
+        db._conn.execute(
+            "UPDATE meta SET value = '3' WHERE key = 'schema_version'"
+        )
+        db._conn.commit()
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        rows = db._conn.execute(
+            "SELECT decision_id, tag FROM decision_tags "
+            "ORDER BY decision_id, tag"
+        ).fetchall()
+        api = db.get_decisions(tags=["api"])
+        db.close()
+
+        self.assertEqual(
+            [tuple(r) for r in rows],
+            [(dec_a, "api"), (dec_a, "auth"), (dec_b, "api")],
+        )
+        self.assertEqual({d["id"] for d in api}, {dec_a, dec_b})
+
+    def test_v4_migration_seeds_counters(self):
+        """Al migrar de v4, los contadores parten del recuento real."""
+        db = MemoryDB(self._db_path)
+        db.start_iteration("feature", "Migracion")
+        db.log_decision(title="A", chosen="A")
+        db.log_event("phase_completed")
+        # Simular una BD v4: sin contadores ni sus triggers
+        for table in ("iterations", "decisions", "commits", "events"):
+            db._conn.execute(f"DROP TRIGGER counters_insert_{table}")
+            db._conn.execute(f"DROP TRIGGER counters_delete_{table}")
+        db._conn.execute("DROP TABLE counters")
+        db._conn.execute(
+            "UPDATE meta SET value = '4' WHERE key = 'schema_version'"
+        )
+        db._conn.commit()
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        stats = db.get_stats()
+        db.log_decision(title="B", chosen="B")
+        after = db.get_stats()["total_decisions"]
+        db.close()
+
+        self.assertEqual(stats["total_iterations"], 1)
+        self.assertEqual(stats["total_decisions"], 1)
+        self.assertEqual(stats["total_events"], 1)
+        self.assertEqual(after, 2)
+
+    def test_v5_migration_enables_incremental_vacuum(self):
+        """Al migrar de v5, la BD pasa a auto_vacuum incremental."""
+        db = MemoryDB(self._db_path)
+        db.log_event("phase_completed")
+        # Simular una BD v5: sin resumenes ni auto_vacuum
+        db._conn.execute("DROP TABLE event_summaries")
+        db._conn.execute("DROP INDEX idx_events_created")
+        db._conn.execute(
+            "UPDATE meta SET value = '5' WHERE key = 'schema_version'"
+        )
+        db._conn.commit()
+        db._conn.execute("PRAGMA auto_vacuum = NONE")
+        db._conn.execute("VACUUM")
+        self.assertEqual(
+            db._conn.execute("PRAGMA auto_vacuum").fetchone()[0], 0,
+        )
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        auto_vacuum = db._conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        summaries = db.get_event_summaries()
+        total = db.get_stats()["total_events"]
+        db.close()
+
+        self.assertEqual(auto_vacuum, 2)
+        self.assertEqual(summaries, [])
+        self.assertEqual(total, 1)
+
+    def test_v6_migration_backfills_commit_files(self):
+        """Al migrar de v6, commit_files se puebla desde commits.files."""
+        db = MemoryDB(self._db_path)
+        small = db.log_commit(sha="k" * 40, message="a", files=["src/a.py"])
+        many = [f"gen/file_{i}.py" for i in range(300)]
+        large = db.log_commit(sha="l" * 40, message="b", files=many)
+        # Simular una BD v6: sin la tabla de rutas
+        db._conn.execute("DROP TABLE commit_files")
+        db._conn.execute(
+            "UPDATE meta SET value = '6' WHERE key = 'schema_version'"
+        )
+        db._conn.commit()
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        small_history = db.get_file_history("src/")
+        large_history = db.get_file_history("gen/")
+        db.close()
+
+        self.assertEqual([c["id"] for c in small_history["commits"]], [small])
+        self.assertEqual([c["id"] for c in large_history["commits"]], [large])
+        self.assertEqual(len(large_history["commits"][0]["paths"]), 300)
+
+    def test_v7_migration_rebuilds_listing_indexes(self):
+        """Al migrar de v7, los indices siguen el orden de los listados."""
+        db = MemoryDB(self._db_path)
+        # Simular una BD v7: indices de una sola columna
+        db._conn.executescript(
+            "DROP INDEX idx_decisions_decided;"
+            "DROP INDEX idx_decisions_iteration;"
+            "CREATE INDEX idx_decisions_iteration ON decisions(iteration_id);"
+            "DROP INDEX idx_events_iteration;"
+            "CREATE INDEX idx_events_iteration ON events(iteration_id);"
+            "UPDATE meta SET value = '7' WHERE key = 'schema_version';"
+        )
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        columns = {
+            name: [r[2] for r in db._conn.execute(f"PRAGMA index_info({name})")]
+            for name in ("idx_decisions_iteration", "idx_decisions_decided",
+                         "idx_events_iteration")
+        }
+        db.close()
+
+        self.assertEqual(columns, {
+            "idx_decisions_iteration": ["iteration_id", "decided_at"],
+            "idx_decisions_decided": ["decided_at"],
+            "idx_events_iteration": ["iteration_id", "created_at"],
+        })
+
+    def test_v8_migration_adds_decision_updated_at(self):
+        """Al migrar de v8, updated_at se rellena con decided_at."""
+        db = MemoryDB(self._db_path)
+        dec_id = db.log_decision(title="A", chosen="A")
+        # Simular una BD v8: sin columna updated_at ni su indice
+        db._conn.executescript(
+            "DROP INDEX idx_decisions_updated;"
+            "ALTER TABLE decisions DROP COLUMN updated_at;"
+            "UPDATE meta SET value = '8' WHERE key = 'schema_version';"
+        )
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        row = db._conn.execute(
+            "SELECT decided_at, updated_at FROM decisions WHERE id = ?",
+            (dec_id,),
+        ).fetchone()
+        index = db._conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'idx_decisions_updated'"
+        ).fetchone()
+        db.close()
+
+        self.assertEqual(row["updated_at"], row["decided_at"])
+        self.assertIsNotNone(index)
+
+    def test_v9_migration_unpacks_commit_files(self):
+        """Al migrar de v9, las listas comprimidas pasan a texto y se indexan."""
+        db = MemoryDB(self._db_path)
+        files = [f"gen/file_{i}.py" for i in range(300)]
+        commit_id = db.log_commit(sha="m" * 40, message="b", files=files)
+        # Simular una BD v9: lista comprimida e indices de la version 5
+        db._conn.executescript(
+            "DROP TRIGGER fts_insert_commit;"
+            "DROP TRIGGER fts_update_commit;"
+            "DROP TRIGGER fts_delete_commit;"
+            "UPDATE meta SET value = '9' WHERE key = 'schema_version';"
+            "UPDATE meta SET value = '5' WHERE key = 'fts_version';"
+        )
+        db._conn.execute(
+            "UPDATE commits SET files = ? WHERE id = ?",
+            (pack_text(json.dumps(files)), commit_id),
+        )
+        db._conn.commit()
+        db.close()
+
+        db = MemoryDB(self._db_path)
+        stored = db._conn.execute(
+            "SELECT files FROM commits WHERE id = ?", (commit_id,)
+        ).fetchone()[0]
+        results = db.search("file_123", mode="substring")
+        db.close()
+
+        self.assertEqual(json.loads(stored), files)
+        self.assertEqual([r["id"] for r in results], [commit_id])
+
+
+class TestRowCounters(unittest.TestCase):
+    """Tests de los contadores de filas mantenidos por triggers."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _totals(self, exact):
+        stats = self.db.get_stats(exact=exact)
+        return {k: v for k, v in stats.items() if k.startswith("total_")}
+
+    def test_counters_track_inserts_and_deletes(self):
+        self.db.start_iteration("feature", "Contadores")
+        for i in range(3):
+            self.db.log_decision(title=f"D{i}", chosen="x")
+        self.db.log_commit(sha="abc", message="feat")
+        self.db.log_commit(sha="abc", message="duplicado ignorado")
+        self.db.log_events_bulk([{"event_type": "e"}] * 5)
+        self.db._conn.execute("DELETE FROM events WHERE id <= 2")
+        expected = {
+            "total_iterations": 1, "total_decisions": 3,
+            "total_commits": 1, "total_events": 3,
+        }
+        self.assertEqual(self._totals(exact=False), expected)
+        self.assertEqual(self._totals(exact=True), expected)
+
+    def test_default_stats_do_not_count_rows(self):
+        statements = []
+        self.db._conn.set_trace_callback(statements.append)
+        try:
+            self.db.get_stats()
+        finally:
+            self.db._conn.set_trace_callback(None)
+        self.assertFalse(any("COUNT(" in s for s in statements))
+
+    def test_fts_row_count_counts_docsize_rows(self):
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        with self.db.batch():
+            for i in range(300):
+                self.db.log_decision(title=f"D{i}", chosen="x")
+        self.db._conn.execute("DELETE FROM decisions WHERE id <= 10")
+        self.assertEqual(self.db._fts_row_count("decisions_fts"), 290)
+        self.assertEqual(self.db._fts_row_count("commits_fts"), 0)
+
+    def test_health_repairs_drifted_counters(self):
+        self.db.log_decision(title="D", chosen="x")
+        self.db._conn.execute(
+            "UPDATE counters SET value = 7 WHERE name = 'decisions'"
+        )
+        health = self.db.check_health(repair=True)
+        self.assertTrue(health["counters_repaired"])
+        self.assertEqual(self.db.get_stats()["total_decisions"], 1)
+
 
 class TestDecisionTagsAndStatus(unittest.TestCase):
     """Tests de etiquetas y estado en decisiones.
@@ -1198,6 +2038,79 @@ class TestDecisionLinks(unittest.TestCase):
         links = self.db.get_decision_links(dec)
         self.assertEqual(links, [])
 
+    def _chain(self, count):
+        """Crea ``count`` decisiones encadenadas con depends_on."""
+        ids = [
+            self.db.log_decision(title=f"Decision {i}", chosen=str(i))
+            for i in range(count)
+        ]
+        for source, target in zip(ids, ids[1:]):
+            self.db.link_decisions(source, target, "depends_on")
+        return ids
+
+    def test_traverse_decisions_chain(self):
+        """El recorrido sigue la cadena y respeta max_depth."""
+        ids = self._chain(5)
+        graph = self.db.traverse_decisions(ids[0])
+        self.assertEqual([n["id"] for n in graph["nodes"]], ids)
+        self.assertEqual([n["depth"] for n in graph["nodes"]], [0, 1, 2, 3, 4])
+        self.assertEqual(len(graph["edges"]), 4)
+
+        graph = self.db.traverse_decisions(ids[0], max_depth=2)
+        self.assertEqual([n["id"] for n in graph["nodes"]], ids[:3])
+        self.assertEqual(len(graph["edges"]), 2)
+
+    def test_traverse_decisions_cycle_terminates(self):
+        """Un ciclo no repite nodos: cada uno sale con su profundidad minima."""
+        ids = self._chain(3)
+        self.db.link_decisions(ids[2], ids[0], "depends_on")
+        graph = self.db.traverse_decisions(ids[0], max_depth=50)
+        self.assertEqual([n["id"] for n in graph["nodes"]], ids)
+        self.assertEqual([n["depth"] for n in graph["nodes"]], [0, 1, 2])
+        self.assertEqual(len(graph["edges"]), 3)
+
+    def test_traverse_decisions_direction_and_types(self):
+        """incoming recorre hacia atras y link_types filtra las relaciones."""
+        ids = self._chain(3)
+        other = self.db.log_decision(title="Sustituta", chosen="S")
+        self.db.link_decisions(other, ids[2], "supersedes")
+
+        graph = self.db.traverse_decisions(ids[2], direction="incoming")
+        self.assertEqual({n["id"] for n in graph["nodes"]},
+                         set(ids) | {other})
+        graph = self.db.traverse_decisions(
+            ids[2], direction="incoming", link_types=["supersedes"])
+        self.assertEqual([n["id"] for n in graph["nodes"]], [ids[2], other])
+        self.assertEqual(graph["edges"], [{
+            "source_id": other, "target_id": ids[2],
+            "link_type": "supersedes",
+        }])
+
+        graph = self.db.traverse_decisions(ids[1], direction="both",
+                                           max_depth=1)
+        self.assertEqual({n["id"] for n in graph["nodes"]}, set(ids))
+
+    def test_traverse_decisions_missing_root_and_invalid_args(self):
+        """Raiz inexistente devuelve grafo vacio; argumentos invalidos fallan."""
+        graph = self.db.traverse_decisions(999)
+        self.assertEqual(graph, {"root_id": 999, "nodes": [], "edges": []})
+        with self.assertRaises(ValueError):
+            self.db.traverse_decisions(1, direction="sideways")
+        with self.assertRaises(ValueError):
+            self.db.traverse_decisions(1, max_depth=-1)
+
+    def test_traverse_decisions_uses_target_index(self):
+        """El recorrido hacia atras busca por idx_decision_links_target."""
+        plan = " ".join(
+            row[3] for row in self.db._conn.execute(
+                "EXPLAIN QUERY PLAN WITH RECURSIVE walk(id, depth) AS ("
+                "SELECT 1, 0 UNION SELECT l.source_id, w.depth + 1 "
+                "FROM walk w JOIN decision_links l ON l.target_id = w.id "
+                "WHERE w.depth < 10) SELECT id FROM walk"
+            )
+        )
+        self.assertIn("idx_decision_links_target", plan)
+
 
 class TestSearchFilters(unittest.TestCase):
     """Tests de los filtros avanzados de busqueda (since, until, tags, status).
@@ -1324,6 +2237,61 @@ class TestSearchFilters(unittest.TestCase):
         )
         self.assertNotIn("Estrategia de despliegue antigua", titles)
 
+    def test_selective_filter_still_fills_limit(self):
+        """Un filtro selectivo no reduce los resultados por debajo de limit.
+
+        Con filtrado posterior al LIMIT, 30 coincidencias sin la etiqueta
+        desplazaban a las 5 que si la tienen. Con el filtro en SQL deben
+        aparecer todas las que cumplen hasta alcanzar el limite.
+        """
+        for i in range(30):
+            self.db.log_decision(title=f"Ruido de indexado {i}", chosen="X")
+        for i in range(5):
+            self.db.log_decision(
+                title=f"Ruido de indexado etiquetado {i}",
+                chosen="Y",
+                tags=["objetivo"],
+            )
+
+        results = self.db.search("Ruido de indexado", limit=5, tags=["objetivo"])
+        self.assertEqual(len(results), 5)
+        for r in results:
+            self.assertEqual(r["source_type"], "decision")
+            self.assertIn("objetivo", r["tags"])
+
+    def test_tags_filter_excludes_commits(self):
+        """Filtrar por tags o status excluye commits (no tienen esas columnas)."""
+        self.db.log_decision(
+            title="Refactor del parser", chosen="PEG", tags=["parser"],
+        )
+        self.db.log_commit(sha="p1" * 20, message="Refactor del parser")
+
+        results = self.db.search("Refactor del parser", tags=["parser"])
+        self.assertEqual(
+            [r["source_type"] for r in results], ["decision"]
+        )
+        results = self.db.search("Refactor del parser", status="active")
+        self.assertEqual(
+            [r["source_type"] for r in results], ["decision"]
+        )
+
+    def test_like_fallback_applies_filters_in_sql(self):
+        """El fallback LIKE aplica los mismos filtros que la ruta FTS5."""
+        self.db._fts_enabled = False
+        for i in range(10):
+            self.db.log_decision(title=f"Cola de trabajos {i}", chosen="X")
+        dec_id = self.db.log_decision(
+            title="Cola de trabajos final", chosen="Y", tags=["colas"],
+        )
+        self.db.log_commit(sha="q1" * 20, message="Cola de trabajos")
+
+        results = self.db.search("Cola de trabajos", limit=1, tags=["colas"])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["id"], dec_id)
+
+        results = self.db.search("Cola de trabajos", until="2000-01-01")
+        self.assertEqual(results, [])
+
     def test_get_decisions_with_tags_filter(self):
         """get_decisions filtra por etiquetas en SQL."""
         self.db.log_decision(
@@ -1341,6 +2309,50 @@ class TestSearchFilters(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]["title"], "Patron de acceso a datos")
 
+    def test_get_decisions_tags_mode_all(self):
+        """tags_mode='all' exige que la decision tenga todas las etiquetas."""
+        both = self.db.log_decision(
+            title="Tokens de sesion", chosen="JWT", tags=["security", "api"],
+        )
+        self.db.log_decision(
+            title="Rate limiting", chosen="Token bucket", tags=["api"],
+        )
+
+        any_ids = {
+            d["id"] for d in self.db.get_decisions(tags=["security", "api"])
+        }
+        all_ids = [
+            d["id"] for d in self.db.get_decisions(
+                tags=["security", "api"], tags_mode="all",
+            )
+        ]
+        self.assertEqual(len(any_ids), 2)
+        self.assertEqual(all_ids, [both])
+
+    def test_get_decisions_invalid_tags_mode(self):
+        """Un tags_mode desconocido lanza ValueError."""
+        with self.assertRaises(ValueError):
+            self.db.get_decisions(tags=["api"], tags_mode="some")
+
+    def test_add_decision_tags_writes_through(self):
+        """add_decision_tags actualiza tambien la tabla decision_tags."""
+        dec_id = self.db.log_decision(title="Cola", chosen="SQS", tags=["infra"])
+        self.db.add_decision_tags(dec_id, ["infra", "aws"])
+
+        rows = self.db._conn.execute(
+            "SELECT tag FROM decision_tags WHERE decision_id = ? ORDER BY tag",
+            (dec_id,),
+        ).fetchall()
+        self.assertEqual([r[0] for r in rows], ["aws", "infra"])
+        self.assertEqual(
+            [d["id"] for d in self.db.get_decisions(tags=["aws"])], [dec_id]
+        )
+
+    def test_tag_filter_does_not_match_substrings(self):
+        """Las etiquetas se comparan exactas, no como subcadena."""
+        self.db.log_decision(title="Cliente HTTP", chosen="httpx", tags=["api-v2"])
+        self.assertEqual(self.db.get_decisions(tags=["api"]), [])
+
     def test_get_decisions_with_status_filter(self):
         """get_decisions filtra por estado en SQL."""
         dec1 = self.db.log_decision(
@@ -1362,6 +2374,141 @@ class TestSearchFilters(unittest.TestCase):
         self.assertEqual(superseded[0]["title"], "Decision reemplazada")
 
 
+class TestKeysetPagination(unittest.TestCase):
+    """Tests de la paginacion por cursor de los listados."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+        self.iter_id = self.db.start_iteration("feature", "Paginacion")
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _pages(self, fetch):
+        """Recorre todas las paginas de ``fetch(cursor)``."""
+        items, cursor, pages = [], None, 0
+        while True:
+            page = fetch(cursor)
+            items.extend(page)
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                return items, pages
+
+    def test_decisions_pages_cover_ties_without_duplicates(self):
+        """Con la misma fecha, el ID desempata y no se repiten filas."""
+        ids = [
+            self.db.log_decision(title=f"D{i}", chosen="x") for i in range(7)
+        ]
+        self.db._conn.execute(
+            "UPDATE decisions SET decided_at = '2026-01-01T00:00:00+00:00'"
+        )
+        self.db._conn.commit()
+        items, pages = self._pages(
+            lambda c: self.db.get_decisions(limit=3, cursor=c)
+        )
+        self.assertEqual([d["id"] for d in items], sorted(ids, reverse=True))
+        self.assertEqual(pages, 3)
+
+    def test_last_page_has_no_cursor(self):
+        """Una pagina que agota los resultados no devuelve cursor."""
+        for i in range(3):
+            self.db.log_decision(title=f"D{i}", chosen="x")
+        self.assertIsNone(self.db.get_decisions(limit=3).next_cursor)
+        self.assertIsNotNone(self.db.get_decisions(limit=2).next_cursor)
+
+    def test_timeline_pages_in_order(self):
+        """La cronologia se pagina en orden cronologico."""
+        ids = [
+            self.db.log_event("paso", payload={"i": i}) for i in range(10)
+        ]
+        items, pages = self._pages(
+            lambda c: self.db.get_timeline(self.iter_id, limit=4, cursor=c)
+        )
+        self.assertEqual([e["id"] for e in items], ids)
+        self.assertEqual(pages, 3)
+
+    def test_search_pages_fts_and_like(self):
+        """La busqueda se pagina con FTS5 y con el fallback LIKE."""
+        for i in range(5):
+            self.db.log_decision(title=f"Cache de sesiones {i}", chosen="Redis")
+            self.db.log_commit(sha=f"{i:040x}", message=f"feat: cache {i}")
+        for mode, query in (("phrase", "cache"), ("substring", "ca")):
+            items, pages = self._pages(
+                lambda c: self.db.search(query, limit=4, mode=mode, cursor=c)
+            )
+            keys = [(r["source_type"], r["id"]) for r in items]
+            self.assertEqual(len(keys), 10, mode)
+            self.assertEqual(len(set(keys)), 10, mode)
+            self.assertEqual(pages, 3, mode)
+
+    def test_file_history_pages(self):
+        """El historial de una ruta se pagina por fecha de commit."""
+        # Fechas en orden inverso al de insercion: manda committed_at
+        self.db.log_commits_bulk(
+            {"sha": f"{i:040x}", "message": f"c{i}", "files": ["src/app.py"],
+             "committed_at": f"2026-01-0{i + 1}T00:00:00+00:00"}
+            for i in reversed(range(5))
+        )
+        first = self.db.get_file_history("src/", limit=3)
+        second = self.db.get_file_history(
+            "src/", limit=3, cursor=first["next_cursor"],
+        )
+        self.assertEqual(
+            [c["message"] for c in first["commits"] + second["commits"]],
+            ["c4", "c3", "c2", "c1", "c0"],
+        )
+        self.assertIsNone(second["next_cursor"])
+
+    def test_invalid_or_foreign_cursor_rejected(self):
+        """Un cursor mal formado o de otro listado lanza ValueError."""
+        self.db.log_event("a")
+        self.db.log_event("b")
+        cursor = self.db.get_timeline(self.iter_id, limit=1).next_cursor
+        with self.assertRaises(ValueError):
+            self.db.get_decisions(cursor=cursor)
+        with self.assertRaises(ValueError):
+            self.db.get_timeline(self.iter_id, cursor="no-es-un-cursor")
+
+    def test_iter_decisions_and_export_have_no_cap(self):
+        """iter_decisions y la exportacion recorren mas de 1000 decisiones."""
+        self.db.log_decisions_bulk(
+            {"title": f"D{i}", "chosen": "x"} for i in range(1205)
+        )
+        self.assertEqual(
+            sum(1 for _ in self.db.iter_decisions(batch_size=100)), 1205,
+        )
+        export_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(export_dir, "adr.md")
+            self.assertEqual(self.db.export_decisions_markdown(path), 1205)
+        finally:
+            import shutil
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+    def test_deep_page_uses_index(self):
+        """La pagina siguiente es un recorrido por indice, sin ordenar."""
+        details = " ".join(
+            row[3] for row in self.db._conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM decisions "
+                "WHERE iteration_id = ? AND (decided_at, id) < (?, ?) "
+                "ORDER BY decided_at DESC, id DESC LIMIT 51",
+                (1, "2026-01-01", 10),
+            )
+        )
+        self.assertIn("idx_decisions_iteration", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
+
 class TestCommitFiles(unittest.TestCase):
     """Tests del campo files en commits.
 
@@ -1447,6 +2594,184 @@ class TestCommitFiles(unittest.TestCase):
         stored_files = json.loads(row[0])
         self.assertEqual(stored_files, expected_files)
 
+    def test_commit_files_populated(self):
+        """log_commit y log_commits_bulk registran cada ruta en commit_files."""
+        commit_id = self.db.log_commit(
+            sha="files_test_sha_4", message="feat: login",
+            files=["src/auth/login.py", "src/auth/login.py", "README.md"],
+        )
+        self.db.log_commits_bulk([
+            {"sha": "files_test_sha_5", "message": "fix: logout",
+             "files": ["src/auth/logout.py"]},
+            {"sha": "files_test_sha_4", "message": "duplicado",
+             "files": ["otro.py"]},
+        ])
+        rows = self.db._conn.execute(
+            "SELECT c.sha, f.path FROM commit_files f "
+            "JOIN commits c ON c.id = f.commit_id ORDER BY f.path"
+        ).fetchall()
+        self.assertEqual(
+            [tuple(r) for r in rows],
+            [("files_test_sha_4", "README.md"),
+             ("files_test_sha_4", "src/auth/login.py"),
+             ("files_test_sha_5", "src/auth/logout.py")],
+        )
+        self.assertIsNotNone(commit_id)
+
+    def test_get_file_history_prefix(self):
+        """get_file_history filtra por prefijo y une las decisiones."""
+        dec_id = self.db.log_decision(title="Tokens JWT", chosen="JWT")
+        first = self.db.log_commit(
+            sha="h" * 40, message="feat: login",
+            files=["src/auth/login.py", "src/app.py"],
+        )
+        second = self.db.log_commit(
+            sha="i" * 40, message="fix: tokens", files=["src/auth/jwt.py"],
+        )
+        self.db.log_commit(sha="j" * 40, message="docs", files=["README.md"])
+        self.db.link_commit_decision(first, dec_id)
+        self.db.link_commit_decision(second, dec_id)
+
+        history = self.db.get_file_history("./src/auth/")
+        self.assertEqual(history["path"], "src/auth/")
+        self.assertEqual(
+            [c["id"] for c in history["commits"]], [second, first],
+        )
+        self.assertEqual(history["commits"][1]["paths"], ["src/auth/login.py"])
+        self.assertEqual(history["commits"][1]["decision_ids"], [dec_id])
+        self.assertEqual(len(history["decisions"]), 1)
+        self.assertEqual(
+            sorted(history["decisions"][0]["commit_ids"]), [first, second],
+        )
+
+        self.assertEqual(
+            [c["id"] for c in self.db.get_file_history("src/app.py")["commits"]],
+            [first],
+        )
+        self.assertEqual(self.db.get_file_history("lib/")["commits"], [])
+        with self.assertRaises(ValueError):
+            self.db.get_file_history("  ")
+
+    def test_file_history_uses_path_index(self):
+        """La consulta por prefijo es un recorrido del indice de rutas."""
+        plan = " ".join(
+            row[3] for row in self.db._conn.execute(
+                "EXPLAIN QUERY PLAN SELECT commit_id FROM commit_files "
+                "WHERE path >= ? AND path < ?", ("src/", "src0"),
+            )
+        )
+        self.assertIn("idx_commit_files_path", plan)
+
+
+class TestPackedColumns(unittest.TestCase):
+    """Tests de la compresion de payloads y listas de ficheros grandes."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+        self.files = [f"src/generated/module_{i}/schema.py" for i in range(500)]
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _stored(self, table, column, row_id):
+        return self.db._conn.execute(
+            f"SELECT {column} FROM {table} WHERE id = ?", (row_id,)
+        ).fetchone()[0]
+
+    def test_pack_text_threshold(self):
+        """Solo se comprimen los textos grandes y la operacion es reversible."""
+        self.assertEqual(pack_text("corto"), "corto")
+        self.assertIsNone(pack_text(None))
+        text = json.dumps(self.files)
+        packed = pack_text(text)
+        self.assertIsInstance(packed, bytes)
+        self.assertLess(len(packed), len(text))
+        self.assertEqual(unpack_text(packed), text)
+        self.assertEqual(unpack_text("corto"), "corto")
+        with self.assertRaises(ValueError):
+            unpack_text(b"?datos")
+
+    def test_large_event_payload_round_trip(self):
+        """get_timeline devuelve el payload comprimido como texto JSON."""
+        iter_id = self.db.start_iteration("feature", "Compresion")
+        payload = {"fase": "desarrollo", "artefactos": self.files}
+        event_id = self.db.log_event(
+            "phase_completed", payload=payload, iteration_id=iter_id,
+        )
+        self.db.log_event("phase_started", payload={"fase": "calidad"},
+                          iteration_id=iter_id)
+
+        self.assertIsInstance(self._stored("events", "payload", event_id), bytes)
+        timeline = self.db.get_timeline(iter_id)
+        self.assertEqual(json.loads(timeline[0]["payload"]), payload)
+        self.assertEqual(json.loads(timeline[1]["payload"]), {"fase": "calidad"})
+
+    def test_large_commit_files_round_trip(self):
+        """Las listas de ficheros grandes se guardan como texto y se buscan."""
+        commit_id = self.db.log_commit(
+            sha="a" * 40, message="chore: regenerar esquemas", files=self.files,
+        )
+        self.assertIsInstance(self._stored("commits", "files", commit_id), str)
+
+        for mode in ("phrase", "substring"):
+            results = self.db.search("regenerar esquemas", mode=mode)
+            self.assertEqual(len(results), 1)
+            self.assertEqual(json.loads(results[0]["files"]), self.files)
+        like = self.db._search_like("regenerar", 10, None)
+        self.assertEqual(json.loads(like[0]["files"]), self.files)
+
+    def test_large_commit_paths_found_by_substring(self):
+        """Una ruta de un commit con muchos ficheros se encuentra por subcadena."""
+        files = [f"src/module_{i}/handler.py" for i in range(60)]
+        files.append("src/auth/tokenRefresher.py")
+        self.db.log_commit(sha="d" * 40, message="refactor: modulos",
+                           files=files)
+        self.db.log_commit(sha="e" * 40, message="fix: sesion",
+                           files=["src/auth/tokenRefresher.py"])
+
+        results = self.db.search("tokenRefresher", mode="substring")
+        self.assertEqual(
+            sorted(r["sha"] for r in results), ["d" * 40, "e" * 40],
+        )
+
+    def test_large_files_keep_fts_in_sync(self):
+        """Los indices siguen sincronizados al modificar o borrar el commit."""
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        commit_id = self.db.log_commit(
+            sha="b" * 40, message="chore: regenerar", files=self.files,
+        )
+        self.db.log_commit(sha="c" * 40, message="fix: ruta",
+                           files=["src/app/main.py"])
+        self.db._conn.execute(
+            "UPDATE commits SET message = 'chore: regenerar todo' WHERE id = ?",
+            (commit_id,),
+        )
+        self.db._conn.execute(
+            "DELETE FROM commit_files WHERE commit_id = ?", (commit_id,),
+        )
+        self.db._conn.execute("DELETE FROM commits WHERE id = ?", (commit_id,))
+        self.db._conn.commit()
+
+        self.assertEqual(self.db.check_health()["status"], "healthy")
+        for index in ("commits_fts", "commits_trigram"):
+            if index == "commits_trigram" and not self.db._trigram_enabled:
+                continue
+            self.db._conn.execute(
+                f"INSERT INTO {index}({index}) VALUES ('integrity-check')"
+            )
+        results = self.db.search("app/main", mode="substring")
+        self.assertEqual([r["sha"] for r in results], ["c" * 40])
+
 
 class TestHealthCheck(unittest.TestCase):
     """Tests de validacion de integridad de la base de datos.
@@ -1479,7 +2804,7 @@ class TestHealthCheck(unittest.TestCase):
     def test_schema_version_check(self):
         """La version del esquema debe ser '3'."""
         health = self.db.check_health()
-        self.assertEqual(health["schema_version"], "3")
+        self.assertEqual(health["schema_version"], str(_SCHEMA_VERSION))
 
     def test_permissions_check(self):
         """Los permisos del fichero deben ser correctos."""
@@ -1553,6 +2878,119 @@ class TestExportImport(unittest.TestCase):
         self.assertIn("backend", content)
         self.assertIn("active", content)
 
+    def test_export_adr_directory_roundtrips_with_import(self):
+        """El formato adr escribe un fichero por decision que import_adrs lee."""
+        dec_id = self.db.log_decision(
+            title="Usar colas para los correos",
+            chosen="RabbitMQ",
+            context="El envio sincrono bloquea las peticiones",
+            alternatives=["Cron"],
+        )
+        self.db.log_decision(title="Cache de sesiones", chosen="Redis")
+        adr_dir = os.path.join(self._export_dir, "adr")
+
+        result = self.db.export_decisions(adr_dir, "adr")
+
+        self.assertEqual(result["exported"], 2)
+        self.assertIn(
+            f"{dec_id:04d}-usar-colas-para-los-correos.md",
+            os.listdir(adr_dir),
+        )
+        other = MemoryDB(os.path.join(self._export_dir, "other.db"))
+        try:
+            self.assertEqual(other.import_adrs(adr_dir), 2)
+            imported = {d["title"]: d for d in other.get_decisions()}
+        finally:
+            other.close()
+        self.assertEqual(
+            imported["Usar colas para los correos"]["context"],
+            "El envio sincrono bloquea las peticiones",
+        )
+        self.assertEqual(imported["Cache de sesiones"]["chosen"], "Redis")
+
+    def test_export_jsonl_decodes_lists(self):
+        """El formato jsonl escribe una decision por linea con listas."""
+        self.db.log_decision(
+            title="API", chosen="REST", alternatives=["gRPC"], tags=["api"],
+        )
+        path = os.path.join(self._export_dir, "decisions.jsonl")
+
+        self.db.export_decisions(path, "jsonl")
+
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["alternatives"], ["gRPC"])
+        self.assertEqual(records[0]["tags"], ["api"])
+
+    def test_incremental_export_writes_only_changes(self):
+        """La exportacion incremental solo escribe lo nuevo o modificado."""
+        first = self.db.log_decision(title="A", chosen="A")
+        self.db.log_decision(title="B", chosen="B")
+        path = os.path.join(self._export_dir, "decisions.jsonl")
+        self.assertEqual(self.db.export_decisions(path, "jsonl")["exported"], 2)
+
+        again = self.db.export_decisions(path, "jsonl", incremental=True)
+        self.assertEqual((again["exported"], again["incremental"]), (0, True))
+
+        self.db.update_decision_status(first, "superseded")
+        third = self.db.log_decision(title="C", chosen="C")
+        result = self.db.export_decisions(path, "jsonl", incremental=True)
+
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(result["exported"], 2)
+        self.assertEqual(
+            [(r["id"], r["status"]) for r in records[2:]],
+            [(first, "superseded"), (third, "active")],
+        )
+
+    def test_incremental_adr_export_rewrites_changed_files(self):
+        """En adr, la exportacion incremental solo toca los ficheros cambiados."""
+        first = self.db.log_decision(title="A", chosen="A")
+        self.db.log_decision(title="B", chosen="B")
+        adr_dir = os.path.join(self._export_dir, "adr")
+        self.db.export_decisions(adr_dir, "adr", incremental=True)
+
+        self.db.add_decision_tags(first, ["revisada"])
+        result = self.db.export_decisions(adr_dir, "adr", incremental=True)
+
+        self.assertEqual(result["exported"], 1)
+        with open(os.path.join(adr_dir, f"{first:04d}-a.md"),
+                  encoding="utf-8") as f:
+            self.assertIn("revisada", f.read())
+
+    def test_cancelled_export_keeps_previous_file(self):
+        """Cancelar la exportacion deja el documento anterior y el punto de control."""
+        self.db.log_decision(title="A", chosen="A")
+        path = os.path.join(self._export_dir, "decisions.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("anterior")
+        cancel = threading.Event()
+        cancel.set()
+
+        with self.assertRaises(OperationCancelled):
+            self.db.export_decisions(path, cancel=cancel)
+        with self.assertRaises(OperationCancelled):
+            self.db.import_adrs(self._export_dir, cancel=cancel)
+
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "anterior")
+        self.assertEqual(os.listdir(self._export_dir), ["decisions.md"])
+        checkpoint = self.db._conn.execute(
+            "SELECT COUNT(*) FROM meta "
+            "WHERE key LIKE 'decision_export_checkpoint:%'"
+        ).fetchone()[0]
+        self.assertEqual(checkpoint, 0)
+
+    def test_export_rejects_invalid_options(self):
+        """Un formato desconocido o markdown incremental lanzan ValueError."""
+        path = os.path.join(self._export_dir, "out")
+        with self.assertRaises(ValueError):
+            self.db.export_decisions(path, "html")
+        with self.assertRaises(ValueError):
+            self.db.export_decisions(path, "markdown", incremental=True)
+
     def test_import_git_history_idempotent(self):
         """Importar el mismo historial dos veces no duplica commits."""
         import subprocess
@@ -1590,5 +3028,263 @@ class TestExportImport(unittest.TestCase):
         self.assertEqual(second_count, 0)
 
 
+class TestGitImportStreaming(unittest.TestCase):
+    """Tests del importador de historial git en streaming con checkpoint."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+        self._repo_dir = tempfile.mkdtemp()
+        self._git("init")
+        self._git("config", "user.email", "test@test.com")
+        self._git("config", "user.name", "Test")
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+        import shutil
+        shutil.rmtree(self._repo_dir, ignore_errors=True)
+
+    def _git(self, *args):
+        import subprocess
+        return subprocess.run(
+            ["git", *args], cwd=self._repo_dir,
+            capture_output=True, check=True, text=True,
+        ).stdout.strip()
+
+    def _commit(self, name, lines, message, date=None):
+        with open(os.path.join(self._repo_dir, name), "w") as f:
+            f.write("".join(f"linea {i}\n" for i in range(lines)))
+        self._git("add", name)
+        env_args = []
+        if date:
+            env_args = ["--date", date]
+        self._git("commit", "-m", message, *env_args)
+        return self._git("rev-parse", "HEAD")
+
+    def _checkpoint(self):
+        row = self.db._conn.execute(
+            "SELECT value FROM meta WHERE key LIKE 'git_import_checkpoint:%'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def test_numstat_and_author_date_are_captured(self):
+        """Se rellenan insertions, deletions, files_changed y la fecha de autor."""
+        self._commit("a.txt", 3, "feat: a | con barra",
+                     date="2024-02-03T04:05:06+00:00")
+        self.db.import_git_history(self._repo_dir)
+
+        row = self.db._conn.execute(
+            "SELECT message, insertions, deletions, files_changed, files, "
+            "committed_at FROM commits"
+        ).fetchone()
+        self.assertEqual(row["message"], "feat: a | con barra")
+        self.assertEqual(row["insertions"], 3)
+        self.assertEqual(row["deletions"], 0)
+        self.assertEqual(row["files_changed"], 1)
+        self.assertEqual(json.loads(row["files"]), ["a.txt"])
+        self.assertTrue(row["committed_at"].startswith("2024-02-03T04:05:06"))
+
+    def test_checkpoint_limits_later_runs_to_new_commits(self):
+        """Tras una importacion completa, solo se recorre checkpoint..HEAD."""
+        self._commit("a.txt", 1, "uno")
+        head = self._commit("b.txt", 1, "dos")
+        self.assertEqual(self.db.import_git_history(self._repo_dir), 2)
+        self.assertEqual(self._checkpoint(), head)
+
+        # Sin commits nuevos no se lanza git log
+        self.assertEqual(self.db.import_git_history(self._repo_dir), 0)
+
+        new_head = self._commit("c.txt", 1, "tres")
+        walked = []
+        original = MemoryDB._iter_git_log
+
+        def spy(repo_path, revision="HEAD", limit=None):
+            walked.append(revision)
+            return original(repo_path, revision, limit)
+
+        self.db._iter_git_log = spy
+        self.assertEqual(self.db.import_git_history(self._repo_dir), 1)
+        self.assertEqual(walked, [f"{head}..{new_head}"])
+        self.assertEqual(self._checkpoint(), new_head)
+
+    def test_capped_import_keeps_checkpoint(self):
+        """Si limit corta el recorrido, una importacion mayor continua."""
+        for i in range(120):
+            self._git("commit", "--allow-empty", "-m", f"commit {i}")
+        head = self._git("rev-parse", "HEAD")
+        self.assertEqual(self.db.import_git_history(self._repo_dir), 100)
+        self.assertIsNone(self._checkpoint())
+
+        self.assertEqual(
+            self.db.import_git_history(self._repo_dir, limit=None), 20,
+        )
+        self.assertEqual(self._checkpoint(), head)
+        self.assertEqual(self.db.get_stats()["total_commits"], 120)
+
+    def test_capped_incremental_import_keeps_previous_checkpoint(self):
+        """Un rango checkpoint..HEAD cortado por limit no mueve el checkpoint."""
+        first = self._commit("a.txt", 1, "base")
+        self.db.import_git_history(self._repo_dir)
+        for i in range(3):
+            self._commit(f"f{i}.txt", 1, f"commit {i}")
+        self.assertEqual(self.db.import_git_history(self._repo_dir, limit=2), 2)
+        self.assertEqual(self._checkpoint(), first)
+
+        # Con un limit que cubre el rango justo, el checkpoint avanza
+        head = self._git("rev-parse", "HEAD")
+        self.assertEqual(self.db.import_git_history(self._repo_dir, limit=3), 1)
+        self.assertEqual(self._checkpoint(), head)
+
+    def test_failing_git_log_reports_stderr(self):
+        """Un git log fallido lanza CalledProcessError con su stderr."""
+        import subprocess
+        gen = MemoryDB._iter_git_log(self._repo_dir, "no-existe")
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            list(gen)
+        self.assertIn("no-existe", ctx.exception.stderr)
+
+    def test_rewritten_history_falls_back_to_full_walk(self):
+        """Si el checkpoint deja de ser ancestro de HEAD, se recorre todo."""
+        self._commit("a.txt", 1, "base")
+        self._commit("b.txt", 1, "descartado")
+        self.db.import_git_history(self._repo_dir)
+
+        self._git("reset", "--hard", "HEAD~1")
+        self._commit("c.txt", 1, "reescrito")
+        self.assertEqual(self.db.import_git_history(self._repo_dir), 1)
+        self.assertEqual(self.db.get_stats()["total_commits"], 3)
+
+    def test_abandoned_iteration_does_not_leave_git_running(self):
+        """Cerrar el generador a medias termina el proceso git."""
+        for i in range(3):
+            self._commit(f"f{i}.txt", 1, f"commit {i}")
+        gen = MemoryDB._iter_git_log(self._repo_dir)
+        first = next(gen)
+        gen.close()
+        self.assertEqual(first["message"], "commit 2")
+
+
+class TestBatchAndBulk(unittest.TestCase):
+    """Tests de batch() y de las APIs de carga masiva (log_*_bulk)."""
+
+    def setUp(self):
+        self._tmpfile = tempfile.NamedTemporaryFile(
+            suffix=".db", delete=False
+        )
+        self._db_path = self._tmpfile.name
+        self._tmpfile.close()
+        self.db = MemoryDB(self._db_path)
+
+    def tearDown(self):
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self._db_path + suffix
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _count_from_other_connection(self, table):
+        """Cuenta filas desde otra conexion (solo ve datos confirmados)."""
+        conn = sqlite3.connect(self._db_path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_batch_defers_commit_until_exit(self):
+        """Dentro de batch() las escrituras no son visibles hasta salir."""
+        with self.db.batch():
+            self.db.log_event("phase_completed", phase="a")
+            self.db.log_event("phase_completed", phase="b")
+            self.assertEqual(self._count_from_other_connection("events"), 0)
+        self.assertEqual(self._count_from_other_connection("events"), 2)
+
+    def test_batch_rolls_back_on_error(self):
+        """Una excepcion dentro de batch() revierte todas sus escrituras."""
+        with self.assertRaises(RuntimeError):
+            with self.db.batch():
+                self.db.log_event("phase_completed")
+                raise RuntimeError("fallo")
+        self.assertEqual(self.db.get_stats()["total_events"], 0)
+
+    def test_nested_batch_error_only_undoes_inner_block(self):
+        """Un error capturado en un batch anidado solo deshace ese bloque."""
+        with self.db.batch():
+            self.db.log_event("outer")
+            try:
+                with self.db.batch():
+                    self.db.log_event("inner")
+                    raise ValueError("fallo interior")
+            except ValueError:
+                pass
+        types = [
+            r[0] for r in self.db._conn.execute(
+                "SELECT event_type FROM events"
+            ).fetchall()
+        ]
+        self.assertEqual(types, ["outer"])
+
+    def test_log_commits_bulk_reports_inserted_and_skipped(self):
+        """log_commits_bulk cuenta insertados y omitidos (duplicados, sin SHA)."""
+        self.db.log_commit(sha="a" * 40, message="ya existia")
+        result = self.db.log_commits_bulk([
+            {"sha": "a" * 40, "message": "duplicado"},
+            {"sha": "b" * 40, "message": "fix: uno", "files": ["x.py"]},
+            {"sha": "c" * 40, "message": "feat: dos",
+             "committed_at": "2025-05-01T00:00:00+00:00"},
+            {"message": "sin sha"},
+        ])
+        self.assertEqual(result, {"inserted": 2, "skipped": 2})
+        self.assertEqual(self.db.get_stats()["total_commits"], 3)
+
+        row = self.db._conn.execute(
+            "SELECT committed_at FROM commits WHERE sha = ?", ("c" * 40,)
+        ).fetchone()
+        self.assertEqual(row[0], "2025-05-01T00:00:00+00:00")
+        # Los commits masivos tambien quedan indexados para la busqueda
+        self.assertEqual(len(self.db.search("feat: dos")), 1)
+
+    def test_log_commits_bulk_uses_active_iteration(self):
+        """Los commits sin iteracion propia se vinculan a la activa."""
+        iter_id = self.db.start_iteration("feature", "Bulk")
+        self.db.log_commits_bulk([{"sha": "d" * 40, "message": "m"}])
+        row = self.db._conn.execute(
+            "SELECT iteration_id FROM commits WHERE sha = ?", ("d" * 40,)
+        ).fetchone()
+        self.assertEqual(row[0], iter_id)
+
+    def test_log_events_bulk(self):
+        """log_events_bulk inserta en lote y sanitiza el payload."""
+        result = self.db.log_events_bulk([
+            {"event_type": "gate_passed", "phase": "calidad"},
+            {"event_type": "note",
+             "payload": {"k": "password = 'supersecreto123'"}},
+            {"phase": "sin tipo"},
+        ])
+        self.assertEqual(result, {"inserted": 2, "skipped": 1})
+        payload = self.db._conn.execute(
+            "SELECT payload FROM events WHERE event_type = 'note'"
+        ).fetchone()[0]
+        self.assertIn("[REDACTED:", payload)
+
+    def test_log_decisions_bulk_writes_tags(self):
+        """log_decisions_bulk registra decisiones con sus etiquetas."""
+        result = self.db.log_decisions_bulk([
+            {"title": "A", "chosen": "1", "tags": ["api"]},
+            {"title": "B", "chosen": "2"},
+            {"title": "Sin opcion"},
+        ])
+        self.assertEqual(result, {"inserted": 2, "skipped": 1})
+        tagged = self.db.get_decisions(tags=["api"])
+        self.assertEqual([d["title"] for d in tagged], ["A"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,16 +7,24 @@ correctos al invocar las operaciones sobre una base de datos temporal.
 Se comprueba tanto el comportamiento exitoso como los casos de validacion.
 """
 
+import io
 import json
 import os
+import shutil
 import sys
 import tempfile
+import threading
 import unittest
+from types import SimpleNamespace
+from unittest import mock
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from core.memory import MemoryDB
-from mcp.memory_server import MemoryMCPServer, _TOOLS
+from core.memory import MemoryDB, OperationCancelled
+from mcp.memory_server import (
+    MemoryMCPServer, _FrameReader, _FrameWriter, _TOOLS, _env_float,
+    _writev_all,
+)
 
 
 class TestMCPTools(unittest.TestCase):
@@ -26,7 +34,9 @@ class TestMCPTools(unittest.TestCase):
         self._tmpfile = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
         self._db_path = self._tmpfile.name
         self._tmpfile.close()
-        self.server = MemoryMCPServer(db_path=self._db_path)
+        self.server = MemoryMCPServer(
+            db_path=self._db_path, maintenance_interval=0,
+        )
         self.db = self.server._ensure_db()
 
     def tearDown(self):
@@ -104,6 +114,109 @@ class TestMCPTools(unittest.TestCase):
         # Una BD recien creada debe estar saludable
         self.assertEqual(result["status"], "healthy")
 
+    def test_memory_health_repair(self):
+        """memory_health con repair resincroniza el indice FTS5."""
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        self.db._conn.execute("DROP TRIGGER fts_insert_decision")
+        self.db.log_decision(title="Decision sin indexar", chosen="A")
+        self.assertEqual(
+            self.server._call_memory_health(self.db, {})["status"], "errors",
+        )
+        result = self.server._call_memory_health(self.db, {"repair": True})
+        self.assertEqual(result["status"], "healthy")
+        self.assertEqual(result["fts_repair"]["mode"], "incremental")
+
+    def test_memory_stats_exact(self):
+        """memory_stats con exact cuenta las filas y coincide con los contadores."""
+        self.db.log_decision(title="Decision contada", chosen="A")
+        self.db.log_event("phase_completed")
+        fast = self.server._call_memory_stats(self.db, {})
+        exact = self.server._call_memory_stats(self.db, {"exact": True})
+        for key in ("total_decisions", "total_events"):
+            self.assertEqual(fast[key], exact[key])
+        self.assertEqual(exact["total_decisions"], 1)
+
+    def _insert_old_event(self):
+        """Inserta un evento con fecha antigua directamente por SQL."""
+        self.db._conn.execute(
+            "INSERT INTO events (event_type, created_at) "
+            "VALUES ('phase_completed', '2020-01-01T00:00:00+00:00')"
+        )
+        self.db._conn.commit()
+
+    def test_memory_purge_summarizes_events(self):
+        """memory_purge devuelve el informe de la compactacion."""
+        self._insert_old_event()
+        result = self.server._call_memory_purge(
+            self.db, {"retention_days": "30"},
+        )
+        self.assertEqual(result["purged_events"], 1)
+        self.assertEqual(result["summarized"], 1)
+        self.assertIn("bytes_reclaimed", result)
+        self.assertEqual(self.db.get_event_summaries()[0]["count"], 1)
+        for value in ("treinta", 0):
+            result = self.server._call_memory_purge(
+                self.db, {"retention_days": value},
+            )
+            self.assertIn("error", result)
+
+    def test_maintenance_runs_in_idle_gap(self):
+        """El hilo de mantenimiento purga y optimiza cuando no hay peticiones."""
+        self._insert_old_event()
+        server = MemoryMCPServer(
+            db_path=self._db_path, retention_days=30, maintenance_idle=0,
+        )
+        db = server._ensure_db()
+        try:
+            thread = server._maintenance_thread
+            self.assertIsNotNone(thread)
+            for _ in range(500):
+                if db.get_maintenance_report():
+                    break
+                threading.Event().wait(0.02)
+            # Solo se lanza una vez por proceso
+            server._ensure_db()
+            self.assertIs(server._maintenance_thread, thread)
+            server._stop_maintenance()
+            self.assertFalse(thread.is_alive())
+
+            self.assertEqual(db.get_stats()["total_events"], 0)
+            health = server._call_memory_health(db, {})["maintenance"]
+            self.assertTrue(health["enabled"])
+            self.assertEqual(
+                list(health["last_run"]["steps"]),
+                ["purge", "optimize", "fts_merge", "checkpoint"],
+            )
+            self.assertEqual(health["last_run"]["steps"]["purge"]["deleted"], 1)
+        finally:
+            db.close()
+
+    def test_maintenance_waits_for_idle_and_interval(self):
+        """Sin hueco entre peticiones o con una pasada reciente, no se ejecuta."""
+        server = MemoryMCPServer(
+            db_path=self._db_path, maintenance_interval=600, maintenance_idle=30,
+        )
+        self.assertFalse(server._is_idle())
+        server._last_activity -= 60
+        self.assertTrue(server._is_idle())
+        server._pending["peticion"] = None
+        self.assertFalse(server._is_idle())
+
+        self.assertEqual(server._maintenance_wait(None), 0)
+        report = self.db.run_maintenance()
+        self.assertGreater(server._maintenance_wait(report), 590)
+        report["interrupted"] = True
+        self.assertEqual(server._maintenance_wait(report), 0)
+
+    def test_env_float_accepts_fractions(self):
+        """Los segundos del mantenimiento admiten decimales."""
+        name = "ALFRED_MEMORY_MAINTENANCE_IDLE"
+        with mock.patch.dict(os.environ, {name: "0.5"}):
+            self.assertEqual(_env_float(name, 30), 0.5)
+        with mock.patch.dict(os.environ, {name: "x"}):
+            self.assertEqual(_env_float(name, 30), 30)
+
     def test_memory_export_returns_count(self):
         """memory_export exporta las decisiones y devuelve el conteo."""
         self.db.log_decision(title="Decision A", chosen="Opcion 1")
@@ -126,6 +239,28 @@ class TestMCPTools(unittest.TestCase):
             if os.path.exists(export_path):
                 os.unlink(export_path)
 
+    def test_memory_export_jsonl_incremental(self):
+        """memory_export en jsonl incremental no repite lo ya exportado."""
+        self.db.log_decision(title="Decision A", chosen="Opcion 1")
+        export_dir = tempfile.mkdtemp()
+        args = {
+            "format": "jsonl",
+            "path": os.path.join(export_dir, "decisions.jsonl"),
+            "incremental": True,
+        }
+        try:
+            first = self.server._call_memory_export(self.db, args)
+            second = self.server._call_memory_export(self.db, args)
+            invalid = self.server._call_memory_export(
+                self.db, {"format": "markdown", "incremental": True},
+            )
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+        self.assertEqual(first["exported"], 1)
+        self.assertEqual(second["exported"], 0)
+        self.assertIn("error", invalid)
+
     # --- Tests de herramientas modificadas ---------------------------------
 
     def test_memory_search_with_filters(self):
@@ -152,6 +287,100 @@ class TestMCPTools(unittest.TestCase):
         self.assertTrue(any("seguridad" in t for t in titles))
         self.assertFalse(any("rendimiento" in t for t in titles))
 
+    def test_memory_search_returns_compact_hits(self):
+        """memory_search devuelve resultados compactos por defecto."""
+        self.db.log_decision(
+            title="Politica de reintentos",
+            chosen="Backoff exponencial",
+            context="Contexto largo que no deberia viajar al agente",
+        )
+        self.db.log_commit(sha="c" * 40, message="fix: politica de reintentos\n\nDetalle")
+
+        result = self.server._call_memory_search(
+            self.db, {"query": "reintentos"},
+        )
+        self.assertEqual(result["total"], 2)
+        for hit in result["results"]:
+            self.assertNotIn("context", hit)
+            self.assertIn("snippet", hit)
+            self.assertIn("score", hit)
+            self.assertIn("date", hit)
+        commit_hit = [
+            h for h in result["results"] if h["source_type"] == "commit"
+        ][0]
+        self.assertEqual(commit_hit["title"], "fix: politica de reintentos")
+        self.assertEqual(commit_hit["sha"], "c" * 40)
+
+    def test_memory_search_full_returns_records(self):
+        """memory_search con full devuelve los registros completos."""
+        self.db.log_decision(
+            title="Politica de reintentos",
+            chosen="Backoff exponencial",
+            context="Contexto completo",
+        )
+        result = self.server._call_memory_search(
+            self.db, {"query": "reintentos", "full": True},
+        )
+        self.assertEqual(result["results"][0]["context"], "Contexto completo")
+
+    def test_memory_search_mode(self):
+        """memory_search pasa el modo y rechaza los no validos."""
+        self.db.log_decision(title="Usar authMiddleware", chosen="Express")
+        result = self.server._call_memory_search(
+            self.db, {"query": "authMidd", "mode": "prefix"},
+        )
+        self.assertEqual(result["total"], 1)
+        result = self.server._call_memory_search(
+            self.db, {"query": "authMidd", "mode": "regex"},
+        )
+        self.assertIn("error", result)
+
+    def test_memory_get_decisions_tags_mode(self):
+        """memory_get_decisions acepta tags_mode y rechaza valores invalidos."""
+        self.db.log_decision(title="A", chosen="A", tags=["x", "y"])
+        self.db.log_decision(title="B", chosen="B", tags=["x"])
+
+        result = self.server._call_memory_get_decisions(
+            self.db, {"tags": ["x", "y"], "tags_mode": "all"},
+        )
+        self.assertEqual([d["title"] for d in result["decisions"]], ["A"])
+
+        result = self.server._call_memory_get_decisions(
+            self.db, {"tags": ["x"], "tags_mode": "none"},
+        )
+        self.assertIn("error", result)
+
+    def test_list_tools_page_with_next_cursor(self):
+        """Los listados devuelven next_cursor y lo aceptan como cursor."""
+        iteration_id = self.db.start_iteration("feature", "Paginas")
+        for i in range(5):
+            self.db.log_decision(title=f"Cache {i}", chosen="Redis")
+            self.db.log_event("paso", payload={"i": i})
+
+        calls = [
+            (self.server._call_memory_get_decisions, {"limit": 2},
+             "decisions"),
+            (self.server._call_memory_get_timeline,
+             {"iteration_id": iteration_id, "limit": 2}, "events"),
+            (self.server._call_memory_search,
+             {"query": "cache", "limit": 2}, "results"),
+        ]
+        for call, args, key in calls:
+            seen, cursor = [], None
+            while True:
+                result = call(self.db, {**args, "cursor": cursor})
+                seen.extend(item["id"] for item in result[key])
+                cursor = result["next_cursor"]
+                if cursor is None:
+                    break
+            self.assertEqual(len(seen), 5, key)
+            self.assertEqual(len(set(seen)), 5, key)
+
+        result = self.server._call_memory_get_decisions(
+            self.db, {"cursor": "roto"},
+        )
+        self.assertIn("error", result)
+
     def test_memory_log_decision_with_tags(self):
         """memory_log_decision registra las etiquetas correctamente."""
         result = self.server._call_memory_log_decision(
@@ -197,11 +426,485 @@ class TestMCPTools(unittest.TestCase):
         files = json.loads(row[0])
         self.assertEqual(files, ["src/app.py", "tests/test_app.py"])
 
+    def test_memory_file_history(self):
+        """memory_file_history devuelve commits y decisiones de una ruta."""
+        dec_id = self.db.log_decision(title="Sesiones en Redis", chosen="Redis")
+        commit_id = self.db.log_commit(
+            sha="e" * 40, message="feat: sesiones",
+            files=["src/auth/session.py", "README.md"],
+        )
+        self.db.link_commit_decision(commit_id, dec_id)
+
+        result = self.server._call_memory_file_history(
+            self.db, {"path": "src/auth/"},
+        )
+        self.assertEqual(result["total"], 1)
+        self.assertEqual(result["commits"][0]["paths"], ["src/auth/session.py"])
+        self.assertEqual(result["decisions"][0]["title"], "Sesiones en Redis")
+
+        result = self.server._call_memory_file_history(self.db, {"path": ""})
+        self.assertIn("error", result)
+
+    def test_string_limit_is_accepted(self):
+        """Un limit enviado como cadena se convierte; uno no valido es error."""
+        for i in range(3):
+            self.db.log_decision(title=f"Decision {i}", chosen="x")
+
+        response = self.server._handle_tools_call(
+            1, {"name": "memory_get_decisions", "arguments": {"limit": "2"}},
+        )
+        result = json.loads(response["result"]["content"][0]["text"])
+        self.assertEqual(result["total"], 2)
+        self.assertIn("next_cursor", result)
+
+        response = self.server._handle_tools_call(
+            1, {"name": "memory_get_decisions", "arguments": {"limit": "dos"}},
+        )
+        self.assertTrue(response["result"]["isError"])
+        self.assertIn("limit", response["result"]["content"][0]["text"])
+
+    def test_memory_import_accepts_string_limit(self):
+        """memory_import convierte un limit en texto y rechaza uno no valido."""
+        calls = []
+        self.db.import_git_history = (
+            lambda path, limit, incremental=True, cancel=None:
+            calls.append(limit) or 0
+        )
+        result = self.server._call_memory_import(
+            self.db, {"source": "git", "limit": "50"},
+        )
+        self.assertEqual(result["imported"], 0)
+        self.assertEqual(calls, [50])
+
+        result = self.server._call_memory_import(
+            self.db, {"source": "git", "limit": "muchos"},
+        )
+        self.assertIn("error", result)
+
+    def test_memory_traverse_decisions(self):
+        """memory_traverse_decisions devuelve el subgrafo en una respuesta."""
+        first = self.db.log_decision(title="JWT", chosen="JWT")
+        second = self.db.log_decision(title="Sesiones", chosen="Redis")
+        self.db.link_decisions(second, first, "supersedes")
+
+        result = self.server._call_memory_traverse_decisions(
+            self.db, {"root_id": first, "direction": "incoming"},
+        )
+        self.assertEqual(result["total_nodes"], 2)
+        self.assertEqual(result["total_edges"], 1)
+        self.assertEqual(result["nodes"][1]["title"], "Sesiones")
+
+        result = self.server._call_memory_traverse_decisions(
+            self.db, {"root_id": 999},
+        )
+        self.assertIn("error", result)
+        result = self.server._call_memory_traverse_decisions(
+            self.db, {"root_id": first, "max_depth": 500},
+        )
+        self.assertIn("error", result)
+        result = self.server._call_memory_traverse_decisions(
+            self.db, {"root_id": first, "max_depth": "1",
+                      "direction": "incoming"},
+        )
+        self.assertEqual(result["total_nodes"], 2)
+
+    # --- Tests de la forma de las respuestas -------------------------------
+
+    def _tool_text(self, name, arguments):
+        response = self.server._handle_tools_call(
+            1, {"name": name, "arguments": arguments},
+        )
+        return response["result"]["content"][0]["text"]
+
+    def test_tool_results_are_compact(self):
+        """Sin sangria, sin nulos y con las columnas JSON decodificadas."""
+        self.db.log_decision(
+            title="API", chosen="REST", alternatives=["gRPC"], tags=["api"],
+        )
+
+        text = self._tool_text("memory_get_decisions", {})
+        decision = json.loads(text)["decisions"][0]
+
+        self.assertNotIn("\n", text)
+        self.assertNotIn(": ", text)
+        self.assertEqual(decision["tags"], ["api"])
+        self.assertEqual(decision["alternatives"], ["gRPC"])
+        self.assertNotIn("rationale", decision)
+
+    def test_fields_and_max_chars(self):
+        """fields proyecta los registros y max_chars recorta el texto."""
+        for i in range(3):
+            self.db.log_decision(
+                title=f"Decision {i}", chosen="x", context="c" * 500,
+            )
+
+        result = json.loads(self._tool_text(
+            "memory_get_decisions",
+            {"limit": 2, "fields": ["context"], "max_chars": 40},
+        ))
+
+        decision = result["decisions"][0]
+        self.assertEqual(set(decision), {"id", "context"})
+        self.assertEqual(decision["context"], "c" * 40 + "...[+460 caracteres]")
+        # El cursor no se recorta
+        self.assertEqual(
+            self.db.get_decisions(limit=2).next_cursor, result["next_cursor"],
+        )
+
+    def test_max_chars_keeps_paths(self):
+        """max_chars no recorta las rutas de memory_file_history."""
+        path = "src/very/long/package/name/with/many/levels/module.py"
+        commit_id = self.db.log_commit(
+            sha="a" * 40, message="m" * 100, files=[path],
+        )
+        dec_id = self.db.log_decision(title="Rutas", chosen="x")
+        self.db.link_commit_decision(commit_id, dec_id)
+
+        result = json.loads(self._tool_text(
+            "memory_file_history", {"path": "src/", "max_chars": 10},
+        ))
+
+        commit = result["commits"][0]
+        self.assertEqual(commit["paths"], [path])
+        self.assertEqual(commit["sha"], "a" * 40)
+        self.assertEqual(commit["decision_ids"], [dec_id])
+        self.assertEqual(commit["message"], "m" * 10 + "...[+90 caracteres]")
+
+    def test_invalid_shaping_options(self):
+        """Un fields o max_chars no valido es un error de parametros."""
+        for arguments in ({"fields": "title"}, {"max_chars": 0}):
+            response = self.server._handle_tools_call(
+                1, {"name": "memory_stats", "arguments": arguments},
+            )
+            self.assertEqual(response["error"]["code"], -32602)
+
+    def test_every_tool_accepts_shaping_params(self):
+        """Todas las herramientas anuncian fields y max_chars."""
+        for tool in _TOOLS:
+            properties = tool["inputSchema"]["properties"]
+            self.assertIn("fields", properties, tool["name"])
+            self.assertIn("max_chars", properties, tool["name"])
+
+    # --- Tests de memory_batch ---------------------------------------------
+
+    def test_batch_returns_results_in_order(self):
+        """Los resultados salen en orden y con fields/max_chars del lote."""
+        self.db.start_iteration("feature", "Lote")
+        self.db.log_decision(title="API", chosen="REST", context="c" * 100)
+
+        result = json.loads(self._tool_text("memory_batch", {
+            "calls": [
+                {"name": "memory_get_iteration"},
+                {"name": "memory_get_decisions", "arguments": {"limit": 5}},
+                {"name": "memory_stats", "arguments": {"max_chars": 500}},
+            ],
+            "fields": ["context"],
+            "max_chars": 10,
+        }))
+
+        self.assertEqual(
+            [entry["name"] for entry in result["results"]],
+            ["memory_get_iteration", "memory_get_decisions", "memory_stats"],
+        )
+        self.assertEqual(result["succeeded"], 3)
+        decision = result["results"][1]["result"]["decisions"][0]
+        self.assertEqual(set(decision), {"id", "context"})
+        # Recortado una sola vez, no otra al serializar el lote
+        self.assertEqual(decision["context"], "c" * 10 + "...[+90 caracteres]")
+
+    def test_batch_isolates_errors(self):
+        """Una llamada que falla no afecta a las demas y deshace lo suyo."""
+        def failing_event(db, args):
+            db.log_decision(title="Revertida", chosen="x")
+            raise RuntimeError("fallo simulado")
+
+        with mock.patch.object(
+            self.server, "_call_memory_log_event", failing_event,
+        ):
+            result = self.server._call_memory_batch(self.db, {"calls": [
+                {"name": "memory_log_event", "arguments": {}},
+                {"name": "memory_log_decision",
+                 "arguments": {"title": "Guardada", "chosen": "y"}},
+                {"name": "memory_update_decision", "arguments": {}},
+                {"name": "memory_batch", "arguments": {"calls": []}},
+                {"name": "memory_nope", "arguments": {}},
+            ]})
+
+        entries = result["results"]
+        self.assertIn("fallo simulado", entries[0]["error"])
+        self.assertNotIn("is_error", entries[1])
+        self.assertIn("error", entries[2]["result"])
+        self.assertTrue(all(entry["is_error"] for entry in entries[2:]))
+        self.assertEqual((result["succeeded"], result["failed"]), (1, 4))
+        titles = [d["title"] for d in self.db.get_decisions()]
+        self.assertEqual(titles, ["Guardada"])
+
+    def test_batch_reads_one_snapshot(self):
+        """Las lecturas del lote no ven lo que otra conexion confirma."""
+        reader = MemoryDB(self._db_path, read_only=True)
+        self.addCleanup(reader.close)
+
+        def write_between(db, args):
+            self.db.log_decision(title="Concurrente", chosen="x")
+            return {}
+
+        with mock.patch.object(self.server, "_call_memory_stats", write_between):
+            result = self.server._call_memory_batch(reader, {"calls": [
+                {"name": "memory_get_decisions", "arguments": {"limit": 5}},
+                {"name": "memory_stats"},
+                {"name": "memory_get_decisions", "arguments": {"limit": 10}},
+            ]})
+
+        totals = [entry["result"].get("total") for entry in result["results"]]
+        self.assertEqual(totals, [0, None, 0])
+        self.assertEqual(len(reader.get_decisions()), 1)
+
+    def test_batch_validation_and_routing(self):
+        """Lote vacio o demasiado largo; solo lecturas va al pool."""
+        self.assertIn("error", self.server._call_memory_batch(self.db, {}))
+        self.assertIn("error", self.server._call_memory_batch(
+            self.db, {"calls": [{"name": "memory_stats"}] * 21},
+        ))
+
+        reads = {"calls": [{"name": "memory_stats"}, {"name": "memory_search"}]}
+        mixed = {"calls": reads["calls"] + [{"name": "memory_log_event"}]}
+        self.assertTrue(MemoryMCPServer._is_read_call("memory_batch", reads))
+        self.assertFalse(MemoryMCPServer._is_read_call("memory_batch", mixed))
+        self.assertFalse(MemoryMCPServer._is_read_call("memory_batch", {}))
+
     # --- Test de conteo total de herramientas ------------------------------
 
-    def test_tool_count_is_15(self):
-        """El catalogo _TOOLS debe contener exactamente 15 herramientas."""
-        self.assertEqual(len(_TOOLS), 15)
+    def test_tool_count_is_18(self):
+        """El catalogo _TOOLS debe contener exactamente 18 herramientas."""
+        self.assertEqual(len(_TOOLS), 18)
+
+
+class _TrickleStream(io.RawIOBase):
+    """Flujo que entrega como mucho ``step`` bytes por lectura."""
+
+    def __init__(self, data, step):
+        self._data = memoryview(data)
+        self._step = step
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self._step, len(self._data))
+        buffer[:count] = self._data[:count]
+        self._data = self._data[count:]
+        return count
+
+
+def _frame(message, separator=b"\r\n\r\n", headers=b""):
+    body = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return headers + b"Content-Length: %d" % len(body) + separator + body
+
+
+class TestFraming(unittest.TestCase):
+    """Verifica el transporte Content-Length: lectura por buffer y writev."""
+
+    def _read_all(self, data, **kwargs):
+        reader = _FrameReader(io.BytesIO(data), **kwargs)
+        messages = []
+        while True:
+            message = reader.read_message()
+            if message is None:
+                return messages
+            messages.append(message)
+
+    def test_reads_several_messages_from_one_chunk(self):
+        """Varios mensajes en una lectura, con lineas y encabezados extra."""
+        data = (
+            _frame({"id": 1}) + b"\r\n"
+            + _frame({"id": 2}, headers=b"Content-Type: application/json\r\n")
+            + _frame({"id": 3, "q": "decision"}, separator=b"\n\n")
+        )
+        self.assertEqual(
+            self._read_all(data),
+            [{"id": 1}, {"id": 2}, {"id": 3, "q": "decision"}],
+        )
+
+    def test_reads_messages_larger_than_buffer_in_pieces(self):
+        """El buffer crece y el cuerpo se completa con lecturas parciales."""
+        big = {"id": 1, "text": "ñ" * 5000}
+        data = _frame(big) + _frame({"id": 2})
+        reader = _FrameReader(_TrickleStream(data, 7), chunk_size=16)
+        self.assertEqual(reader.read_message(), big)
+        self.assertEqual(reader.read_message(), {"id": 2})
+        self.assertIsNone(reader.read_message())
+
+    def test_malformed_header_skips_message(self):
+        """Un Content-Length no numerico da ValueError y se sigue leyendo."""
+        reader = _FrameReader(io.BytesIO(
+            b"Content-Length: abc\r\n\r\n" + _frame({"id": 2})
+        ))
+        with self.assertRaises(ValueError):
+            reader.read_message()
+        self.assertEqual(reader.read_message(), {"id": 2})
+
+    def test_invalid_utf8_body_is_consumed(self):
+        """Un cuerpo que no es UTF-8 da ValueError y no se vuelve a leer."""
+        bad = b"\xff\xfe{}"
+        reader = _FrameReader(io.BytesIO(
+            b"Content-Length: %d\r\n\r\n" % len(bad) + bad + _frame({"id": 2})
+        ))
+        with self.assertRaises(ValueError):
+            reader.read_message()
+        self.assertEqual(reader.read_message(), {"id": 2})
+
+    def test_truncated_body_ends_stream(self):
+        """Un cuerpo incompleto al cerrarse el flujo devuelve None."""
+        self.assertEqual(self._read_all(_frame({"id": 1})[:-2]), [])
+
+    def test_writer_queues_until_flush(self):
+        """Los mensajes se escriben juntos al vaciar la cola."""
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, "rb") as pipe_in, \
+                os.fdopen(write_fd, "wb") as pipe_out:
+            writer = _FrameWriter(pipe_out)
+            writer.enqueue({"id": 1, "result": {}})
+            writer.enqueue({"id": 2, "result": {"text": "ñ"}})
+            self.assertTrue(writer.pending)
+            writer.flush()
+            self.assertFalse(writer.pending)
+            pipe_out.close()
+            data = pipe_in.read()
+        self.assertEqual(
+            self._read_all(data),
+            [{"id": 1, "result": {}}, {"id": 2, "result": {"text": "ñ"}}],
+        )
+
+    def test_writer_without_descriptor_uses_writelines(self):
+        """Sin descriptor de fichero se escribe con writelines."""
+        stream = io.BytesIO()
+        writer = _FrameWriter(stream)
+        writer.enqueue({"id": 1})
+        writer.flush()
+        self.assertEqual(self._read_all(stream.getvalue()), [{"id": 1}])
+
+    def test_writev_all_resumes_partial_writes(self):
+        """Una escritura parcial continua desde el byte en que se quedo."""
+        written = []
+
+        def short_writev(fd, buffers):
+            chunk = b"".join(bytes(b) for b in buffers)[:5]
+            written.append(chunk)
+            return len(chunk)
+
+        with mock.patch("mcp.memory_server.os.writev", short_writev):
+            _writev_all(1, [b"abc", b"defghij", b"", b"k"])
+        self.assertEqual(b"".join(written), b"abcdefghijk")
+
+
+class TestConcurrentLoop(unittest.TestCase):
+    """Verifica el bucle asyncio: respuestas fuera de orden y cancelacion.
+
+    El servidor corre en un hilo con stdin y stdout sustituidos por pipes;
+    el test hace de cliente MCP. ``memory_import`` se reemplaza por un
+    handler que ocupa el hilo escritor hasta que se cancela.
+    """
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self.server = MemoryMCPServer(
+            db_path=os.path.join(self._tmpdir, "memory.db"), retention_days=0,
+        )
+        self.import_started = threading.Event()
+
+        def slow_import(db, args, cancel=None):
+            self.import_started.set()
+            cancel.wait(10)
+            raise OperationCancelled()
+
+        self.server._call_memory_import = slow_import
+
+        server_in, self._client_in = (os.fdopen(fd, mode) for fd, mode in
+                                      zip(os.pipe(), ("rb", "wb")))
+        self._client_out, server_out = (os.fdopen(fd, mode) for fd, mode in
+                                        zip(os.pipe(), ("rb", "wb")))
+        self._streams = [server_in, server_out, self._client_out]
+        self._patches = [
+            mock.patch.object(sys, "stdin", SimpleNamespace(buffer=server_in)),
+            mock.patch.object(sys, "stdout", SimpleNamespace(buffer=server_out)),
+        ]
+        for patch in self._patches:
+            patch.start()
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+        self._thread.start()
+
+    def tearDown(self):
+        self._client_in.close()
+        self._thread.join(timeout=10)
+        for patch in self._patches:
+            patch.stop()
+        for stream in self._streams:
+            stream.close()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def _send(self, method, params=None, request_id=None):
+        message = {"jsonrpc": "2.0", "method": method, "params": params or {}}
+        if request_id is not None:
+            message["id"] = request_id
+        body = json.dumps(message).encode("utf-8")
+        self._client_in.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self._client_in.flush()
+
+    def _call(self, request_id, name, arguments=None):
+        self._send("tools/call", {"name": name, "arguments": arguments or {}},
+                   request_id)
+
+    def _recv(self):
+        length = None
+        while True:
+            line = self._client_out.readline().strip()
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+            elif not line and length is not None:
+                return json.loads(self._client_out.read(length))
+
+    def _start_import(self):
+        self._call(1, "memory_import", {"source": "git"})
+        self.assertTrue(self.import_started.wait(5))
+
+    def test_reads_and_ping_answer_while_writer_is_busy(self):
+        """Un ping y una lectura responden antes que una escritura en curso."""
+        self._start_import()
+        self._send("ping", request_id=2)
+        self._call(3, "memory_get_decisions")
+
+        self.assertEqual({self._recv()["id"], self._recv()["id"]}, {2, 3})
+
+        self._send("notifications/cancelled", {"requestId": 1})
+        self._call(4, "memory_stats")
+        # La peticion cancelada no se responde
+        self.assertEqual(self._recv()["id"], 4)
+
+    def test_invalid_utf8_frame_does_not_block_later_messages(self):
+        """Tras un mensaje que no es UTF-8 se responde el siguiente."""
+        bad = b"\xff\xfe{}"
+        self._client_in.write(b"Content-Length: %d\r\n\r\n" % len(bad) + bad)
+        self._send("ping", request_id=2)
+
+        error = self._recv()
+        self.assertEqual(error["error"]["code"], -32700)
+        self.assertEqual(self._recv()["id"], 2)
+
+    def test_cancel_drops_queued_write(self):
+        """Una escritura cancelada mientras espera turno no se ejecuta."""
+        self._start_import()
+        self._call(2, "memory_log_decision", {"title": "T", "chosen": "C"})
+        self._send("notifications/cancelled", {"requestId": 2})
+        self._send("notifications/cancelled", {"requestId": 1})
+        # memory_health pasa por el hilo escritor detras de la cancelada
+        self._call(3, "memory_health")
+        self.assertEqual(self._recv()["id"], 3)
+        self._call(4, "memory_get_decisions")
+
+        response = self._recv()
+        payload = json.loads(response["result"]["content"][0]["text"])
+        self.assertEqual(response["id"], 4)
+        self.assertEqual(payload["total"], 0)
 
 
 if __name__ == "__main__":
@@ -11,9 +11,12 @@ import unittest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from gui.websocket import (
+    PerMessageDeflate,
     build_accept_key,
+    build_handshake_response,
     encode_frame,
     decode_frame,
+    negotiate_deflate,
     OPCODE_TEXT,
     OPCODE_CLOSE,
     OPCODE_PING,
@@ -95,5 +98,105 @@ class TestWebSocketFraming(unittest.TestCase):
         self.assertEqual(recovered["type"], "event")
 
 
+def _handshake(extensions=None):
+    """Peticion de handshake minima con Sec-WebSocket-Extensions opcional."""
+    lines = [
+        "GET / HTTP/1.1",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==",
+    ]
+    if extensions is not None:
+        lines.append(f"Sec-WebSocket-Extensions: {extensions}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+class TestPerMessageDeflate(unittest.TestCase):
+    """Tests de la extension permessage-deflate (RFC 7692)."""
+
+    def test_no_offer_no_deflate(self):
+        """Sin oferta del cliente no se negocia compresion."""
+        self.assertIsNone(negotiate_deflate(_handshake()))
+        self.assertIsNone(negotiate_deflate(_handshake("x-webkit-other")))
+
+    def test_browser_offer_accepted(self):
+        """La oferta tipica de un navegador se acepta con context takeover."""
+        deflate = negotiate_deflate(
+            _handshake("permessage-deflate; client_max_window_bits"))
+        self.assertIsNotNone(deflate)
+        self.assertFalse(deflate.server_no_context_takeover)
+        self.assertEqual(deflate.response_header(), "permessage-deflate")
+
+    def test_offer_parameters_echoed(self):
+        """Los parametros que limitan al servidor se respetan y se anuncian."""
+        deflate = negotiate_deflate(_handshake(
+            "permessage-deflate; server_no_context_takeover; "
+            "server_max_window_bits=10"))
+        header = deflate.response_header()
+        self.assertIn("server_no_context_takeover", header)
+        self.assertIn("server_max_window_bits=10", header)
+
+    def test_unsupported_offer_falls_through(self):
+        """Una oferta inaceptable se descarta en favor de la siguiente."""
+        deflate = negotiate_deflate(_handshake(
+            "permessage-deflate; server_max_window_bits=8, permessage-deflate"))
+        self.assertIsNotNone(deflate)
+        self.assertEqual(deflate.server_max_window_bits, 15)
+        self.assertIsNone(negotiate_deflate(
+            _handshake("permessage-deflate; bogus_param")))
+
+    def test_handshake_response_includes_extension(self):
+        """La respuesta 101 incluye la extension aceptada."""
+        response = build_handshake_response(
+            "dGhlIHNhbXBsZSBub25jZQ==", "permessage-deflate")
+        self.assertIn(b"Sec-WebSocket-Extensions: permessage-deflate\r\n",
+                      response)
+        self.assertTrue(response.endswith(b"\r\n\r\n"))
+
+    def test_large_message_compressed_roundtrip(self):
+        """Un mensaje grande se marca con RSV1 y se recupera intacto."""
+        import json
+        msg = json.dumps({"type": "init", "payload": ["decision"] * 500})
+        sender, receiver = PerMessageDeflate(), PerMessageDeflate()
+        frame = encode_frame(msg, OPCODE_TEXT, deflate=sender)
+        self.assertEqual(frame[0], 0x80 | 0x40 | OPCODE_TEXT)
+        self.assertLess(len(frame), len(msg) // 10)
+        opcode, payload = decode_frame(frame, deflate=receiver)
+        self.assertEqual(opcode, OPCODE_TEXT)
+        self.assertEqual(payload.decode("utf-8"), msg)
+
+    def test_context_takeover_shrinks_repeated_messages(self):
+        """Con context takeover, un mensaje repetido ocupa mucho menos."""
+        msg = ("update " + "x" * 40 + " ".join(str(i) for i in range(300)))
+        sender, receiver = PerMessageDeflate(), PerMessageDeflate()
+        first = encode_frame(msg, deflate=sender)
+        second = encode_frame(msg, deflate=sender)
+        self.assertLess(len(second), len(first) // 4)
+        for frame in (first, second):
+            self.assertEqual(decode_frame(frame, deflate=receiver)[1],
+                             msg.encode())
+
+    def test_no_context_takeover_is_stateless(self):
+        """Sin context takeover cada mensaje se comprime por separado."""
+        msg = "y" * 2000
+        sender = PerMessageDeflate(server_no_context_takeover=True)
+        self.assertEqual(encode_frame(msg, deflate=sender),
+                         encode_frame(msg, deflate=sender))
+
+    def test_small_and_control_frames_stay_raw(self):
+        """Por debajo del umbral, y en frames de control, no se comprime."""
+        deflate = PerMessageDeflate()
+        self.assertEqual(encode_frame("hola", deflate=deflate),
+                         encode_frame("hola"))
+        ping = encode_frame("p" * 2000, OPCODE_PING, deflate=deflate)
+        self.assertEqual(ping[0], 0x80 | OPCODE_PING)
+
+    def test_compressed_frame_without_negotiation_rejected(self):
+        """Un frame con RSV1 sin deflate negociado es un error."""
+        frame = encode_frame("z" * 2000, deflate=PerMessageDeflate())
+        with self.assertRaises(ValueError):
+            decode_frame(frame)
+
+
 if __name__ == "__main__":
     unittest.main()